@@ -0,0 +1,53 @@
+"""Security audit log API endpoints (admin only)"""
+from datetime import datetime, timedelta
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_db, require_admin
+from app.models.user import User
+from app.schemas.security_log import SecurityLogPage
+from app.services.audit_service import AuditService
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+# Longest range one query may cover (keeps scans to a few partitions)
+MAX_RANGE = timedelta(days=93)
+
+
+@router.get("/security-logs", response_model=SecurityLogPage)
+def list_security_logs(
+    start: Optional[datetime] = Query(None, description="Inclusive; defaults to 24 hours before end"),
+    end: Optional[datetime] = Query(None, description="Exclusive; defaults to now"),
+    user_id: Optional[str] = None,
+    action: Optional[str] = None,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(100, ge=1, le=500),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Search the security audit log
+    
+    Filters by time range, user and action; results are newest first and
+    paginated with next_cursor.
+    """
+    end = end or datetime.utcnow()
+    start = start or end - timedelta(hours=24)
+    if not start < end <= start + MAX_RANGE:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"start must be before end, at most {MAX_RANGE.days} days apart"
+        )
+    
+    try:
+        logs, next_cursor = AuditService.search(db, start, end, user_id, action, cursor, limit)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    
+    return SecurityLogPage(items=logs, next_cursor=next_cursor)
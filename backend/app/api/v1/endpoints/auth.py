@@ -14,6 +14,7 @@ from app.schemas.auth import (
 from app.schemas.user import UserResponse
 from app.schemas.common import MessageResponse
 from app.services.auth_service import AuthService
+from app.utils.audit import AuditContext
 
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
@@ -32,10 +33,16 @@ def register(
 @router.post("/login", response_model=Token)
 def login(
     login_data: UserLogin,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    audit: AuditContext = Depends()
 ):
     """Login and get access token"""
-    user = AuthService.authenticate_user(db, login_data)
+    try:
+        user = AuthService.authenticate_user(db, login_data)
+    except HTTPException as exc:
+        audit.record("login_failed", details=f"{login_data.identifier} ({exc.status_code})")
+        raise
+    audit.record("login_succeeded", user_id=user.id)
     tokens = AuthService.create_tokens(user)
     return tokens
 
@@ -0,0 +1,132 @@
+"""Diagnostics API endpoints: request profiling and memory reports (admin only)"""
+from dataclasses import asdict
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+
+from app.core.config import settings
+from app.core.dependencies import require_admin
+from app.models.user import User
+from app.schemas.common import MessageResponse
+from app.schemas.diagnostics import (
+    MemoryReport, ProfileTokenRequest, ProfileTokenResponse, ProfilingRequest, ProfilingSession
+)
+from app.utils.memory import REQUEST_POLL_SECONDS, memory_reports, request_window
+from app.utils.profiling import arm_profiling, current_profiling, disarm_profiling, sign_profile_token
+
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+
+def _require_profiling_enabled():
+    if not settings.PROFILING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Profiling is disabled on this deployment (PROFILING_ENABLED)"
+        )
+
+
+@router.post("/profiling", response_model=ProfilingSession, status_code=status.HTTP_201_CREATED)
+def start_profiling(
+    body: ProfilingRequest,
+    request: Request,
+    current_user: User = Depends(require_admin)
+):
+    """
+    Profile the next N requests to a route, across all API workers
+    
+    Replaces any armed session. Each profiled request's collapsed stacks are
+    stored under profiles/<session id>/ (see the X-Profile response header).
+    """
+    _require_profiling_enabled()
+    templates = {getattr(route, "path_format", None) for route in request.app.routes}
+    if body.route not in templates:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Unknown route template"
+        )
+    if body.requests > settings.PROFILING_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {settings.PROFILING_MAX_REQUESTS} requests per session"
+        )
+    
+    session = arm_profiling(
+        body.method, body.route, body.requests,
+        body.interval_ms or settings.PROFILING_INTERVAL_MS, body.ttl_seconds
+    )
+    return ProfilingSession(**asdict(session), remaining=session.requests)
+
+
+@router.get("/profiling", response_model=ProfilingSession)
+def get_profiling(current_user: User = Depends(require_admin)):
+    """The armed profiling session"""
+    session = current_profiling()
+    if session is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiling session armed"
+        )
+    return session
+
+
+@router.delete("/profiling", response_model=MessageResponse)
+def stop_profiling(current_user: User = Depends(require_admin)):
+    """Disarm profiling (workers notice within PROFILING_POLL_SECONDS)"""
+    disarm_profiling()
+    return MessageResponse(message="Profiling stopped")
+
+
+@router.post("/profiling/token", response_model=ProfileTokenResponse)
+def create_profile_token(body: ProfileTokenRequest, current_user: User = Depends(require_admin)):
+    """
+    Sign an X-Profile-Token header value
+    
+    Every request to exactly this method and path that carries the header is
+    profiled until the token expires; useful to profile one's own calls
+    without catching other traffic.
+    """
+    _require_profiling_enabled()
+    return ProfileTokenResponse(
+        token=sign_profile_token(body.method, body.path, body.ttl_seconds),
+        expires_in=body.ttl_seconds
+    )
+
+
+def _require_memory_tracing_enabled():
+    if not settings.MEMORY_TRACING_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Memory tracing is disabled on this deployment (MEMORY_TRACING_ENABLED)"
+        )
+
+
+@router.get("/memory", response_model=List[MemoryReport])
+def get_memory_reports(
+    kind: Optional[str] = Query(None, pattern="^(api|worker)$"),
+    top: int = Query(10, ge=1, le=100, description="Sites and units per report"),
+    current_user: User = Depends(require_admin)
+):
+    """
+    Latest trace window report of every API and Celery worker process
+    
+    Each report has the allocations measured per route template or task
+    name, the sites holding memory allocated during the window, and the
+    change per site since the process's previous window.
+    """
+    _require_memory_tracing_enabled()
+    reports = [report for report in memory_reports() if kind is None or report["kind"] == kind]
+    for report in reports:
+        for section in ("units", "top_sites", "growth_since_previous"):
+            report[section] = report[section][:top]
+    return reports
+
+
+@router.post("/memory/window", response_model=MessageResponse, status_code=status.HTTP_202_ACCEPTED)
+def start_memory_window(current_user: User = Depends(require_admin)):
+    """Ask every tracing process to run a trace window now instead of waiting for the next one"""
+    _require_memory_tracing_enabled()
+    request_window()
+    return MessageResponse(
+        message=f"New reports in about {REQUEST_POLL_SECONDS + settings.MEMORY_WINDOW_SECONDS:.0f}s"
+    )
@@ -0,0 +1,54 @@
+"""KYC document upload API endpoints"""
+from typing import List
+from fastapi import APIRouter, Depends, status
+from sqlalchemy.orm import Session
+
+from app.core.dependencies import get_db, get_current_user
+from app.models.user import User
+from app.schemas.kyc import (
+    KYCUploadRequest,
+    KYCUploadResponse,
+    KYCUploadComplete,
+    KYCDocumentResponse
+)
+from app.services.kyc_service import KYCService
+
+
+router = APIRouter(prefix="/kyc", tags=["KYC"])
+
+
+@router.post("/uploads", response_model=KYCUploadResponse, status_code=status.HTTP_201_CREATED)
+def create_upload(
+    upload: KYCUploadRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Get a presigned URL to upload a KYC image directly to storage
+    
+    1. Call this endpoint with the file name, content type and size
+    2. PUT the file to `upload_url` with the returned `headers`
+    3. Call `/kyc/uploads/complete` with the returned `object_name`
+    
+    Omit `document_id` for the first image; reuse the returned one for the others.
+    """
+    return KYCService.create_upload(db, current_user, upload)
+
+
+@router.post("/uploads/complete", response_model=KYCDocumentResponse)
+def complete_upload(
+    completion: KYCUploadComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """Verify an uploaded KYC image and attach it to the document"""
+    return KYCService.complete_upload(db, current_user, completion)
+
+
+@router.get("/documents", response_model=List[KYCDocumentResponse])
+def list_documents(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    """List KYC documents of current user"""
+    return KYCService.list_documents(db, current_user.id)
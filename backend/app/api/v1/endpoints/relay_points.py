@@ -14,6 +14,7 @@ from app.schemas.relay_point import (
 )
 from app.services.shipment_service import ShipmentService
 from app.services.code_service import CodeService
+from app.utils.audit import AuditContext
 
 
 router = APIRouter(prefix="/relay-points", tags=["Relay Points"])
@@ -23,7 +24,8 @@ router = APIRouter(prefix="/relay-points", tags=["Relay Points"])
 def check_in_sender(
     request: CheckInRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit: AuditContext = Depends()
 ):
     """
     Sender checks in at relay point
@@ -34,7 +36,9 @@ def check_in_sender(
     - Updates status to AT_RELAY_POINT
     """
     # Verify unique code
-    if not CodeService.verify_unique_code(db, request.shipment_id, request.unique_code):
+    verified = CodeService.verify_unique_code(db, request.shipment_id, request.unique_code)
+    audit.code_check("unique_code", verified, current_user.id, request.shipment_id)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid unique code"
@@ -77,7 +81,8 @@ def check_in_sender(
 def verify_traveler(
     request: VerifyTravelerRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit: AuditContext = Depends()
 ):
     """
     Verify traveler identity and code before handoff
@@ -85,7 +90,9 @@ def verify_traveler(
     Workflow Step 3a: Traveler shows ID and provides traveler_code
     """
     # Verify traveler code
-    if not CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code):
+    verified = CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code)
+    audit.code_check("traveler_code", verified, current_user.id, request.shipment_id)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid traveler code"
@@ -119,7 +126,8 @@ def verify_traveler(
 def handoff_to_traveler(
     request: HandoffRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit: AuditContext = Depends()
 ):
     """
     Hand off envelope to traveler
@@ -129,7 +137,9 @@ def handoff_to_traveler(
     - Updates status to WITH_TRAVELER
     """
     # Verify traveler code
-    if not CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code):
+    verified = CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code)
+    audit.code_check("traveler_code", verified, current_user.id, request.shipment_id)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid traveler code"
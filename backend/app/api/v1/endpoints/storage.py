@@ -0,0 +1,96 @@
+"""Signed downloads and uploads for the local filesystem storage backend"""
+import re
+from typing import AsyncIterator
+from fastapi import APIRouter, HTTPException, Request, Response, status
+from fastapi.responses import StreamingResponse
+
+from app.core.config import settings
+from app.utils.local_storage import LocalStorageClient
+from app.utils.storage import storage_client
+
+
+router = APIRouter(prefix="/storage", tags=["Storage"])
+
+# Single byte range: "bytes=start-end", "bytes=start-" or "bytes=-suffix"
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def _local_client(method: str, object_name: str, expires: int, signature: str) -> LocalStorageClient:
+    """Local storage client, if the presigned request is valid"""
+    client = storage_client.resolve()
+    if not isinstance(client, LocalStorageClient):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not found")
+    if not client.verify_signature(method, object_name, expires, signature):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid or expired signature")
+    return client
+
+
+@router.get("/{object_name:path}")
+def download_object(object_name: str, expires: int, signature: str, request: Request):
+    """
+    Download an object through a presigned URL
+    
+    Whole files are sent with sendfile where the server supports it;
+    a single `Range` is served from an mmap of the file.
+    """
+    client = _local_client("GET", object_name, expires, signature)
+    info = client.stat_file(object_name)
+    if info is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Object not found")
+    
+    match = RANGE_PATTERN.match(request.headers.get("range", ""))
+    if not match or match.groups() == ("", ""):
+        response = client.file_response(object_name)
+        if response is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Object not found")
+        response.headers["accept-ranges"] = "bytes"
+        return response
+    
+    first, last = match.groups()
+    if first:
+        start, end = int(first), min(int(last), info.size - 1) if last else info.size - 1
+    else:
+        start, end = max(info.size - int(last), 0), info.size - 1
+    if start > end:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            detail="Range not satisfiable",
+            headers={"content-range": f"bytes */{info.size}"}
+        )
+    
+    chunks = client.stream_file(object_name, offset=start, length=end - start + 1)
+    if chunks is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Object not found")
+    return StreamingResponse(
+        chunks,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        media_type=info.content_type,
+        headers={
+            "accept-ranges": "bytes",
+            "content-range": f"bytes {start}-{end}/{info.size}",
+            "content-length": str(end - start + 1)
+        }
+    )
+
+
+@router.put("/{object_name:path}")
+async def upload_object(object_name: str, expires: int, signature: str, request: Request):
+    """Upload an object through a presigned URL (streamed to disk)"""
+    client = _local_client("PUT", object_name, expires, signature)
+    max_size = settings.max_upload_size_bytes
+    if int(request.headers.get("content-length") or 0) > max_size:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+    
+    async def limited_body() -> AsyncIterator[bytes]:
+        # Chunked bodies carry no Content-Length, so count as we go
+        received = 0
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_size:
+                raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail="File too large")
+            yield chunk
+    
+    content_type = request.headers.get("content-type", "application/octet-stream")
+    if await client.upload_async_iter(limited_body(), object_name, content_type) is None:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail="Upload failed")
+    return Response(status_code=status.HTTP_200_OK)
@@ -13,6 +13,7 @@ from app.schemas.traveler import (
 )
 from app.services.shipment_service import ShipmentService
 from app.services.code_service import CodeService
+from app.utils.audit import AuditContext
 
 
 router = APIRouter(prefix="/travelers", tags=["Travelers"])
@@ -22,7 +23,8 @@ router = APIRouter(prefix="/travelers", tags=["Travelers"])
 def pickup_from_relay_point(
     request: PickupRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit: AuditContext = Depends()
 ):
     """
     Traveler picks up envelope from relay point
@@ -33,7 +35,9 @@ def pickup_from_relay_point(
     - Status updated to WITH_TRAVELER (done by relay point handoff)
     """
     # Verify traveler code
-    if not CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code):
+    verified = CodeService.verify_traveler_code(db, request.shipment_id, request.traveler_code)
+    audit.code_check("traveler_code", verified, current_user.id, request.shipment_id)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid traveler code"
@@ -74,7 +78,8 @@ def pickup_from_relay_point(
 def deliver_to_receiver(
     request: DeliveryRequest,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    current_user: User = Depends(get_current_user),
+    audit: AuditContext = Depends()
 ):
     """
     Traveler delivers envelope to receiver
@@ -85,7 +90,9 @@ def deliver_to_receiver(
     - Status updated to DELIVERED
     """
     # Verify delivery code
-    if not CodeService.verify_delivery_code(db, request.shipment_id, request.delivery_code):
+    verified = CodeService.verify_delivery_code(db, request.shipment_id, request.delivery_code)
+    audit.code_check("delivery_code", verified, current_user.id, request.shipment_id)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid delivery code. Please ask receiver for correct code."
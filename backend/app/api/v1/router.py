@@ -1,7 +1,7 @@
 """API router configuration for DocUrgent"""
 from fastapi import APIRouter
 
-from app.api.v1.endpoints import auth, shipments, relay_points, travelers
+from app.api.v1.endpoints import auth, shipments, relay_points, travelers, kyc, storage, audit, diagnostics
 
 api_router = APIRouter()
 
@@ -10,3 +10,7 @@ api_router.include_router(auth.router)
 api_router.include_router(shipments.router)
 api_router.include_router(relay_points.router)
 api_router.include_router(travelers.router)
+api_router.include_router(kyc.router)
+api_router.include_router(storage.router)
+api_router.include_router(audit.router)
+api_router.include_router(diagnostics.router)
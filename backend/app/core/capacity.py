@@ -0,0 +1,83 @@
+"""Consistent sizing of API workers, request threads and database connections"""
+import math
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class CapacityPlan:
+    """
+    How much work one API worker process takes on
+    
+    Sync endpoints (and get_db, which holds one session for the request)
+    each need a threadpool thread and a pooled connection. The limits are
+    derived together so that an admitted request never waits for either:
+    - the pod's DB_MAX_CONNECTIONS are split between the workers, less
+      DB_RESERVED_CONNECTIONS per worker for background threads (audit writer)
+    - threads = admitted requests = pool_size, at most API_THREADS
+    - requests beyond that wait in a bounded admission queue (up to
+      API_QUEUE_LIMIT, for API_QUEUE_TIMEOUT_SECONDS) and then get 503
+    """
+    workers: int
+    threads: int
+    max_inflight: int
+    queue_limit: int
+    queue_timeout: float
+    db_pool_size: int
+    db_max_overflow: int
+    db_pool_timeout: float
+    
+    @property
+    def db_connections(self) -> int:
+        """Connections the whole pod may open"""
+        return self.workers * (self.db_pool_size + self.db_max_overflow)
+
+
+def _cgroup_quota(root: Path) -> Optional[float]:
+    """CPU quota of the container in CPUs (cgroup v2, then v1), None when unlimited"""
+    try:
+        quota, period = (root / "cpu.max").read_text().split()  # "max 100000" or "50000 100000"
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        quota = int((root / "cpu" / "cpu.cfs_quota_us").read_text())
+        period = int((root / "cpu" / "cpu.cfs_period_us").read_text())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus(cgroup_root: str = "/sys/fs/cgroup") -> float:
+    """
+    CPUs this process may use: the CPUs it may be scheduled on, capped by
+    the cgroup CPU quota (a pod's limits.cpu), which os.cpu_count() ignores
+    """
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = _cgroup_quota(Path(cgroup_root))
+    return min(float(cpus), quota) if quota else float(cpus)
+
+
+def capacity_plan() -> CapacityPlan:
+    """The plan for the current settings"""
+    # One async worker per CPU of quota keeps every core busy without workers
+    # preempting each other (a 500m limit still gets one)
+    workers = settings.API_WORKERS if settings.API_WORKERS > 0 else math.ceil(available_cpus())
+    workers = max(1, workers)
+    reserved = settings.DB_RESERVED_CONNECTIONS
+    per_worker = settings.DB_MAX_CONNECTIONS // workers
+    threads = max(1, min(settings.API_THREADS, per_worker - reserved))
+    return CapacityPlan(
+        workers=workers,
+        threads=threads,
+        max_inflight=threads,
+        queue_limit=settings.API_QUEUE_LIMIT,
+        queue_timeout=settings.API_QUEUE_TIMEOUT_SECONDS,
+        db_pool_size=threads,
+        db_max_overflow=reserved,
+        db_pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    )
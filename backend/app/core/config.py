@@ -2,6 +2,8 @@
 from typing import List
 from pydantic_settings import BaseSettings
 
+from app.core.lazy import LazyClient
+
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
@@ -20,6 +22,27 @@ class Settings(BaseSettings):
     DATABASE_URL: str
     DB_ECHO: bool = False
     
+    # Capacity per pod, split between API workers by app.core.capacity:
+    # worker processes (0 = one per CPU of the cgroup quota), threads per worker
+    # (cap), Postgres connections for the pod, connections per worker kept for
+    # background threads, how long a request may wait for a pooled connection,
+    # requests queued per worker and for how long
+    API_WORKERS: int = 0
+    API_THREADS: int = 40
+    DB_MAX_CONNECTIONS: int = 120
+    DB_RESERVED_CONNECTIONS: int = 2
+    DB_POOL_TIMEOUT_SECONDS: float = 10.0
+    API_QUEUE_LIMIT: int = 100
+    API_QUEUE_TIMEOUT_SECONDS: float = 5.0
+    # Window of latencies behind the per-class p95 used for load shedding (app.utils.concurrency)
+    ADMISSION_WINDOW_SECONDS: float = 10.0
+    # Gunicorn (app.server): seconds a stopping worker gets to finish in-flight requests
+    # (below the pod's terminationGracePeriodSeconds), and requests after which a
+    # worker is replaced, plus up to JITTER more so workers do not restart together
+    API_GRACEFUL_TIMEOUT_SECONDS: float = 25.0
+    API_MAX_REQUESTS: int = 10000
+    API_MAX_REQUESTS_JITTER: int = 1000
+    
     # JWT Authentication
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
@@ -31,10 +54,16 @@ class Settings(BaseSettings):
     REDIS_PORT: int = 6379
     REDIS_DB: int = 0
     REDIS_PASSWORD: str = ""
+    # Connect and per-command timeout
+    REDIS_SOCKET_TIMEOUT_SECONDS: float = 1.0
     
     # Celery
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    # Messages reserved per worker process (pools override it, see celery-entrypoint.sh)
+    CELERY_PREFETCH_MULTIPLIER: int = 4
+    # Port of the worker's Prometheus endpoint (0 = disabled)
+    CELERY_METRICS_PORT: int = 0
     
     # MinIO / S3 Storage
     MINIO_ENDPOINT: str = "localhost:9000"
@@ -42,6 +71,17 @@ class Settings(BaseSettings):
     MINIO_SECRET_KEY: str
     MINIO_BUCKET: str = "docurgent-files"
     MINIO_SECURE: bool = False
+    MINIO_REGION: str = "us-east-1"
+    # Read timeout of storage requests (connects time out sooner)
+    STORAGE_TIMEOUT_SECONDS: float = 10.0
+    # Host browsers use for presigned URLs (defaults to MINIO_ENDPOINT)
+    MINIO_PUBLIC_ENDPOINT: str = ""
+    
+    # Storage backend: "minio" (S3 API) or "local" (filesystem, on-prem relays and tests)
+    STORAGE_BACKEND: str = "minio"
+    LOCAL_STORAGE_ROOT: str = "./storage"
+    # Base URL prepended to signed local storage links (empty = relative to the API host)
+    LOCAL_STORAGE_PUBLIC_URL: str = ""
     
     # SMTP Email
     SMTP_HOST: str
@@ -50,11 +90,87 @@ class Settings(BaseSettings):
     SMTP_PASSWORD: str
     SMTP_FROM: str
     SMTP_TLS: bool = True
+    # Pooled sender: connections kept open, messages per batch, retries on connection errors
+    SMTP_POOL_SIZE: int = 3
+    SMTP_BATCH_SIZE: int = 50
+    SMTP_TIMEOUT: int = 30
+    SMTP_IDLE_SECONDS: int = 60
+    SMTP_MAX_ATTEMPTS: int = 3
+    
+    # Bulk notifications: recipients per chunk and concurrent sends per channel
+    NOTIFICATION_CHUNK_SIZE: int = 1000
+    NOTIFICATION_EMAIL_CONCURRENCY: int = 50
+    NOTIFICATION_SMS_CONCURRENCY: int = 10
+    NOTIFICATION_PUSH_CONCURRENCY: int = 4
+    # Push gateway receiving {"user_ids", "title", "body", "data"} batches (empty = push disabled)
+    PUSH_GATEWAY_URL: str = ""
+    PUSH_BATCH_SIZE: int = 500
+    
+    # Transactional outbox relay: "celery" (handle_outbox_event task) or "redis" (stream)
+    OUTBOX_PUBLISHER: str = "celery"
+    OUTBOX_STREAM: str = "docurgent:events"
+    OUTBOX_STREAM_MAXLEN: int = 100000
+    OUTBOX_BATCH_SIZE: int = 100
+    OUTBOX_POLL_SECONDS: float = 1.0
+    OUTBOX_MAX_BACKOFF_SECONDS: int = 300
+    # How long consumers remember handled event ids
+    OUTBOX_DEDUPE_SECONDS: int = 7 * 24 * 3600
+    
+    # Reports: rows fetched per server-side cursor batch, download link lifetime
+    REPORT_BATCH_SIZE: int = 5000
+    REPORT_URL_EXPIRES_SECONDS: int = 24 * 3600
+    
+    # Maintenance jobs (Celery beat): rows per batch, pause between batches, time budget per run
+    MAINTENANCE_BATCH_SIZE: int = 1000
+    MAINTENANCE_BATCH_PAUSE_SECONDS: float = 0.05
+    MAINTENANCE_MAX_SECONDS: int = 240
+    OTP_PURGE_GRACE_HOURS: int = 24
+    STUCK_SHIPMENT_HOURS: int = 72
+    
+    # Security audit log: flush every AUDIT_FLUSH_MS or AUDIT_BATCH_SIZE events,
+    # drop events beyond AUDIT_QUEUE_SIZE; monthly partitions kept and pre-created
+    AUDIT_FLUSH_MS: int = 250
+    AUDIT_BATCH_SIZE: int = 500
+    AUDIT_QUEUE_SIZE: int = 10000
+    AUDIT_RETENTION_MONTHS: int = 13
+    AUDIT_PARTITIONS_AHEAD: int = 2
+    
+    # On-demand request profiling (armed by an admin; off unless enabled):
+    # sampling interval, most requests per session, how often workers check Redis
+    PROFILING_ENABLED: bool = False
+    PROFILING_INTERVAL_MS: float = 5.0
+    PROFILING_MAX_REQUESTS: int = 100
+    PROFILING_POLL_SECONDS: float = 2.0
+    
+    # Distributed tracing: exporter (none, memory, file, otlp or "package.module:Class"),
+    # share of traces sampled at the root, file and OTLP/HTTP destinations
+    TRACING_EXPORTER: str = "none"
+    TRACING_SAMPLE_RATIO: float = 1.0
+    TRACING_SERVICE_NAME: str = "docurgent-backend"
+    TRACING_FILE_PATH: str = "traces.jsonl"
+    TRACING_OTLP_ENDPOINT: str = "http://localhost:4318/v1/traces"
+    
+    # tracemalloc instrumentation, traced in windows of MEMORY_WINDOW_SECONDS every
+    # MEMORY_SNAPSHOT_SECONDS (allocation-heavy code runs ~10x slower inside a window);
+    # frames kept per allocation, sites per report
+    MEMORY_TRACING_ENABLED: bool = False
+    MEMORY_TRACE_FRAMES: int = 1
+    MEMORY_WINDOW_SECONDS: int = 10
+    MEMORY_SNAPSHOT_SECONDS: int = 300
+    MEMORY_TOP_SITES: int = 25
+    
+    # Readiness: seconds between background checks of Postgres, Redis and storage (0 = no checks)
+    HEALTH_CHECK_INTERVAL_SECONDS: float = 5.0
+    
+    # Circuit breakers: per-dependency overrides of app.utils.circuit_breaker.BREAKER_DEFAULTS,
+    # "<dependency>=<failures in a row>/<seconds open>", comma separated
+    CIRCUIT_BREAKERS: str = ""
     
     # Twilio
     TWILIO_ACCOUNT_SID: str
     TWILIO_AUTH_TOKEN: str
     TWILIO_PHONE_NUMBER: str
+    TWILIO_TIMEOUT_SECONDS: float = 10.0
     
     # Stripe
     STRIPE_SECRET_KEY: str
@@ -71,8 +187,15 @@ class Settings(BaseSettings):
             return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
         return [self.CORS_ORIGINS] if self.CORS_ORIGINS else ["http://localhost:3000"]
     
-    # Rate Limiting
+    # Rate Limiting (requests per client IP per minute; 0 disables)
     RATE_LIMIT_PER_MINUTE: int = 60
+    # Reverse proxies (IPs or CIDRs, comma-separated) whose X-Forwarded-For is
+    # trusted when resolving client IPs (app.utils.middleware.client_ip)
+    TRUSTED_PROXIES: str = "127.0.0.1,::1"
+    
+    # Idempotency (Idempotency-Key header on mutating workflow endpoints)
+    IDEMPOTENCY_TTL_SECONDS: int = 24 * 60 * 60
+    IDEMPOTENCY_LOCK_SECONDS: int = 30
     
     # Pagination
     DEFAULT_PAGE_SIZE: int = 20
@@ -82,6 +205,14 @@ class Settings(BaseSettings):
     MAX_UPLOAD_SIZE_MB: int = 10
     ALLOWED_EXTENSIONS: str = "pdf,jpg,jpeg,png,gif"
     
+    # Lifetime of presigned direct-to-storage upload URLs
+    UPLOAD_URL_EXPIRE_SECONDS: int = 300
+    
+    @property
+    def max_upload_size_bytes(self) -> int:
+        """Maximum upload size in bytes"""
+        return self.MAX_UPLOAD_SIZE_MB * 1024 * 1024
+    
     @property
     def allowed_extensions_list(self) -> List[str]:
         """Parse allowed extensions from string to list"""
@@ -105,5 +236,5 @@ class Settings(BaseSettings):
         case_sensitive = True
 
 
-# Global settings instance
-settings = Settings()
+# Global settings instance (read from the environment on first use)
+settings: Settings = LazyClient(Settings)
@@ -0,0 +1,69 @@
+"""Lazily constructed clients for external services"""
+import threading
+from typing import Callable, Generic, List, Optional, TypeVar
+
+
+T = TypeVar("T")
+
+# Every lazy client, so the application lifespan can close them all
+_registry: List["LazyClient"] = []
+
+
+class LazyClient(Generic[T]):
+    """
+    Proxy that builds its client on first use
+    
+    Importing a module that defines a client costs nothing: no settings
+    parsing and no network calls until an attribute is first accessed.
+    Attribute access is forwarded to the real client.
+    
+    - resolve(): build the client (once, thread-safe) and return it
+    - override(instance): inject a ready-made client, e.g. a fake in tests
+    - reset(): close the client; the next use builds a fresh one
+    """
+    
+    def __init__(self, factory: Callable[[], T], closer: Optional[Callable[[T], None]] = None):
+        self._factory = factory
+        self._closer = closer
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+        _registry.append(self)
+    
+    @property
+    def initialized(self) -> bool:
+        """Whether the client has been built"""
+        return self._instance is not None
+    
+    def resolve(self) -> T:
+        """Return the client, building it on first call"""
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return instance
+    
+    def override(self, instance: Optional[T]) -> None:
+        """Replace the client (None forgets it without closing)"""
+        with self._lock:
+            self._instance = instance
+    
+    def reset(self) -> None:
+        """Close the client if it was built and forget it"""
+        with self._lock:
+            instance, self._instance = self._instance, None
+        if instance is not None and self._closer is not None:
+            self._closer(instance)
+    
+    def __getattr__(self, name: str):
+        # Private names belong to the proxy itself (and guard copy/pickle)
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+
+
+def close_all_clients() -> None:
+    """Close every client that was built (application shutdown)"""
+    for client in reversed(_registry):
+        client.reset()
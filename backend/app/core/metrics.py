@@ -0,0 +1,238 @@
+"""Prometheus metrics shared across the application and workers"""
+import os
+
+from prometheus_client import REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, multiprocess
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    Registry to expose on a metrics endpoint
+    
+    With PROMETHEUS_MULTIPROC_DIR set (prefork workers, several API workers)
+    every process writes its samples there and they are merged on collection.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+# HTTP requests (app.utils.http_metrics), labelled by route template
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request to sending the last response byte",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10, 30)
+)
+HTTP_REQUESTS = Counter(
+    "http_requests",
+    "HTTP responses by status code",
+    ["method", "route", "status"]
+)
+HTTP_REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled (summed over API worker processes)",
+    ["method"],
+    multiprocess_mode="livesum"
+)
+HTTP_REQUEST_BYTES = Histogram(
+    "http_request_size_bytes",
+    "Request body size",
+    ["method", "route"],
+    buckets=(0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+HTTP_RESPONSE_BYTES = Histogram(
+    "http_response_size_bytes",
+    "Response body size",
+    ["method", "route"],
+    buckets=(0, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+)
+
+
+# Outbound email (app.utils.email)
+SMTP_MESSAGE_SECONDS = Histogram(
+    "smtp_message_seconds",
+    "Time from queueing an email to its final outcome",
+    ["outcome"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+SMTP_MESSAGES = Counter(
+    "smtp_messages",
+    "Emails by final outcome (sent, rejected, failed)",
+    ["outcome"]
+)
+SMTP_RETRIES = Counter(
+    "smtp_retries",
+    "Emails requeued after a connection failure"
+)
+SMTP_CONNECTIONS = Counter(
+    "smtp_connections",
+    "SMTP connection attempts (connect, TLS and AUTH) by result",
+    ["result"]
+)
+
+
+# Transactional outbox relay (app.workers.outbox_relay)
+OUTBOX_PUBLISHED = Counter(
+    "outbox_published",
+    "Outbox events published to the broker"
+)
+OUTBOX_FAILURES = Counter(
+    "outbox_publish_failures",
+    "Outbox publish attempts that failed and were rescheduled"
+)
+OUTBOX_LAG_SECONDS = Histogram(
+    "outbox_lag_seconds",
+    "Time from an event's commit to its publication",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+)
+
+
+# Celery tasks (signal handlers in app.workers.celery_app)
+CELERY_TASK_QUEUE_SECONDS = Histogram(
+    "celery_task_queue_seconds",
+    "Time from publishing a task to a worker starting it",
+    ["task", "queue"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+)
+CELERY_TASK_RUNTIME_SECONDS = Histogram(
+    "celery_task_runtime_seconds",
+    "Task execution time by final state",
+    ["task", "state"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900, 1800)
+)
+
+
+# Maintenance sweeps (app.services.maintenance_service)
+MAINTENANCE_ROWS = Counter(
+    "maintenance_rows",
+    "Rows deleted, updated or flagged by maintenance jobs",
+    ["job"]
+)
+MAINTENANCE_RUN_SECONDS = Histogram(
+    "maintenance_run_seconds",
+    "Duration of a maintenance job run",
+    ["job"],
+    buckets=(0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 120, 300, 600)
+)
+
+
+# Security audit writer (app.utils.audit)
+AUDIT_EVENTS = Counter(
+    "audit_events",
+    "Security audit events by outcome (written, dropped, failed)",
+    ["result"]
+)
+AUDIT_FLUSH_SECONDS = Histogram(
+    "audit_flush_seconds",
+    "Time to write one batch of audit events",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+)
+
+
+# Span export (app.utils.tracing)
+TRACE_SPANS = Counter(
+    "trace_spans",
+    "Sampled spans by export outcome (exported, dropped, failed)",
+    ["result"]
+)
+
+
+# tracemalloc sampling (app.utils.memory), when MEMORY_TRACING_ENABLED
+MEMORY_PEAK_BYTES = Histogram(
+    "memory_unit_peak_bytes",
+    "Peak traced memory above the start of a sampled request or task",
+    ["kind", "name"],
+    buckets=(65536, 262144, 1048576, 4194304, 16777216, 67108864, 268435456, 1073741824)
+)
+
+
+# Admission control and request capacity (app.utils.concurrency, app.database.database)
+ADMISSION_QUEUE_DEPTH = Gauge(
+    "admission_queue_depth",
+    "Requests waiting for an admission slot (summed over API worker processes)",
+    ["route_class"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_INFLIGHT = Gauge(
+    "admission_inflight",
+    "Admitted requests being handled (summed over API worker processes)",
+    ["route_class"],
+    multiprocess_mode="livesum"
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "admission_wait_seconds",
+    "Time an admitted request waited for a slot",
+    ["route_class"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+ADMISSION_P95_SECONDS = Gauge(
+    "admission_p95_latency_seconds",
+    "Recent p95 latency (queue wait + handling) seen by admission control (worst API worker)",
+    ["route_class"],
+    multiprocess_mode="livemax"
+)
+ADMISSION_REJECTED = Counter(
+    "admission_rejected",
+    "Requests shed with 503 (slo, delay, queue_full, evicted, timeout)",
+    ["route_class", "reason"]
+)
+THREADPOOL_BUSY = Gauge(
+    "threadpool_busy_threads",
+    "Request threadpool threads in use (summed over API worker processes)",
+    multiprocess_mode="livesum"
+)
+THREADPOOL_WAITING = Gauge(
+    "threadpool_waiting_tasks",
+    "Tasks waiting for a threadpool thread (summed over API worker processes)",
+    multiprocess_mode="livesum"
+)
+DB_POOL_CHECKOUT_SECONDS = Histogram(
+    "db_pool_checkout_seconds",
+    "Time to get a connection from the SQLAlchemy pool (including connecting)",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+DB_POOL_TIMEOUTS = Counter(
+    "db_pool_timeouts",
+    "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS"
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Pooled connections in use (summed over processes)",
+    multiprocess_mode="livesum"
+)
+
+
+# Circuit breakers around outbound dependencies (app.utils.circuit_breaker)
+CIRCUIT_STATE = Gauge(
+    "circuit_breaker_state",
+    "Breaker state per dependency: 0 closed, 1 half-open, 2 open (worst process)",
+    ["dependency"],
+    multiprocess_mode="livemax"
+)
+CIRCUIT_TRANSITIONS = Counter(
+    "circuit_breaker_transitions",
+    "Breaker state changes by the state entered",
+    ["dependency", "state"]
+)
+CIRCUIT_REJECTED = Counter(
+    "circuit_breaker_rejected",
+    "Calls refused without being attempted because the circuit was open",
+    ["dependency"]
+)
+
+
+# Readiness checks (app.utils.health)
+DEPENDENCY_UP = Gauge(
+    "dependency_up",
+    "Whether the latest background check of a dependency succeeded (worst API worker)",
+    ["dependency"],
+    multiprocess_mode="livemin"
+)
+DEPENDENCY_CHECK_SECONDS = Histogram(
+    "dependency_check_seconds",
+    "Latency of background dependency checks (SELECT 1, PING, bucket lookup)",
+    ["dependency"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
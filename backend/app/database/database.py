@@ -1,22 +1,67 @@
 """SQLAlchemy database configuration"""
-from sqlalchemy import create_engine
+import time
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.pool import QueuePool
 
+from app.core.capacity import capacity_plan
 from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.core.metrics import DB_POOL_CHECKED_OUT, DB_POOL_CHECKOUT_SECONDS, DB_POOL_TIMEOUTS
+from app.utils.tracing import instrument_sqlalchemy
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records checkout wait, timeouts and connections in use"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        event.listen(self, "checkout", lambda *args: DB_POOL_CHECKED_OUT.inc())
+        event.listen(self, "checkin", lambda *args: DB_POOL_CHECKED_OUT.dec())
+    
+    def _do_get(self):
+        # The pool offers no "checkout requested" event, so time the
+        # internal get (queue wait, plus connecting when the pool grows)
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            DB_POOL_TIMEOUTS.inc()
+            raise
+        finally:
+            DB_POOL_CHECKOUT_SECONDS.observe(time.perf_counter() - started)
+
+
+def _create_engine() -> Engine:
+    """Create SQLAlchemy engine, pool sized by the capacity plan"""
+    plan = capacity_plan()
+    return create_engine(
+        settings.DATABASE_URL,
+        echo=settings.DB_ECHO,
+        pool_pre_ping=True,
+        poolclass=InstrumentedQueuePool,
+        pool_size=plan.db_pool_size,
+        max_overflow=plan.db_max_overflow,
+        pool_timeout=plan.db_pool_timeout
+    )
+
+
+# SQLAlchemy engine, created on first use and disposed on shutdown
+engine: Engine = LazyClient(_create_engine, closer=lambda e: e.dispose())
+
+# A span per statement executed inside a trace (any engine, including test engines)
+instrument_sqlalchemy(Engine)
 
+_session_factory = sessionmaker(autocommit=False, autoflush=False)
 
-# Create SQLAlchemy engine
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=settings.DB_ECHO,
-    pool_pre_ping=True,
-    pool_size=10,
-    max_overflow=20
-)
 
-# Create SessionLocal class
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def SessionLocal(**kwargs) -> Session:
+    """Create a session bound to the (lazily created) engine"""
+    return _session_factory(bind=engine.resolve(), **kwargs)
 
 # Create Base class for models
 Base = declarative_base()
@@ -1,14 +1,31 @@
 """FastAPI main application"""
+import math
+
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.exceptions import RequestValidationError
 from contextlib import asynccontextmanager
-import time
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from starlette.middleware import Middleware
 
+from app.core.capacity import capacity_plan
 from app.core.config import settings
+from app.core.lazy import close_all_clients
+from app.core.metrics import metrics_registry
 from app.api.v1.router import api_router
 from app.database.database import Base, engine
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.concurrency import ConcurrencyLimitMiddleware, configure_threadpool
+from app.utils.email import close_mailer
+from app.utils.health import health_monitor
+from app.utils.http_metrics import PrometheusMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.memory import MemoryTracingMiddleware, memory_tracer
+from app.utils.middleware import RequestIdMiddleware, TimingMiddleware
+from app.utils.profiling import ProfilingMiddleware
+from app.utils.tracing import TracingMiddleware
+from app.utils.rate_limiter import RateLimitMiddleware
 
 
 # Create database tables on startup
@@ -16,12 +33,53 @@ from app.database.database import Base, engine
 async def lifespan(app: FastAPI):
     """Application lifespan events"""
     # Startup
+    # Postgres, Redis and MinIO clients are created on first use, so an
+    # unreachable dependency never blocks startup (see app.core.lazy)
     print("Starting up DocUrgent Backend...")
+    # As many request threads as admitted requests and pooled connections
+    configure_threadpool(capacity_plan().threads)
+    if settings.MEMORY_TRACING_ENABLED:
+        memory_tracer.start("api")
+    if settings.HEALTH_CHECK_INTERVAL_SECONDS > 0:
+        health_monitor.start()
     # Note: In production, use Alembic migrations instead
     # Base.metadata.create_all(bind=engine)
     yield
     # Shutdown
     print("Shutting down DocUrgent Backend...")
+    await close_mailer()
+    # Stop checks before their clients (engine, Redis, storage) are closed
+    health_monitor.reset()
+    close_all_clients()
+
+
+# Middleware, outermost first. All are pure ASGI: none wraps the request in
+# an extra task or memory stream, and streaming responses pass through.
+middleware = [
+    # Metrics first, so time spent in the other middlewares counts
+    Middleware(PrometheusMiddleware),
+    # Server span per request; everything below runs inside it
+    Middleware(TracingMiddleware),
+    Middleware(RequestIdMiddleware),
+    Middleware(TimingMiddleware),
+    # Admission control before anything that borrows a thread or a connection
+    Middleware(ConcurrencyLimitMiddleware),
+    # Admin-armed sampling profiler (inside RequestId so profiles are named after the request id)
+    Middleware(ProfilingMiddleware),
+    # tracemalloc attribution per route (only while MEMORY_TRACING_ENABLED)
+    Middleware(MemoryTracingMiddleware),
+    # CORS outside the rate limiter and idempotency, so their responses get CORS headers
+    Middleware(
+        CORSMiddleware,
+        allow_origins=settings.cors_origins_list,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    ),
+    Middleware(RateLimitMiddleware),
+    # Idempotency-Key replay
+    Middleware(IdempotencyMiddleware),
+]
 
 
 # Create FastAPI application
@@ -31,31 +89,11 @@ app = FastAPI(
     description="Multi-tenant SaaS for school and education management",
     docs_url="/docs",
     redoc_url="/redoc",
+    middleware=middleware,
     lifespan=lifespan
 )
 
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.cors_origins_list,
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-
-# Request timing middleware
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-    """Add processing time header to responses"""
-    start_time = time.time()
-    response = await call_next(request)
-    process_time = time.time() - start_time
-    response.headers["X-Process-Time"] = str(process_time)
-    return response
-
-
 # Exception handlers
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(request: Request, exc: RequestValidationError):
@@ -69,6 +107,16 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
     )
 
 
+@app.exception_handler(CircuitOpenError)
+async def circuit_open_handler(request: Request, exc: CircuitOpenError):
+    """A dependency's circuit is open: fail fast instead of waiting on it"""
+    return JSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": f"{exc.dependency} is temporarily unavailable"},
+        headers={"Retry-After": str(max(1, math.ceil(exc.retry_after)))}
+    )
+
+
 # Health check endpoint
 @app.get("/health", tags=["Health"])
 def health_check():
@@ -81,6 +129,29 @@ def health_check():
     }
 
 
+# Kubernetes probes. Async so they never wait for a threadpool thread, and
+# O(1): readiness reads the results of the background dependency checks.
+@app.get("/health/live", tags=["Health"])
+async def liveness():
+    """Liveness probe: the worker's event loop is serving requests"""
+    return {"status": "alive"}
+
+
+@app.get("/health/ready", tags=["Health"])
+async def readiness():
+    """Readiness probe: Postgres, Redis and storage answered their latest checks"""
+    report = health_monitor.report()
+    code = status.HTTP_200_OK if report["status"] == "ready" else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(report, status_code=code)
+
+
+# Prometheus scrape endpoint (every API worker process when PROMETHEUS_MULTIPROC_DIR is set)
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus metrics"""
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+
 # Root endpoint
 @app.get("/", tags=["Root"])
 def root():
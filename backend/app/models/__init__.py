@@ -9,6 +9,8 @@ from app.models.security_log import SecurityLog
 from app.models.otp_verification import OTPVerification
 from app.models.payment import Payment, PaymentStatus, PaymentMethod
 from app.models.message import Conversation, Message
+from app.models.notification import Notification, NotificationType, NotificationChannel
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
 
 __all__ = [
     "User",
@@ -29,4 +31,9 @@ __all__ = [
     "PaymentMethod",
     "Conversation",
     "Message",
+    "Notification",
+    "NotificationType",
+    "NotificationChannel",
+    "OutboxEvent",
+    "ProcessedEvent",
 ]
@@ -1,5 +1,5 @@
 """Delivery step tracking model"""
-from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime
+from sqlalchemy import Column, String, Boolean, ForeignKey, DateTime, Text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -11,10 +11,10 @@ class DeliveryStep(Base):
     __tablename__ = "delivery_steps"
     
     id = Column(String(36), primary_key=True)
-    document_request_id = Column(String(36), ForeignKey('document_requests.id'), nullable=False)
+    document_request_id = Column(String(36), ForeignKey('document_requests.id'), nullable=False, index=True)
     
     # Step information
-    step_id = Column(String(50), nullable=False)  # collect_envelope, take_plane, landed, handled_envelope
+    step_id = Column(String(50), nullable=True)  # collect_envelope, take_plane, landed, handled_envelope
     step_name = Column(String(100), nullable=False)
     
     # Status
@@ -23,6 +23,8 @@ class DeliveryStep(Base):
     # Completion tracking
     completed_at = Column(DateTime, nullable=True)
     completed_by = Column(String(36), nullable=True)
+    actor_id = Column(String(36), nullable=True)  # User who triggered the step
+    notes = Column(Text, nullable=True)
     
     # Timestamps
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
@@ -1,5 +1,5 @@
 """Document request model for delivery workflow"""
-from sqlalchemy import Column, String, ForeignKey, Enum as SQLEnum, DateTime, Text
+from sqlalchemy import Column, String, ForeignKey, Enum as SQLEnum, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
@@ -82,4 +82,14 @@ class DocumentRequest(Base):
     trip = relationship("Trip", back_populates="document_requests")
     relay_point = relationship("RelayPoint", back_populates="document_requests")
     delivery_steps = relationship("DeliveryStep", back_populates="document_request", cascade="all, delete-orphan")
-    security_logs = relationship("SecurityLog", back_populates="document_request", cascade="all, delete-orphan")
+    security_logs = relationship(
+        "SecurityLog",
+        primaryjoin="DocumentRequest.id == foreign(SecurityLog.document_request_id)",
+        back_populates="document_request",
+        viewonly=True
+    )
+    
+    __table_args__ = (
+        # Shipments by status and age (stuck-shipment sweep, ops dashboards)
+        Index("ix_document_requests_status_updated_at", "status", "updated_at"),
+    )
@@ -1,10 +1,10 @@
 """Notification model"""
-from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Enum as SQLEnum, Text, JSON
+from sqlalchemy import Column, String, Integer, ForeignKey, Boolean, Enum as SQLEnum, Text, JSON, DateTime
 from sqlalchemy.orm import relationship
 import enum
 from datetime import datetime
 
-from app.database.base import BaseModel
+from app.database.database import Base
 
 
 class NotificationType(str, enum.Enum):
@@ -24,12 +24,14 @@ class NotificationChannel(str, enum.Enum):
     PUSH = "push"
 
 
-class Notification(BaseModel):
+class Notification(Base):
     """Notification model"""
     __tablename__ = "notifications"
     
+    id = Column(String(36), primary_key=True)
+    
     # Recipient
-    user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
+    user_id = Column(String(36), ForeignKey('users.id'), nullable=False, index=True)
     
     # Content
     title = Column(String(255), nullable=False)
@@ -41,17 +43,20 @@ class Notification(BaseModel):
     
     # Status
     is_read = Column(Boolean, default=False)
-    read_at = Column(String(255), nullable=True)
+    read_at = Column(DateTime, nullable=True)
     
-    # Metadata
-    metadata = Column(JSON, default={})  # Additional data like links, actions
+    # Metadata (attribute renamed: "metadata" is reserved by SQLAlchemy)
+    extra_data = Column("metadata", JSON, default={})  # Additional data like links, actions
     
     # Priority
     priority = Column(Integer, default=0)  # Higher number = higher priority
     
     # Expiry
-    expires_at = Column(String(255), nullable=True)
+    expires_at = Column(DateTime, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     
     # Relationships
-    tenant = relationship("Tenant")
     user = relationship("User")
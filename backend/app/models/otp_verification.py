@@ -24,7 +24,7 @@ class OTPVerification(Base):
     verified_at = Column(DateTime, nullable=True)
     
     # Expiry
-    expires_at = Column(DateTime, nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)  # Purged by the maintenance job
     
     # Attempts
     attempts = Column(Integer, default=0)
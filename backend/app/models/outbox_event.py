@@ -0,0 +1,58 @@
+"""Transactional outbox model"""
+from sqlalchemy import Column, String, Integer, DateTime, Text, JSON, Index
+from datetime import datetime
+
+from app.database.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Domain event written in the same transaction as the change it describes
+    
+    The outbox relay publishes unpublished rows and stamps published_at, so
+    an event is never lost once its transaction commits (delivered at least
+    once; consumers deduplicate on id).
+    """
+    __tablename__ = "outbox_events"
+    
+    id = Column(String(36), primary_key=True)
+    
+    # What happened to which entity
+    aggregate_type = Column(String(50), nullable=False)  # shipment
+    aggregate_id = Column(String(36), nullable=False, index=True)
+    event_type = Column(String(100), nullable=False)  # shipment.created, shipment.status_changed, ...
+    payload = Column(JSON, nullable=False, default={})
+    
+    # Relay state
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False)  # Next publish attempt
+    published_at = Column(DateTime, nullable=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    last_error = Column(Text, nullable=True)
+    
+    # Timestamps
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    
+    __table_args__ = (
+        # The relay only ever scans unpublished rows
+        Index(
+            "ix_outbox_events_unpublished",
+            "available_at",
+            postgresql_where=published_at.is_(None),
+            sqlite_where=published_at.is_(None)
+        ),
+    )
+
+
+class ProcessedEvent(Base):
+    """
+    Outbox event a consumer has handled
+    
+    Inserted in the same transaction as the consumer's side effects, so a
+    redelivered event hits the primary key instead of running them twice.
+    Rows older than OUTBOX_DEDUPE_SECONDS are purged by maintenance.
+    """
+    __tablename__ = "processed_events"
+    
+    consumer = Column(String(50), primary_key=True)
+    event_id = Column(String(36), primary_key=True)
+    processed_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
@@ -1,5 +1,5 @@
 """Security logging model"""
-from sqlalchemy import Column, String, ForeignKey, DateTime, Text
+from sqlalchemy import Column, String, DateTime, Text, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -7,7 +7,14 @@ from app.database.database import Base
 
 
 class SecurityLog(Base):
-    """Security audit log model"""
+    """
+    Security audit log model
+    
+    Rows are written in batches by app.utils.audit. In Postgres the table is
+    range-partitioned by month on timestamp (migrate_partition_security_logs.py),
+    so the primary key includes timestamp and user/shipment ids carry no
+    foreign keys: audit rows outlive the users and shipments they mention.
+    """
     __tablename__ = "security_logs"
     
     id = Column(String(36), primary_key=True)
@@ -17,16 +24,33 @@ class SecurityLog(Base):
     details = Column(Text)
     
     # Related entities
-    user_id = Column(String(36), ForeignKey('users.id'), nullable=True)
-    document_request_id = Column(String(36), ForeignKey('document_requests.id'), nullable=True)
+    user_id = Column(String(36), nullable=True)
+    document_request_id = Column(String(36), nullable=True)
     
     # Request metadata
     ip_address = Column(String(50))
     user_agent = Column(String(500))
     
-    # Timestamp
-    timestamp = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # Timestamp (partition key)
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow, nullable=False)
+    
+    # Relationships (read-only)
+    user = relationship(
+        "User",
+        primaryjoin="foreign(SecurityLog.user_id) == User.id",
+        back_populates="security_logs",
+        viewonly=True
+    )
+    document_request = relationship(
+        "DocumentRequest",
+        primaryjoin="foreign(SecurityLog.document_request_id) == DocumentRequest.id",
+        back_populates="security_logs",
+        viewonly=True
+    )
     
-    # Relationships
-    user = relationship("User", back_populates="security_logs")
-    document_request = relationship("DocumentRequest", back_populates="security_logs")
+    __table_args__ = (
+        # Append-only and time-ordered: a BRIN index stays tiny
+        Index("ix_security_logs_timestamp_brin", "timestamp", postgresql_using="brin"),
+        # Per-user history (admin audit API)
+        Index("ix_security_logs_user_id_timestamp", "user_id", "timestamp"),
+    )
@@ -1,5 +1,5 @@
 """Trip model for travelers"""
-from sqlalchemy import Column, String, Integer, ForeignKey, Date, DateTime, Boolean
+from sqlalchemy import Column, String, Integer, ForeignKey, Date, DateTime, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 
@@ -45,6 +45,16 @@ class Trip(Base):
     traveler = relationship("User", back_populates="trips")
     document_requests = relationship("DocumentRequest", back_populates="trip")
     
+    __table_args__ = (
+        # Active trips by date (search, and the job deactivating past trips)
+        Index(
+            "ix_trips_active_departure_date",
+            "departure_date",
+            postgresql_where=is_active.is_(True),
+            sqlite_where=is_active.is_(True)
+        ),
+    )
+    
     @property
     def has_available_spots(self) -> bool:
         """Check if trip has available spots"""
@@ -66,7 +66,12 @@ class User(Base):
     sent_requests = relationship("DocumentRequest", foreign_keys="DocumentRequest.sender_id", back_populates="sender")
     trips = relationship("Trip", back_populates="traveler", cascade="all, delete-orphan")
     relay_point = relationship("RelayPoint", back_populates="user", uselist=False, cascade="all, delete-orphan")
-    security_logs = relationship("SecurityLog", back_populates="user", cascade="all, delete-orphan")
+    security_logs = relationship(
+        "SecurityLog",
+        primaryjoin="User.id == foreign(SecurityLog.user_id)",
+        back_populates="user",
+        viewonly=True
+    )
     
     @property
     def full_name(self) -> str:
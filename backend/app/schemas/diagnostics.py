@@ -0,0 +1,69 @@
+"""Diagnostics (profiling, memory) schemas"""
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+
+class ProfilingRequest(BaseModel):
+    """Profile the next `requests` requests to one route"""
+    method: str = Field(..., pattern="^(GET|POST|PUT|PATCH|DELETE)$")
+    route: str = Field(..., description="Route template, e.g. /api/v1/shipments/{shipment_id}")
+    requests: int = Field(10, ge=1)
+    interval_ms: Optional[float] = Field(None, ge=1, le=100, description="Sampling interval; defaults to PROFILING_INTERVAL_MS")
+    ttl_seconds: int = Field(900, ge=10, le=24 * 3600, description="The session ends after this even if requests remain")
+
+
+class ProfilingSession(BaseModel):
+    """An armed profiling session"""
+    id: str
+    method: str
+    route: str
+    requests: int
+    remaining: int
+    interval_ms: float
+    expires_at: float
+
+
+class ProfileTokenRequest(BaseModel):
+    """Profile requests to one exact path (sent with the X-Profile-Token header)"""
+    method: str = Field(..., pattern="^(GET|POST|PUT|PATCH|DELETE)$")
+    path: str = Field(..., description="Request path, e.g. /api/v1/shipments/3f2a...")
+    ttl_seconds: int = Field(300, ge=10, le=3600)
+
+
+class ProfileTokenResponse(BaseModel):
+    """Value for the X-Profile-Token request header"""
+    header: str = "X-Profile-Token"
+    token: str
+    expires_in: int
+
+
+class MemoryUnit(BaseModel):
+    """Sampled allocations of one route or Celery task"""
+    kind: str
+    name: str
+    samples: int
+    retained_bytes: int
+    peak_bytes: int
+
+
+class MemorySite(BaseModel):
+    """Memory allocated at one source line during a window and still alive at its end"""
+    site: str
+    size: int
+    count: int
+    size_diff: Optional[int] = None
+    count_diff: Optional[int] = None
+
+
+class MemoryReport(BaseModel):
+    """Latest trace window report of one API or worker process"""
+    process: str
+    kind: str
+    window_started_at: float
+    window_ended_at: float
+    windows: int
+    rss_bytes: Optional[int]
+    rss_bytes_at_start: Optional[int]
+    units: List[MemoryUnit]
+    top_sites: List[MemorySite]
+    growth_since_previous: List[MemorySite]
@@ -0,0 +1,78 @@
+"""KYC document upload schemas"""
+from pydantic import BaseModel, Field
+from typing import Optional, Dict
+from datetime import datetime
+from enum import Enum
+
+
+class KYCDocumentTypeEnum(str, Enum):
+    """KYC document type enumeration"""
+    NATIONAL_ID = "national_id"
+    PASSPORT = "passport"
+    DRIVERS_LICENSE = "drivers_license"
+
+
+class KYCImageSide(str, Enum):
+    """Image slot on a KYC document"""
+    FRONT = "front"
+    BACK = "back"
+    SELFIE = "selfie"
+
+
+class KYCUploadRequest(BaseModel):
+    """Request a presigned URL to upload one KYC image"""
+    document_id: Optional[str] = Field(None, description="Existing KYC document (omit to start a new one)")
+    document_type: KYCDocumentTypeEnum
+    document_number: Optional[str] = Field(None, max_length=100)
+    side: KYCImageSide
+    filename: str = Field(..., min_length=1, max_length=255)
+    content_type: str = Field(..., min_length=1, max_length=100)
+    size: int = Field(..., gt=0, description="File size in bytes")
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "document_type": "passport",
+                "side": "front",
+                "filename": "passport.jpg",
+                "content_type": "image/jpeg",
+                "size": 2483920
+            }
+        }
+
+
+class KYCUploadResponse(BaseModel):
+    """Presigned upload instructions for the browser"""
+    document_id: str
+    side: KYCImageSide
+    object_name: str
+    upload_url: str
+    method: str = "PUT"
+    headers: Dict[str, str]
+    max_size: int
+    expires_in: int
+
+
+class KYCUploadComplete(BaseModel):
+    """Confirm that the browser finished uploading an image"""
+    document_id: str
+    side: KYCImageSide
+    object_name: str
+
+
+class KYCDocumentResponse(BaseModel):
+    """KYC document with its uploaded images"""
+    id: str
+    user_id: str
+    document_type: str
+    document_number: Optional[str]
+    front_image_url: Optional[str]
+    back_image_url: Optional[str]
+    selfie_url: Optional[str]
+    is_verified: bool
+    rejection_reason: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
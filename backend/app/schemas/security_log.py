@@ -0,0 +1,25 @@
+"""Security audit log schemas"""
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+
+class SecurityLogResponse(BaseModel):
+    """One security audit event"""
+    id: str
+    action: str
+    details: Optional[str]
+    user_id: Optional[str]
+    document_request_id: Optional[str]
+    ip_address: Optional[str]
+    user_agent: Optional[str]
+    timestamp: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class SecurityLogPage(BaseModel):
+    """A page of audit events, newest first"""
+    items: List[SecurityLogResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,110 @@
+"""
+Production server: Gunicorn managing Uvicorn workers
+
+    python -m app.server
+
+- one worker per CPU of the container's CPU quota unless API_WORKERS is
+  set (app.core.capacity), so a 500m pod runs one worker, not one per node core
+- the app is imported once in the master (preload) and the garbage
+  collector frozen before forking: imported modules stay shared
+  copy-on-write between workers instead of each worker dirtying its copy
+- workers run uvloop and httptools
+- SIGTERM lets workers finish in-flight requests for up to
+  API_GRACEFUL_TIMEOUT_SECONDS, lifespan shutdown included
+- workers are replaced after API_MAX_REQUESTS (+ jitter) requests, which
+  bounds slow memory growth without restarting all workers at once
+"""
+import gc
+import os
+
+from gunicorn.app.base import BaseApplication
+from prometheus_client import multiprocess
+from uvicorn.workers import UvicornWorker
+
+from app.core.capacity import capacity_plan
+from app.core.config import settings
+
+
+class Worker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop and httptools"""
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools"}
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # Stop waiting for open connections a second before Gunicorn kills the
+        # worker, so the lifespan shutdown (audit and span flushes) still runs
+        self.config.timeout_graceful_shutdown = max(1, int(self.cfg.graceful_timeout) - 1)
+
+
+def pre_fork(server, worker):
+    """Move everything imported so far to the permanent generation, out of the collector's reach"""
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    gc.enable()
+
+
+def when_ready(server):
+    server.log.info(
+        "Serving on %s with %d workers (graceful timeout %ss, max requests %d + %d jitter)",
+        server.cfg.bind, server.cfg.workers, server.cfg.graceful_timeout,
+        server.cfg.max_requests, server.cfg.max_requests_jitter
+    )
+
+
+def child_exit(server, worker):
+    """Drop a dead worker's live gauges (in-flight requests) from the merged metrics"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
+
+
+def server_options() -> dict:
+    """Gunicorn settings for the current settings and capacity plan"""
+    return {
+        "bind": f"{settings.HOST}:{settings.PORT}",
+        "workers": capacity_plan().workers,
+        "worker_class": "app.server.Worker",
+        "preload_app": True,
+        "graceful_timeout": int(settings.API_GRACEFUL_TIMEOUT_SECONDS),
+        # Uvicorn's default; Gunicorn's 2s would close idle proxy connections sooner
+        "keepalive": 5,
+        "max_requests": settings.API_MAX_REQUESTS,
+        "max_requests_jitter": settings.API_MAX_REQUESTS_JITTER,
+        # Worker heartbeats go to memory, not the container's overlay filesystem
+        "worker_tmp_dir": "/dev/shm" if os.path.isdir("/dev/shm") else None,
+        "accesslog": "-",
+        "errorlog": "-",
+        "loglevel": "debug" if settings.DEBUG else "info",
+        "pre_fork": pre_fork,
+        "post_fork": post_fork,
+        "when_ready": when_ready,
+        "child_exit": child_exit,
+    }
+
+
+class Server(BaseApplication):
+    """Gunicorn application serving app.main:app with server_options()"""
+    
+    def __init__(self, options: dict):
+        self.options = options
+        super().__init__()
+    
+    def load_config(self):
+        for key, value in self.options.items():
+            self.cfg.set(key, value)
+    
+    def load(self):
+        from app.main import app
+        return app
+
+
+def main():
+    # No collections in the master while the app is imported: freed objects
+    # would leave holes in pages the workers then share (see pre_fork)
+    gc.disable()
+    Server(server_options()).run()
+
+
+if __name__ == "__main__":
+    main()
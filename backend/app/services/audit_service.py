@@ -0,0 +1,121 @@
+"""Security audit log queries and partition retention"""
+import logging
+import re
+from datetime import date, datetime
+from typing import List, Optional, Tuple
+
+from sqlalchemy import select, text, tuple_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.security_log import SecurityLog
+
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions of security_logs, e.g. security_logs_y2026m10
+PARTITION_NAME = re.compile(r"^security_logs_y(\d{4})m(\d{2})$")
+
+
+def month_start(day: date, offset: int = 0) -> date:
+    """First day of the month `offset` months after the one containing `day`"""
+    index = day.year * 12 + day.month - 1 + offset
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_ddl(month: date) -> Tuple[str, str]:
+    """Name and CREATE statement of the partition holding `month`"""
+    name = f"security_logs_y{month.year:04d}m{month.month:02d}"
+    return name, (
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF security_logs "
+        f"FOR VALUES FROM ('{month.isoformat()}') TO ('{month_start(month, 1).isoformat()}')"
+    )
+
+
+def encode_cursor(log: SecurityLog) -> str:
+    return f"{log.timestamp.isoformat()}|{log.id}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Raises ValueError on a malformed cursor"""
+    timestamp, _, log_id = cursor.partition("|")
+    if not log_id:
+        raise ValueError("Malformed cursor")
+    return datetime.fromisoformat(timestamp), log_id
+
+
+class AuditService:
+    """Service for reading and retaining the security audit log"""
+    
+    @staticmethod
+    def search(
+        db: Session,
+        start: datetime,
+        end: datetime,
+        user_id: Optional[str] = None,
+        action: Optional[str] = None,
+        cursor: Optional[str] = None,
+        limit: int = 100
+    ) -> Tuple[List[SecurityLog], Optional[str]]:
+        """
+        Events in [start, end), newest first, one keyset page at a time
+        
+        The time range is mandatory so Postgres only scans the partitions it
+        covers. Returns the page and the cursor of the next one (None at the end).
+        """
+        key = (SecurityLog.timestamp, SecurityLog.id)
+        query = select(SecurityLog).where(SecurityLog.timestamp >= start, SecurityLog.timestamp < end)
+        if user_id:
+            query = query.where(SecurityLog.user_id == user_id)
+        if action:
+            query = query.where(SecurityLog.action == action)
+        if cursor:
+            query = query.where(tuple_(*key) < decode_cursor(cursor))
+        logs = db.execute(query.order_by(*(column.desc() for column in key)).limit(limit + 1)).scalars().all()
+        if len(logs) > limit:
+            return logs[:limit], encode_cursor(logs[limit - 1])
+        return logs, None
+    
+    @staticmethod
+    def rotate_partitions(db: Session, today: Optional[date] = None) -> dict:
+        """
+        Create the next AUDIT_PARTITIONS_AHEAD monthly partitions and drop
+        the ones older than AUDIT_RETENTION_MONTHS
+        
+        Dropping a partition frees a month of events at once, without the
+        DELETE and vacuum a plain table would need. Postgres only, and only
+        once migrate_partition_security_logs.py has run.
+        """
+        stats = {"created": [], "dropped": []}
+        if db.bind.dialect.name != "postgresql" or not db.execute(text(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = 'security_logs'"
+        )).first():
+            logger.warning("security_logs is not partitioned; skipping partition rotation")
+            return stats
+        
+        current = month_start(today or date.today())
+        existing = set(db.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = 'security_logs'::regclass"
+        )).scalars())
+        
+        for offset in range(settings.AUDIT_PARTITIONS_AHEAD + 1):
+            name, ddl = partition_ddl(month_start(current, offset))
+            if name not in existing:
+                db.execute(text(ddl))
+                stats["created"].append(name)
+        
+        oldest_kept = month_start(current, -settings.AUDIT_RETENTION_MONTHS)
+        for name in sorted(existing):
+            match = PARTITION_NAME.match(name)
+            if match and date(int(match[1]), int(match[2]), 1) < oldest_kept:
+                db.execute(text(f"DROP TABLE {name}"))
+                stats["dropped"].append(name)
+        
+        db.commit()
+        logger.info(
+            "Audit partitions: created %s, dropped %s",
+            ", ".join(stats["created"]) or "none", ", ".join(stats["dropped"]) or "none"
+        )
+        return stats
@@ -0,0 +1,258 @@
+"""KYC document service with presigned direct-to-storage uploads"""
+import hashlib
+import io
+import tempfile
+import uuid
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from fastapi import HTTPException, status
+from datetime import datetime
+
+from app.core.config import settings
+from app.models.kyc_document import KYCDocument, DocumentTypeKYC
+from app.models.user import User, VerificationStatus
+from app.schemas.kyc import KYCUploadRequest, KYCUploadResponse, KYCUploadComplete, KYCImageSide
+from app.services.outbox_service import OutboxService
+from app.utils.images import PROCESSABLE_EXTENSIONS, process_image
+from app.utils.storage import StorageError, storage_client
+
+
+# Content type the browser must send for each allowed extension
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "jpg": "image/jpeg",
+    "jpeg": "image/jpeg",
+    "png": "image/png",
+    "gif": "image/gif",
+    "webp": "image/webp",
+    "heic": "image/heic",
+}
+
+# Originals are spooled to disk above this size while being hashed
+SPOOL_MAX_MEMORY = 1024 * 1024
+
+# KYCDocument column holding each image
+SIDE_COLUMNS = {
+    KYCImageSide.FRONT: "front_image_url",
+    KYCImageSide.BACK: "back_image_url",
+    KYCImageSide.SELFIE: "selfie_url",
+}
+
+
+class KYCService:
+    """Service for KYC document uploads"""
+    
+    @staticmethod
+    def create_upload(db: Session, user: User, upload: KYCUploadRequest) -> KYCUploadResponse:
+        """
+        Issue a short-lived presigned PUT URL for one KYC image
+        
+        The browser uploads straight to storage; the API never proxies image bytes.
+        Size and content type are checked here against MAX_UPLOAD_SIZE_MB and
+        ALLOWED_EXTENSIONS, and enforced again on completion.
+        """
+        extension = KYCService._validate_file(upload.filename, upload.content_type, upload.size)
+        
+        if upload.document_id:
+            document = KYCService._get_document(db, user.id, upload.document_id)
+        else:
+            document = KYCDocument(
+                id=str(uuid.uuid4()),
+                user_id=user.id,
+                document_type=DocumentTypeKYC(upload.document_type.value),
+                document_number=upload.document_number,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            db.add(document)
+            db.commit()
+            db.refresh(document)
+        
+        object_name = f"kyc/{user.id}/{document.id}/{upload.side.value}-{uuid.uuid4().hex}.{extension}"
+        upload_url = storage_client.get_upload_url(object_name, expires=settings.UPLOAD_URL_EXPIRE_SECONDS)
+        if not upload_url:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Storage unavailable, please retry"
+            )
+        
+        return KYCUploadResponse(
+            document_id=document.id,
+            side=upload.side,
+            object_name=object_name,
+            upload_url=upload_url,
+            headers={"Content-Type": CONTENT_TYPES[extension]},
+            max_size=settings.max_upload_size_bytes,
+            expires_in=settings.UPLOAD_URL_EXPIRE_SECONDS
+        )
+    
+    @staticmethod
+    def complete_upload(db: Session, user: User, completion: KYCUploadComplete) -> KYCDocument:
+        """
+        Verify an uploaded object and attach it to the KYC document
+        
+        Checks that the object exists, belongs to this document slot, is not
+        empty or oversized and has the content type of its extension.
+        Rejected objects are deleted from storage. Accepted images get a
+        kyc.image_uploaded outbox event, which queues their processing.
+        """
+        document = KYCService._get_document(db, user.id, completion.document_id)
+        
+        prefix = f"kyc/{user.id}/{document.id}/{completion.side.value}-"
+        object_name = completion.object_name
+        if not object_name.startswith(prefix) or "/" in object_name[len(prefix):]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Object does not belong to this document"
+            )
+        
+        info = storage_client.stat_file(object_name)
+        if info is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Upload not found. Upload the file before completing."
+            )
+        
+        extension = object_name.rsplit(".", 1)[-1]
+        content_type = (info.content_type or "").split(";")[0].strip().lower()
+        if not 0 < info.size <= settings.max_upload_size_bytes or content_type != CONTENT_TYPES.get(extension):
+            storage_client.delete_file(object_name)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Uploaded file rejected: must be a non-empty {CONTENT_TYPES.get(extension)} "
+                       f"of at most {settings.MAX_UPLOAD_SIZE_MB} MB"
+            )
+        
+        setattr(document, SIDE_COLUMNS[completion.side], storage_client.object_url(object_name))
+        document.updated_at = datetime.utcnow()
+        
+        # Front and selfie are enough to queue the user for review
+        if document.front_image_url and document.selfie_url and user.verification_status in (
+            VerificationStatus.UNVERIFIED, VerificationStatus.REJECTED
+        ):
+            user.verification_status = VerificationStatus.PENDING
+        
+        if extension in PROCESSABLE_EXTENSIONS:
+            # Queued through the outbox: committed with the document, so a broker
+            # outage delays processing instead of failing this request
+            OutboxService.add_event(db, "kyc.image_uploaded", document.id, {
+                "side": completion.side.value,
+                "object_name": object_name
+            }, aggregate_type="kyc_document")
+        
+        db.commit()
+        db.refresh(document)
+        
+        return document
+    
+    @staticmethod
+    def process_uploaded_image(db: Session, document_id: str, side: str, object_name: str) -> Optional[dict]:
+        """
+        Strip EXIF, build review rendition and thumbnail, deduplicate by content
+        
+        Renditions are stored under the SHA-256 of the original bytes, so the
+        same photo uploaded twice is processed and stored once. The original
+        upload (with its EXIF/GPS metadata) is deleted and the document points
+        to the review rendition, only once both renditions are stored; a
+        failed upload raises StorageError so the task retries.
+        """
+        document = db.query(KYCDocument).filter(KYCDocument.id == document_id).first()
+        column = SIDE_COLUMNS[KYCImageSide(side)]
+        # Skip if the slot was re-uploaded since this job was queued
+        if not document or getattr(document, column) != storage_client.object_url(object_name):
+            return None
+        
+        chunks = storage_client.stream_file(object_name)
+        if chunks is None:
+            return None
+        
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_MEMORY) as original:
+            digest = hashlib.sha256()
+            for chunk in chunks:
+                digest.update(chunk)
+                original.write(chunk)
+            content_hash = digest.hexdigest()
+            
+            review_name = f"kyc/processed/{content_hash}/review.jpg"
+            thumbnail_name = f"kyc/processed/{content_hash}/thumbnail.jpg"
+            deduplicated = (
+                storage_client.stat_file(review_name) is not None
+                and storage_client.stat_file(thumbnail_name) is not None
+            )
+            
+            if not deduplicated:
+                original.seek(0)
+                processed = process_image(original)
+                for name, data in ((review_name, processed.review), (thumbnail_name, processed.thumbnail)):
+                    if storage_client.upload_stream(io.BytesIO(data), name, "image/jpeg", length=len(data)) is None:
+                        # The original is the only copy: keep it and the document as they are
+                        raise StorageError(f"Could not store {name}")
+        
+        setattr(document, column, storage_client.object_url(review_name))
+        document.updated_at = datetime.utcnow()
+        db.commit()
+        
+        storage_client.delete_file(object_name)
+        
+        return {
+            "document_id": document_id,
+            "side": side,
+            "content_hash": content_hash,
+            "review": review_name,
+            "thumbnail": thumbnail_name,
+            "deduplicated": deduplicated
+        }
+    
+    @staticmethod
+    def list_documents(db: Session, user_id: str) -> List[KYCDocument]:
+        """List KYC documents of a user"""
+        return db.query(KYCDocument).filter(
+            KYCDocument.user_id == user_id
+        ).order_by(KYCDocument.created_at.desc()).all()
+    
+    @staticmethod
+    def _get_document(db: Session, user_id: str, document_id: str) -> KYCDocument:
+        """Get a KYC document owned by the user that can still be changed"""
+        document = db.query(KYCDocument).filter(
+            KYCDocument.id == document_id,
+            KYCDocument.user_id == user_id
+        ).first()
+        
+        if not document:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="KYC document not found"
+            )
+        
+        if document.is_verified:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="KYC document already verified"
+            )
+        
+        return document
+    
+    @staticmethod
+    def _validate_file(filename: str, content_type: str, size: int) -> str:
+        """Validate declared file metadata and return its extension"""
+        extension = filename.rsplit(".", 1)[-1].lower() if "." in filename else ""
+        
+        if extension not in settings.allowed_extensions_list or extension not in CONTENT_TYPES:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"File type not allowed. Allowed: {', '.join(settings.allowed_extensions_list)}"
+            )
+        
+        if content_type.lower() != CONTENT_TYPES[extension]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Content type must be {CONTENT_TYPES[extension]} for .{extension} files"
+            )
+        
+        if size > settings.max_upload_size_bytes:
+            raise HTTPException(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                detail=f"File too large. Maximum size is {settings.MAX_UPLOAD_SIZE_MB} MB"
+            )
+        
+        return extension
@@ -0,0 +1,178 @@
+"""Scheduled maintenance sweeps (run by Celery beat)"""
+import logging
+import time
+from datetime import date, datetime, timedelta
+from typing import Callable, List, Optional, Sequence
+
+from sqlalchemy import delete, exists, select, tuple_, update
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import MAINTENANCE_ROWS, MAINTENANCE_RUN_SECONDS
+from app.models.document_request import DocumentRequest, RequestStatus
+from app.models.otp_verification import OTPVerification
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+from app.models.trip import Trip
+from app.services.outbox_service import OutboxService
+
+
+logger = logging.getLogger(__name__)
+
+# Statuses in which a shipment waits on a person (relay point or traveler)
+STUCK_STATUSES = [RequestStatus.AT_RELAY_POINT, RequestStatus.WITH_TRAVELER]
+
+
+def _sweep(
+    db: Session,
+    job: str,
+    select_batch: Callable[[Optional[Sequence]], List],
+    apply_batch: Callable[[List], int]
+) -> dict:
+    """
+    Walk matching rows in keyset order, one short transaction per batch
+    
+    select_batch(after) returns up to MAINTENANCE_BATCH_SIZE rows whose
+    leading columns are the sort key, strictly after the last row of the
+    previous batch (None for the first). Batches are spaced by
+    MAINTENANCE_BATCH_PAUSE_SECONDS, and the run stops after
+    MAINTENANCE_MAX_SECONDS; the next run picks up the rest.
+    """
+    started = time.monotonic()
+    stats = {"job": job, "rows": 0, "batches": 0, "complete": True}
+    after = None
+    while True:
+        batch = select_batch(after)
+        if not batch:
+            break
+        stats["rows"] += apply_batch(batch)
+        db.commit()
+        stats["batches"] += 1
+        after = tuple(batch[-1])
+        if len(batch) < settings.MAINTENANCE_BATCH_SIZE:
+            break
+        if time.monotonic() - started >= settings.MAINTENANCE_MAX_SECONDS:
+            stats["complete"] = False
+            break
+        time.sleep(settings.MAINTENANCE_BATCH_PAUSE_SECONDS)
+    
+    stats["seconds"] = round(time.monotonic() - started, 3)
+    MAINTENANCE_ROWS.labels(job).inc(stats["rows"])
+    MAINTENANCE_RUN_SECONDS.labels(job).observe(stats["seconds"])
+    logger.info(
+        "Maintenance %s: %d rows in %d batches, %.2fs%s",
+        job, stats["rows"], stats["batches"], stats["seconds"], "" if stats["complete"] else " (time budget reached)"
+    )
+    return stats
+
+
+class MaintenanceService:
+    """Service for batched cleanup jobs"""
+    
+    @staticmethod
+    def purge_expired_otps(db: Session, now: Optional[datetime] = None) -> dict:
+        """Delete OTPs that expired more than OTP_PURGE_GRACE_HOURS ago (uses ix on expires_at)"""
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.OTP_PURGE_GRACE_HOURS)
+        key = (OTPVerification.expires_at, OTPVerification.id)
+        
+        def select_batch(after):
+            query = select(*key).where(OTPVerification.expires_at < cutoff)
+            if after is not None:
+                query = query.where(tuple_(*key) > after)
+            return db.execute(query.order_by(*key).limit(settings.MAINTENANCE_BATCH_SIZE)).all()
+        
+        def apply_batch(batch):
+            ids = [row.id for row in batch]
+            return db.execute(delete(OTPVerification).where(OTPVerification.id.in_(ids))).rowcount
+        
+        return _sweep(db, "purge_expired_otps", select_batch, apply_batch)
+    
+    @staticmethod
+    def purge_processed_events(db: Session, now: Optional[datetime] = None) -> dict:
+        """Forget outbox events handled more than OUTBOX_DEDUPE_SECONDS ago (uses ix on processed_at)"""
+        cutoff = (now or datetime.utcnow()) - timedelta(seconds=settings.OUTBOX_DEDUPE_SECONDS)
+        key = (ProcessedEvent.processed_at, ProcessedEvent.consumer, ProcessedEvent.event_id)
+        
+        def select_batch(after):
+            query = select(*key).where(ProcessedEvent.processed_at < cutoff)
+            if after is not None:
+                query = query.where(tuple_(*key) > after)
+            return db.execute(query.order_by(*key).limit(settings.MAINTENANCE_BATCH_SIZE)).all()
+        
+        def apply_batch(batch):
+            return db.execute(
+                delete(ProcessedEvent).where(
+                    tuple_(ProcessedEvent.consumer, ProcessedEvent.event_id).in_(
+                        [(row.consumer, row.event_id) for row in batch]
+                    )
+                )
+            ).rowcount
+        
+        return _sweep(db, "purge_processed_events", select_batch, apply_batch)
+    
+    @staticmethod
+    def deactivate_past_trips(db: Session, today: Optional[date] = None) -> dict:
+        """Deactivate trips whose departure date has passed (uses the partial active-trips index)"""
+        today = today or date.today()
+        key = (Trip.departure_date, Trip.id)
+        
+        def select_batch(after):
+            query = select(*key).where(Trip.is_active.is_(True), Trip.departure_date < today)
+            if after is not None:
+                query = query.where(tuple_(*key) > after)
+            return db.execute(query.order_by(*key).limit(settings.MAINTENANCE_BATCH_SIZE)).all()
+        
+        def apply_batch(batch):
+            ids = [row.id for row in batch]
+            return db.execute(
+                update(Trip)
+                .where(Trip.id.in_(ids), Trip.is_active.is_(True))
+                .values(is_active=False, updated_at=datetime.utcnow())
+            ).rowcount
+        
+        return _sweep(db, "deactivate_past_trips", select_batch, apply_batch)
+    
+    @staticmethod
+    def flag_stuck_shipments(db: Session, now: Optional[datetime] = None) -> dict:
+        """
+        Publish shipment.stuck for shipments idle in a waiting status
+        
+        A shipment is stuck after STUCK_SHIPMENT_HOURS without an update in
+        AT_RELAY_POINT or WITH_TRAVELER. It is flagged once per stay: a
+        shipment.stuck event newer than its last update means already flagged.
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(hours=settings.STUCK_SHIPMENT_HOURS)
+        key = (DocumentRequest.updated_at, DocumentRequest.id)
+        already_flagged = exists().where(
+            OutboxEvent.aggregate_id == DocumentRequest.id,
+            OutboxEvent.event_type == "shipment.stuck",
+            OutboxEvent.created_at >= DocumentRequest.updated_at
+        )
+        
+        def select_batch(after):
+            query = select(
+                *key,
+                DocumentRequest.status,
+                DocumentRequest.sender_id,
+                DocumentRequest.traveler_id,
+                DocumentRequest.relay_point_id
+            ).where(
+                DocumentRequest.status.in_(STUCK_STATUSES),
+                DocumentRequest.updated_at < cutoff,
+                ~already_flagged
+            )
+            if after is not None:
+                query = query.where(tuple_(*key) > after[:2])
+            return db.execute(query.order_by(*key).limit(settings.MAINTENANCE_BATCH_SIZE)).all()
+        
+        def apply_batch(batch):
+            for row in batch:
+                OutboxService.add_event(db, "shipment.stuck", row.id, {
+                    "sender_id": row.sender_id,
+                    "traveler_id": row.traveler_id,
+                    "relay_point_id": row.relay_point_id,
+                    "status": row.status.value,
+                    "since": row.updated_at.isoformat()
+                })
+            return len(batch)
+        
+        return _sweep(db, "flag_stuck_shipments", select_batch, apply_batch)
@@ -0,0 +1,206 @@
+"""Bulk notification fan-out (in-app, email, SMS, push)"""
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime
+from typing import Awaitable, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_request import DocumentRequest, RequestStatus
+from app.models.notification import Notification, NotificationChannel, NotificationType
+from app.models.trip import Trip
+from app.models.user import User
+from app.utils.email import send_email
+from app.utils.sms import send_sms
+from app.workers.runtime import runtime
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class Recipient:
+    """Contact details resolved for one user"""
+    id: str
+    email: Optional[str]
+    phone: Optional[str]
+
+
+def _chunks(items: Sequence, size: int) -> Iterator[Sequence]:
+    """Split a sequence into chunks of at most size items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+async def _send_limited(targets: List, send: Callable[..., Awaitable[bool]], limit: int) -> List[bool]:
+    """Send to every target with at most `limit` sends in flight"""
+    semaphore = asyncio.Semaphore(limit)
+    
+    async def send_one(target) -> bool:
+        async with semaphore:
+            try:
+                return await send(target)
+            except Exception as e:
+                logger.warning("Notification delivery failed: %s", e)
+                return False
+    
+    return await asyncio.gather(*(send_one(target) for target in targets))
+
+
+async def _count(sends: Awaitable[List[bool]]) -> Dict[str, int]:
+    """Sent/failed counts of a batch of sends"""
+    results = await sends
+    sent = sum(results)
+    return {"sent": sent, "failed": len(results) - sent}
+
+
+async def _post_push_batch(user_ids: Sequence[str], title: str, message: str, data: dict) -> bool:
+    """Send one batch to the push gateway (it maps users to their devices)"""
+    response = await runtime.http_client().post(
+        settings.PUSH_GATEWAY_URL,
+        json={"user_ids": list(user_ids), "title": title, "body": message, "data": data}
+    )
+    response.raise_for_status()
+    return True
+
+
+async def _send_push(user_ids: List[str], title: str, message: str, data: dict) -> Dict[str, int]:
+    """Push to users in gateway-sized batches (counted per user)"""
+    if not settings.PUSH_GATEWAY_URL:
+        return {"sent": 0, "failed": 0, "skipped": len(user_ids)}
+    batches = list(_chunks(user_ids, settings.PUSH_BATCH_SIZE))
+    results = await _send_limited(
+        batches,
+        lambda batch: _post_push_batch(batch, title, message, data),
+        settings.NOTIFICATION_PUSH_CONCURRENCY
+    )
+    sent = sum(len(batch) for batch, ok in zip(batches, results) if ok)
+    return {"sent": sent, "failed": len(user_ids) - sent}
+
+
+async def _deliver(recipients: List[Recipient], title: str, message: str, channels: List[str], data: dict) -> Dict[str, Dict[str, int]]:
+    """Send one chunk over every external channel concurrently"""
+    jobs = {}
+    if NotificationChannel.EMAIL.value in channels:
+        jobs[NotificationChannel.EMAIL.value] = _count(_send_limited(
+            [recipient.email for recipient in recipients if recipient.email],
+            lambda email: send_email(email, title, message),
+            settings.NOTIFICATION_EMAIL_CONCURRENCY
+        ))
+    if NotificationChannel.SMS.value in channels:
+        jobs[NotificationChannel.SMS.value] = _count(_send_limited(
+            [recipient.phone for recipient in recipients if recipient.phone],
+            lambda phone: send_sms(phone, f"{title}: {message}"),
+            settings.NOTIFICATION_SMS_CONCURRENCY
+        ))
+    if NotificationChannel.PUSH.value in channels:
+        jobs[NotificationChannel.PUSH.value] = _send_push(
+            [recipient.id for recipient in recipients], title, message, data
+        )
+    results = await asyncio.gather(*jobs.values())
+    return dict(zip(jobs.keys(), results))
+
+
+class NotificationService:
+    """Service for notifying many users at once"""
+    
+    @staticmethod
+    def route_recipient_ids(db: Session, departure_city: str, destination_city: str, departure_date: date) -> List[str]:
+        """Travelers flying a route on a date, and senders with open requests on those trips"""
+        trips = select(Trip.id, Trip.traveler_id).where(
+            Trip.departure_city == departure_city,
+            Trip.destination_city == destination_city,
+            Trip.departure_date == departure_date,
+            Trip.is_active.is_(True)
+        ).subquery()
+        senders = select(DocumentRequest.sender_id).where(
+            DocumentRequest.trip_id.in_(select(trips.c.id)),
+            DocumentRequest.status.notin_([RequestStatus.COMPLETED, RequestStatus.CANCELLED])
+        )
+        return list(db.scalars(select(trips.c.traveler_id).union(senders)))
+    
+    @staticmethod
+    def fan_out(
+        db: Session,
+        user_ids: Sequence[str],
+        title: str,
+        message: str,
+        channels: Sequence[str] = (NotificationChannel.IN_APP.value,),
+        notification_type: NotificationType = NotificationType.INFO,
+        data: Optional[dict] = None,
+        progress: Optional[Callable[[dict], None]] = None
+    ) -> dict:
+        """
+        Notify every user over the requested channels
+        
+        Recipients are processed in chunks of NOTIFICATION_CHUNK_SIZE: one
+        IN query resolves the chunk's contact details, one multi-row INSERT
+        (committed on its own) stores its in-app notifications, and its
+        email/SMS/push sends run on the worker's event loop with per-channel
+        concurrency limits while the next chunk is loaded. Unknown and
+        inactive users are skipped. progress() receives the running totals
+        after each chunk.
+        """
+        channels = [NotificationChannel(channel).value for channel in channels]
+        external = [channel for channel in channels if channel != NotificationChannel.IN_APP.value]
+        data = data or {}
+        unique_ids = list(dict.fromkeys(user_ids))
+        stats = {
+            "total": len(unique_ids),
+            "processed": 0,
+            "skipped": 0,
+            "channels": {channel: {"sent": 0, "failed": 0} for channel in channels},
+        }
+        
+        def collect(future):
+            for channel, outcome in future.result().items():
+                for key, count in outcome.items():
+                    stats["channels"][channel][key] = stats["channels"][channel].get(key, 0) + count
+        
+        pending = None
+        for chunk in _chunks(unique_ids, settings.NOTIFICATION_CHUNK_SIZE):
+            rows = db.execute(
+                select(User.id, User.email, User.phone).where(User.id.in_(chunk), User.is_active.is_(True))
+            ).all()
+            recipients = [Recipient(*row) for row in rows]
+            
+            if NotificationChannel.IN_APP.value in channels and recipients:
+                now = datetime.utcnow()
+                db.execute(insert(Notification), [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "user_id": recipient.id,
+                        "title": title,
+                        "message": message,
+                        "notification_type": notification_type,
+                        "channels": channels,
+                        "is_read": False,
+                        "extra_data": data,
+                        "priority": 0,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for recipient in recipients
+                ])
+                db.commit()
+                stats["channels"][NotificationChannel.IN_APP.value]["sent"] += len(recipients)
+            
+            # Keep one chunk of sends in flight while the next chunk is queried
+            if pending is not None:
+                collect(pending)
+            pending = runtime.submit(_deliver(recipients, title, message, external, data)) if external and recipients else None
+            
+            stats["processed"] += len(chunk)
+            stats["skipped"] += len(chunk) - len(recipients)
+            if progress is not None:
+                progress(stats)
+        
+        if pending is not None:
+            collect(pending)
+            if progress is not None:
+                progress(stats)
+        return stats
@@ -0,0 +1,131 @@
+"""Transactional outbox: record domain events with the changes they describe"""
+import logging
+import uuid
+from datetime import datetime
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.models.notification import Notification, NotificationChannel, NotificationType
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+from app.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+# processed_events.consumer of handle_outbox_event
+CONSUMER = "handle_outbox_event"
+
+# In-app notification sent to the sender for each shipment event
+_SENDER_MESSAGES = {
+    "shipment.status_changed": ("Shipment update", "Your shipment is now {new_status}."),
+    "shipment.assigned": ("Traveler assigned", "A traveler has been assigned to your shipment."),
+    "shipment.cancelled": ("Shipment cancelled", "Your shipment was cancelled: {reason}"),
+}
+
+
+class OutboxService:
+    """Service for writing and consuming outbox events"""
+    
+    @staticmethod
+    def add_event(
+        db: Session,
+        event_type: str,
+        aggregate_id: str,
+        payload: dict,
+        aggregate_type: str = "shipment"
+    ) -> OutboxEvent:
+        """
+        Add an event to the caller's transaction (never commits)
+        
+        The event is only visible to the relay once the caller commits, and
+        disappears with a rollback, so events and state never diverge.
+        """
+        now = datetime.utcnow()
+        event = OutboxEvent(
+            id=str(uuid.uuid4()),
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id,
+            event_type=event_type,
+            payload=payload,
+            available_at=now,
+            attempts=0,
+            created_at=now
+        )
+        db.add(event)
+        return event
+    
+    @staticmethod
+    def to_message(event: OutboxEvent) -> dict:
+        """JSON-serializable message published for an event"""
+        return {
+            "id": event.id,
+            "type": event.event_type,
+            "aggregate_type": event.aggregate_type,
+            "aggregate_id": event.aggregate_id,
+            "payload": event.payload or {},
+            "created_at": event.created_at.isoformat(),
+        }
+    
+    @staticmethod
+    def consume(db: Session, message: dict) -> bool:
+        """
+        Handle a published event once, returns False for redeliveries
+        
+        Events are delivered at least once (the relay republishes after a
+        crash, the broker redelivers unacknowledged tasks), so the event id
+        is recorded in processed_events in the same transaction as the
+        notification: either both commit or neither does, and a redelivery
+        finds the row (or hits its primary key) and is skipped. Uploaded KYC
+        images are queued for processing before the commit, so a broker
+        error rolls back and the event is retried (the processing task is
+        idempotent if a commit failure queues it twice).
+        """
+        if db.get(ProcessedEvent, (CONSUMER, message["id"])) is not None:
+            logger.info("Skipping already handled event %s", message["id"])
+            return False
+        db.add(ProcessedEvent(consumer=CONSUMER, event_id=message["id"], processed_at=datetime.utcnow()))
+        try:
+            db.flush()
+        except IntegrityError:
+            # Being handled concurrently by another worker
+            db.rollback()
+            logger.info("Skipping already handled event %s", message["id"])
+            return False
+        OutboxService._notify_sender(db, message)
+        OutboxService._queue_image_processing(message)
+        db.commit()
+        return True
+    
+    @staticmethod
+    def _queue_image_processing(message: dict):
+        """Queue process_kyc_image for an uploaded KYC image"""
+        if message["type"] != "kyc.image_uploaded":
+            return
+        # Imported here: the worker imports this module through its tasks
+        from app.workers.tasks import process_kyc_image_task
+        payload = message["payload"]
+        process_kyc_image_task.delay(message["aggregate_id"], payload["side"], payload["object_name"])
+    
+    @staticmethod
+    def _notify_sender(db: Session, message: dict):
+        """Tell the shipment's sender about the event (in-app, in the caller's transaction)"""
+        template = _SENDER_MESSAGES.get(message["type"])
+        payload = message["payload"]
+        if template is None or not payload.get("sender_id"):
+            return
+        sender = db.get(User, payload["sender_id"])
+        if sender is None or not sender.is_active:
+            return
+        title, body = template
+        db.add(Notification(
+            id=str(uuid.uuid4()),
+            user_id=payload["sender_id"],
+            title=title,
+            message=body.format(**payload),
+            notification_type=NotificationType.INFO,
+            channels=[NotificationChannel.IN_APP.value],
+            is_read=False,
+            extra_data={"shipment_id": message["aggregate_id"], "event_id": message["id"], "event": message["type"]},
+            priority=0
+        ))
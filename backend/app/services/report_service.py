@@ -0,0 +1,237 @@
+"""Streaming shipment reports (CSV/NDJSON written straight to storage)"""
+import csv
+import io
+import json
+import logging
+import time
+import uuid
+from collections import defaultdict
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.document_request import DocumentRequest, RequestStatus
+from app.models.relay_point import RelayPoint
+from app.models.trip import Trip
+from app.utils.storage import storage_client
+
+
+logger = logging.getLogger(__name__)
+
+# Encoded output is handed to storage in chunks of about this size
+OUTPUT_CHUNK_SIZE = 256 * 1024
+
+CONTENT_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+# Columns of the row-level "shipments" report
+SHIPMENT_COLUMNS = [
+    "id", "created_at", "status", "document_type", "sender_id", "traveler_id",
+    "route", "relay_point", "offered_price",
+]
+
+# Grouping key of each aggregate report
+_GROUP_KEYS: Dict[str, Callable[[dict], str]] = {
+    "by_status": lambda row: row["status"],
+    "by_route": lambda row: row["route"],
+    "by_relay_point": lambda row: row["relay_point"],
+    "by_traveler": lambda row: row["traveler_id"] or "unassigned",
+}
+
+AGGREGATE_COLUMNS = ["key", "shipments"] + [s.value for s in RequestStatus] + ["revenue"]
+
+REPORT_TYPES = ["shipments"] + list(_GROUP_KEYS)
+
+
+def _price(value: Optional[str]) -> Decimal:
+    """offered_price is stored as a string; bad values count as 0"""
+    try:
+        return Decimal(value or "0")
+    except InvalidOperation:
+        return Decimal(0)
+
+
+class _GroupTotals:
+    """Running totals of one group (counts per status and revenue)"""
+    __slots__ = ("shipments", "statuses", "revenue")
+    
+    def __init__(self):
+        self.shipments = 0
+        self.statuses = defaultdict(int)
+        self.revenue = Decimal(0)
+
+
+class ReportAggregator:
+    """
+    Incremental GROUP BY over a row stream
+    
+    Memory grows with the number of groups (statuses, routes, relay points,
+    travelers), never with the number of rows.
+    """
+    
+    def __init__(self, key: Callable[[dict], str]):
+        self.key = key
+        self.groups: Dict[str, _GroupTotals] = defaultdict(_GroupTotals)
+    
+    def add(self, row: dict):
+        """Fold one shipment into its group"""
+        totals = self.groups[self.key(row)]
+        totals.shipments += 1
+        totals.statuses[row["status"]] += 1
+        # Revenue counts only shipments that reached the recipient
+        if row["status"] in (RequestStatus.DELIVERED.value, RequestStatus.CONFIRMED.value, RequestStatus.COMPLETED.value):
+            totals.revenue += _price(row["offered_price"])
+    
+    def rows(self) -> Iterator[dict]:
+        """Aggregated rows, largest groups first"""
+        for key, totals in sorted(self.groups.items(), key=lambda item: (-item[1].shipments, item[0])):
+            row = {"key": key, "shipments": totals.shipments}
+            row.update({s.value: totals.statuses.get(s.value, 0) for s in RequestStatus})
+            row["revenue"] = str(totals.revenue)
+            yield row
+
+
+def encode_rows(rows: Iterable[dict], columns: List[str], output_format: str) -> Iterator[bytes]:
+    """Encode rows as CSV or NDJSON, yielding chunks of about OUTPUT_CHUNK_SIZE"""
+    buffer = io.StringIO()
+    if output_format == "csv":
+        writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+        writer.writeheader()
+        write = writer.writerow
+    else:
+        write = lambda row: buffer.write(json.dumps(row, default=str) + "\n")
+    
+    for row in rows:
+        write(row)
+        if buffer.tell() >= OUTPUT_CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def month_bounds(month: Optional[str]) -> Tuple[datetime, datetime]:
+    """First instant of a YYYY-MM month and of the next one (default: last month)"""
+    if month is None:
+        today = date.today()
+        year, number = (today.year, today.month - 1) if today.month > 1 else (today.year - 1, 12)
+    else:
+        try:
+            year, number = (int(part) for part in month.split("-"))
+            date(year, number, 1)
+        except ValueError:
+            raise ValueError(f"month must be formatted YYYY-MM, got {month!r}")
+    start = datetime(year, number, 1)
+    end = datetime(year + 1, 1, 1) if number == 12 else datetime(year, number + 1, 1)
+    return start, end
+
+
+class ReportService:
+    """Service for generating shipment reports"""
+    
+    @staticmethod
+    def iter_shipments(db: Session, start: datetime, end: datetime) -> Iterator[dict]:
+        """
+        Stream the shipments created in [start, end)
+        
+        yield_per runs the query on a server-side cursor (stream_results), so
+        only REPORT_BATCH_SIZE rows are fetched into memory at a time.
+        """
+        query = (
+            select(
+                DocumentRequest.id,
+                DocumentRequest.created_at,
+                DocumentRequest.status,
+                DocumentRequest.document_type,
+                DocumentRequest.sender_id,
+                DocumentRequest.traveler_id,
+                DocumentRequest.offered_price,
+                Trip.departure_city,
+                Trip.destination_city,
+                RelayPoint.location_name,
+                RelayPoint.city
+            )
+            .outerjoin(Trip, DocumentRequest.trip_id == Trip.id)
+            .outerjoin(RelayPoint, DocumentRequest.relay_point_id == RelayPoint.id)
+            .where(DocumentRequest.created_at >= start, DocumentRequest.created_at < end)
+            .execution_options(yield_per=settings.REPORT_BATCH_SIZE)
+        )
+        for (shipment_id, created_at, shipment_status, document_type, sender_id, traveler_id, offered_price,
+             departure_city, destination_city, relay_name, relay_city) in db.execute(query).tuples():
+            yield {
+                "id": shipment_id,
+                "created_at": created_at,
+                "status": shipment_status.value,
+                "document_type": document_type.value,
+                "sender_id": sender_id,
+                "traveler_id": traveler_id,
+                "route": f"{departure_city} -> {destination_city}" if departure_city else "unassigned",
+                "relay_point": f"{relay_name} ({relay_city})" if relay_name else "none",
+                "offered_price": offered_price,
+            }
+    
+    @staticmethod
+    def generate(
+        db: Session,
+        report_type: str,
+        month: Optional[str] = None,
+        output_format: str = "csv",
+        storage=None
+    ) -> dict:
+        """
+        Generate a monthly report into storage and return its download URL
+        
+        "shipments" exports one row per shipment while it is read; the
+        by_* reports fold the stream into per-group totals first. Either
+        way the output is encoded in chunks and uploaded as it is produced.
+        """
+        if report_type not in REPORT_TYPES:
+            raise ValueError(f"Unknown report type: {report_type}")
+        if output_format not in CONTENT_TYPES:
+            raise ValueError(f"Unknown report format: {output_format}")
+        storage = storage or storage_client
+        start, end = month_bounds(month)
+        started = time.monotonic()
+        counts = {"rows": 0}
+        
+        def counted(rows: Iterable[dict]) -> Iterator[dict]:
+            for row in rows:
+                counts["rows"] += 1
+                yield row
+        
+        shipments = counted(ReportService.iter_shipments(db, start, end))
+        if report_type == "shipments":
+            rows, columns = shipments, SHIPMENT_COLUMNS
+        else:
+            aggregator = ReportAggregator(_GROUP_KEYS[report_type])
+            
+            def aggregated() -> Iterator[dict]:
+                # Runs lazily when the upload starts reading
+                for row in shipments:
+                    aggregator.add(row)
+                yield from aggregator.rows()
+            
+            rows, columns = aggregated(), AGGREGATE_COLUMNS
+        
+        object_name = f"reports/{report_type}/{start:%Y-%m}/{uuid.uuid4()}.{output_format}"
+        if storage.upload_iter(encode_rows(rows, columns, output_format), object_name, CONTENT_TYPES[output_format]) is None:
+            raise RuntimeError(f"Could not upload report {object_name}")
+        
+        elapsed = time.monotonic() - started
+        logger.info("Report %s for %s: %d shipments in %.1fs", report_type, f"{start:%Y-%m}", counts["rows"], elapsed)
+        return {
+            "report_type": report_type,
+            "month": f"{start:%Y-%m}",
+            "format": output_format,
+            "rows": counts["rows"],
+            "object_name": object_name,
+            "url": storage.get_file_url(object_name, expires=settings.REPORT_URL_EXPIRES_SECONDS),
+            "seconds": round(elapsed, 3),
+        }
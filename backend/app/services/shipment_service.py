@@ -9,6 +9,7 @@ from app.models.document_request import DocumentRequest, RequestStatus, Document
 from app.models.delivery_step import DeliveryStep
 from app.models.relay_point import RelayPoint
 from app.services.code_service import CodeService
+from app.services.outbox_service import OutboxService
 from app.schemas.shipment import ShipmentCreate, ShipmentUpdate
 
 
@@ -66,6 +67,11 @@ class ShipmentService:
         )
         
         db.add(initial_step)
+        OutboxService.add_event(db, "shipment.created", shipment.id, {
+            "sender_id": sender_id,
+            "status": shipment.status.value,
+            "relay_point_id": shipment.relay_point_id
+        })
         db.commit()
         db.refresh(shipment)
         
@@ -136,6 +142,13 @@ class ShipmentService:
         )
         
         db.add(step)
+        OutboxService.add_event(db, "shipment.status_changed", shipment_id, {
+            "sender_id": shipment.sender_id,
+            "traveler_id": shipment.traveler_id,
+            "actor_id": actor_id,
+            "old_status": old_status.value,
+            "new_status": new_status.value
+        })
         db.commit()
         db.refresh(shipment)
         
@@ -179,6 +192,11 @@ class ShipmentService:
         )
         
         db.add(step)
+        OutboxService.add_event(db, "shipment.assigned", shipment_id, {
+            "sender_id": shipment.sender_id,
+            "traveler_id": traveler_id,
+            "trip_id": trip_id
+        })
         db.commit()
         db.refresh(shipment)
         
@@ -221,6 +239,12 @@ class ShipmentService:
         )
         
         db.add(step)
+        OutboxService.add_event(db, "shipment.cancelled", shipment_id, {
+            "sender_id": shipment.sender_id,
+            "traveler_id": shipment.traveler_id,
+            "actor_id": actor_id,
+            "reason": reason
+        })
         db.commit()
         db.refresh(shipment)
         
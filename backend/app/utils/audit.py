@@ -0,0 +1,172 @@
+"""Security audit log writer: in-process queue, flushed in multi-row INSERTs"""
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, List, Optional
+
+from fastapi import Request
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.core.metrics import AUDIT_EVENTS, AUDIT_FLUSH_SECONDS
+from app.database.database import SessionLocal
+from app.models.security_log import SecurityLog
+from app.utils.middleware import client_ip
+
+
+logger = logging.getLogger(__name__)
+
+# Queued after the last event by close(): the writer drains and exits
+_STOP = object()
+
+
+class AuditWriter:
+    """
+    Buffers security events and writes them in batches
+    
+    record() never touches the database: it puts the row on a bounded queue
+    and returns. A daemon thread writes one multi-row INSERT per batch, as
+    soon as batch_size events are waiting or flush_ms after the first one.
+    When the queue is full the event is dropped and counted, so a slow
+    database never slows logins down.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: Optional[int] = None,
+        flush_ms: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        self._session_factory = session_factory
+        self.batch_size = batch_size or settings.AUDIT_BATCH_SIZE
+        self.flush_seconds = (flush_ms if flush_ms is not None else settings.AUDIT_FLUSH_MS) / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size or settings.AUDIT_QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    def record(
+        self,
+        action: str,
+        user_id: Optional[str] = None,
+        document_request_id: Optional[str] = None,
+        details: Optional[str] = None,
+        ip_address: Optional[str] = None,
+        user_agent: Optional[str] = None
+    ) -> bool:
+        """Queue one event; False if it was dropped"""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait({
+                "id": str(uuid.uuid4()),
+                "action": action,
+                "user_id": user_id,
+                "document_request_id": document_request_id,
+                "details": details,
+                "ip_address": ip_address,
+                "user_agent": user_agent[:500] if user_agent else None,
+                "timestamp": datetime.utcnow()
+            })
+            return True
+        except queue.Full:
+            AUDIT_EVENTS.labels("dropped").inc()
+            return False
+    
+    def close(self, timeout: float = 10.0) -> None:
+        """Write everything queued so far and stop the writer thread"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is None or self._pid != os.getpid():
+            return
+        try:
+            self._queue.put(_STOP, timeout=timeout)
+        except queue.Full:
+            # The database is stuck: give up on the backlog rather than block shutdown
+            logger.warning("Audit queue still full after %.0fs, %d events not written", timeout, self._queue.qsize())
+            return
+        thread.join(timeout)
+    
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork: a forked worker starts its own writer
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[dict] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                self._write(batch)
+    
+    def _write(self, batch: List[dict]) -> None:
+        """One INSERT ... VALUES (...), (...) for the whole batch"""
+        started = time.monotonic()
+        db = self._session_factory()
+        try:
+            db.execute(insert(SecurityLog), batch)
+            db.commit()
+            AUDIT_EVENTS.labels("written").inc(len(batch))
+        except Exception:
+            db.rollback()
+            AUDIT_EVENTS.labels("failed").inc(len(batch))
+            logger.exception("Failed to write %d audit events", len(batch))
+        finally:
+            db.close()
+            AUDIT_FLUSH_SECONDS.observe(time.monotonic() - started)
+
+
+# Shared writer, started on first event and flushed on application shutdown
+audit_writer: AuditWriter = LazyClient(AuditWriter, closer=lambda writer: writer.close())
+
+
+class AuditContext:
+    """
+    Request metadata for audit events (a FastAPI dependency)
+    
+    The address is the one our trusted proxy saw (client_ip), never a hop
+    the client wrote into X-Forwarded-For itself.
+    
+    Usage:
+        audit: AuditContext = Depends()
+        audit.record("login_failed", details=identifier)
+    """
+    
+    def __init__(self, request: Request):
+        self.ip_address = client_ip(request.scope)
+        self.user_agent = request.headers.get("user-agent")
+    
+    def record(self, action: str, **fields) -> None:
+        """Queue an event carrying this request's address and user agent"""
+        audit_writer.record(action, ip_address=self.ip_address, user_agent=self.user_agent, **fields)
+    
+    def code_check(self, code: str, verified: bool, user_id: str, shipment_id: str) -> None:
+        """Record a workflow code verification (unique, traveler or delivery code)"""
+        self.record(
+            f"{code}_{'verified' if verified else 'rejected'}",
+            user_id=user_id,
+            document_request_id=shipment_id
+        )
@@ -0,0 +1,161 @@
+"""Circuit breakers for outbound dependencies (Redis, storage, SMTP, Twilio, Stripe)"""
+import functools
+import logging
+import threading
+import time
+from typing import Dict, Tuple, Type
+
+from app.core.config import settings
+from app.core.metrics import CIRCUIT_REJECTED, CIRCUIT_STATE, CIRCUIT_TRANSITIONS
+
+
+logger = logging.getLogger(__name__)
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+# Dependency: (consecutive failures that open the circuit, seconds open before a probe);
+# CIRCUIT_BREAKERS overrides them, e.g. "smtp=3/60,redis=5/5"
+BREAKER_DEFAULTS: Dict[str, Tuple[int, float]] = {
+    "redis": (5, 5.0),
+    "storage": (5, 30.0),
+    "smtp": (3, 60.0),
+    "twilio": (5, 30.0),
+    "stripe": (3, 30.0),
+}
+
+
+class CircuitOpenError(Exception):
+    """A dependency's circuit is open: the call was refused without being attempted"""
+    
+    def __init__(self, dependency: str, retry_after: float):
+        super().__init__(f"{dependency} is unavailable (circuit open, retry in {retry_after:.0f}s)")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Consecutive-failure circuit breaker, shared by the threads and tasks of a client
+    
+    - closed: calls go through; failure_threshold failures in a row open it
+    - open: calls fail at once with open_error for reset_seconds
+    - half_open: one call at a time is let through as a probe (another one
+      after reset_seconds if a probe never reports back); its success closes
+      the circuit, its failure opens it again
+    
+    Only exceptions in `failures` count (timeouts and connection errors, not
+    "not found" answers). Use it as a context manager around one call, or
+    call allow() and record_success()/record_failure() when the outcome is
+    known elsewhere (e.g. a queue worker).
+    """
+    
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_seconds: float = 30.0,
+        failures: Tuple[Type[BaseException], ...] = (Exception,),
+        open_error: Type[CircuitOpenError] = CircuitOpenError
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = failures
+        self.open_error = open_error
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_at = 0.0
+        self._lock = threading.Lock()
+        CIRCUIT_STATE.labels(name).set(0)
+    
+    def __enter__(self) -> "CircuitBreaker":
+        self.check()
+        return self
+    
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        if exc_type is not None and issubclass(exc_type, self.failures):
+            self.record_failure()
+        else:
+            self.record_success()
+        return False
+    
+    def allow(self) -> bool:
+        """Whether a call may go ahead now (moves open to half-open when it is time to probe)"""
+        if self.state == CLOSED:
+            return True
+        now = time.monotonic()
+        with self._lock:
+            if self.state == OPEN and now - self._opened_at >= self.reset_seconds:
+                self._transition(HALF_OPEN)
+            elif self.state != HALF_OPEN or now - self._probe_at < self.reset_seconds:
+                return self.state == CLOSED
+            self._probe_at = now
+            return True
+    
+    def check(self) -> None:
+        """Raise open_error unless a call may go ahead"""
+        if not self.allow():
+            CIRCUIT_REJECTED.labels(self.name).inc()
+            raise self.open_error(self.name, self.retry_after())
+    
+    def retry_after(self) -> float:
+        """Seconds until the next probe may be let through"""
+        since = time.monotonic() - (self._opened_at if self.state == OPEN else self._probe_at)
+        return max(0.0, self.reset_seconds - since)
+    
+    def record_success(self) -> None:
+        if self.state == CLOSED and not self.consecutive_failures:
+            return
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != CLOSED:
+                self._transition(CLOSED)
+    
+    def record_failure(self) -> None:
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (self.state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self._transition(OPEN)
+    
+    def _transition(self, state: str) -> None:
+        logger.log(
+            logging.WARNING if state == OPEN else logging.INFO,
+            "Circuit %s %s -> %s after %d failures in a row", self.name, self.state, state, self.consecutive_failures
+        )
+        self.state = state
+        CIRCUIT_STATE.labels(self.name).set(_STATE_VALUES[state])
+        CIRCUIT_TRANSITIONS.labels(self.name, state).inc()
+
+
+def circuit_breaker(
+    dependency: str,
+    failures: Tuple[Type[BaseException], ...] = (Exception,),
+    open_error: Type[CircuitOpenError] = CircuitOpenError
+) -> CircuitBreaker:
+    """Breaker for a dependency with its thresholds (BREAKER_DEFAULTS, CIRCUIT_BREAKERS)"""
+    threshold, reset_seconds = BREAKER_DEFAULTS[dependency]
+    for entry in settings.CIRCUIT_BREAKERS.split(","):
+        name, _, value = entry.strip().partition("=")
+        if name == dependency:
+            threshold, _, seconds = value.partition("/")
+            threshold, reset_seconds = int(threshold), float(seconds or reset_seconds)
+    return CircuitBreaker(dependency, threshold, reset_seconds, failures, open_error)
+
+
+def guarded_methods(*names: str):
+    """Class decorator: run the named (sync) methods through the instance's `breaker`"""
+    def wrap(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            with self.breaker:
+                return method(self, *args, **kwargs)
+        return wrapper
+    
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, wrap(getattr(cls, name)))
+        return cls
+    return decorate
@@ -0,0 +1,271 @@
+"""Admission control: bounded in-flight requests per worker, prioritized queue, early 503"""
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Iterable, Optional, Tuple
+
+import anyio.to_thread
+from fastapi import status
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.capacity import capacity_plan
+from app.core.config import settings
+from app.core.metrics import (
+    ADMISSION_INFLIGHT, ADMISSION_P95_SECONDS, ADMISSION_QUEUE_DEPTH, ADMISSION_REJECTED, ADMISSION_WAIT_SECONDS,
+    THREADPOOL_BUSY, THREADPOOL_WAITING
+)
+
+
+logger = logging.getLogger(__name__)
+
+# How often a class's p95 is recomputed from its window, and a shedding warning logged at most
+P95_REFRESH_SECONDS = 0.5
+WARNING_INTERVAL_SECONDS = 10.0
+
+
+@dataclass(frozen=True)
+class RouteClass:
+    """Requests admitted and shed together; lower priority numbers are shed last"""
+    name: str
+    priority: int
+    # Longest wait for a slot before the request is shed (capped by API_QUEUE_TIMEOUT_SECONDS)
+    max_queue_delay: float
+    # Latency objective (queue wait + handling); while missed, lower priorities are shed
+    slo_p95: float
+
+
+ROUTE_CLASSES = (
+    RouteClass("write", 0, math.inf, 1.0),
+    RouteClass("auth", 1, 2.0, 1.5),
+    RouteClass("read", 2, 1.0, 0.5),
+    RouteClass("list", 3, 0.5, 2.0),
+    RouteClass("analytics", 4, 0.25, 10.0),
+)
+_CLASSES = {route.name: route for route in ROUTE_CLASSES}
+
+ANALYTICS_PATHS = re.compile(r"^/api/v1/(admin/security-logs|analytics|reports)(/|$)")
+LIST_PATHS = frozenset({"/api/v1/shipments", "/api/v1/travelers/my-shipments", "/api/v1/kyc/documents"})
+
+
+def route_class(method: str, path: str) -> RouteClass:
+    """Class of a request (by path, before routing has run)"""
+    if path.startswith("/api/v1/auth/"):
+        return _CLASSES["auth"]
+    if ANALYTICS_PATHS.match(path):
+        return _CLASSES["analytics"]
+    if method not in ("GET", "HEAD"):
+        return _CLASSES["write"]
+    if path.rstrip("/") in LIST_PATHS:
+        return _CLASSES["list"]
+    return _CLASSES["read"]
+
+
+def configure_threadpool(threads: int) -> None:
+    """Size AnyIO's default thread limiter (sync endpoints, dependencies, run_in_threadpool); call from the event loop"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = threads
+
+
+@dataclass
+class _ClassState:
+    inflight: int = 0
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+    # (finished at, latency) of recent requests
+    latencies: Deque[Tuple[float, float]] = field(default_factory=lambda: deque(maxlen=2048))
+    p95: float = 0.0
+    p95_at: float = 0.0
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Admit at most max_inflight requests at a time in this worker (pure ASGI)
+    
+    With max_inflight equal to the threadpool size and the DB pool size (see
+    app.core.capacity), an admitted request gets a thread and a connection
+    without waiting: the only queue is this one, which is measured and
+    bounded. Requests are classed (write, auth, read, list, analytics) and,
+    when all slots are busy, a freed slot goes to the highest class waiting.
+    A request is shed with 503 and Retry-After when:
+    - slo: a higher class is missing its p95 objective over the last
+      ADMISSION_WINDOW_SECONDS (queueing inflates it first)
+    - delay: its expected wait (waiters ahead x recent handling time / slots)
+      exceeds its class's max_queue_delay
+    - queue_full: max_queue requests wait and none is of a lower class
+      (otherwise the newest lowest-class waiter is shed: evicted)
+    - timeout: it waited max_queue_delay without getting a slot
+    With free slots every request is admitted, whatever the latencies.
+    
+    Threadpool usage is sampled into gauges as requests enter and leave.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        max_inflight: Optional[int] = None,
+        max_queue: Optional[int] = None,
+        queue_timeout: Optional[float] = None,
+        classify: Callable[[str, str], RouteClass] = route_class,
+        window_seconds: Optional[float] = None,
+        exempt_prefixes: Iterable[str] = ("/health", "/metrics")
+    ):
+        plan = capacity_plan() if None in (max_inflight, max_queue, queue_timeout) else None
+        self.app = app
+        self.max_inflight = plan.max_inflight if max_inflight is None else max_inflight
+        self.max_queue = plan.queue_limit if max_queue is None else max_queue
+        self.queue_timeout = plan.queue_timeout if queue_timeout is None else queue_timeout
+        self.classify = classify
+        self.window_seconds = settings.ADMISSION_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.inflight = 0
+        self.queued = 0
+        self._classes: Dict[RouteClass, _ClassState] = {}
+        self._service_seconds = 0.0
+        self._warned_at = 0.0
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+        
+        route = self.classify(scope["method"], scope["path"])
+        state = self._state(route)
+        arrived = time.perf_counter()
+        rejection = await self._acquire(route, state)
+        if rejection is not None:
+            reason, retry_after = rejection
+            self._shed(route, reason)
+            response = JSONResponse(
+                {"detail": "Server is busy. Please try again later."},
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+            )
+            await response(scope, receive, send)
+            return
+        
+        admitted = time.perf_counter()
+        ADMISSION_WAIT_SECONDS.labels(route.name).observe(admitted - arrived)
+        state.inflight += 1
+        ADMISSION_INFLIGHT.labels(route.name).inc()
+        self._sample_threadpool()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            state.inflight -= 1
+            ADMISSION_INFLIGHT.labels(route.name).dec()
+            self._release()
+            self._sample_threadpool()
+            self._record(state, time.perf_counter() - arrived, time.perf_counter() - admitted)
+    
+    def _state(self, route: RouteClass) -> _ClassState:
+        state = self._classes.get(route)
+        if state is None:
+            state = self._classes[route] = _ClassState()
+            # Kept in priority order: _release() serves the first class with waiters
+            self._classes = dict(sorted(self._classes.items(), key=lambda item: item[0].priority))
+        return state
+    
+    async def _acquire(self, route: RouteClass, state: _ClassState) -> Optional[Tuple[str, float]]:
+        """Take a slot, waiting in line if needed; (reason, retry after) if the request is shed"""
+        if self.inflight < self.max_inflight and not self.queued:
+            self.inflight += 1
+            return None
+        
+        max_delay = min(route.max_queue_delay, self.queue_timeout)
+        if self._slo_missed_above(route):
+            return "slo", max_delay
+        ahead = sum(len(other.waiters) for other_route, other in self._classes.items() if other_route.priority <= route.priority)
+        expected = (ahead + 1) * self._service_seconds / self.max_inflight
+        if expected > max_delay:
+            return "delay", expected
+        if self.queued >= self.max_queue and not self._evict_below(route):
+            return "queue_full", max_delay
+        
+        waiter = asyncio.get_running_loop().create_future()
+        state.waiters.append(waiter)
+        self.queued += 1
+        ADMISSION_QUEUE_DEPTH.labels(route.name).inc()
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), max_delay)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # Client went away; hand on a slot we were granted meanwhile
+            self._abandon(state, waiter)
+            raise
+        finally:
+            ADMISSION_QUEUE_DEPTH.labels(route.name).dec()
+        if not waiter.done():
+            self._abandon(state, waiter)
+            return "timeout", max_delay
+        # True: _release() handed its slot over (inflight unchanged); False: evicted
+        return None if waiter.result() else ("evicted", max_delay)
+    
+    def _abandon(self, state: _ClassState, waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            state.waiters.remove(waiter)
+            self.queued -= 1
+        elif waiter.result():
+            self._release()
+    
+    def _release(self) -> None:
+        """Hand the slot to the longest waiting request of the highest class, or free it"""
+        for state in self._classes.values():
+            if state.waiters:
+                state.waiters.popleft().set_result(True)
+                self.queued -= 1
+                return
+        self.inflight -= 1
+    
+    def _evict_below(self, route: RouteClass) -> bool:
+        """Shed the newest waiter of the lowest class below route, to make room"""
+        for other_route, other in reversed(self._classes.items()):
+            if other_route.priority <= route.priority:
+                return False
+            if other.waiters:
+                other.waiters.pop().set_result(False)
+                self.queued -= 1
+                return True
+        return False
+    
+    def _slo_missed_above(self, route: RouteClass) -> bool:
+        return any(
+            self._p95(other_route, other) > other_route.slo_p95
+            for other_route, other in self._classes.items()
+            if other_route.priority < route.priority
+        )
+    
+    def _p95(self, route: RouteClass, state: _ClassState) -> float:
+        """p95 latency of the class over the window (recomputed every P95_REFRESH_SECONDS)"""
+        now = time.monotonic()
+        if now - state.p95_at >= P95_REFRESH_SECONDS:
+            while state.latencies and state.latencies[0][0] < now - self.window_seconds:
+                state.latencies.popleft()
+            latencies = sorted(latency for _, latency in state.latencies)
+            state.p95 = latencies[math.ceil(0.95 * len(latencies)) - 1] if latencies else 0.0
+            state.p95_at = now
+            ADMISSION_P95_SECONDS.labels(route.name).set(state.p95)
+        return state.p95
+    
+    def _record(self, state: _ClassState, latency: float, service: float) -> None:
+        state.latencies.append((time.monotonic(), latency))
+        # Moving average of handling time (all classes) for expected queue delays
+        self._service_seconds += 0.1 * (service - self._service_seconds) if self._service_seconds else service
+    
+    def _shed(self, route: RouteClass, reason: str) -> None:
+        ADMISSION_REJECTED.labels(route.name, reason).inc()
+        now = time.monotonic()
+        if now - self._warned_at >= WARNING_INTERVAL_SECONDS:
+            self._warned_at = now
+            logger.warning(
+                "Shedding load (%s %s): %d in flight, %d queued", route.name, reason, self.inflight, self.queued
+            )
+    
+    @staticmethod
+    def _sample_threadpool() -> None:
+        statistics = anyio.to_thread.current_default_thread_limiter().statistics()
+        THREADPOOL_BUSY.set(statistics.borrowed_tokens)
+        THREADPOOL_WAITING.set(statistics.tasks_waiting)
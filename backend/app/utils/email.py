@@ -1,10 +1,258 @@
 """Email utilities"""
+import asyncio
+import logging
+import random
+import time
+import weakref
 import aiosmtplib
+from dataclasses import dataclass
+from email.message import Message
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List
+from typing import List, Optional
 
 from app.core.config import settings
+from app.core.metrics import SMTP_CONNECTIONS, SMTP_MESSAGE_SECONDS, SMTP_MESSAGES, SMTP_RETRIES
+from app.utils.circuit_breaker import CircuitOpenError, circuit_breaker
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _QueuedMessage:
+    """Message waiting for a pool connection"""
+    message: Message
+    future: asyncio.Future
+    queued_at: float
+    failures: int = 0
+
+
+class SMTPPool:
+    """
+    Pool of authenticated SMTP connections fed by a message queue
+    
+    Up to `size` workers each keep one connection open (connect, TLS and
+    AUTH happen once, not per message) and drain the queue in batches of up
+    to `batch_size` messages. When a connection breaks, the worker reopens
+    it with exponential backoff and requeues the unsent messages until they
+    reach `max_attempts`. Messages the server rejects (5xx) fail at once, and
+    so does a message hitting any other error; the rest of its batch is
+    requeued and the worker carries on.
+    
+    Connection failures feed the "smtp" circuit breaker; while it is open,
+    send() raises CircuitOpenError at once instead of queueing behind
+    connection timeouts.
+    """
+    
+    def __init__(
+        self,
+        hostname: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        use_tls: bool = False,
+        size: int = 3,
+        batch_size: int = 50,
+        timeout: float = 30,
+        idle_timeout: float = 60,
+        max_attempts: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30
+    ):
+        self.hostname = hostname
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.size = size
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._workers: List[asyncio.Task] = []
+        self._closed = False
+        self.breaker = circuit_breaker("smtp", failures=(aiosmtplib.SMTPException, OSError, asyncio.TimeoutError))
+    
+    @classmethod
+    def from_settings(cls) -> "SMTPPool":
+        """Pool configured from SMTP_* settings"""
+        return cls(
+            hostname=settings.SMTP_HOST,
+            port=settings.SMTP_PORT,
+            username=settings.SMTP_USER or None,
+            password=settings.SMTP_PASSWORD or None,
+            use_tls=settings.SMTP_TLS,
+            size=settings.SMTP_POOL_SIZE,
+            batch_size=settings.SMTP_BATCH_SIZE,
+            timeout=settings.SMTP_TIMEOUT,
+            idle_timeout=settings.SMTP_IDLE_SECONDS,
+            max_attempts=settings.SMTP_MAX_ATTEMPTS
+        )
+    
+    async def send(self, message: Message) -> bool:
+        """Queue a message and wait for its outcome (True if accepted by the server)"""
+        if self._closed:
+            raise RuntimeError("SMTP pool is closed")
+        self.breaker.check()
+        if not self._workers:
+            self._workers = [asyncio.create_task(self._worker()) for _ in range(self.size)]
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait(_QueuedMessage(message, future, time.monotonic()))
+        return await future
+    
+    async def close(self, timeout: float = 10):
+        """Finish queued messages (up to timeout), then close all connections"""
+        self._closed = True
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning("SMTP pool closed with %d messages unsent", self._queue.qsize())
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        while not self._queue.empty():
+            self._finish(self._queue.get_nowait(), "failed")
+    
+    async def _connect(self) -> aiosmtplib.SMTP:
+        """Open an authenticated connection"""
+        smtp = aiosmtplib.SMTP(
+            hostname=self.hostname,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            use_tls=self.use_tls,
+            timeout=self.timeout
+        )
+        try:
+            await smtp.connect()
+        except BaseException:
+            SMTP_CONNECTIONS.labels("error").inc()
+            raise
+        SMTP_CONNECTIONS.labels("ok").inc()
+        return smtp
+    
+    @staticmethod
+    async def _disconnect(smtp: aiosmtplib.SMTP):
+        """Close a connection politely if possible"""
+        try:
+            await asyncio.wait_for(smtp.quit(), 1)
+        except Exception:
+            smtp.close()
+    
+    def _finish(self, item: _QueuedMessage, outcome: str):
+        """Record the final outcome of a message"""
+        SMTP_MESSAGES.labels(outcome).inc()
+        SMTP_MESSAGE_SECONDS.labels(outcome).observe(time.monotonic() - item.queued_at)
+        if outcome != "sent":
+            logger.warning("Email to %s %s (%d connection failures)", item.message["To"], outcome, item.failures)
+        if not item.future.done():
+            item.future.set_result(outcome == "sent")
+    
+    def _retry(self, item: _QueuedMessage):
+        """Requeue a message after a connection failure, or give up"""
+        item.failures += 1
+        if item.failures >= self.max_attempts:
+            self._finish(item, "failed")
+        else:
+            SMTP_RETRIES.inc()
+            self._queue.put_nowait(item)
+    
+    async def _worker(self):
+        """Own one connection and send queued messages over it in batches"""
+        smtp = None
+        last_used = 0.0
+        failures = 0
+        try:
+            while True:
+                batch = [await self._queue.get()]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                taken = len(batch)
+                # Skip messages whose sender stopped waiting
+                pending = [item for item in batch if not item.future.done()]
+                
+                # Servers drop idle sessions; reconnect instead of failing the first send
+                if smtp is not None and (not smtp.is_connected or time.monotonic() - last_used > self.idle_timeout):
+                    await self._disconnect(smtp)
+                    smtp = None
+                try:
+                    if pending and smtp is None:
+                        smtp = await self._connect()
+                    while pending:
+                        item = pending[0]
+                        try:
+                            await smtp.send_message(item.message)
+                            outcome = "sent"
+                        except aiosmtplib.SMTPRecipientsRefused:
+                            outcome = "rejected"
+                        except aiosmtplib.SMTPResponseException as e:
+                            # 4xx is transient: treat like a broken connection
+                            if e.code < 500:
+                                raise
+                            outcome = "rejected"
+                        pending.pop(0)
+                        self._finish(item, outcome)
+                    if smtp is not None:
+                        self.breaker.record_success()
+                    failures = 0
+                    last_used = time.monotonic()
+                except asyncio.CancelledError:
+                    # Pool closing: unsent messages of this batch fail
+                    for item in pending:
+                        self._finish(item, "failed")
+                    raise
+                except (aiosmtplib.SMTPException, OSError, asyncio.TimeoutError) as e:
+                    failures += 1
+                    self.breaker.record_failure()
+                    logger.warning("SMTP connection to %s failed (%d in a row): %s", self.hostname, failures, e)
+                    if smtp is not None:
+                        smtp.close()
+                        smtp = None
+                    for item in pending:
+                        self._retry(item)
+                    delay = min(self.backoff_max, self.backoff_base * 2 ** (failures - 1))
+                    await asyncio.sleep(delay * random.uniform(0.5, 1))
+                except Exception:
+                    # Anything else (a malformed message, a bug): fail the message being
+                    # sent, requeue the rest of the batch on a fresh connection
+                    logger.exception("SMTP worker failed on a message, %d requeued", len(pending) - 1)
+                    if smtp is not None:
+                        smtp.close()
+                        smtp = None
+                    if pending:
+                        self._finish(pending.pop(0), "failed")
+                    for item in pending:
+                        self._queue.put_nowait(item)
+                finally:
+                    for _ in range(taken):
+                        self._queue.task_done()
+        finally:
+            if smtp is not None:
+                await self._disconnect(smtp)
+
+
+# One pool per event loop: connections belong to the loop that opened them
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, SMTPPool]" = weakref.WeakKeyDictionary()
+
+
+def get_mailer() -> SMTPPool:
+    """SMTP pool of the running event loop"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = SMTPPool.from_settings()
+    return pool
+
+
+async def close_mailer():
+    """Flush and close the running loop's SMTP pool"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.close()
 
 
 async def send_email(
@@ -12,8 +260,8 @@ async def send_email(
     subject: str,
     body: str,
     html: bool = False
-):
-    """Send email using SMTP"""
+) -> bool:
+    """Send email over the pooled SMTP connections"""
     message = MIMEMultipart("alternative")
     message["From"] = settings.SMTP_FROM
     message["To"] = to_email if isinstance(to_email, str) else ", ".join(to_email)
@@ -25,19 +273,28 @@ async def send_email(
     else:
         message.attach(MIMEText(body, "plain"))
     
-    # Send email
+    return await get_mailer().send(message)
+
+
+async def send_or_queue_email(
+    to_email: str | List[str],
+    subject: str,
+    body: str,
+    html: bool = False
+) -> bool:
+    """
+    Send email now, or hand it to a worker while SMTP's circuit is open
+    
+    The queued send_email_task runs once the breaker lets a probe through
+    (and retries while it stays open). Returns whether it was sent now.
+    """
     try:
-        await aiosmtplib.send(
-            message,
-            hostname=settings.SMTP_HOST,
-            port=settings.SMTP_PORT,
-            username=settings.SMTP_USER,
-            password=settings.SMTP_PASSWORD,
-            use_tls=settings.SMTP_TLS
-        )
-        return True
-    except Exception as e:
-        print(f"Error sending email: {e}")
+        return await send_email(to_email, subject, body, html)
+    except CircuitOpenError as e:
+        # Imported here: the worker tasks import this module
+        from app.workers.tasks import send_email_task
+        send_email_task.apply_async((to_email, subject, body, html), countdown=e.retry_after)
+        logger.info("SMTP unavailable, queued email to %s for %.0fs from now", to_email, e.retry_after)
         return False
 
 
@@ -61,7 +318,7 @@ async def send_password_reset_email(email: str, reset_token: str):
     DocUrgent Team
     """
     
-    await send_email(email, subject, body)
+    await send_or_queue_email(email, subject, body)
 
 
 async def send_welcome_email(email: str, name: str):
@@ -78,4 +335,4 @@ async def send_welcome_email(email: str, name: str):
     DocUrgent Team
     """
     
-    await send_email(email, subject, body)
+    await send_or_queue_email(email, subject, body)
@@ -0,0 +1,132 @@
+"""Cached dependency health for the readiness probe"""
+import logging
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import text
+
+from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.core.metrics import DEPENDENCY_CHECK_SECONDS, DEPENDENCY_UP
+from app.database.database import engine
+from app.utils.redis_client import redis_client
+from app.utils.storage import storage_client
+
+
+logger = logging.getLogger(__name__)
+
+
+def check_database() -> None:
+    with engine.resolve().connect() as connection:
+        connection.execute(text("SELECT 1"))
+
+
+def check_redis() -> None:
+    redis_client.client.ping()
+
+
+def check_storage() -> None:
+    storage_client.ping()
+
+
+DEFAULT_CHECKS: Dict[str, Callable[[], None]] = {
+    "database": check_database,
+    "redis": check_redis,
+    "storage": check_storage,
+}
+
+
+@dataclass
+class CheckResult:
+    """Outcome of the latest probe of one dependency"""
+    ok: bool
+    latency_ms: float
+    checked_at: datetime
+    error: Optional[str] = None
+
+
+class HealthMonitor:
+    """
+    Probes dependencies in the background and caches the results
+    
+    Each dependency has its own daemon thread that runs its check every
+    interval seconds, so a hanging dependency only delays its own result.
+    report() reads the cache and never touches a dependency, however often
+    the kubelet asks. A result older than three intervals (a check stuck
+    past its timeouts) counts as failing; so does a dependency not probed yet.
+    """
+    
+    def __init__(self, checks: Optional[Dict[str, Callable[[], None]]] = None, interval: Optional[float] = None):
+        self.checks = DEFAULT_CHECKS if checks is None else checks
+        self.interval = settings.HEALTH_CHECK_INTERVAL_SECONDS if interval is None else interval
+        self.results: Dict[str, CheckResult] = {}
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+    
+    def start(self) -> None:
+        if self._threads:
+            return
+        self._stop.clear()
+        for name, check in self.checks.items():
+            thread = threading.Thread(target=self._run, args=(name, check), name=f"health-{name}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+    
+    def stop(self) -> None:
+        """Stop probing (a check stuck in I/O is left to its daemon thread)"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(1.0)
+        self._threads = []
+    
+    def probe(self, name: str, check: Callable[[], None]) -> CheckResult:
+        """Run one check now and cache its result"""
+        started = time.perf_counter()
+        try:
+            check()
+            error = None
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        latency = time.perf_counter() - started
+        result = CheckResult(ok=error is None, latency_ms=round(latency * 1000, 2), checked_at=datetime.utcnow(), error=error)
+        previous = self.results.get(name)
+        if previous is None or previous.ok != result.ok:
+            if result.ok:
+                logger.info("Dependency %s is up (%.1f ms)", name, result.latency_ms)
+            else:
+                logger.warning("Dependency %s is down: %s", name, error)
+        self.results[name] = result
+        DEPENDENCY_UP.labels(name).set(int(result.ok))
+        DEPENDENCY_CHECK_SECONDS.labels(name).observe(latency)
+        return result
+    
+    def report(self) -> dict:
+        """Cached readiness: ready when every dependency's latest result is recent and ok"""
+        if self.interval <= 0:
+            return {"status": "ready", "checks": {}}  # Dependency checks disabled
+        now = datetime.utcnow()
+        stale_after = 3 * self.interval
+        checks, ready = {}, True
+        for name in self.checks:
+            result = self.results.get(name)
+            if result is None:
+                checks[name], ready = {"ok": False, "error": "not probed yet"}, False
+                continue
+            entry = {**asdict(result), "checked_at": result.checked_at.isoformat()}
+            if (now - result.checked_at).total_seconds() > stale_after:
+                entry.update(ok=False, error=f"no result for over {stale_after:.0f}s")
+            checks[name] = entry
+            ready = ready and entry["ok"]
+        return {"status": "ready" if ready else "not_ready", "checks": checks}
+    
+    def _run(self, name: str, check: Callable[[], None]) -> None:
+        while not self._stop.is_set():
+            self.probe(name, check)
+            self._stop.wait(self.interval)
+
+
+# This API worker's monitor (started by the lifespan when HEALTH_CHECK_INTERVAL_SECONDS > 0)
+health_monitor: HealthMonitor = LazyClient(HealthMonitor, closer=lambda m: m.stop())
@@ -0,0 +1,92 @@
+"""Prometheus metrics for HTTP requests (pure ASGI middleware)"""
+import time
+from typing import Dict, Iterable, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.metrics import (
+    HTTP_REQUEST_BYTES,
+    HTTP_REQUEST_SECONDS,
+    HTTP_REQUESTS,
+    HTTP_REQUESTS_IN_PROGRESS,
+    HTTP_RESPONSE_BYTES,
+)
+
+
+# Route label for requests no route matched (404s, scanners): one series, not one per path
+UNMATCHED_ROUTE = "unmatched"
+METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class PrometheusMiddleware:
+    """
+    Record latency, status, in-flight count and body sizes per route template
+    
+    Routes are labelled by their template ("/api/v1/shipments/{shipment_id}"),
+    read from scope["route"] once FastAPI has matched the request, so label
+    cardinality stays bounded. Durations use the monotonic clock. Labelled
+    series are looked up once and cached, so the hot path is a dict lookup
+    and four observations.
+    """
+    
+    def __init__(self, app: ASGIApp, exclude: Iterable[str] = ("/metrics",)):
+        self.app = app
+        self.exclude = frozenset(exclude)
+        self._series: Dict[Tuple[str, str], tuple] = {}
+        self._statuses: Dict[Tuple[str, str, int], object] = {}
+        self._in_progress = {method: HTTP_REQUESTS_IN_PROGRESS.labels(method) for method in METHODS | {"other"}}
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"] in self.exclude:
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"] if scope["method"] in METHODS else "other"
+        started = time.perf_counter()
+        status_code = 500  # Unless the app gets to send a response
+        request_bytes = 0
+        response_bytes = 0
+        
+        async def receive_counting() -> Message:
+            nonlocal request_bytes
+            message = await receive()
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+            return message
+        
+        async def send_counting(message: Message) -> None:
+            nonlocal status_code, response_bytes
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+            await send(message)
+        
+        in_progress = self._in_progress[method]
+        in_progress.inc()
+        try:
+            await self.app(scope, receive_counting, send_counting)
+        finally:
+            in_progress.dec()
+            route = scope.get("route")
+            template = getattr(route, "path_format", None) or UNMATCHED_ROUTE
+            self._observe(method, template, status_code, time.perf_counter() - started, request_bytes, response_bytes)
+    
+    def _observe(self, method: str, route: str, status_code: int, seconds: float,
+                 request_bytes: int, response_bytes: int) -> None:
+        series = self._series.get((method, route))
+        if series is None:
+            series = self._series[(method, route)] = (
+                HTTP_REQUEST_SECONDS.labels(method, route),
+                HTTP_REQUEST_BYTES.labels(method, route),
+                HTTP_RESPONSE_BYTES.labels(method, route),
+            )
+        duration, request_size, response_size = series
+        duration.observe(seconds)
+        request_size.observe(request_bytes)
+        response_size.observe(response_bytes)
+        
+        counter = self._statuses.get((method, route, status_code))
+        if counter is None:
+            counter = self._statuses[(method, route, status_code)] = HTTP_REQUESTS.labels(method, route, str(status_code))
+        counter.inc()
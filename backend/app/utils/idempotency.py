@@ -0,0 +1,236 @@
+"""Idempotency-Key support for retried mutating requests"""
+import base64
+import hashlib
+import json
+import logging
+import secrets
+from typing import Iterable, Optional
+
+from fastapi import HTTPException, status
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.security import decode_token
+from app.utils.redis_client import RedisClient, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAY_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+
+# Workflow endpoints that mobile clients retry on flaky networks
+IDEMPOTENT_PATHS = frozenset({
+    "/api/v1/shipments",
+    "/api/v1/relay-points/check-in",
+    "/api/v1/relay-points/handoff",
+    "/api/v1/travelers/deliver",
+})
+
+
+class IdempotencyMiddleware:
+    """
+    Make POSTs carrying an Idempotency-Key header safe to retry
+    
+    - First request: takes a short Redis lock, runs the endpoint and stores
+      the request fingerprint with the serialized response (TTL)
+    - Replay: returns the stored response without reaching the endpoint
+      (no auth lookup, no Postgres)
+    - Concurrent duplicate: 409 while the original is still in progress
+    - Same key, different payload: 422
+    
+    Keys are scoped to the JWT subject so users cannot collide.
+    5xx responses are not stored so the client can retry them.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis: Optional[RedisClient] = None,
+        paths: Iterable[str] = IDEMPOTENT_PATHS
+    ):
+        self.app = app
+        self.redis = redis or redis_client
+        self.paths = frozenset(paths)
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        
+        headers = dict(scope["headers"])
+        raw_key = headers.get(IDEMPOTENCY_HEADER, b"").decode("latin-1").strip()
+        subject = self._subject(headers)
+        if not raw_key or subject is None:
+            # No key, or unauthenticated (the endpoint will reject it anyway)
+            await self.app(scope, receive, send)
+            return
+        
+        if len(raw_key) > MAX_KEY_LENGTH:
+            await self._send_error(send, status.HTTP_400_BAD_REQUEST, "Idempotency-Key is too long")
+            return
+        
+        body = await self._read_body(receive)
+        fingerprint = self._fingerprint(scope, body)
+        key_hash = hashlib.sha256(raw_key.encode()).hexdigest()
+        record_key = f"idempotency:{subject}:{key_hash}"
+        lock_key = f"idempotency_lock:{subject}:{key_hash}"
+        replay_receive = self._replay_receive(body, receive)
+        
+        try:
+            stored = await run_in_threadpool(self.redis.get, record_key)
+            if stored is None:
+                lock_token = secrets.token_hex(16)
+                acquired = await run_in_threadpool(
+                    self.redis.set_if_absent, lock_key, lock_token, settings.IDEMPOTENCY_LOCK_SECONDS
+                )
+                if not acquired:
+                    await self._send_error(
+                        send,
+                        status.HTTP_409_CONFLICT,
+                        "A request with this Idempotency-Key is already in progress",
+                        retry_after=1
+                    )
+                    return
+                # The original may have finished between our read and the lock
+                stored = await run_in_threadpool(self.redis.get, record_key)
+                if stored is not None:
+                    await run_in_threadpool(self.redis.delete_if_equals, lock_key, lock_token)
+        except RedisError as e:
+            # Fail open: idempotency is a retry optimisation, not a gate
+            logger.warning("Idempotency store unavailable, executing request: %s", e)
+            await self.app(scope, replay_receive, send)
+            return
+        
+        if stored is not None:
+            if stored.get("fingerprint") != fingerprint:
+                await self._send_error(
+                    send,
+                    status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    "Idempotency-Key was already used with a different request payload"
+                )
+                return
+            await self._replay(send, stored)
+            return
+        
+        try:
+            await self._execute_and_store(scope, replay_receive, send, record_key, fingerprint)
+        finally:
+            try:
+                await run_in_threadpool(self.redis.delete_if_equals, lock_key, lock_token)
+            except RedisError as e:
+                logger.warning("Could not release idempotency lock %s: %s", lock_key, e)
+    
+    async def _execute_and_store(
+        self,
+        scope: Scope,
+        receive: Receive,
+        send: Send,
+        record_key: str,
+        fingerprint: str
+    ) -> None:
+        """Run the endpoint, forwarding the response while capturing it"""
+        response_start: dict = {}
+        chunks: list[bytes] = []
+        
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_start.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+        
+        await self.app(scope, receive, capture)
+        
+        status_code = response_start.get("status", 500)
+        if status_code >= 500:
+            return
+        
+        record = {
+            "fingerprint": fingerprint,
+            "status": status_code,
+            "headers": [
+                [name.decode("latin-1"), value.decode("latin-1")]
+                for name, value in response_start.get("headers", [])
+            ],
+            "body": base64.b64encode(b"".join(chunks)).decode("ascii"),
+        }
+        try:
+            await run_in_threadpool(self.redis.set, record_key, record, settings.IDEMPOTENCY_TTL_SECONDS)
+        except RedisError as e:
+            logger.warning("Could not store idempotent response %s: %s", record_key, e)
+    
+    @staticmethod
+    def _subject(headers: dict) -> Optional[str]:
+        """Extract the JWT subject without touching the database"""
+        authorization = headers.get(b"authorization", b"").decode("latin-1")
+        scheme, _, token = authorization.partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            return None
+        try:
+            payload = decode_token(token)
+        except HTTPException:
+            return None
+        return payload.get("sub")
+    
+    @staticmethod
+    def _fingerprint(scope: Scope, body: bytes) -> str:
+        """Hash method, path, query string and body of the request"""
+        digest = hashlib.sha256()
+        digest.update(scope["method"].encode())
+        digest.update(b"\0" + scope["path"].encode())
+        digest.update(b"\0" + scope.get("query_string", b""))
+        digest.update(b"\0" + body)
+        return digest.hexdigest()
+    
+    @staticmethod
+    async def _read_body(receive: Receive) -> bytes:
+        """Read the full request body"""
+        chunks = []
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunks.append(message.get("body", b""))
+            more_body = message.get("more_body", False)
+        return b"".join(chunks)
+    
+    @staticmethod
+    def _replay_receive(body: bytes, receive: Receive) -> Receive:
+        """Receive callable that hands the buffered body to the endpoint"""
+        consumed = False
+        
+        async def replay() -> Message:
+            nonlocal consumed
+            if not consumed:
+                consumed = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+        
+        return replay
+    
+    @staticmethod
+    async def _replay(send: Send, stored: dict) -> None:
+        """Send a stored response back to the client"""
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1"))
+            for name, value in stored["headers"]
+        ]
+        headers.append((REPLAY_HEADER, b"true"))
+        await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": base64.b64decode(stored["body"])})
+    
+    @staticmethod
+    async def _send_error(send: Send, status_code: int, detail: str, retry_after: Optional[int] = None) -> None:
+        """Send a JSON error in the same shape as HTTPException"""
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(retry_after).encode()))
+        await send({"type": "http.response.start", "status": status_code, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
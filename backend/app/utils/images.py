@@ -0,0 +1,74 @@
+"""Image processing utilities for KYC uploads"""
+import io
+import math
+from dataclasses import dataclass
+from typing import BinaryIO, Tuple
+
+from PIL import Image, ImageOps
+
+
+# Longest edge of the rendition shown to KYC reviewers
+REVIEW_MAX_SIZE = 1600
+REVIEW_QUALITY = 82
+
+# Longest edge of list thumbnails
+THUMBNAIL_MAX_SIZE = 320
+THUMBNAIL_QUALITY = 70
+
+# Refuse decompression bombs (~50 MP is well above any phone camera)
+Image.MAX_IMAGE_PIXELS = 50_000_000
+
+# Extensions Pillow can decode out of the box
+PROCESSABLE_EXTENSIONS = {"jpg", "jpeg", "png", "gif", "webp"}
+
+
+@dataclass
+class ProcessedImage:
+    """Re-encoded renditions of an uploaded image (no EXIF)"""
+    review: bytes
+    thumbnail: bytes
+    original_size: Tuple[int, int]
+    review_size: Tuple[int, int]
+
+
+def _encode_jpeg(image: Image.Image, quality: int) -> bytes:
+    """Encode as progressive JPEG without any metadata"""
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=quality, optimize=True, progressive=True)
+    return output.getvalue()
+
+
+def process_image(source: BinaryIO) -> ProcessedImage:
+    """
+    Build the review rendition and thumbnail of an uploaded photo
+    
+    Memory stays bounded for large photos: JPEGs are decoded with draft()
+    directly at a reduced scale (1/2, 1/4 or 1/8) and other formats are
+    shrunk with reduce() before resampling. EXIF orientation is applied to
+    the pixels, then all metadata (GPS, device, timestamps) is dropped
+    because the renditions are re-encoded from pixels only.
+    """
+    with Image.open(source) as image:
+        original_size = image.size
+        # Decode at the smallest DCT scale that still covers the review size
+        # (the box keeps the aspect ratio, or landscape photos never shrink)
+        scale = min(1.0, REVIEW_MAX_SIZE / max(original_size))
+        image.draft("RGB", (math.ceil(original_size[0] * scale), math.ceil(original_size[1] * scale)))
+        image = ImageOps.exif_transpose(image)
+        if image.mode != "RGB":
+            image = image.convert("RGB")
+        
+        # reducing_gap shrinks by an integer factor first, then resamples
+        image.thumbnail((REVIEW_MAX_SIZE, REVIEW_MAX_SIZE), Image.LANCZOS, reducing_gap=3.0)
+        review = _encode_jpeg(image, REVIEW_QUALITY)
+        review_size = image.size
+        
+        image.thumbnail((THUMBNAIL_MAX_SIZE, THUMBNAIL_MAX_SIZE), Image.LANCZOS, reducing_gap=2.0)
+        thumbnail = _encode_jpeg(image, THUMBNAIL_QUALITY)
+    
+    return ProcessedImage(
+        review=review,
+        thumbnail=thumbnail,
+        original_size=original_size,
+        review_size=review_size
+    )
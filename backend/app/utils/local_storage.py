@@ -0,0 +1,294 @@
+"""Local filesystem storage (same interface as the MinIO StorageClient)"""
+import hashlib
+import hmac
+import io
+import mmap
+import os
+import re
+import tempfile
+import time
+from datetime import datetime, timezone
+from mimetypes import guess_type
+from pathlib import Path
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, Optional
+from urllib.parse import quote, urlencode
+
+from minio.datatypes import Object
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+from app.core.config import settings
+from app.utils.storage import (
+    DEFAULT_CHUNK_SIZE, DEFAULT_PART_SIZE, STORAGE_OPERATIONS, _AsyncIteratorReader, _IteratorReader
+)
+from app.utils.tracing import traced_methods
+
+
+# Route serving signed local storage URLs (see api/v1/endpoints/storage.py)
+URL_PREFIX = "/api/v1/storage"
+
+# Extended attribute holding the uploaded Content-Type
+CONTENT_TYPE_XATTR = "user.docurgent.content_type"
+
+# Extensions kept on sharded file names so types can be guessed without xattrs
+_SAFE_SUFFIX = re.compile(r"^\.[A-Za-z0-9]{1,10}$")
+
+
+class SendfileResponse(FileResponse):
+    """
+    FileResponse that lets the server send the file with sendfile(2)
+    
+    Servers advertising the ASGI "http.response.zerocopy" extension receive
+    the file descriptor and copy from the page cache straight to the socket.
+    Other servers (uvicorn) fall back to FileResponse's chunked reads.
+    """
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if "http.response.zerocopy" not in scope.get("extensions", {}) or scope["method"].upper() == "HEAD":
+            await super().__call__(scope, receive, send)
+            return
+        
+        with open(self.path, "rb") as file:
+            stat_result = os.fstat(file.fileno())
+            self.set_stat_headers(stat_result)
+            await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+            await send({
+                "type": "http.response.zerocopy",
+                "file": file.fileno(),
+                "offset": 0,
+                "count": stat_result.st_size,
+                "more_body": False
+            })
+        if self.background is not None:
+            await self.background()
+
+
+@traced_methods("storage", *STORAGE_OPERATIONS)
+class LocalStorageClient:
+    """
+    Filesystem storage client
+    
+    Objects live under LOCAL_STORAGE_ROOT/<bucket>/ab/cd/<sha256(name)><ext>,
+    so directories stay small and object names never touch the filesystem
+    (no path traversal). Writes go to a temp file that is renamed into place.
+    Presigned URLs point at the API's /storage route, signed with SECRET_KEY.
+    """
+    
+    def __init__(self, root: Optional[str] = None):
+        self.bucket = settings.MINIO_BUCKET
+        self.base = Path(root or settings.LOCAL_STORAGE_ROOT).resolve() / self.bucket
+        self._tmp = self.base / ".tmp"
+        self._tmp.mkdir(parents=True, exist_ok=True)
+    
+    def close(self):
+        """Nothing to release (kept for interface parity)"""
+    
+    def ping(self) -> None:
+        """Raise unless the storage directory is usable (readiness checks)"""
+        if not os.access(self._tmp, os.W_OK):
+            raise RuntimeError(f"{self._tmp} is not writable")
+    
+    def path_for(self, object_name: str) -> Path:
+        """Sharded file path of an object"""
+        digest = hashlib.sha256(object_name.encode()).hexdigest()
+        suffix = os.path.splitext(object_name)[1]
+        if not _SAFE_SUFFIX.match(suffix):
+            suffix = ""
+        return self.base / digest[:2] / digest[2:4] / f"{digest}{suffix.lower()}"
+    
+    def object_url(self, object_name: str) -> str:
+        """Stable URL of an object (not directly downloadable, see get_file_url)"""
+        return f"local/{self.bucket}/{object_name}"
+    
+    def upload_file(self, file_data: bytes, object_name: str, content_type: str = "application/octet-stream") -> Optional[str]:
+        """Upload file to storage"""
+        return self.upload_stream(io.BytesIO(file_data), object_name, content_type, length=len(file_data))
+    
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        length: int = -1,
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """
+        Copy from a file-like object to disk in chunks
+        
+        part_size is accepted for interface parity; copies use DEFAULT_CHUNK_SIZE.
+        Blocking: call through run_in_threadpool from async code.
+        """
+        path = self.path_for(object_name)
+        tmp_path = None
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=self._tmp, delete=False) as tmp:
+                tmp_path = Path(tmp.name)
+                remaining = length
+                while remaining != 0:
+                    chunk = stream.read(DEFAULT_CHUNK_SIZE if remaining < 0 else min(DEFAULT_CHUNK_SIZE, remaining))
+                    if not chunk:
+                        break
+                    tmp.write(chunk)
+                    if remaining > 0:
+                        remaining -= len(chunk)
+            self._commit(tmp_path, path, content_type)
+            return self.object_url(object_name)
+        except OSError as e:
+            print(f"Error uploading file: {e}")
+            return None
+        finally:
+            # Aborted uploads (including errors raised by the stream) leave nothing behind
+            if tmp_path is not None and tmp_path.exists():
+                tmp_path.unlink()
+    
+    async def upload_async_iter(
+        self,
+        chunks: AsyncIterator[bytes],
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """Upload an async byte iterator (e.g. request.stream())"""
+        return await run_in_threadpool(
+            self.upload_stream,
+            _AsyncIteratorReader(chunks),
+            object_name,
+            content_type,
+            -1,
+            part_size
+        )
+    
+    def upload_iter(
+        self,
+        chunks: Iterable[bytes],
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """Upload a byte iterator (e.g. a generated report)"""
+        return self.upload_stream(_IteratorReader(chunks), object_name, content_type, -1, part_size)
+    
+    @staticmethod
+    def _commit(tmp_path: Path, path: Path, content_type: str):
+        """Record the content type and atomically move the file into place"""
+        try:
+            os.setxattr(tmp_path, CONTENT_TYPE_XATTR, content_type.encode())
+        except (AttributeError, OSError):
+            # No xattr support: stat_file guesses from the extension
+            pass
+        os.replace(tmp_path, path)
+    
+    def download_file(self, object_name: str) -> Optional[bytes]:
+        """Download file from storage (small objects only, see stream_file)"""
+        try:
+            return self.path_for(object_name).read_bytes()
+        except OSError as e:
+            print(f"Error downloading file: {e}")
+            return None
+    
+    def stream_file(
+        self,
+        object_name: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        offset: int = 0,
+        length: int = 0
+    ) -> Optional[Iterator[bytes]]:
+        """
+        Open an object for chunked reading
+        
+        The file is opened eagerly so a missing object returns None. Range
+        reads (offset/length) are served from an mmap of the file, so only
+        the requested pages are faulted in.
+        """
+        try:
+            file = open(self.path_for(object_name), "rb")
+        except OSError as e:
+            print(f"Error downloading file: {e}")
+            return None
+        if offset or length:
+            return self._iter_mmap(file, chunk_size, offset, length)
+        return self._iter_file(file, chunk_size)
+    
+    @staticmethod
+    def _iter_file(file: BinaryIO, chunk_size: int) -> Iterator[bytes]:
+        """Yield file chunks and always close the file"""
+        with file:
+            while chunk := file.read(chunk_size):
+                yield chunk
+    
+    @staticmethod
+    def _iter_mmap(file: BinaryIO, chunk_size: int, offset: int, length: int) -> Iterator[bytes]:
+        """Yield a byte range of the file through mmap"""
+        with file:
+            size = os.fstat(file.fileno()).st_size
+            end = size if length <= 0 else min(size, offset + length)
+            if offset >= end:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                if hasattr(mmap, "MADV_SEQUENTIAL"):
+                    mapped.madvise(mmap.MADV_SEQUENTIAL, offset - offset % mmap.PAGESIZE)
+                for position in range(offset, end, chunk_size):
+                    yield mapped[position:min(position + chunk_size, end)]
+    
+    def delete_file(self, object_name: str) -> bool:
+        """Delete file from storage (missing objects count as deleted, like S3)"""
+        try:
+            self.path_for(object_name).unlink(missing_ok=True)
+            return True
+        except OSError as e:
+            print(f"Error deleting file: {e}")
+            return False
+    
+    def stat_file(self, object_name: str) -> Optional[Object]:
+        """Get object metadata (size, content type), None if missing"""
+        path = self.path_for(object_name)
+        try:
+            stat_result = path.stat()
+        except FileNotFoundError:
+            return None
+        try:
+            content_type = os.getxattr(path, CONTENT_TYPE_XATTR).decode()
+        except (AttributeError, OSError):
+            content_type = guess_type(object_name)[0] or "application/octet-stream"
+        return Object(
+            self.bucket,
+            object_name,
+            last_modified=datetime.fromtimestamp(stat_result.st_mtime, tz=timezone.utc),
+            etag=f"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}",
+            size=stat_result.st_size,
+            content_type=content_type
+        )
+    
+    def _signature(self, method: str, object_name: str, expires: int) -> str:
+        """HMAC of a presigned request"""
+        message = f"{method}\n{self.bucket}\n{object_name}\n{expires}".encode()
+        return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+    
+    def _presign(self, method: str, object_name: str, expires: int) -> str:
+        """Signed URL to the API's storage route"""
+        expires_at = int(time.time()) + expires
+        query = urlencode({"expires": expires_at, "signature": self._signature(method, object_name, expires_at)})
+        return f"{settings.LOCAL_STORAGE_PUBLIC_URL}{URL_PREFIX}/{quote(object_name)}?{query}"
+    
+    def verify_signature(self, method: str, object_name: str, expires: int, signature: str) -> bool:
+        """Check a presigned URL's signature and expiry"""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self._signature(method, object_name, expires), signature)
+    
+    def get_file_url(self, object_name: str, expires: int = 3600) -> Optional[str]:
+        """Get presigned URL for file"""
+        return self._presign("GET", object_name, expires)
+    
+    def get_upload_url(self, object_name: str, expires: int = 300) -> Optional[str]:
+        """Get presigned PUT URL for a direct browser upload"""
+        return self._presign("PUT", object_name, expires)
+    
+    def file_response(self, object_name: str) -> Optional[SendfileResponse]:
+        """Response serving an object with sendfile, None if missing"""
+        info = self.stat_file(object_name)
+        if info is None:
+            return None
+        return SendfileResponse(self.path_for(object_name), media_type=info.content_type)
@@ -0,0 +1,244 @@
+"""tracemalloc instrumentation: allocations per route and task, top sites and growth"""
+import logging
+import os
+import re
+import socket
+import threading
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Dict, List, Optional, Tuple
+
+from redis.exceptions import RedisError
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.core.metrics import MEMORY_PEAK_BYTES
+from app.utils.redis_client import RedisClient, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+REPORT_KEY = "memory:report:{}"
+WINDOW_REQUEST_KEY = "memory:window_requested_at"
+# How often an idle tracer checks for an on-demand window request
+REQUEST_POLL_SECONDS = 5.0
+
+# Allocations made by tracemalloc itself and by the import machinery are noise
+_IGNORED = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+_SITE_DIR = re.compile(r"^.*?/(site-packages|dist-packages|lib/python\d+\.\d+)/")
+
+
+@dataclass
+class UnitStats:
+    """Measured allocations of one route or task"""
+    samples: int = 0
+    retained_bytes: int = 0
+    peak_bytes: int = 0
+
+
+def _site(frame: tracemalloc.Frame) -> str:
+    return f"{_SITE_DIR.sub('', frame.filename)}:{frame.lineno}"
+
+
+def _rss_bytes() -> Optional[int]:
+    """Current resident set size (Linux)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class MemoryTracer:
+    """
+    Per-process tracemalloc tracer, run in sampled windows
+    
+    tracemalloc makes allocation-heavy code an order of magnitude slower, so
+    it only runs for MEMORY_WINDOW_SECONDS every MEMORY_SNAPSHOT_SECONDS (or
+    soon after an admin asks for a window). During a window:
+    - requests and tasks are measured one at a time per process: the peak
+      traced memory while each ran and what it left allocated, relative to
+      its start (concurrent work in the process is included, so figures per
+      route are statistical)
+    - at the end, the allocations made in the window and still alive are
+      grouped by source line and compared with the previous window
+    
+    The report goes to Redis, one key per process, for GET /admin/memory.
+    """
+    
+    def __init__(self, redis: Optional[RedisClient] = None):
+        self.redis = redis or redis_client
+        self.kind = "api"
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+        self.units: Dict[Tuple[str, str], UnitStats] = {}
+        self.windows = 0
+        self._window_open = False
+        self._window_at = 0.0
+        self._previous: Optional[tracemalloc.Snapshot] = None
+        self._started_rss = _rss_bytes()
+        self._units_lock = threading.Lock()
+        self._measuring = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self, kind: str) -> None:
+        """Run trace windows in this process (API worker or Celery worker)"""
+        if self._thread is not None:
+            return
+        self.kind = kind
+        self.process = f"{socket.gethostname()}:{os.getpid()}"
+        self._started_rss = _rss_bytes()
+        self._window_at = time.time()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="memory-tracer", daemon=True)
+        self._thread.start()
+        logger.info("Memory tracing windows started (%s)", self.process)
+    
+    def stop(self) -> None:
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        if self._window_open:
+            self._window_open = False
+            tracemalloc.stop()
+    
+    def open_window(self) -> None:
+        """Start tracing allocations"""
+        tracemalloc.start(settings.MEMORY_TRACE_FRAMES)
+        self._window_at = time.time()
+        self._window_open = True
+    
+    def close_window(self) -> dict:
+        """Stop tracing; report what the window allocated and kept, and publish it"""
+        with self._measuring:  # Let a unit being measured finish first
+            self._window_open = False
+            snapshot = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+            tracemalloc.stop()
+        self.windows += 1
+        report = self.report(snapshot)
+        self._previous = snapshot
+        self.redis.set(REPORT_KEY.format(self.process), report, expire=int(settings.MEMORY_SNAPSHOT_SECONDS * 3))
+        return report
+    
+    def begin(self) -> Optional[int]:
+        """Start measuring a unit of work if a window is open; returns the token for end()"""
+        if not self._window_open or not self._measuring.acquire(blocking=False):
+            return None
+        if not self._window_open:  # Closed while we waited for the lock
+            self._measuring.release()
+            return None
+        tracemalloc.reset_peak()
+        return tracemalloc.get_traced_memory()[0]
+    
+    def end(self, started: int, kind: str, name: str) -> None:
+        """Record the unit measured since begin() under kind ("route", "task") and name"""
+        current, peak = tracemalloc.get_traced_memory()
+        self._measuring.release()
+        retained, peak = current - started, max(0, peak - started)
+        MEMORY_PEAK_BYTES.labels(kind, name).observe(peak)
+        with self._units_lock:
+            stats = self.units.setdefault((kind, name), UnitStats())
+            stats.samples += 1
+            stats.retained_bytes += retained
+            stats.peak_bytes = max(stats.peak_bytes, peak)
+    
+    def report(self, snapshot: tracemalloc.Snapshot) -> dict:
+        """Units so far, sites holding memory allocated in the window, change since the previous window"""
+        limit = settings.MEMORY_TOP_SITES
+        with self._units_lock:
+            units = [
+                {"kind": kind, "name": name, **asdict(stats)}
+                for (kind, name), stats in self.units.items()
+            ]
+        growth = []
+        if self._previous is not None:
+            growth = [
+                {"site": _site(stat.traceback[0]), "size": stat.size, "count": stat.count,
+                 "size_diff": stat.size_diff, "count_diff": stat.count_diff}
+                for stat in snapshot.compare_to(self._previous, "lineno")[:limit]
+                if stat.size_diff
+            ]
+        return {
+            "process": self.process,
+            "kind": self.kind,
+            "window_started_at": self._window_at,
+            "window_ended_at": time.time(),
+            "windows": self.windows,
+            "rss_bytes": _rss_bytes(),
+            "rss_bytes_at_start": self._started_rss,
+            "units": sorted(units, key=lambda unit: unit["retained_bytes"], reverse=True),
+            "top_sites": [
+                {"site": _site(stat.traceback[0]), "size": stat.size, "count": stat.count}
+                for stat in snapshot.statistics("lineno")[:limit]
+            ],
+            "growth_since_previous": growth,
+        }
+    
+    def _window_due(self) -> bool:
+        if time.time() - self._window_at >= settings.MEMORY_SNAPSHOT_SECONDS:
+            return True
+        try:
+            return float(self.redis.get(WINDOW_REQUEST_KEY) or 0) > self._window_at
+        except RedisError as e:
+            logger.warning("Could not check for memory window requests: %s", e)
+            return False
+    
+    def _run(self) -> None:
+        while not self._stop.wait(REQUEST_POLL_SECONDS):
+            if not self._window_due():
+                continue
+            self.open_window()
+            if self._stop.wait(settings.MEMORY_WINDOW_SECONDS):
+                return  # stop() closes the window
+            try:
+                self.close_window()
+            except RedisError as e:
+                logger.warning("Could not publish memory report: %s", e)
+            except Exception:
+                logger.exception("Memory report failed")
+
+
+def request_window(redis: Optional[RedisClient] = None) -> float:
+    """Ask every tracing process to run a window now (it starts within REQUEST_POLL_SECONDS)"""
+    requested_at = time.time()
+    (redis or redis_client).set(WINDOW_REQUEST_KEY, requested_at, expire=int(REQUEST_POLL_SECONDS * 10))
+    return requested_at
+
+
+def memory_reports(redis: Optional[RedisClient] = None) -> List[dict]:
+    """Latest report of every tracing process"""
+    redis = redis or redis_client
+    keys = sorted(redis.client.scan_iter(match=REPORT_KEY.format("*"), count=100))
+    return [report for report in map(redis.get, keys) if report]
+
+
+# This process's tracer (started by the API lifespan or the Celery worker when MEMORY_TRACING_ENABLED)
+memory_tracer: MemoryTracer = LazyClient(MemoryTracer, closer=lambda t: t.stop())
+
+
+class MemoryTracingMiddleware:
+    """Attribute requests measured during trace windows to their route template"""
+    
+    def __init__(self, app: ASGIApp, tracer: Optional[MemoryTracer] = None):
+        self.app = app
+        self.tracer = tracer or memory_tracer
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        started = self.tracer.begin() if scope["type"] == "http" else None
+        if started is None:
+            await self.app(scope, receive, send)
+            return
+        
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            template = getattr(scope.get("route"), "path_format", None) or "unmatched"
+            self.tracer.end(started, "route", f"{scope['method']} {template}")
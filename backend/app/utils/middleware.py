@@ -0,0 +1,120 @@
+"""Pure ASGI middlewares for request ids and response timing"""
+import ipaddress
+import re
+import time
+import uuid
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+
+
+REQUEST_ID_HEADER = b"x-request-id"
+_VALID_REQUEST_ID = re.compile(rb"^[A-Za-z0-9._:-]{1,128}$")
+
+# Id of the request being handled (copied into threadpool calls by Starlette)
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+
+@lru_cache(maxsize=8)
+def _networks(trusted_proxies: str) -> Tuple:
+    """Parsed TRUSTED_PROXIES"""
+    return tuple(
+        ipaddress.ip_network(entry.strip(), strict=False) for entry in trusted_proxies.split(",") if entry.strip()
+    )
+
+
+def _is_trusted(address: str, networks: Tuple) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in networks)
+
+
+def client_ip(scope: Scope) -> Optional[str]:
+    """
+    Client address, as seen by the outermost trusted proxy
+    
+    X-Forwarded-For is only read when the peer is in TRUSTED_PROXIES (or has
+    no address: a UNIX socket only a local proxy can reach). nginx appends
+    the address it saw ($proxy_add_x_forwarded_for) to whatever the client
+    sent, so hops are walked from the right past our own proxies: the first
+    other hop is the client, anything left of it may be forged.
+    """
+    client = scope.get("client")
+    peer = client[0] if client else None
+    networks = _networks(settings.TRUSTED_PROXIES)
+    if peer is not None and not _is_trusted(peer, networks):
+        return peer
+    hops = [
+        hop.strip()
+        for name, value in scope["headers"] if name == b"x-forwarded-for"
+        for hop in value.decode("latin-1").split(",") if hop.strip()
+    ]
+    for hop in reversed(hops):
+        if not _is_trusted(hop, networks):
+            return hop
+    return hops[0] if hops else peer
+
+
+class RequestIdMiddleware:
+    """
+    Give every request an id, echoed in the X-Request-ID response header
+    
+    A well-formed X-Request-ID from the caller (nginx, a mobile client) is
+    kept so logs can be joined across hops; otherwise one is generated. The
+    id is available as request.state.request_id and through request_id_var.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == REQUEST_ID_HEADER and _VALID_REQUEST_ID.match(value):
+                request_id = value.decode("latin-1")
+                break
+        request_id = request_id or uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        
+        async def send_with_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Request-ID", request_id)
+            await send(message)
+        
+        token = request_id_var.set(request_id)
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            request_id_var.reset(token)
+
+
+class TimingMiddleware:
+    """Add X-Process-Time: seconds until the response headers were sent (monotonic clock)"""
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        started = time.perf_counter()
+        
+        async def send_with_time(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("X-Process-Time", f"{time.perf_counter() - started:.6f}")
+            await send(message)
+        
+        await self.app(scope, receive, send_with_time)
@@ -0,0 +1,273 @@
+"""On-demand sampling profiler for selected requests (admin-armed, off by default)"""
+import hashlib
+import hmac
+import logging
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Optional
+
+import fastapi
+import starlette
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+import app as app_package
+from app.core.config import settings
+from app.utils.redis_client import RedisClient, redis_client
+from app.utils.storage import storage_client
+
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = b"x-profile-token"
+SESSION_KEY = "profiling:session"
+REMAINING_KEY = "profiling:remaining:{}"
+
+# Frames under these directories mean the event loop is working on a request
+_REQUEST_CODE_DIRS = tuple(str(Path(module.__file__).parent) for module in (app_package, starlette, fastapi))
+_SITE_DIR = re.compile(r"^.*?/(site-packages|dist-packages|lib/python\d+\.\d+)/")
+
+
+@dataclass
+class ProfileSession:
+    """Profiling armed for the next `requests` requests matching method and route template"""
+    id: str
+    method: str
+    route: str
+    requests: int
+    interval_ms: float
+    expires_at: float
+    
+    def __post_init__(self):
+        # "/api/v1/shipments/{shipment_id}" -> "^/api/v1/shipments/[^/]+$"
+        self._pattern = re.compile("^" + re.sub(r"\\\{[^}]+\\\}", "[^/]+", re.escape(self.route)) + "$")
+    
+    def matches(self, method: str, path: str) -> bool:
+        return method == self.method and self._pattern.match(path) is not None
+
+
+def arm_profiling(method: str, route: str, requests: int, interval_ms: float, ttl_seconds: int,
+                  redis: Optional[RedisClient] = None) -> ProfileSession:
+    """Arm every API worker to profile the next `requests` matching requests"""
+    redis = redis or redis_client
+    session = ProfileSession(
+        id=uuid.uuid4().hex[:12], method=method.upper(), route=route, requests=requests,
+        interval_ms=interval_ms, expires_at=time.time() + ttl_seconds
+    )
+    redis.set(REMAINING_KEY.format(session.id), requests, expire=ttl_seconds)
+    redis.set(SESSION_KEY, asdict(session), expire=ttl_seconds)
+    return session
+
+
+def current_profiling(redis: Optional[RedisClient] = None) -> Optional[dict]:
+    """The armed session with the number of requests still to profile, if any"""
+    redis = redis or redis_client
+    session = redis.get(SESSION_KEY)
+    if not session:
+        return None
+    remaining = redis.get(REMAINING_KEY.format(session["id"]))
+    return {**session, "remaining": max(0, int(remaining or 0))}
+
+
+def disarm_profiling(redis: Optional[RedisClient] = None) -> None:
+    (redis or redis_client).delete(SESSION_KEY)
+
+
+def _token_signature(method: str, path: str, expires: int) -> str:
+    message = f"profile\n{method.upper()}\n{path}\n{expires}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+
+def sign_profile_token(method: str, path: str, ttl_seconds: int) -> str:
+    """X-Profile-Token value that profiles requests to exactly this method and path until it expires"""
+    expires = int(time.time()) + ttl_seconds
+    return f"{expires}.{_token_signature(method, path, expires)}"
+
+
+def verify_profile_token(token: str, method: str, path: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(_token_signature(method, path, int(expires)), signature)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({_SITE_DIR.sub('', code.co_filename)}:{code.co_firstlineno})"
+
+
+class StackSampler:
+    """
+    Samples one request's Python stacks from a background thread
+    
+    Every interval it reads sys._current_frames() and keeps:
+    - threadpool threads running the request's endpoint function (the sync
+      endpoint and everything it calls)
+    - the event loop thread while it is in application, FastAPI or Starlette
+      code (dependencies, validation, serialization, middleware)
+    Other requests on the loop thread can show up in the second group.
+    """
+    
+    def __init__(self, loop_thread_id: int, endpoint: Callable[[], Optional[Callable]], interval: float):
+        self.loop_thread_id = loop_thread_id
+        self.endpoint = endpoint
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+    
+    def start(self) -> None:
+        self._thread.start()
+    
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+    
+    def collapsed(self) -> str:
+        """Brendan Gregg's collapsed format: "root;...;leaf count" per line"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+    
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            endpoint_code = getattr(self.endpoint(), "__code__", None)
+            self.samples += 1
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                frames = []
+                while frame is not None:
+                    frames.append(frame)
+                    frame = frame.f_back
+                if thread_id == self.loop_thread_id:
+                    if not any(f.f_code.co_filename.startswith(_REQUEST_CODE_DIRS) for f in frames):
+                        continue  # Idle, or serving something else
+                    root = "event-loop"
+                elif endpoint_code is not None and any(f.f_code is endpoint_code for f in frames):
+                    root = "threadpool"
+                else:
+                    continue
+                self.stacks[";".join([root] + [_frame_label(f) for f in reversed(frames)])] += 1
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests selected by an admin, upload collapsed stacks to storage
+    
+    A request is profiled when it carries a valid X-Profile-Token for its
+    method and path, or when an armed session (POST /admin/profiling) matches
+    its route and still has requests left. Each worker reads the session
+    from Redis at most every PROFILING_POLL_SECONDS; unprofiled requests cost
+    a timestamp check. With PROFILING_ENABLED off the middleware does nothing.
+    
+    The stacks go to profiles/<session>/<route>/<time>-<request id>.folded,
+    named in the X-Profile response header, ready for flamegraph.pl,
+    speedscope or inferno.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis: Optional[RedisClient] = None,
+        storage=None,
+        enabled: Optional[bool] = None
+    ):
+        self.app = app
+        self.redis = redis or redis_client
+        self.storage = storage or storage_client
+        self.enabled = settings.PROFILING_ENABLED if enabled is None else enabled
+        self._session: Optional[ProfileSession] = None
+        self._next_poll = 0.0
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if not self.enabled or scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        method, path = scope["method"], scope["path"]
+        for name, value in scope["headers"]:
+            if name == PROFILE_TOKEN_HEADER and verify_profile_token(value.decode("latin-1"), method, path):
+                await self._profile(scope, receive, send, "token", settings.PROFILING_INTERVAL_MS)
+                return
+        
+        session = await self._armed_session()
+        if session is not None and session.matches(method, path) and await self._claim(session):
+            await self._profile(scope, receive, send, session.id, session.interval_ms)
+            return
+        
+        await self.app(scope, receive, send)
+    
+    async def _armed_session(self) -> Optional[ProfileSession]:
+        """The armed session, refreshed from Redis at most every PROFILING_POLL_SECONDS"""
+        if time.monotonic() >= self._next_poll:
+            self._next_poll = time.monotonic() + settings.PROFILING_POLL_SECONDS
+            try:
+                stored = await run_in_threadpool(self.redis.get, SESSION_KEY)
+            except RedisError as e:
+                logger.warning("Could not read profiling session: %s", e)
+                stored = None
+            if stored is None:
+                self._session = None
+            elif self._session is None or self._session.id != stored["id"]:
+                self._session = ProfileSession(**stored)
+        session = self._session
+        if session is not None and session.expires_at < time.time():
+            self._session = session = None
+        return session
+    
+    async def _claim(self, session: ProfileSession) -> bool:
+        """Take one of the session's remaining requests (shared by all workers)"""
+        try:
+            remaining = await run_in_threadpool(self.redis.client.decr, REMAINING_KEY.format(session.id))
+        except RedisError as e:
+            logger.warning("Could not claim a profiling slot: %s", e)
+            return False
+        if remaining < 0:
+            self._session = None  # Used up; stop matching until the next poll
+            return False
+        return True
+    
+    async def _profile(self, scope: Scope, receive: Receive, send: Send, folder: str, interval_ms: float) -> None:
+        request_id = scope.setdefault("state", {}).get("request_id") or uuid.uuid4().hex
+        sampler = StackSampler(threading.get_ident(), lambda: scope.get("endpoint"), interval_ms / 1000)
+        object_name = None
+        
+        async def send_with_profile(message: Message) -> None:
+            nonlocal object_name
+            if message["type"] == "http.response.start":
+                # Routing has run by now: "GET /api/v1/shipments/{shipment_id}" -> "GET_api_v1_shipments_shipment_id"
+                template = getattr(scope.get("route"), "path_format", None) or "unmatched"
+                route_slug = re.sub(r"[^A-Za-z0-9]+", "_", f"{scope['method']} {template}").strip("_")
+                stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+                object_name = f"profiles/{folder}/{route_slug}/{stamp}-{request_id}.folded"
+                MutableHeaders(scope=message).append("X-Profile", object_name)
+            await send(message)
+        
+        started = time.perf_counter()
+        sampler.start()
+        try:
+            await self.app(scope, receive, send_with_profile)
+        finally:
+            # Joining the sampler waits up to one interval: not on the event loop
+            await run_in_threadpool(sampler.stop)
+            if object_name is not None:
+                await self._store(object_name, sampler, time.perf_counter() - started)
+    
+    async def _store(self, object_name: str, sampler: StackSampler, seconds: float) -> None:
+        try:
+            await run_in_threadpool(
+                self.storage.upload_file, sampler.collapsed().encode(), object_name, "text/plain"
+            )
+            logger.info("Profiled request in %.3fs (%d samples): %s", seconds, sampler.samples, object_name)
+        except Exception:
+            logger.exception("Could not store profile %s", object_name)
@@ -1,39 +1,82 @@
 """Rate limiting middleware"""
-from fastapi import Request, HTTPException, status
-from starlette.middleware.base import BaseHTTPMiddleware
-from app.utils.redis_client import redis_client
+import logging
+import math
+import time
+from typing import Iterable, Optional
+
+from fastapi import status
+from fastapi.responses import JSONResponse
+from redis.exceptions import RedisError
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Receive, Scope, Send
+
 from app.core.config import settings
+from app.utils.middleware import client_ip
+from app.utils.redis_client import RedisClient, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+# After a Redis error, requests pass unchecked for this long before retrying Redis
+REDIS_RETRY_SECONDS = 5.0
 
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Rate limiting middleware using Redis"""
+class RateLimitMiddleware:
+    """
+    Fixed-window rate limit per client IP using Redis (pure ASGI)
     
-    async def dispatch(self, request: Request, call_next):
-        # Skip rate limiting for health check
-        if request.url.path == "/health":
-            return await call_next(request)
-        
-        # Get client IP
-        client_ip = request.client.host
-        
-        # Create rate limit key
-        key = f"rate_limit:{client_ip}"
+    Each request costs one pipelined INCR + EXPIRE on a per-minute key.
+    Over RATE_LIMIT_PER_MINUTE the request gets 429 with Retry-After set to
+    the end of the window. If Redis is unavailable the limiter fails open
+    (it protects capacity, it is not an auth gate) and stops asking Redis
+    for REDIS_RETRY_SECONDS, so an outage does not add a timeout per request.
+    A limit of 0 disables it.
+    """
+    
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis: Optional[RedisClient] = None,
+        limit: Optional[int] = None,
+        window_seconds: int = 60,
+        exempt_prefixes: Iterable[str] = ("/health", "/metrics")
+    ):
+        self.app = app
+        self.redis = redis or redis_client
+        self.limit = settings.RATE_LIMIT_PER_MINUTE if limit is None else limit
+        self.window_seconds = window_seconds
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self._redis_down_until = 0.0
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or not self.limit
+            or scope["path"].startswith(self.exempt_prefixes)
+            or time.monotonic() < self._redis_down_until
+        ):
+            await self.app(scope, receive, send)
+            return
         
-        # Get current count
-        count = redis_client.get(key)
+        now = time.time()
+        window = int(now // self.window_seconds)
+        key = f"rate_limit:{client_ip(scope)}:{window}"
+        try:
+            count = await run_in_threadpool(self.redis.increment_window, key, self.window_seconds)
+        except RedisError as e:
+            logger.warning("Rate limiter store unavailable, not limiting for %.0fs: %s", REDIS_RETRY_SECONDS, e)
+            self._redis_down_until = time.monotonic() + REDIS_RETRY_SECONDS
+            await self.app(scope, receive, send)
+            return
         
-        if count is None:
-            # First request in window
-            redis_client.set(key, 1, expire=60)
-        elif int(count) >= settings.RATE_LIMIT_PER_MINUTE:
-            # Rate limit exceeded
-            raise HTTPException(
+        if count > self.limit:
+            retry_after = math.ceil((window + 1) * self.window_seconds - now)
+            response = JSONResponse(
+                {"detail": "Rate limit exceeded. Please try again later."},
                 status_code=status.HTTP_429_TOO_MANY_REQUESTS,
-                detail="Rate limit exceeded. Please try again later."
+                headers={"Retry-After": str(retry_after)}
             )
-        else:
-            # Increment count
-            redis_client.increment(key)
+            await response(scope, receive, send)
+            return
         
-        response = await call_next(request)
-        return response
+        await self.app(scope, receive, send)
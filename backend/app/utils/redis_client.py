@@ -4,18 +4,42 @@ from typing import Optional, Any
 import json
 
 from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.utils.circuit_breaker import CircuitOpenError, circuit_breaker, guarded_methods
+from app.utils.tracing import traced_methods
 
 
+# Client methods run through the breaker (and traced)
+REDIS_OPERATIONS = (
+    "get", "set", "set_if_absent", "delete_if_equals", "delete", "exists",
+    "increment", "increment_window", "expire"
+)
+
+
+class RedisUnavailableError(CircuitOpenError, redis.exceptions.ConnectionError):
+    """Redis circuit open; a RedisError, so callers that fail open on Redis errors keep doing so"""
+
+
+@traced_methods("redis", *REDIS_OPERATIONS)
+@guarded_methods(*REDIS_OPERATIONS)
 class RedisClient:
     """Redis client wrapper"""
     
-    def __init__(self):
-        self.client = redis.Redis(
+    def __init__(self, client: Optional[redis.Redis] = None):
+        self.client = client or redis.Redis(
             host=settings.REDIS_HOST,
             port=settings.REDIS_PORT,
             db=settings.REDIS_DB,
             password=settings.REDIS_PASSWORD if settings.REDIS_PASSWORD else None,
-            decode_responses=True
+            decode_responses=True,
+            socket_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS,
+            socket_connect_timeout=settings.REDIS_SOCKET_TIMEOUT_SECONDS
+        )
+        # Unreachable or hanging Redis, not command errors, opens the circuit
+        self.breaker = circuit_breaker(
+            "redis",
+            failures=(redis.exceptions.ConnectionError, redis.exceptions.TimeoutError),
+            open_error=RedisUnavailableError
         )
     
     def get(self, key: str) -> Optional[Any]:
@@ -37,6 +61,27 @@ class RedisClient:
             return self.client.setex(key, expire, value)
         return self.client.set(key, value)
     
+    def set_if_absent(self, key: str, value: Any, expire: int) -> bool:
+        """Set value only if key does not exist (SET NX EX)"""
+        if isinstance(value, (dict, list)):
+            value = json.dumps(value)
+        return bool(self.client.set(key, value, nx=True, ex=expire))
+    
+    def delete_if_equals(self, key: str, value: str) -> bool:
+        """Delete key only if it still holds the given value"""
+        with self.client.pipeline() as pipe:
+            try:
+                pipe.watch(key)
+                if pipe.get(key) != value:
+                    pipe.unwatch()
+                    return False
+                pipe.multi()
+                pipe.delete(key)
+                pipe.execute()
+                return True
+            except redis.WatchError:
+                return False
+    
     def delete(self, key: str) -> bool:
         """Delete key from Redis"""
         return self.client.delete(key) > 0
@@ -49,10 +94,22 @@ class RedisClient:
         """Increment value"""
         return self.client.incr(key)
     
+    def increment_window(self, key: str, seconds: int) -> int:
+        """Increment a counter and (re)set its expiry in one round trip"""
+        with self.client.pipeline(transaction=False) as pipe:
+            pipe.incr(key)
+            pipe.expire(key, seconds)
+            count, _ = pipe.execute()
+        return count
+    
     def expire(self, key: str, seconds: int) -> bool:
         """Set expiration on key"""
         return self.client.expire(key, seconds)
+    
+    def close(self) -> None:
+        """Close pooled connections"""
+        self.client.close()
 
 
-# Global Redis client instance
-redis_client = RedisClient()
+# Global Redis client instance (connection pool created on first use)
+redis_client: RedisClient = LazyClient(RedisClient, closer=lambda c: c.close())
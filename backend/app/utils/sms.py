@@ -0,0 +1,78 @@
+"""SMS utilities (Twilio)"""
+import asyncio
+import logging
+import weakref
+
+import aiohttp
+from twilio.base.exceptions import TwilioException, TwilioRestException
+from twilio.http.async_http_client import AsyncTwilioHttpClient
+from twilio.rest import Client
+
+from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.utils.circuit_breaker import CircuitBreaker, circuit_breaker
+
+
+logger = logging.getLogger(__name__)
+
+# One client per event loop: its aiohttp session belongs to the loop that opened it
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Client]" = weakref.WeakKeyDictionary()
+
+
+def get_sms_client() -> Client:
+    """Twilio client with a pooled async HTTP session for the running loop"""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = Client(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            http_client=AsyncTwilioHttpClient(timeout=settings.TWILIO_TIMEOUT_SECONDS)
+        )
+    return client
+
+
+async def close_sms_client():
+    """Close the running loop's Twilio HTTP session"""
+    client = _clients.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.http_client.close()
+
+
+# Shared by every loop's client: an outage affects them all
+sms_breaker: CircuitBreaker = LazyClient(lambda: circuit_breaker("twilio"))
+
+
+async def send_sms(to_phone: str, body: str) -> bool:
+    """
+    Send an SMS through Twilio
+    
+    While Twilio's circuit is open the SMS is not attempted and False is
+    returned at once (notifications keep their in-app copy).
+    """
+    if not sms_breaker.allow():
+        logger.warning("Twilio circuit open, SMS to %s not sent", to_phone)
+        return False
+    try:
+        await asyncio.wait_for(
+            get_sms_client().messages.create_async(
+                to=to_phone,
+                from_=settings.TWILIO_PHONE_NUMBER,
+                body=body
+            ),
+            settings.TWILIO_TIMEOUT_SECONDS
+        )
+    except TwilioRestException as e:
+        # 4xx (bad number, unsubscribed) means Twilio is up
+        if e.status >= 500:
+            sms_breaker.record_failure()
+        else:
+            sms_breaker.record_success()
+        logger.warning("SMS to %s failed: %s", to_phone, e)
+        return False
+    except (TwilioException, aiohttp.ClientError, OSError, asyncio.TimeoutError) as e:
+        sms_breaker.record_failure()
+        logger.warning("SMS to %s failed: %s", to_phone, e)
+        return False
+    sms_breaker.record_success()
+    return True
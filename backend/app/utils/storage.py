@@ -1,25 +1,188 @@
 """Storage utilities for MinIO/S3"""
 from minio import Minio
-from minio.error import S3Error
-from typing import Optional
+from minio.datatypes import Object
+from minio.error import S3Error, ServerError
+from datetime import timedelta
+from typing import AsyncIterator, BinaryIO, Iterable, Iterator, Optional
 import io
 
+import anyio.from_thread
+import urllib3
+from starlette.concurrency import run_in_threadpool
+
 from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.utils.circuit_breaker import circuit_breaker, guarded_methods
+from app.utils.tracing import traced_methods
+
+
+# Multipart part size for streamed uploads (S3 minimum); one part is buffered at a time
+DEFAULT_PART_SIZE = 5 * 1024 * 1024
+
+# Chunk size for streamed downloads
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+# Client methods traced as "storage <method>" spans (both backends)
+STORAGE_OPERATIONS = (
+    "upload_file", "upload_stream", "upload_async_iter", "upload_iter", "download_file",
+    "stream_file", "delete_file", "stat_file", "get_file_url", "get_upload_url"
+)
+
+# Operations that call the server, run through the breaker (the others build
+# on them or only sign URLs); for stream_file only opening the object is guarded
+STORAGE_CALLS = ("upload_stream", "download_file", "stream_file", "delete_file", "stat_file")
+
+
+class StorageError(Exception):
+    """A write the caller depends on did not reach storage (retry later)"""
+
+
+class _IteratorReader(io.RawIOBase):
+    """
+    File-like view over a byte iterator (e.g. a report being generated)
+    
+    Each read() pulls the next chunk on demand, so only one chunk plus one
+    multipart part is ever held in memory.
+    """
+    
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._pending = b""
+        self._exhausted = False
+    
+    def readable(self) -> bool:
+        return True
+    
+    def _next_chunk(self) -> bytes:
+        try:
+            return next(self._chunks)
+        except StopIteration:
+            self._exhausted = True
+            return b""
+    
+    def read(self, size: int = -1) -> bytes:
+        # Short reads are fine: callers loop until they have a full part
+        while not self._pending and not self._exhausted:
+            self._pending = self._next_chunk()
+        if size < 0:
+            chunks = [self._pending]
+            while not self._exhausted:
+                chunks.append(self._next_chunk())
+            self._pending = b""
+            return b"".join(chunks)
+        data, self._pending = self._pending[:size], self._pending[size:]
+        return data
+
+
+class _AsyncIteratorReader(_IteratorReader):
+    """
+    File-like view over an async byte iterator
+    
+    Used from a worker thread (run_in_threadpool): each read() pulls the next
+    chunk from the event loop.
+    """
+    
+    def __init__(self, chunks: AsyncIterator[bytes]):
+        self._chunks = chunks.__aiter__()
+        self._pending = b""
+        self._exhausted = False
+    
+    def _next_chunk(self) -> bytes:
+        try:
+            return anyio.from_thread.run(self._chunks.__anext__)
+        except StopAsyncIteration:
+            self._exhausted = True
+            return b""
+
+
+class _ResponseChunks:
+    """
+    Chunks of an open get_object response
+    
+    The connection goes back to the pool once the chunks are exhausted, on
+    close(), or when the object is discarded, even if it was never iterated
+    (a generator's finally block would only run once it had started).
+    """
+    
+    def __init__(self, response, chunk_size: int):
+        self._response = response
+        self._chunks = response.stream(chunk_size)
+        self.closed = False
+    
+    def __iter__(self) -> "_ResponseChunks":
+        return self
+    
+    def __next__(self) -> bytes:
+        if self.closed:
+            raise StopIteration
+        try:
+            return next(self._chunks)
+        except BaseException:
+            # Exhausted or failed: nothing more will be read
+            self.close()
+            raise
+    
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._response.close()
+            self._response.release_conn()
+    
+    def __del__(self):
+        if hasattr(self, "closed"):
+            self.close()
 
 
+def _http_client() -> urllib3.PoolManager:
+    """
+    Connection pool with bounded timeouts and retries
+    
+    minio's default waits up to 5 minutes per attempt and retries 5 times,
+    stalling request threads for as long when the server hangs.
+    """
+    timeout = settings.STORAGE_TIMEOUT_SECONDS
+    return urllib3.PoolManager(
+        timeout=urllib3.Timeout(connect=min(timeout, 3.0), read=timeout),
+        maxsize=10,
+        retries=urllib3.Retry(total=2, backoff_factor=0.2, status_forcelist=[500, 502, 503, 504])
+    )
+
+
+@traced_methods("storage", *STORAGE_OPERATIONS)
+@guarded_methods(*STORAGE_CALLS)
 class StorageClient:
     """MinIO/S3 storage client"""
     
     def __init__(self):
+        http_client = _http_client()
         self.client = Minio(
             settings.MINIO_ENDPOINT,
             access_key=settings.MINIO_ACCESS_KEY,
             secret_key=settings.MINIO_SECRET_KEY,
-            secure=settings.MINIO_SECURE
+            secure=settings.MINIO_SECURE,
+            region=settings.MINIO_REGION,
+            http_client=http_client
+        )
+        # Presigned URLs are signed for the host the browser will call
+        self.public_client = Minio(
+            settings.MINIO_PUBLIC_ENDPOINT or settings.MINIO_ENDPOINT,
+            access_key=settings.MINIO_ACCESS_KEY,
+            secret_key=settings.MINIO_SECRET_KEY,
+            secure=settings.MINIO_SECURE,
+            region=settings.MINIO_REGION,
+            http_client=http_client
         )
         self.bucket = settings.MINIO_BUCKET
+        # Timeouts, connection errors and 5xx count; S3 error responses mean the server is up
+        self.breaker = circuit_breaker("storage", failures=(urllib3.exceptions.HTTPError, OSError, ServerError))
         self._ensure_bucket()
     
+    def close(self):
+        """Close pooled HTTP connections"""
+        # minio exposes no public close(); its urllib3 pool is _http
+        for client in (self.client, self.public_client):
+            client._http.clear()
+    
     def _ensure_bucket(self):
         """Ensure bucket exists"""
         try:
@@ -28,29 +191,110 @@ class StorageClient:
         except S3Error as e:
             print(f"Error ensuring bucket: {e}")
     
+    def ping(self) -> None:
+        """Raise unless the server answers for the bucket (readiness checks)"""
+        if not self.client.bucket_exists(self.bucket):
+            raise RuntimeError(f"Bucket {self.bucket} does not exist")
+    
+    def object_url(self, object_name: str) -> str:
+        """Public URL of an object"""
+        return f"{settings.MINIO_ENDPOINT}/{self.bucket}/{object_name}"
+    
     def upload_file(self, file_data: bytes, object_name: str, content_type: str = "application/octet-stream") -> Optional[str]:
         """Upload file to storage"""
+        return self.upload_stream(io.BytesIO(file_data), object_name, content_type, length=len(file_data))
+    
+    def upload_stream(
+        self,
+        stream: BinaryIO,
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        length: int = -1,
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """
+        Upload from a file-like object without buffering it whole
+        
+        Objects larger than part_size (or of unknown length, -1) are sent as
+        a multipart upload, so at most one part is held in memory.
+        Blocking: call through run_in_threadpool from async code.
+        """
         try:
             self.client.put_object(
                 self.bucket,
                 object_name,
-                io.BytesIO(file_data),
-                length=len(file_data),
-                content_type=content_type
+                stream,
+                length=length,
+                content_type=content_type,
+                part_size=part_size,
+                num_parallel_uploads=1
             )
-            return f"{settings.MINIO_ENDPOINT}/{self.bucket}/{object_name}"
+            return self.object_url(object_name)
         except S3Error as e:
             print(f"Error uploading file: {e}")
             return None
     
+    async def upload_async_iter(
+        self,
+        chunks: AsyncIterator[bytes],
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """Upload an async byte iterator (e.g. request.stream()) as a multipart upload"""
+        return await run_in_threadpool(
+            self.upload_stream,
+            _AsyncIteratorReader(chunks),
+            object_name,
+            content_type,
+            -1,
+            part_size
+        )
+    
+    def upload_iter(
+        self,
+        chunks: Iterable[bytes],
+        object_name: str,
+        content_type: str = "application/octet-stream",
+        part_size: int = DEFAULT_PART_SIZE
+    ) -> Optional[str]:
+        """Upload a byte iterator (e.g. a generated report) as a multipart upload"""
+        return self.upload_stream(_IteratorReader(chunks), object_name, content_type, -1, part_size)
+    
     def download_file(self, object_name: str) -> Optional[bytes]:
-        """Download file from storage"""
+        """Download file from storage (small objects only, see stream_file)"""
         try:
             response = self.client.get_object(self.bucket, object_name)
+        except S3Error as e:
+            print(f"Error downloading file: {e}")
+            return None
+        try:
             return response.read()
+        finally:
+            response.close()
+            response.release_conn()
+    
+    def stream_file(
+        self,
+        object_name: str,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        offset: int = 0,
+        length: int = 0
+    ) -> Optional[Iterator[bytes]]:
+        """
+        Open an object for chunked reading
+        
+        The object is opened eagerly so a missing object returns None before
+        any response headers are sent. The returned iterator can be passed
+        straight to StreamingResponse (which iterates it in the threadpool) and
+        releases the connection when exhausted, closed or discarded unread.
+        """
+        try:
+            response = self.client.get_object(self.bucket, object_name, offset=offset, length=length)
         except S3Error as e:
             print(f"Error downloading file: {e}")
             return None
+        return _ResponseChunks(response, chunk_size)
     
     def delete_file(self, object_name: str) -> bool:
         """Delete file from storage"""
@@ -61,14 +305,44 @@ class StorageClient:
             print(f"Error deleting file: {e}")
             return False
     
+    def stat_file(self, object_name: str) -> Optional[Object]:
+        """Get object metadata (size, content type), None if missing"""
+        try:
+            return self.client.stat_object(self.bucket, object_name)
+        except S3Error as e:
+            if e.code not in ("NoSuchKey", "NoSuchObject"):
+                print(f"Error getting file info: {e}")
+            return None
+    
     def get_file_url(self, object_name: str, expires: int = 3600) -> Optional[str]:
         """Get presigned URL for file"""
         try:
-            return self.client.presigned_get_object(self.bucket, object_name, expires=expires)
+            return self.public_client.presigned_get_object(
+                self.bucket, object_name, expires=timedelta(seconds=expires)
+            )
         except S3Error as e:
             print(f"Error getting file URL: {e}")
             return None
+    
+    def get_upload_url(self, object_name: str, expires: int = 300) -> Optional[str]:
+        """Get presigned PUT URL for a direct browser upload"""
+        try:
+            return self.public_client.presigned_put_object(
+                self.bucket, object_name, expires=timedelta(seconds=expires)
+            )
+        except S3Error as e:
+            print(f"Error getting upload URL: {e}")
+            return None
+
+
+def _create_storage_client() -> StorageClient:
+    """Build the backend selected by STORAGE_BACKEND"""
+    if settings.STORAGE_BACKEND == "local":
+        # Imported here: local_storage builds on this module
+        from app.utils.local_storage import LocalStorageClient
+        return LocalStorageClient()
+    return StorageClient()
 
 
-# Global storage client instance
-storage_client = StorageClient()
+# Global storage client instance (bucket check runs on first use, not at import)
+storage_client: StorageClient = LazyClient(_create_storage_client, closer=lambda c: c.close())
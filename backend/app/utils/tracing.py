@@ -0,0 +1,500 @@
+"""Distributed tracing: OpenTelemetry-format spans, W3C trace context, pluggable exporters"""
+import functools
+import importlib
+import inspect
+import json
+import logging
+import os
+import queue
+import random
+import re
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy import event
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.config import settings
+from app.core.lazy import LazyClient
+from app.core.metrics import TRACE_SPANS
+
+
+logger = logging.getLogger(__name__)
+
+TRACEPARENT_HEADER = "traceparent"
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP enum values
+SPAN_KINDS = {"internal": 1, "server": 2, "client": 3, "producer": 4, "consumer": 5}
+STATUS_UNSET, STATUS_OK, STATUS_ERROR = 0, 1, 2
+
+# Queued by close(): the export thread drains and exits
+_STOP = object()
+
+
+@dataclass
+class Span:
+    """One timed operation, in OpenTelemetry's span data model"""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str] = None
+    kind: str = "internal"
+    sampled: bool = True
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    events: List[dict] = field(default_factory=list)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: Optional[int] = None
+    status: int = STATUS_UNSET
+    status_message: str = ""
+    
+    @property
+    def traceparent(self) -> str:
+        """W3C traceparent header value naming this span as the parent"""
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+    
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is not None:
+            self.attributes[key] = value
+    
+    def record_exception(self, exc: BaseException) -> None:
+        """Mark the span failed and attach an "exception" event"""
+        self.status = STATUS_ERROR
+        self.status_message = f"{type(exc).__name__}: {exc}"[:500]
+        self.events.append({
+            "name": "exception",
+            "time_ns": time.time_ns(),
+            "attributes": {"exception.type": type(exc).__qualname__, "exception.message": str(exc)[:500]},
+        })
+    
+    def to_otlp(self) -> dict:
+        """OTLP/JSON representation"""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": SPAN_KINDS[self.kind],
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": _otlp_attributes(self.attributes),
+            "events": [
+                {"name": e["name"], "timeUnixNano": str(e["time_ns"]), "attributes": _otlp_attributes(e["attributes"])}
+                for e in self.events
+            ],
+            "status": {"code": self.status, "message": self.status_message} if self.status else {},
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        return span
+
+
+def _otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> List[dict]:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_payload(spans: List[Span], service_name: Optional[str] = None) -> dict:
+    """ExportTraceServiceRequest in OTLP/JSON encoding"""
+    resource = {
+        "service.name": service_name or settings.TRACING_SERVICE_NAME,
+        "host.name": socket.gethostname(),
+        "process.pid": os.getpid(),
+    }
+    return {"resourceSpans": [{
+        "resource": {"attributes": _otlp_attributes(resource)},
+        "scopeSpans": [{"scope": {"name": __name__}, "spans": [span.to_otlp() for span in spans]}],
+    }]}
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[tuple]:
+    """(trace_id, parent span_id, sampled) from a W3C traceparent, or None if absent or malformed"""
+    match = _TRACEPARENT.match(value.strip().lower()) if value else None
+    if match is None or match.group(1) == "0" * 32 or match.group(2) == "0" * 16:
+        return None
+    return match.group(1), match.group(2), bool(int(match.group(3), 16) & 1)
+
+
+# Span of the operation in progress (copied into threadpool calls by Starlette)
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+def activate(span: Optional[Span]) -> Token:
+    """Make span the parent of spans started in this context until deactivate()"""
+    return _current_span.set(span)
+
+
+def deactivate(token: Token) -> None:
+    _current_span.reset(token)
+
+
+class SpanExporter:
+    """Destination for finished spans; set TRACING_EXPORTER to "module:Class" to plug in another"""
+    
+    # Export from a background thread in batches (False: synchronously, as spans end)
+    batched = True
+    
+    def export(self, spans: List[Span]) -> None:
+        raise NotImplementedError
+    
+    def shutdown(self) -> None:
+        pass
+
+
+class InMemorySpanExporter(SpanExporter):
+    """Keeps finished spans in a list (tests)"""
+    
+    batched = False
+    
+    def __init__(self):
+        self.spans: List[Span] = []
+    
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+    
+    def clear(self) -> None:
+        self.spans.clear()
+
+
+class FileSpanExporter(SpanExporter):
+    """
+    Appends each batch to a file as one line of OTLP/JSON (local development)
+    
+    The format is the one the OpenTelemetry Collector's otlpjsonfile
+    receiver reads, so a local file can be replayed into Jaeger or Tempo.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.TRACING_FILE_PATH
+        self._lock = threading.Lock()
+    
+    def export(self, spans: List[Span]) -> None:
+        line = json.dumps(otlp_payload(spans), separators=(",", ":"))
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+
+class OTLPHttpSpanExporter(SpanExporter):
+    """POSTs OTLP/JSON batches to a collector (http://collector:4318/v1/traces)"""
+    
+    def __init__(self, endpoint: Optional[str] = None):
+        import httpx
+        
+        self.endpoint = endpoint or settings.TRACING_OTLP_ENDPOINT
+        self._client = httpx.Client(timeout=5.0)
+    
+    def export(self, spans: List[Span]) -> None:
+        self._client.post(self.endpoint, json=otlp_payload(spans)).raise_for_status()
+    
+    def shutdown(self) -> None:
+        self._client.close()
+
+
+def create_exporter(name: str) -> Optional[SpanExporter]:
+    """Exporter for TRACING_EXPORTER: none, memory, file, otlp or "package.module:Class" """
+    builtin = {"memory": InMemorySpanExporter, "file": FileSpanExporter, "otlp": OTLPHttpSpanExporter}
+    if not name or name == "none":
+        return None
+    if name in builtin:
+        return builtin[name]()
+    module, _, attribute = name.partition(":")
+    return getattr(importlib.import_module(module), attribute)()
+
+
+class Tracer:
+    """
+    Creates spans and hands the sampled ones to the exporter
+    
+    A trace is sampled once, at its root (TRACING_SAMPLE_RATIO), or taken
+    from the caller's traceparent; children follow. Batched exporters get
+    spans from a bounded queue drained by a daemon thread, so exporting
+    never blocks a request; when the queue is full spans are dropped and
+    counted. With no exporter configured every method is a no-op.
+    """
+    
+    def __init__(
+        self,
+        exporter: Optional[SpanExporter] = None,
+        sample_ratio: Optional[float] = None,
+        batch_size: int = 512,
+        flush_ms: int = 1000,
+        queue_size: int = 10000
+    ):
+        self.exporter = exporter if exporter is not None else create_exporter(settings.TRACING_EXPORTER)
+        self.sample_ratio = settings.TRACING_SAMPLE_RATIO if sample_ratio is None else sample_ratio
+        self.batch_size = batch_size
+        self.flush_seconds = flush_ms / 1000
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+    
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+    
+    def start_span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None
+    ) -> Optional[Span]:
+        """
+        Start a span (None when tracing is off)
+        
+        Its parent is the remote span in traceparent if given and valid,
+        else the current span; without either it starts a new trace.
+        """
+        if self.exporter is None:
+            return None
+        remote = parse_traceparent(traceparent)
+        parent = None if remote else _current_span.get()
+        if remote:
+            trace_id, parent_id, sampled = remote
+        elif parent is not None:
+            trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+        else:
+            trace_id, parent_id, sampled = f"{random.getrandbits(128):032x}", None, random.random() < self.sample_ratio
+        return Span(
+            name=name, trace_id=trace_id, span_id=f"{random.getrandbits(64):016x}", parent_span_id=parent_id,
+            kind=kind, sampled=sampled, attributes=dict(attributes or {})
+        )
+    
+    def end_span(self, span: Optional[Span]) -> None:
+        if span is None or span.end_ns is not None:
+            return
+        span.end_ns = time.time_ns()
+        if not span.sampled:
+            return
+        if not self.exporter.batched:
+            self._export([span])
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(span)
+        except queue.Full:
+            TRACE_SPANS.labels("dropped").inc()
+    
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: str = "internal",
+        attributes: Optional[Dict[str, Any]] = None,
+        traceparent: Optional[str] = None
+    ) -> Iterator[Optional[Span]]:
+        """Run a block in a span that is current (the parent of nested spans) until it ends"""
+        span = self.start_span(name, kind, attributes, traceparent)
+        if span is None:
+            yield None
+            return
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            self.end_span(span)
+    
+    def close(self, timeout: float = 10.0) -> None:
+        """Export everything queued so far and shut the exporter down"""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None and self._pid == os.getpid():
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                # The exporter is stuck: drop the backlog rather than block shutdown
+                dropped = self._queue.qsize()
+                TRACE_SPANS.labels("dropped").inc(dropped)
+                logger.warning("Span queue still full after %.0fs, %d spans not exported", timeout, dropped)
+            else:
+                thread.join(timeout)
+        if self.exporter is not None:
+            self.exporter.shutdown()
+    
+    def _ensure_started(self) -> None:
+        # Threads do not survive fork: a forked worker starts its own exporter thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name="span-exporter", daemon=True)
+                self._thread.start()
+    
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            batch: List[Span] = []
+            item = self._queue.get()
+            deadline = time.monotonic() + self.flush_seconds
+            while item is not _STOP:
+                batch.append(item)
+                if len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+            else:
+                stopping = True
+            if batch:
+                self._export(batch)
+    
+    def _export(self, spans: List[Span]) -> None:
+        try:
+            self.exporter.export(spans)
+            TRACE_SPANS.labels("exported").inc(len(spans))
+        except Exception:
+            TRACE_SPANS.labels("failed").inc(len(spans))
+            logger.exception("Failed to export %d spans", len(spans))
+
+
+# Process-wide tracer, configured from settings on first use and flushed on shutdown
+tracer: Tracer = LazyClient(Tracer, closer=lambda t: t.close())
+
+
+def traced_methods(system: str, *names: str):
+    """
+    Class decorator: run the named methods in client spans ("<system> <method>")
+    
+    Spans are only created inside a trace (a request or a task), so calls
+    from background threads and untraced processes cost one context lookup.
+    """
+    def wrap(method):
+        name = f"{system} {method.__name__}"
+        attributes = {"peer.service": system, "code.function": method.__qualname__}
+        
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(*args, **kwargs):
+                if _current_span.get() is None:
+                    return await method(*args, **kwargs)
+                with tracer.span(name, "client", attributes):
+                    return await method(*args, **kwargs)
+            return async_wrapper
+        
+        @functools.wraps(method)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return method(*args, **kwargs)
+            with tracer.span(name, "client", attributes):
+                return method(*args, **kwargs)
+        return wrapper
+    
+    def decorate(cls):
+        for name in names:
+            setattr(cls, name, wrap(getattr(cls, name)))
+        return cls
+    return decorate
+
+
+def instrument_sqlalchemy(target) -> None:
+    """Client span per statement executed through target (an Engine or the Engine class)"""
+    event.listen(target, "before_cursor_execute", _before_cursor_execute)
+    event.listen(target, "after_cursor_execute", _after_cursor_execute)
+    event.listen(target, "handle_error", _handle_error)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_span.get() is None or context is None:
+        return
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+    context._trace_span = tracer.start_span(operation, "client", {
+        "db.system": conn.dialect.name,
+        "db.operation": operation,
+        "db.statement": statement[:2000],
+        "db.executemany": executemany,
+    })
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    span = getattr(context, "_trace_span", None)
+    if span is not None:
+        if cursor is not None and cursor.rowcount >= 0:
+            span.set_attribute("db.rowcount", cursor.rowcount)
+        tracer.end_span(span)
+        context._trace_span = None
+
+
+def _handle_error(exception_context):
+    span = getattr(exception_context.execution_context, "_trace_span", None)
+    if span is not None:
+        span.record_exception(exception_context.original_exception)
+        tracer.end_span(span)
+
+
+class TracingMiddleware:
+    """
+    Server span per request, named after the route template
+    
+    Continues the caller's trace when the request carries a traceparent
+    header, and returns the trace id in X-Trace-Id so a slow response can
+    be looked up. Handler code, dependencies and the other middlewares run
+    inside the span, so their database, Redis, storage and Celery calls
+    become its children.
+    """
+    
+    def __init__(self, app: ASGIApp):
+        self.app = app
+    
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        
+        method = scope["method"]
+        traceparent = None
+        for name, value in scope["headers"]:
+            if name == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+        span = tracer.start_span(method, "server", {
+            "http.request.method": method,
+            "url.path": scope["path"],
+            "url.scheme": scope.get("scheme", "http"),
+        }, traceparent)
+        
+        async def send_with_trace(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                span.set_attribute("http.response.status_code", message["status"])
+                if message["status"] >= 500:
+                    span.status = STATUS_ERROR
+                MutableHeaders(scope=message).append("X-Trace-Id", span.trace_id)
+            await send(message)
+        
+        token = _current_span.set(span)
+        try:
+            await self.app(scope, receive, send_with_trace)
+        except BaseException as exc:
+            span.record_exception(exc)
+            raise
+        finally:
+            _current_span.reset(token)
+            template = getattr(scope.get("route"), "path_format", None)
+            if template:
+                span.name = f"{method} {template}"
+                span.set_attribute("http.route", template)
+            tracer.end_span(span)
@@ -1,6 +1,44 @@
 """Celery application configuration"""
+import os
+import threading
+import time
+from datetime import datetime
+
 from celery import Celery
+from celery.schedules import crontab
+from celery.signals import (
+    after_task_publish,
+    before_task_publish,
+    task_failure,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_init,
+    worker_process_shutdown,
+    worker_shutdown,
+)
+from kombu import Queue
+from prometheus_client import multiprocess, start_http_server
+
 from app.core.config import settings
+from app.core.metrics import CELERY_TASK_QUEUE_SECONDS, CELERY_TASK_RUNTIME_SECONDS, metrics_registry
+from app.utils.memory import memory_tracer
+from app.utils.tracing import TRACEPARENT_HEADER, activate, deactivate, tracer
+from app.workers.runtime import runtime
+
+# Task priorities within a queue (Redis serves lower numbers first)
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 9
+
+# Queues, each consumed by its own worker pool (see celery-entrypoint.sh), so a
+# bulk fan-out or a report never delays a password-reset email
+QUEUE_TRANSACTIONAL = "transactional"  # Single emails/SMS, outbox events
+QUEUE_BULK = "bulk"  # Notification fan-out
+QUEUE_MEDIA = "media"  # KYC image processing
+QUEUE_REPORTS = "reports"  # Report generation
+QUEUE_MAINTENANCE = "maintenance"  # Beat sweeps (consumed by the bulk pool)
+QUEUE_DEFAULT = "default"
 
 # Create Celery app
 celery_app = Celery(
@@ -16,10 +54,223 @@ celery_app.conf.update(
     result_serializer="json",
     timezone="UTC",
     enable_utc=True,
-    task_track_started=True,
     task_time_limit=30 * 60,  # 30 minutes
     task_soft_time_limit=25 * 60,  # 25 minutes
+    # Routing
+    task_queues=[
+        Queue(name, routing_key=name)
+        for name in (QUEUE_TRANSACTIONAL, QUEUE_BULK, QUEUE_MEDIA, QUEUE_REPORTS, QUEUE_MAINTENANCE, QUEUE_DEFAULT)
+    ],
+    task_default_queue=QUEUE_DEFAULT,
+    task_routes={
+        "send_email_task": {"queue": QUEUE_TRANSACTIONAL},
+        "handle_outbox_event": {"queue": QUEUE_TRANSACTIONAL},
+        "send_bulk_notifications": {"queue": QUEUE_BULK},
+        "notify_route": {"queue": QUEUE_BULK},
+        "process_kyc_image": {"queue": QUEUE_MEDIA},
+        "generate_report": {"queue": QUEUE_REPORTS},
+        "maintenance.*": {"queue": QUEUE_MAINTENANCE},
+    },
+    # Priorities: one Redis list per step, polled in order
+    task_default_priority=PRIORITY_NORMAL,
+    broker_transport_options={
+        "priority_steps": [PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW],
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    },
+    # Results are only stored for tasks that opt in (progress and report URLs)
+    task_ignore_result=True,
+    task_track_started=True,
+    result_expires=24 * 3600,
+    # Prefetch is per worker; each pool sets its own (celery-entrypoint.sh)
+    worker_prefetch_multiplier=settings.CELERY_PREFETCH_MULTIPLIER,
+    # Maintenance sweeps (celery beat), staggered; each run stays under MAINTENANCE_MAX_SECONDS
+    beat_schedule={
+        "purge-expired-otps": {
+            "task": "maintenance.purge_expired_otps",
+            "schedule": crontab(minute="*/15"),
+        },
+        "purge-processed-events": {
+            "task": "maintenance.purge_processed_events",
+            "schedule": crontab(minute=40),
+        },
+        "deactivate-past-trips": {
+            "task": "maintenance.deactivate_past_trips",
+            "schedule": crontab(minute=5),
+        },
+        "flag-stuck-shipments": {
+            "task": "maintenance.flag_stuck_shipments",
+            "schedule": crontab(minute=20),
+        },
+        "rotate-security-log-partitions": {
+            "task": "maintenance.rotate_security_log_partitions",
+            "schedule": crontab(hour=3, minute=30),
+        },
+    },
 )
 
+
+# One event loop per worker process, shared by all async tasks
+@worker_process_init.connect
+def start_async_runtime(**kwargs):
+    """Start the process's event loop when a prefork child starts"""
+    runtime.start()
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_async_runtime(**kwargs):
+    """Close pooled connections and stop the loop (child exit, or solo/threads pool shutdown)"""
+    runtime.stop()
+
+
+# Task metrics: enqueue-to-start latency and runtime per task
+_started: dict = {}
+
+
+@before_task_publish.connect
+def stamp_enqueue_time(headers=None, **kwargs):
+    """Record when the task was published (wall clock: publisher and worker differ)"""
+    if headers is not None:
+        headers.setdefault("enqueued_at", time.time())
+
+
+@task_prerun.connect
+def record_queue_time(task_id=None, task=None, **kwargs):
+    """Observe how long the task waited in its queue"""
+    _started[task_id] = time.monotonic()
+    request = task.request
+    enqueued_at = getattr(request, "enqueued_at", None)
+    if enqueued_at is None:
+        return  # Eager call or a publisher without the signal
+    if request.eta:
+        # Scheduled tasks only count from their ETA
+        eta = datetime.fromisoformat(request.eta) if isinstance(request.eta, str) else request.eta
+        enqueued_at = max(enqueued_at, eta.timestamp())
+    queue = (request.delivery_info or {}).get("routing_key") or QUEUE_DEFAULT
+    CELERY_TASK_QUEUE_SECONDS.labels(task.name, queue).observe(max(0.0, time.time() - enqueued_at))
+
+
+@task_postrun.connect
+def record_runtime(task_id=None, task=None, state=None, **kwargs):
+    """Observe the task's execution time by final state"""
+    started = _started.pop(task_id, None)
+    if started is not None:
+        CELERY_TASK_RUNTIME_SECONDS.labels(task.name, state or "UNKNOWN").observe(time.monotonic() - started)
+
+
+# tracemalloc attribution per task name (MEMORY_TRACING_ENABLED)
+_memory_started: dict = {}
+
+
+@worker_process_init.connect
+def start_memory_tracing(**kwargs):
+    """Trace allocations in each pool process"""
+    if settings.MEMORY_TRACING_ENABLED:
+        memory_tracer.start("worker")
+
+
+@task_prerun.connect
+def begin_memory_sample(task_id=None, **kwargs):
+    started = memory_tracer.begin()
+    if started is not None:
+        _memory_started[task_id] = started
+
+
+@task_postrun.connect
+def end_memory_sample(task_id=None, task=None, **kwargs):
+    started = _memory_started.pop(task_id, None)
+    if started is not None:
+        memory_tracer.end(started, "task", task.name)
+
+
+@worker_process_shutdown.connect
+def stop_memory_tracing(**kwargs):
+    memory_tracer.reset()
+
+
+# Tracing: a producer span per publish, whose traceparent travels in the task
+# headers, and a consumer span per execution continuing the publisher's trace
+_task_spans: dict = {}
+
+# The open publish span of each thread: publishing is synchronous, and
+# after_task_publish never fires for a failed publish, so a slot (not a
+# dict keyed by task id) keeps failed publishes from piling up
+_publishing = threading.local()
+
+
+@before_task_publish.connect
+def start_publish_span(sender=None, headers=None, routing_key=None, **kwargs):
+    """Start the publish span and put its trace context in the message headers"""
+    if headers is None:
+        return
+    # Replaces the span of a publish on this thread that raised (never exported)
+    span = tracer.start_span(f"{sender} publish", "producer", {
+        "messaging.system": "celery",
+        "messaging.destination.name": routing_key,
+        "messaging.message.id": headers.get("id"),
+    })
+    if span is not None:
+        headers[TRACEPARENT_HEADER] = span.traceparent
+    _publishing.span = span
+
+
+@after_task_publish.connect
+def end_publish_span(headers=None, **kwargs):
+    span, _publishing.span = getattr(_publishing, "span", None), None
+    tracer.end_span(span)
+
+
+@task_prerun.connect
+def start_task_span(task_id=None, task=None, **kwargs):
+    """Run the task in a span that continues the publisher's trace"""
+    request = task.request
+    span = tracer.start_span(f"{task.name} process", "consumer", {
+        "messaging.system": "celery",
+        "messaging.destination.name": (request.delivery_info or {}).get("routing_key"),
+        "messaging.message.id": task_id,
+        "celery.retries": request.retries,
+    }, getattr(request, TRACEPARENT_HEADER, None))
+    if span is not None:
+        _task_spans[task_id] = (span, activate(span))
+
+
+@task_failure.connect
+def record_task_failure(task_id=None, exception=None, **kwargs):
+    entry = _task_spans.get(task_id)
+    if entry is not None and exception is not None:
+        entry[0].record_exception(exception)
+
+
+@task_postrun.connect
+def end_task_span(task_id=None, state=None, **kwargs):
+    entry = _task_spans.pop(task_id, None)
+    if entry is not None:
+        span, token = entry
+        span.set_attribute("celery.state", state)
+        deactivate(token)
+        tracer.end_span(span)
+
+
+@worker_process_shutdown.connect
+def flush_spans(**kwargs):
+    """Export the child's queued spans before it exits"""
+    tracer.reset()
+
+
+@worker_init.connect
+def serve_metrics(**kwargs):
+    """Expose the worker's metrics (all pool processes) on CELERY_METRICS_PORT"""
+    if settings.CELERY_METRICS_PORT:
+        start_http_server(settings.CELERY_METRICS_PORT, registry=metrics_registry())
+
+
+@worker_process_shutdown.connect
+def remove_process_metrics(pid=None, **kwargs):
+    """Drop a dead child's live gauges from the shared metrics directory"""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
 # Auto-discover tasks
 celery_app.autodiscover_tasks(["app.workers"])
@@ -0,0 +1,155 @@
+"""
+Outbox relay: publish committed outbox events to Celery or a Redis Stream
+
+Run one or more relays next to the API:
+    python -m app.workers.outbox_relay
+"""
+import json
+import logging
+import signal
+import threading
+from datetime import datetime, timedelta
+from typing import Callable, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.metrics import OUTBOX_FAILURES, OUTBOX_LAG_SECONDS, OUTBOX_PUBLISHED
+from app.database.database import SessionLocal
+from app.models.outbox_event import OutboxEvent
+from app.services.outbox_service import OutboxService
+from app.utils.redis_client import RedisClient, redis_client
+
+
+logger = logging.getLogger(__name__)
+
+
+class CeleryPublisher:
+    """Publish events as handle_outbox_event tasks (task id = event id)"""
+    
+    def __init__(self, app=None):
+        if app is None:
+            from app.workers.celery_app import celery_app as app
+        self.app = app
+    
+    def publish(self, message: dict):
+        """Send the event to the broker"""
+        self.app.send_task("handle_outbox_event", args=[message], task_id=message["id"])
+
+
+class RedisStreamPublisher:
+    """Append events to a capped Redis Stream (XADD)"""
+    
+    def __init__(self, redis: Optional[RedisClient] = None, stream: Optional[str] = None):
+        self.redis = redis or redis_client
+        self.stream = stream or settings.OUTBOX_STREAM
+    
+    def publish(self, message: dict):
+        """Append the event to the stream"""
+        self.redis.client.xadd(
+            self.stream,
+            {"id": message["id"], "type": message["type"], "event": json.dumps(message)},
+            maxlen=settings.OUTBOX_STREAM_MAXLEN,
+            approximate=True
+        )
+
+
+def create_publisher(kind: Optional[str] = None):
+    """Publisher selected by OUTBOX_PUBLISHER"""
+    kind = kind or settings.OUTBOX_PUBLISHER
+    if kind == "celery":
+        return CeleryPublisher()
+    if kind == "redis":
+        return RedisStreamPublisher()
+    raise ValueError(f"Unknown OUTBOX_PUBLISHER: {kind}")
+
+
+class OutboxRelay:
+    """
+    Claims batches of unpublished events and publishes them in order
+    
+    Each batch is locked with SELECT ... FOR UPDATE SKIP LOCKED, so several
+    relays can run side by side without publishing the same row twice while
+    they are alive. published_at is committed only after the publisher
+    returned: a relay that dies mid-batch leaves its rows unpublished and
+    they are published again (at-least-once; consumers deduplicate on id).
+    Failed publishes are retried with exponential backoff via available_at.
+    """
+    
+    def __init__(
+        self,
+        session_factory: Callable[[], Session] = SessionLocal,
+        publisher=None,
+        batch_size: Optional[int] = None
+    ):
+        self.session_factory = session_factory
+        self.publisher = publisher or create_publisher()
+        self.batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    
+    def relay_once(self) -> dict:
+        """Publish one batch, returns published/failed counts"""
+        stats = {"published": 0, "failed": 0}
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            events = db.scalars(
+                select(OutboxEvent)
+                .where(OutboxEvent.published_at.is_(None), OutboxEvent.available_at <= now)
+                .order_by(OutboxEvent.available_at, OutboxEvent.created_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).all()
+            
+            for event in events:
+                try:
+                    self.publisher.publish(OutboxService.to_message(event))
+                except Exception as e:
+                    event.attempts += 1
+                    event.last_error = str(e)[:1000]
+                    event.available_at = now + self._backoff(event.attempts)
+                    stats["failed"] += 1
+                    OUTBOX_FAILURES.inc()
+                    logger.warning("Could not publish event %s (attempt %d): %s", event.id, event.attempts, e)
+                    continue
+                event.published_at = datetime.utcnow()
+                stats["published"] += 1
+                OUTBOX_PUBLISHED.inc()
+                OUTBOX_LAG_SECONDS.observe((event.published_at - event.created_at).total_seconds())
+            
+            db.commit()
+        finally:
+            db.close()
+        return stats
+    
+    @staticmethod
+    def _backoff(attempts: int) -> timedelta:
+        """Delay before the next attempt (1s, 2s, 4s, ... capped)"""
+        return timedelta(seconds=min(settings.OUTBOX_MAX_BACKOFF_SECONDS, 2 ** (attempts - 1)))
+    
+    def run(self, stop: threading.Event):
+        """Relay until stop is set, sleeping only when there is no backlog"""
+        logger.info("Outbox relay started (batch size %d)", self.batch_size)
+        while not stop.is_set():
+            try:
+                stats = self.relay_once()
+            except Exception as e:
+                logger.error("Outbox relay batch failed: %s", e)
+                stats = {"published": 0, "failed": 0}
+            if stats["published"] + stats["failed"] < self.batch_size:
+                stop.wait(settings.OUTBOX_POLL_SECONDS)
+        logger.info("Outbox relay stopped")
+
+
+def main():
+    """Run the relay until SIGTERM/SIGINT"""
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    stop = threading.Event()
+    # Finish the current batch on SIGTERM/SIGINT (an interrupted batch is republished anyway)
+    signal.signal(signal.SIGTERM, lambda *args: stop.set())
+    signal.signal(signal.SIGINT, lambda *args: stop.set())
+    OutboxRelay().run(stop)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""Long-lived asyncio runtime for Celery worker processes"""
+import asyncio
+import concurrent.futures
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, TypeVar
+
+import httpx
+import redis.asyncio
+
+from app.core.config import settings
+from app.utils.email import close_mailer
+from app.utils.sms import close_sms_client
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class AsyncRuntime:
+    """
+    One event loop per worker process, running on a background thread
+    
+    Async tasks are submitted with run() instead of asyncio.run(), so pooled
+    resources bound to the loop (SMTP pool, async Redis, HTTP client) are
+    created once per process and reused by every task. The loop is started
+    on worker_process_init (or on first use) and stopped on shutdown, which
+    closes all shared resources.
+    """
+    
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        # name -> (resource, async closer); only touched on the loop thread
+        self._resources: Dict[str, Tuple[Any, Callable[[Any], Awaitable[None]]]] = {}
+    
+    @property
+    def running(self) -> bool:
+        """Whether this process has a live loop"""
+        return self._loop is not None and self._pid == os.getpid() and self._loop.is_running()
+    
+    def start(self):
+        """Start the loop thread (idempotent; a loop inherited through fork is discarded)"""
+        with self._lock:
+            if self.running:
+                return
+            # After fork only the forking thread survives: never reuse the parent's loop
+            self._resources = {}
+            loop = asyncio.new_event_loop()
+            ready = threading.Event()
+            
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(ready.set)
+                loop.run_forever()
+            
+            self._thread = threading.Thread(target=run_loop, name="async-runtime", daemon=True)
+            self._thread.start()
+            ready.wait()
+            self._loop, self._pid = loop, os.getpid()
+    
+    def submit(self, coro: Awaitable[T]) -> concurrent.futures.Future:
+        """Schedule a coroutine on the runtime loop without waiting for it"""
+        if not self.running:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+    
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """Run a coroutine on the runtime loop and wait for its result (blocking)"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            # Timeouts and Celery time limits must not leave the coroutine running
+            future.cancel()
+            raise
+    
+    def stop(self, timeout: float = 10):
+        """Close shared resources and stop the loop"""
+        with self._lock:
+            if not self.running:
+                return
+            loop, thread = self._loop, self._thread
+            try:
+                asyncio.run_coroutine_threadsafe(self._close_resources(), loop).result(timeout)
+            except Exception as e:
+                logger.warning("Async runtime resources did not close cleanly: %s", e)
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            loop.close()
+            self._loop = self._thread = self._pid = None
+    
+    async def _close_resources(self):
+        """Close every shared resource, then the SMTP pool and SMS client"""
+        resources, self._resources = self._resources, {}
+        for name, (resource, closer) in resources.items():
+            try:
+                await closer(resource)
+            except Exception as e:
+                logger.warning("Could not close %s: %s", name, e)
+        await close_mailer()
+        await close_sms_client()
+    
+    def _resource(self, name: str, factory: Callable[[], T], closer: Callable[[T], Awaitable[None]]) -> T:
+        """Shared resource created on first use (call from the loop)"""
+        if name not in self._resources:
+            self._resources[name] = (factory(), closer)
+        return self._resources[name][0]
+    
+    def async_redis(self) -> redis.asyncio.Redis:
+        """Async Redis client shared by the tasks of this process"""
+        return self._resource(
+            "redis",
+            lambda: redis.asyncio.Redis(
+                host=settings.REDIS_HOST,
+                port=settings.REDIS_PORT,
+                db=settings.REDIS_DB,
+                password=settings.REDIS_PASSWORD or None,
+                decode_responses=True
+            ),
+            lambda client: client.aclose()
+        )
+    
+    def http_client(self) -> httpx.AsyncClient:
+        """Pooled HTTP client shared by the tasks of this process"""
+        return self._resource(
+            "http",
+            lambda: httpx.AsyncClient(timeout=10, limits=httpx.Limits(max_connections=100)),
+            lambda client: client.aclose()
+        )
+
+
+# Runtime of the current worker process (started by the signals in celery_app)
+runtime = AsyncRuntime()
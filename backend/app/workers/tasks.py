@@ -1,26 +1,173 @@
 """Background tasks"""
-from app.workers.celery_app import celery_app
+from datetime import date
+
+import urllib3
+
+from app.workers.celery_app import PRIORITY_HIGH, PRIORITY_LOW, celery_app
+from app.database.database import SessionLocal
+from app.models.notification import NotificationChannel, NotificationType
+from app.services.audit_service import AuditService
+from app.services.maintenance_service import MaintenanceService
+from app.services.notification_service import NotificationService
+from app.services.outbox_service import OutboxService
+from app.services.report_service import ReportService
+from app.utils.circuit_breaker import CircuitOpenError
 from app.utils.email import send_email
+from app.utils.storage import StorageError
+from app.workers.runtime import runtime
 
 
-@celery_app.task(name="send_email_task")
-def send_email_task(to_email: str, subject: str, body: str, html: bool = False):
+@celery_app.task(name="send_email_task", bind=True, priority=PRIORITY_HIGH, max_retries=10)
+def send_email_task(self, to_email: str, subject: str, body: str, html: bool = False):
     """Send email as background task"""
-    # Note: This needs to be synchronous for Celery
-    import asyncio
-    asyncio.run(send_email(to_email, subject, body, html))
-    return {"status": "sent", "to": to_email}
+    # Runs on the worker's persistent loop, reusing its pooled SMTP connections
+    try:
+        sent = runtime.run(send_email(to_email, subject, body, html))
+    except CircuitOpenError as e:
+        # SMTP is down: come back when the breaker lets a probe through
+        raise self.retry(countdown=max(1.0, e.retry_after))
+    return {"status": "sent" if sent else "failed", "to": to_email}
+
+
+@celery_app.task(name="generate_report", ignore_result=False, acks_late=True)
+def generate_report_task(report_type: str, month: str = None, output_format: str = "csv"):
+    """
+    Generate a monthly shipment report and return its presigned URL
+    
+    report_type: shipments, by_status, by_route, by_relay_point or by_traveler;
+    month: YYYY-MM (default: last month); output_format: csv or ndjson.
+    """
+    db = SessionLocal()
+    try:
+        result = ReportService.generate(db, report_type, month, output_format)
+    finally:
+        db.close()
+    return {"status": "generated", **result}
+
+
+@celery_app.task(name="send_bulk_notifications", bind=True, ignore_result=False, priority=PRIORITY_LOW)
+def send_bulk_notifications_task(
+    self,
+    user_ids: list,
+    message: str,
+    title: str = "DocUrgent",
+    channels: list = None,
+    notification_type: str = "info",
+    data: dict = None
+):
+    """
+    Send bulk notifications as background task
+    
+    Progress is published as state PROGRESS with the running totals.
+    """
+    def report(stats: dict):
+        if self.request.id:
+            self.update_state(state="PROGRESS", meta=stats)
+    
+    db = SessionLocal()
+    try:
+        stats = NotificationService.fan_out(
+            db,
+            user_ids,
+            title,
+            message,
+            channels or [NotificationChannel.IN_APP.value],
+            NotificationType(notification_type),
+            data,
+            progress=report
+        )
+    finally:
+        db.close()
+    return {"status": "sent", "count": stats["processed"] - stats["skipped"], **stats}
+
+
+@celery_app.task(name="notify_route", priority=PRIORITY_LOW)
+def notify_route_task(departure_city: str, destination_city: str, departure_date: str, message: str,
+                      title: str = "DocUrgent", channels: list = None):
+    """Notify every traveler and sender on a route and date (e.g. delayed flight)"""
+    db = SessionLocal()
+    try:
+        user_ids = NotificationService.route_recipient_ids(
+            db, departure_city, destination_city, date.fromisoformat(departure_date)
+        )
+    finally:
+        db.close()
+    task = send_bulk_notifications_task.delay(user_ids, message, title, channels, NotificationType.ALERT.value)
+    return {"status": "queued", "count": len(user_ids), "task_id": task.id}
+
+
+@celery_app.task(name="handle_outbox_event", autoretry_for=(Exception,), retry_backoff=True, max_retries=5, acks_late=True)
+def handle_outbox_event_task(message: dict):
+    """Handle an event published by the outbox relay (acked after handling; redeliveries are skipped)"""
+    db = SessionLocal()
+    try:
+        handled = OutboxService.consume(db, message)
+    finally:
+        db.close()
+    return {"status": "handled" if handled else "duplicate", "event_id": message["id"]}
+
+
+@celery_app.task(name="process_kyc_image", autoretry_for=(urllib3.exceptions.HTTPError, StorageError), retry_backoff=True, max_retries=5, acks_late=True)
+def process_kyc_image_task(document_id: str, side: str, object_name: str):
+    """Strip EXIF, render review image and thumbnail, deduplicate by hash"""
+    from app.services.kyc_service import KYCService
+    
+    db = SessionLocal()
+    try:
+        result = KYCService.process_uploaded_image(db, document_id, side, object_name)
+    finally:
+        db.close()
+    
+    if result is None:
+        return {"status": "skipped", "document_id": document_id, "side": side}
+    return {"status": "processed", **result}
+
+
+@celery_app.task(name="maintenance.purge_expired_otps")
+def purge_expired_otps_task():
+    """Delete long-expired OTP verifications"""
+    db = SessionLocal()
+    try:
+        return MaintenanceService.purge_expired_otps(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="maintenance.purge_processed_events")
+def purge_processed_events_task():
+    """Forget long-handled outbox event ids"""
+    db = SessionLocal()
+    try:
+        return MaintenanceService.purge_processed_events(db)
+    finally:
+        db.close()
+
+
+@celery_app.task(name="maintenance.deactivate_past_trips")
+def deactivate_past_trips_task():
+    """Deactivate trips that have departed"""
+    db = SessionLocal()
+    try:
+        return MaintenanceService.deactivate_past_trips(db)
+    finally:
+        db.close()
 
 
-@celery_app.task(name="generate_report")
-def generate_report_task(report_type: str, tenant_id: int):
-    """Generate report as background task"""
-    # Placeholder for report generation
-    return {"status": "generated", "report_type": report_type, "tenant_id": tenant_id}
+@celery_app.task(name="maintenance.flag_stuck_shipments")
+def flag_stuck_shipments_task():
+    """Publish shipment.stuck events for idle shipments"""
+    db = SessionLocal()
+    try:
+        return MaintenanceService.flag_stuck_shipments(db)
+    finally:
+        db.close()
 
 
-@celery_app.task(name="send_bulk_notifications")
-def send_bulk_notifications_task(user_ids: list, message: str):
-    """Send bulk notifications as background task"""
-    # Placeholder for bulk notification sending
-    return {"status": "sent", "count": len(user_ids)}
+@celery_app.task(name="maintenance.rotate_security_log_partitions")
+def rotate_security_log_partitions_task():
+    """Pre-create upcoming audit log partitions and drop expired ones"""
+    db = SessionLocal()
+    try:
+        return AuditService.rotate_partitions(db)
+    finally:
+        db.close()
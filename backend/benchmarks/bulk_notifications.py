@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Bulk notification fan-out benchmark
+
+Creates N users in a SQLite database and notifies all of them through
+NotificationService.fan_out (in-app rows, email to a local aiosmtpd server,
+push to a local HTTP gateway), then runs a naive per-recipient loop (one
+SELECT, one INSERT + COMMIT and one send per user) on a sample for
+comparison. SMS is left out: it needs Twilio.
+
+Usage:
+    python -m benchmarks.bulk_notifications [--recipients 100000] [--naive-sample 1000]
+"""
+
+import argparse
+import asyncio
+import socket
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from aiosmtpd.controller import Controller
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 (register all tables)
+from app.core.config import settings
+from app.database.database import Base
+from app.models.notification import Notification
+from app.models.user import User
+from app.services.notification_service import NotificationService
+from app.utils.email import send_email
+from app.workers.runtime import runtime
+
+
+class CountingSMTPHandler:
+    def __init__(self):
+        self.messages = 0
+    
+    async def handle_DATA(self, server, session, envelope):
+        self.messages += 1
+        return "250 OK"
+
+
+class PushGateway(BaseHTTPRequestHandler):
+    requests = 0
+    
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        PushGateway.requests += 1
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+    
+    def log_message(self, *args):
+        pass
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def naive_fan_out(db, user_ids, title, message):
+    """One query, one committed insert and one awaited email per recipient"""
+    for user_id in user_ids:
+        user = db.get(User, user_id)
+        now = datetime.utcnow()
+        db.add(Notification(id=str(uuid.uuid4()), user_id=user.id, title=title, message=message,
+                            channels=["in_app", "email"], created_at=now, updated_at=now))
+        db.commit()
+        runtime.run(send_email(user.email, title, message))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipients", type=int, default=100_000)
+    parser.add_argument("--naive-sample", type=int, default=1000)
+    args = parser.parse_args()
+    
+    smtp = CountingSMTPHandler()
+    controller = Controller(smtp, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    gateway = ThreadingHTTPServer(("127.0.0.1", 0), PushGateway)
+    threading.Thread(target=gateway.serve_forever, daemon=True).start()
+    
+    config = settings.resolve()
+    config.SMTP_HOST, config.SMTP_PORT, config.SMTP_TLS = "127.0.0.1", controller.port, False
+    config.SMTP_USER = config.SMTP_PASSWORD = ""
+    config.PUSH_GATEWAY_URL = f"http://127.0.0.1:{gateway.server_port}/send"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(engine)
+        Session = sessionmaker(bind=engine)
+        user_ids = [str(uuid.uuid4()) for _ in range(args.recipients)]
+        with engine.begin() as connection:
+            connection.execute(insert(User), [
+                {"id": user_id, "email": f"user{i}@example.com", "phone": f"+33{i:09d}", "hashed_password": "x",
+                 "first_name": "User", "last_name": str(i), "is_active": True, "created_at": datetime.utcnow(),
+                 "updated_at": datetime.utcnow()}
+                for i, user_id in enumerate(user_ids)
+            ])
+        
+        print(f"{args.recipients} recipients, chunk {config.NOTIFICATION_CHUNK_SIZE}, "
+              f"email concurrency {config.NOTIFICATION_EMAIL_CONCURRENCY}, SMTP pool {config.SMTP_POOL_SIZE}\n")
+        try:
+            for channels in (["in_app", "push"], ["in_app", "email", "push"]):
+                smtp.messages = PushGateway.requests = 0
+                db = Session()
+                started = time.perf_counter()
+                stats = NotificationService.fan_out(
+                    db, user_ids, "Flight delayed", "AF123 leaves 3 hours late", channels=channels
+                )
+                elapsed = time.perf_counter() - started
+                db.close()
+                print(f"fan_out {'+'.join(channels):<18} {args.recipients / elapsed:8.0f} recipients/s   "
+                      f"{elapsed:7.1f} s   rows {stats['channels']['in_app']['sent']}  emails {smtp.messages}  "
+                      f"push requests {PushGateway.requests}")
+            
+            db = Session()
+            sample = user_ids[:args.naive_sample]
+            started = time.perf_counter()
+            naive_fan_out(db, sample, "Flight delayed", "AF123 leaves 3 hours late")
+            elapsed = time.perf_counter() - started
+            db.close()
+            rate = len(sample) / elapsed
+            print(f"naive   {'in_app+email':<18} {rate:8.0f} recipients/s   {args.recipients / rate:7.1f} s projected for "
+                  f"{args.recipients} (measured on {len(sample)})")
+        finally:
+            runtime.stop()
+            controller.stop()
+            gateway.shutdown()
+
+
+if __name__ == "__main__":
+    main()
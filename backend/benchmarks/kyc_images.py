@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+KYC image pipeline throughput benchmark
+
+Processes synthetic 12 MP phone photos (JPEG with EXIF orientation and GPS)
+through app.utils.images.process_image and reports images/second per worker
+process and peak RSS, next to a naive full-resolution decode for reference.
+No external services are needed.
+
+Usage:
+    python -m benchmarks.kyc_images [--images 20] [--workers 1] [--width 4032 --height 3024]
+"""
+
+import argparse
+import io
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from PIL import Image, ImageOps
+
+from app.utils.images import REVIEW_MAX_SIZE, THUMBNAIL_MAX_SIZE, process_image
+
+
+def make_photo(width: int, height: int) -> bytes:
+    """Synthetic camera JPEG with EXIF orientation and GPS tags"""
+    gradient = Image.linear_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    image = Image.merge("RGB", (gradient, noise, gradient.transpose(Image.FLIP_LEFT_RIGHT)))
+    exif = Image.Exif()
+    exif[0x0112] = 6  # Orientation: rotate 90 CW
+    exif[0x0110] = "Benchmark Phone"
+    exif[0x8825] = {1: "N", 2: (48.0, 51.0, 24.0), 3: "E", 4: (2.0, 21.0, 7.0)}  # GPS
+    output = io.BytesIO()
+    image.save(output, format="JPEG", quality=92, exif=exif)
+    return output.getvalue()
+
+
+def naive_process(data: bytes) -> None:
+    """Full-resolution decode, then resize (what the pipeline avoids)"""
+    with Image.open(io.BytesIO(data)) as image:
+        image = ImageOps.exif_transpose(image).convert("RGB")
+        review = image.copy()
+        review.thumbnail((REVIEW_MAX_SIZE, REVIEW_MAX_SIZE), Image.LANCZOS)
+        review.save(io.BytesIO(), format="JPEG", quality=82)
+        review.thumbnail((THUMBNAIL_MAX_SIZE, THUMBNAIL_MAX_SIZE), Image.LANCZOS)
+        review.save(io.BytesIO(), format="JPEG", quality=70)
+
+
+def pipeline_process(data: bytes) -> None:
+    """Pipeline path: draft decode, EXIF stripped, review + thumbnail"""
+    processed = process_image(io.BytesIO(data))
+    assert b"Exif" not in processed.review[:64]
+
+
+def run_worker(variant: str, data: bytes, images: int) -> tuple[float, int]:
+    """Process images in one process; return elapsed seconds and peak RSS (KiB)"""
+    process = pipeline_process if variant == "pipeline" else naive_process
+    process(data)  # warm up
+    started = time.perf_counter()
+    for _ in range(images):
+        process(data)
+    return time.perf_counter() - started, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=20, help="images per worker")
+    parser.add_argument("--workers", type=int, default=1, help="parallel worker processes")
+    parser.add_argument("--width", type=int, default=4032)
+    parser.add_argument("--height", type=int, default=3024)
+    args = parser.parse_args()
+    
+    data = make_photo(args.width, args.height)
+    print(f"Source: {args.width}x{args.height} JPEG, {len(data) / 1024 / 1024:.1f} MiB, "
+          f"{args.images} images x {args.workers} worker(s)\n")
+    
+    for variant in ("pipeline", "naive"):
+        # Fresh processes per variant so peak RSS is not shared
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            started = time.perf_counter()
+            results = list(pool.map(run_worker, [variant] * args.workers, [data] * args.workers,
+                                    [args.images] * args.workers))
+            wall = time.perf_counter() - started
+        per_core = sum(args.images / elapsed for elapsed, _ in results) / len(results)
+        peak_rss = max(rss for _, rss in results) / 1024
+        print(f"{variant:<9} {per_core:6.2f} img/s per worker   "
+              f"{args.images * args.workers / wall:6.2f} img/s total   "
+              f"{1000 / per_core:7.1f} ms/img   peak RSS {peak_rss:6.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
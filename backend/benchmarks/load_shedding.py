@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Load shedding benchmark
+
+Offers an open-loop (Poisson) mix of workflow writes, logins, shipment
+reads, list pages and analytics to one worker with `--slots` request threads,
+at `--load` times the rate it can handle, and compares:
+
+- off: no admission control; requests queue for a thread without bound
+- on: app.utils.concurrency.ConcurrencyLimitMiddleware with the same slots
+
+Handlers are sync endpoints sleeping for a per-class service time (the
+database work of the real endpoint), so slots, not CPU, are the bottleneck.
+Clients give up after `--client-timeout` seconds. Reports, per class, how
+many requests succeeded, were shed (503) or timed out, and the p50/p95
+latency of the successful ones.
+
+Usage:
+    python -m benchmarks.load_shedding [--seconds 15] [--load 2.0] [--slots 8]
+"""
+
+import argparse
+import asyncio
+import random
+import statistics
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+from fastapi import FastAPI
+
+from app.utils.concurrency import ConcurrencyLimitMiddleware, configure_threadpool, route_class
+
+
+# Class: (method, path, service seconds, requests/s at load 1.0): 90% of 8 slots busy
+TRAFFIC = {
+    "write": ("POST", "/api/v1/relay-points/handoff", 0.05, 20),
+    "auth": ("POST", "/api/v1/auth/login", 0.10, 10),
+    "read": ("GET", "/api/v1/shipments/42", 0.02, 40),
+    "list": ("GET", "/api/v1/shipments", 0.08, 30),
+    "analytics": ("GET", "/api/v1/analytics/daily", 0.40, 5),
+}
+
+
+def build_app(shedding: bool, slots: int):
+    """Endpoints sleeping for their class's service time, with or without admission control"""
+    app = FastAPI()
+    
+    @app.api_route("/api/v1/{path:path}", methods=["GET", "POST"])
+    def endpoint(path: str, method: str = "GET"):
+        name = route_class(method, f"/api/v1/{path}").name
+        time.sleep(TRAFFIC[name][2])
+        return {"class": name}
+    
+    if shedding:
+        return ConcurrencyLimitMiddleware(app, max_inflight=slots, max_queue=slots * 8, queue_timeout=5)
+    return app
+
+
+async def run(shedding: bool, seconds: float, load: float, slots: int, client_timeout: float) -> dict:
+    configure_threadpool(slots)
+    app = build_app(shedding, slots)
+    results = defaultdict(lambda: {"ok": [], "shed": 0, "timeout": 0})
+    transport = httpx.ASGITransport(app=app)
+    
+    async with httpx.AsyncClient(transport=transport, base_url="http://test", timeout=client_timeout) as http:
+        async def call(name: str, method: str, path: str):
+            started = time.perf_counter()
+            try:
+                response = await asyncio.wait_for(
+                    http.request(method, path, params={"method": method}), client_timeout
+                )
+            except asyncio.TimeoutError:
+                results[name]["timeout"] += 1
+                return
+            if response.status_code == 503:
+                results[name]["shed"] += 1
+            else:
+                results[name]["ok"].append(time.perf_counter() - started)
+        
+        async def arrivals(name: str):
+            method, path, _, rate = TRAFFIC[name]
+            deadline = time.monotonic() + seconds
+            tasks = []
+            while time.monotonic() < deadline:
+                await asyncio.sleep(random.expovariate(rate * load))
+                tasks.append(asyncio.create_task(call(name, method, path)))
+            await asyncio.gather(*tasks)
+        
+        await asyncio.gather(*(arrivals(name) for name in TRAFFIC))
+    return results
+
+
+def percentile(values, q: float) -> float:
+    return statistics.quantiles(values, n=100)[q - 1] if len(values) > 1 else (values[0] if values else 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=15)
+    parser.add_argument("--load", type=float, default=2.0, help="multiplier of the TRAFFIC rates (1.0 keeps 90%% of 8 slots busy)")
+    parser.add_argument("--slots", type=int, default=8)
+    parser.add_argument("--client-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+    
+    random.seed(1)
+    for shedding in (False, True):
+        results = asyncio.run(run(shedding, args.seconds, args.load, args.slots, args.client_timeout))
+        print(f"\nadmission control {'on' if shedding else 'off'} (load x{args.load}, {args.slots} slots)")
+        print(f"  {'class':<10} {'sent':>6} {'ok':>6} {'shed':>6} {'timeout':>8} {'p50 ms':>8} {'p95 ms':>8}")
+        for name in TRAFFIC:
+            result = results[name]
+            ok = result["ok"]
+            sent = len(ok) + result["shed"] + result["timeout"]
+            print(
+                f"  {name:<10} {sent:>6} {len(ok):>6} {result['shed']:>6} {result['timeout']:>8}"
+                f" {percentile(ok, 50) * 1000:>8.0f} {percentile(ok, 95) * 1000:>8.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Middleware stack benchmark
+
+Serves the API from one uvicorn worker and measures requests/s on /health and
+GET /api/v1/shipments/{id} (JWT auth, user and shipment lookups) for:
+
+- legacy: the previous stack, i.e. the @app.middleware("http") timing
+  decorator and the BaseHTTPMiddleware rate limiter around metrics, CORS
+  and idempotency
+- asgi: the application's pure ASGI stack (app.main.middleware)
+
+Both use an in-process fake Redis for the rate limiter (with a limit no
+client reaches) and a SQLite database in a temporary directory. The load
+generator is a minimal keep-alive HTTP/1.1 client on raw sockets, so it
+costs far less CPU than the server it measures.
+
+Usage:
+    python -m benchmarks.middleware [--seconds 10] [--connections 16]
+"""
+
+import argparse
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+
+def build_app(stack: str):
+    """The application with the legacy or the pure ASGI middleware stack"""
+    import fakeredis
+    from fastapi import FastAPI, HTTPException, Request, status
+    from starlette.middleware.base import BaseHTTPMiddleware
+    
+    from app.core.config import settings
+    from app.utils.redis_client import RedisClient, redis_client
+    
+    redis_client.override(RedisClient(client=fakeredis.FakeRedis(decode_responses=True)))
+    settings.resolve().RATE_LIMIT_PER_MINUTE = 10 ** 9
+    
+    import app.main as main
+    
+    if stack == "asgi":
+        return main.app
+    
+    class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+        """app.utils.rate_limiter before the pure ASGI rewrite"""
+        
+        async def dispatch(self, request: Request, call_next):
+            if request.url.path == "/health":
+                return await call_next(request)
+            key = f"rate_limit:{request.client.host}"
+            count = redis_client.get(key)
+            if count is None:
+                redis_client.set(key, 1, expire=60)
+            elif int(count) >= settings.RATE_LIMIT_PER_MINUTE:
+                raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS, detail="Rate limit exceeded")
+            else:
+                redis_client.increment(key)
+            return await call_next(request)
+    
+    app = FastAPI(lifespan=main.lifespan)
+    app.router.routes.extend(main.app.router.routes)
+    app.exception_handlers.update(main.app.exception_handlers)
+    app.add_middleware(LegacyRateLimitMiddleware)
+    app.add_middleware(main.IdempotencyMiddleware)
+    app.add_middleware(
+        main.CORSMiddleware,
+        allow_origins=settings.cors_origins_list,
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    app.add_middleware(main.PrometheusMiddleware)
+    
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(time.time() - start_time)
+        return response
+    
+    return app
+
+
+def serve(stack: str, port: int, database_url: str):
+    """Run one uvicorn worker (server subprocess)"""
+    import uvicorn
+    from sqlalchemy import create_engine
+    
+    from app.database.database import engine
+    
+    # Same pool limits as app.database.database
+    engine.override(create_engine(
+        database_url, connect_args={"check_same_thread": False}, pool_size=10, max_overflow=20
+    ))
+    uvicorn.run(build_app(stack), host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def populate(database_url: str) -> tuple[str, str]:
+    """Create the schema, one user and one shipment; return the shipment id and a token"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    
+    import app.models  # noqa: F401 (register all tables)
+    from app.core.security import create_access_token
+    from app.database.database import Base
+    from app.models.document_request import DocumentRequest, DocumentType
+    from app.models.user import User
+    
+    engine = create_engine(database_url)
+    Base.metadata.create_all(engine)
+    db = sessionmaker(bind=engine)()
+    user = User(id=str(uuid.uuid4()), email="bench@example.com", phone="+33600000000",
+                hashed_password="x", first_name="Bench", last_name="User")
+    shipment = DocumentRequest(
+        id=str(uuid.uuid4()), sender_id=user.id, sender_name="Sender", sender_phone="+33600000000",
+        source_address="1 Rue de Paris", recipient_name="Recipient", recipient_phone="+21260000000",
+        destination_address="1 Avenue", document_type=DocumentType.DIPLOMA, unique_code="DOC00000001",
+        delivery_code="RCV00001", traveler_code="TRV00001"
+    )
+    db.add_all([user, shipment])
+    db.commit()
+    ids = (shipment.id, create_access_token({"sub": user.id}))
+    db.close()
+    engine.dispose()
+    return ids
+
+
+async def drive(port: int, request: bytes, seconds: float, connections: int) -> tuple[int, int]:
+    """Send `request` over keep-alive connections for `seconds`; return (ok, errors)"""
+    deadline = time.monotonic() + seconds
+    counts = [0, 0]
+    
+    async def connection():
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        while time.monotonic() < deadline:
+            writer.write(request)
+            status_line = await reader.readline()
+            length = 0
+            while (line := await reader.readline()) not in (b"\r\n", b""):
+                name, _, value = line.partition(b":")
+                if name.lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            counts[0 if status_line.split()[1] == b"200" else 1] += 1
+        writer.close()
+    
+    await asyncio.gather(*(connection() for _ in range(connections)))
+    return counts[0], counts[1]
+
+
+def wait_for_port(port: int, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return
+        time.sleep(0.1)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--connections", type=int, default=16)
+    parser.add_argument("--stacks", default="legacy,asgi")
+    parser.add_argument("--serve", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--database-url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.serve:
+        serve(args.serve, args.port, args.database_url)
+        return
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/bench.db"
+        shipment_id, token = populate(database_url)
+        requests = {
+            "/health": b"GET /health HTTP/1.1\r\nHost: bench\r\n\r\n",
+            "GET /shipments/{id}": (
+                f"GET /api/v1/shipments/{shipment_id} HTTP/1.1\r\nHost: bench\r\n"
+                f"Authorization: Bearer {token}\r\n\r\n"
+            ).encode(),
+        }
+        
+        for stack in args.stacks.split(","):
+            port = free_port()
+            server = subprocess.Popen(
+                [sys.executable, "-m", "benchmarks.middleware", "--serve", stack,
+                 "--port", str(port), "--database-url", database_url],
+                cwd=BACKEND, env={**os.environ, "DATABASE_URL": database_url}
+            )
+            try:
+                wait_for_port(port)
+                for label, request in requests.items():
+                    asyncio.run(drive(port, request, 1, args.connections))  # Warm-up
+                    ok, errors = asyncio.run(drive(port, request, args.seconds, args.connections))
+                    print(f"  {stack:<7} {label:<22} {ok / args.seconds:>8,.0f} req/s   {errors} errors")
+            finally:
+                server.terminate()
+                server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Streaming report benchmark
+
+Fills a SQLite database with N shipments in one month (spread over routes,
+relay points and travelers), then generates reports with ReportService in a
+fresh process each and reports rows/s and peak RSS. The naive variant loads
+every row with .all() and builds the CSV in memory, as the reports would
+without streaming; it is run on --naive-rows only, since it grows with N.
+Output goes to a LocalStorageClient in a temporary directory.
+
+Usage:
+    python -m benchmarks.reports [--rows 10000000] [--naive-rows 1000000]
+"""
+
+import argparse
+import csv
+import io
+import random
+import resource
+import sys
+import tempfile
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime, timedelta
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+import app.models  # noqa: F401 (register all tables)
+from app.database.database import Base
+from app.models.document_request import DocumentRequest, DocumentType, RequestStatus
+from app.models.relay_point import RelayPoint
+from app.models.trip import Trip
+from app.models.user import User
+from app.services.report_service import SHIPMENT_COLUMNS, ReportService, month_bounds
+from app.utils.local_storage import LocalStorageClient
+
+MONTH = "2026-03"
+INSERT_BATCH = 50_000
+
+
+def populate(url: str, rows: int, travelers: int = 2000, relays: int = 200):
+    """Insert users, trips, relay points and `rows` shipments created in MONTH"""
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+    now = datetime(2026, 3, 1)
+    cities = ["Casablanca", "Rabat", "Marrakech", "Tunis", "Alger", "Dakar", "Abidjan", "Oran"]
+    with engine.begin() as conn:
+        user_ids = [str(uuid.uuid4()) for _ in range(travelers + relays + 1)]
+        conn.execute(insert(User), [
+            {"id": user_id, "email": f"user{i}@example.com", "phone": f"+33{i:09d}", "hashed_password": "x",
+             "first_name": "User", "last_name": str(i), "created_at": now, "updated_at": now}
+            for i, user_id in enumerate(user_ids)
+        ])
+        sender_id, traveler_ids, relay_user_ids = user_ids[0], user_ids[1:travelers + 1], user_ids[travelers + 1:]
+        trips = [(str(uuid.uuid4()), traveler_id) for traveler_id in traveler_ids]
+        conn.execute(insert(Trip), [
+            {"id": trip_id, "traveler_id": traveler_id, "departure_city": "Paris",
+             "destination_city": cities[i % len(cities)], "destination_country": "Africa",
+             "departure_date": date(2026, 3, 15), "created_at": now, "updated_at": now}
+            for i, (trip_id, traveler_id) in enumerate(trips)
+        ])
+        relay_ids = [str(uuid.uuid4()) for _ in relay_user_ids]
+        conn.execute(insert(RelayPoint), [
+            {"id": relay_id, "user_id": user_id, "location_name": f"Relay {i}", "address": "1 Rue",
+             "city": "Paris", "country": "France", "created_at": now, "updated_at": now}
+            for i, (relay_id, user_id) in enumerate(zip(relay_ids, relay_user_ids))
+        ])
+    
+    statuses = list(RequestStatus)
+    rng = random.Random(42)
+    for start in range(0, rows, INSERT_BATCH):
+        batch = []
+        for i in range(start, min(rows, start + INSERT_BATCH)):
+            trip_id, traveler_id = trips[i % len(trips)] if i % 4 else (None, None)
+            batch.append({
+                "id": f"{i:036d}", "sender_id": sender_id, "sender_name": "Sender", "sender_phone": "+33600000000",
+                "source_address": "1 Rue de Paris", "recipient_name": "Recipient", "recipient_phone": "+21260000000",
+                "destination_address": "1 Avenue", "document_type": DocumentType.DIPLOMA, "unique_code": f"D{i:019d}",
+                "delivery_code": "RCV", "traveler_code": "TRV", "status": rng.choice(statuses),
+                "offered_price": str(rng.randint(5, 60)), "trip_id": trip_id, "traveler_id": traveler_id,
+                "relay_point_id": relay_ids[i % len(relay_ids)],
+                "created_at": now + timedelta(seconds=i * 30 * 86400 // rows), "updated_at": now,
+            })
+        with engine.begin() as conn:
+            conn.execute(insert(DocumentRequest), batch)
+    engine.dispose()
+
+
+def naive_report(db, storage) -> int:
+    """Load every row, then build the whole CSV in memory"""
+    start, end = month_bounds(MONTH)
+    shipments = db.query(DocumentRequest).filter(
+        DocumentRequest.created_at >= start, DocumentRequest.created_at < end
+    ).all()
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(SHIPMENT_COLUMNS)
+    for s in shipments:
+        route = f"{s.trip.departure_city} -> {s.trip.destination_city}" if s.trip else "unassigned"
+        writer.writerow([s.id, s.created_at.isoformat(), s.status.value, s.document_type.value, s.sender_id,
+                         s.traveler_id, route, s.relay_point_id, s.offered_price])
+    storage.upload_file(output.getvalue().encode(), "reports/naive.csv", "text/csv")
+    return len(shipments)
+
+
+def run(url: str, storage_root: str, report_type: str) -> tuple[int, float, int]:
+    """Generate one report in this process; return rows, seconds and peak RSS (KiB)"""
+    engine = create_engine(url)
+    db = sessionmaker(bind=engine)()
+    storage = LocalStorageClient(root=storage_root)
+    started = time.perf_counter()
+    if report_type == "naive":
+        rows = naive_report(db, storage)
+    else:
+        rows = ReportService.generate(db, report_type, MONTH, "csv", storage=storage)["rows"]
+    elapsed = time.perf_counter() - started
+    db.close()
+    return rows, elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(url: str, storage_root: str, report_type: str) -> tuple[int, float, int]:
+    # Fresh process per report so peak RSS is its own
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        return pool.submit(run, url, storage_root, report_type).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--naive-rows", type=int, default=1_000_000)
+    parser.add_argument("--reports", default="shipments,by_route,by_traveler")
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for label, rows, report_types in (
+            ("naive", args.naive_rows, ["naive", "shipments"]),
+            ("streaming", args.rows, args.reports.split(",")),
+        ):
+            if rows <= 0:
+                continue
+            url = f"sqlite:///{tmp}/{label}.db"
+            started = time.perf_counter()
+            populate(url, rows)
+            print(f"{rows:,} shipments inserted in {time.perf_counter() - started:.0f}s")
+            for report_type in report_types:
+                count, elapsed, rss = measure(url, tmp, report_type)
+                print(f"  {report_type:<12} {count:>11,} rows  {count / elapsed:>9,.0f} rows/s  "
+                      f"{elapsed:7.1f} s   peak RSS {rss / 1024:7.1f} MiB")
+            Path(f"{tmp}/{label}.db").unlink()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+API server benchmark
+
+Starts the API the previous way and with app.server on a local port and
+compares:
+
+- before: the gunicorn command entrypoint.sh ran (no preload, loop and
+  parser picked by uvicorn, access log and debug logging to stdout) with
+  `--before-workers` workers (the previous fixed API_WORKERS=4)
+- after: `python -m app.server` (preload + gc.freeze, uvloop, httptools)
+  with `--workers` workers (default 0: one per CPU of the cgroup quota)
+
+For each, `--clients` keep-alive connections send GET /health/live (the
+whole middleware stack, no dependencies) for `--seconds`, then reports
+requests/s and, per worker, RSS, PSS (shared pages split between the
+processes sharing them) and private memory from /proc/<pid>/smaps_rollup,
+and the PSS of the whole server (master + workers).
+Dependency checks are disabled so only request handling is measured.
+
+Usage:
+    python -m benchmarks.server [--workers 0] [--before-workers 4] [--clients 32] [--seconds 10]
+"""
+
+import argparse
+import asyncio
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import httpx
+
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+COMMANDS = {
+    "before": lambda workers, port: [
+        sys.executable, "-m", "gunicorn", "app.main:app",
+        "--worker-class", "uvicorn.workers.UvicornWorker",
+        "--workers", str(workers), "--bind", f"127.0.0.1:{port}",
+        "--access-logfile", "-", "--error-logfile", "-", "--log-level", "debug",
+    ],
+    "after": lambda workers, port: [sys.executable, "-m", "app.server"],
+}
+
+
+def memory_kb(pid: int) -> dict:
+    """Rss, Pss and private kB of a process"""
+    fields = {}
+    for line in Path(f"/proc/{pid}/smaps_rollup").read_text().splitlines()[1:]:
+        name, value = line.split(":")
+        fields[name] = int(value.split()[0])
+    return {"rss": fields["Rss"], "pss": fields["Pss"], "private": fields["Private_Clean"] + fields["Private_Dirty"]}
+
+
+def worker_pids(master: int) -> list:
+    return [int(pid) for pid in Path(f"/proc/{master}/task/{master}/children").read_text().split()]
+
+
+async def wait_until_up(url: str, timeout: float = 30) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as http:
+        while time.monotonic() < deadline:
+            try:
+                if (await http.get(url)).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"server did not answer on {url}")
+
+
+async def load(url: str, clients: int, seconds: float) -> int:
+    """Requests completed by `clients` keep-alive connections in `seconds`"""
+    limits = httpx.Limits(max_connections=clients, max_keepalive_connections=clients)
+    async with httpx.AsyncClient(limits=limits) as http:
+        deadline = time.monotonic() + seconds
+        
+        async def client():
+            done = 0
+            while time.monotonic() < deadline:
+                (await http.get(url)).raise_for_status()
+                done += 1
+            return done
+        
+        return sum(await asyncio.gather(*(client() for _ in range(clients))))
+
+
+def run(name: str, workers: int, clients: int, seconds: float, port: int) -> dict:
+    env = {
+        **os.environ, "PORT": str(port), "HOST": "127.0.0.1", "API_WORKERS": str(workers),
+        "HEALTH_CHECK_INTERVAL_SECONDS": "0", "DEBUG": "false",
+    }
+    env.pop("PROMETHEUS_MULTIPROC_DIR", None)
+    server = subprocess.Popen(
+        COMMANDS[name](workers, port), cwd=BACKEND, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    url = f"http://127.0.0.1:{port}/health/live"
+    try:
+        asyncio.run(wait_until_up(url))
+        time.sleep(1)  # Let every worker finish booting
+        idle = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        started = time.perf_counter()
+        requests = asyncio.run(load(url, clients, seconds))
+        elapsed = time.perf_counter() - started
+        loaded = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        total = memory_kb(server.pid)["pss"] + sum(sample["pss"] for sample in loaded)
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(30)
+    return {"rps": requests / elapsed, "idle": idle, "loaded": loaded, "total_pss": total}
+
+
+def average(samples: list, field: str) -> float:
+    return sum(sample[field] for sample in samples) / len(samples) / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=0, help="app.server workers (0 = from the CPU quota)")
+    parser.add_argument("--before-workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+    
+    print(f"{args.clients} clients, {args.seconds:.0f}s of GET /health/live")
+    print(
+        f"  {'server':<8} {'workers':>7} {'req/s':>8} {'total PSS':>10}"
+        f" {'RSS MiB':>8} {'PSS MiB':>8} {'private':>8}   per worker"
+    )
+    for name, workers in (("before", args.before_workers), ("after", args.workers)):
+        result = run(name, workers, args.clients, args.seconds, args.port)
+        idle, loaded = result["idle"], result["loaded"]
+        print(
+            f"  {name:<8} {len(loaded):>7} {result['rps']:>8.0f} {result['total_pss'] / 1024:>10.1f}"
+            f" {average(idle, 'rss'):>8.1f} {average(idle, 'pss'):>8.1f} {average(idle, 'private'):>8.1f}   idle"
+        )
+        print(
+            f"  {'':<8} {'':>7} {'':>8} {'':>10}"
+            f" {average(loaded, 'rss'):>8.1f} {average(loaded, 'pss'):>8.1f} {average(loaded, 'private'):>8.1f}   after load"
+        )
+
+
+if __name__ == "__main__":
+    main()
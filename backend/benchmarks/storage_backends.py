@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Storage backend benchmark
+
+Runs the same StorageClient operations against the MinIO backend configured
+in .env and against the local filesystem backend (in a temp directory) for
+KYC-image-sized objects: upload, stat, full streamed read, 64 KiB range read
+and delete. Reports operations per second for each.
+
+Usage:
+    python -m benchmarks.storage_backends [--sizes-kb 200,2048,8192] [--objects 50]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.utils.local_storage import LocalStorageClient
+from app.utils.storage import StorageClient
+
+
+RANGE_SIZE = 64 * 1024
+
+
+def run_backend(client, data: bytes, objects: int) -> dict:
+    """Time each operation over a batch of objects; return ops/second"""
+    names = [f"benchmarks/{uuid.uuid4()}/front.jpg" for _ in range(objects)]
+    middle = max(len(data) // 2 - RANGE_SIZE, 0)
+    operations = {
+        "upload": lambda name: client.upload_file(data, name, "image/jpeg"),
+        "stat": lambda name: client.stat_file(name),
+        "read": lambda name: sum(len(chunk) for chunk in client.stream_file(name)),
+        "range": lambda name: sum(len(chunk) for chunk in client.stream_file(name, offset=middle, length=RANGE_SIZE)),
+        "delete": lambda name: client.delete_file(name),
+    }
+    results = {}
+    for label, operation in operations.items():
+        started = time.perf_counter()
+        for name in names:
+            operation(name)
+        results[label] = objects / (time.perf_counter() - started)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes-kb", default="200,2048,8192", help="comma separated object sizes")
+    parser.add_argument("--objects", type=int, default=50)
+    args = parser.parse_args()
+    
+    with tempfile.TemporaryDirectory() as root:
+        backends = {"minio": StorageClient(), "local": LocalStorageClient(root=root)}
+        print(f"{'size':>8} {'backend':<7}" + "".join(f"{op:>12}" for op in ("upload/s", "stat/s", "read/s", "range/s", "delete/s")))
+        for size_kb in (int(size) for size in args.sizes_kb.split(",")):
+            data = os.urandom(size_kb * 1024)
+            for label, client in backends.items():
+                results = run_backend(client, data, args.objects)
+                print(f"{size_kb:>6}KB {label:<7}" + "".join(f"{value:>12.0f}" for value in results.values()))
+
+
+if __name__ == "__main__":
+    main()
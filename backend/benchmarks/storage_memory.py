@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Storage memory benchmark
+
+Uploads and downloads one object of MAX_UPLOAD_SIZE_MB through the buffered
+StorageClient API (bytes in, bytes out) and through the streaming API
+(file-like / async iterator in, chunked generator out), and reports the
+peak Python heap allocation of each path.
+
+Needs the storage configured in .env (e.g. MinIO from docker-compose).
+
+Usage:
+    python -m benchmarks.storage_memory [--size-mb 10] [--runs 3]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.core.config import settings
+from app.utils.storage import DEFAULT_CHUNK_SIZE, storage_client
+
+
+MB = 1024 * 1024
+
+
+def measure(label: str, func, runs: int):
+    """Run func and report best wall time and worst peak allocation"""
+    peaks, times = [], []
+    for _ in range(runs):
+        tracemalloc.start()
+        started = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - started)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    print(f"{label:<34} peak {max(peaks) / MB:8.2f} MiB   best {min(times) * 1000:8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=settings.MAX_UPLOAD_SIZE_MB)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    
+    with tempfile.NamedTemporaryFile() as source:
+        source.write(os.urandom(args.size_mb * MB))
+        source.flush()
+        object_name = f"benchmarks/{uuid.uuid4()}.bin"
+        print(f"Object size: {args.size_mb} MiB, runs: {args.runs}\n")
+        
+        def buffered_upload():
+            with open(source.name, "rb") as f:
+                storage_client.upload_file(f.read(), object_name)
+        
+        def buffered_download():
+            assert len(storage_client.download_file(object_name)) == args.size_mb * MB
+        
+        def streaming_upload():
+            with open(source.name, "rb") as f:
+                storage_client.upload_stream(f, object_name, length=os.fstat(f.fileno()).st_size)
+        
+        def async_iter_upload():
+            async def chunks():
+                with open(source.name, "rb") as f:
+                    while chunk := f.read(DEFAULT_CHUNK_SIZE):
+                        yield chunk
+            
+            asyncio.run(storage_client.upload_async_iter(chunks(), object_name))
+        
+        def streaming_download():
+            total = 0
+            for chunk in storage_client.stream_file(object_name):
+                total += len(chunk)
+            assert total == args.size_mb * MB
+        
+        measure("upload_file(bytes)", buffered_upload, args.runs)
+        measure("download_file() -> bytes", buffered_download, args.runs)
+        measure("upload_stream(file)", streaming_upload, args.runs)
+        measure("upload_async_iter(async gen)", async_iter_upload, args.runs)
+        measure("stream_file() chunks", streaming_download, args.runs)
+        
+        storage_client.delete_file(object_name)
+
+
+if __name__ == "__main__":
+    main()
@@ -9,5 +9,34 @@ done
 
 echo "Redis is up - starting Celery worker"
 
+# Scheduler for the periodic maintenance jobs (run exactly one)
+if [ "$CELERY_WORKER_POOL" = "beat" ]; then
+  exec celery -A app.workers.celery_app beat --loglevel=info --schedule /tmp/celerybeat-schedule
+fi
+
+# Worker pool: which queues it consumes and how many messages it reserves.
+# Short transactional tasks prefetch a few; long fan-out, maintenance sweeps,
+# media and report tasks take one at a time so they never sit behind a busy
+# process.
+case "${CELERY_WORKER_POOL:-all}" in
+  transactional)
+    QUEUES="transactional,default"; CONCURRENCY="${CELERY_CONCURRENCY:-8}"; PREFETCH=4 ;;
+  bulk)
+    QUEUES="bulk,maintenance"; CONCURRENCY="${CELERY_CONCURRENCY:-2}"; PREFETCH=1 ;;
+  media)
+    QUEUES="media"; CONCURRENCY="${CELERY_CONCURRENCY:-2}"; PREFETCH=1 ;;
+  reports)
+    QUEUES="reports"; CONCURRENCY="${CELERY_CONCURRENCY:-1}"; PREFETCH=1 ;;
+  *)
+    QUEUES="transactional,bulk,media,reports,maintenance,default"; CONCURRENCY="${CELERY_CONCURRENCY:-4}"; PREFETCH=1 ;;
+esac
+
+# Pool processes share metrics through this directory (see app.core.metrics)
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 # Start Celery worker
-exec celery -A app.workers.celery_app worker --loglevel=info
+exec celery -A app.workers.celery_app worker --loglevel=info \
+  -Q "$QUEUES" -c "$CONCURRENCY" --prefetch-multiplier "$PREFETCH" -O fair \
+  -n "${CELERY_WORKER_POOL:-all}@%h"
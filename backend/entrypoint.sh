@@ -13,12 +13,11 @@ echo "PostgreSQL is up - executing command"
 echo "Running database migrations..."
 alembic upgrade head 2>&1 || echo "Migrations skipped or failed - continuing anyway"
 
-# Start Gunicorn with Uvicorn workers
+# Metrics from all Gunicorn workers are merged through this directory;
+# files left by a previous run would be counted again
+export PROMETHEUS_MULTIPROC_DIR="${PROMETHEUS_MULTIPROC_DIR:-/tmp/prometheus}"
+rm -rf "$PROMETHEUS_MULTIPROC_DIR" && mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+
+# Gunicorn with Uvicorn workers; workers, preload and timeouts are set in app/server.py
 echo "Starting Gunicorn server..."
-exec gunicorn app.main:app \
-    --workers 4 \
-    --worker-class uvicorn.workers.UvicornWorker \
-    --bind 0.0.0.0:8000 \
-    --access-logfile - \
-    --error-logfile - \
-    --log-level debug
+exec python -m app.server
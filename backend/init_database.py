@@ -37,6 +37,8 @@ from app.models.kyc_document import KYCDocument, DocumentTypeKYC
 from app.models.payment import Payment, PaymentStatus, PaymentMethod
 from app.models.message import Conversation, Message
 from app.models.security_log import SecurityLog
+from app.models.notification import Notification
+from app.models.outbox_event import OutboxEvent
 
 
 def print_banner():
@@ -67,7 +69,7 @@ def check_database_connection():
 
 def get_existing_tables():
     """Get list of existing tables in database"""
-    inspector = inspect(engine)
+    inspector = inspect(engine.resolve())
     return inspector.get_table_names()
 
 
@@ -75,7 +77,7 @@ def drop_all_tables():
     """Drop all existing tables (use with caution!)"""
     print("\n⚠️  Dropping all existing tables...")
     try:
-        Base.metadata.drop_all(bind=engine)
+        Base.metadata.drop_all(bind=engine.resolve())
         print("✅ All tables dropped successfully")
         return True
     except SQLAlchemyError as e:
@@ -87,7 +89,7 @@ def create_all_tables():
     """Create all tables defined in models"""
     print("\n🏗️  Creating database tables...")
     try:
-        Base.metadata.create_all(bind=engine)
+        Base.metadata.create_all(bind=engine.resolve())
         print("✅ All tables created successfully")
         return True
     except SQLAlchemyError as e:
@@ -110,7 +112,9 @@ def verify_tables():
         'payments',
         'conversations',
         'messages',
-        'security_logs'
+        'security_logs',
+        'notifications',
+        'outbox_events'
     ]
     
     existing_tables = get_existing_tables()
@@ -135,7 +139,7 @@ def show_table_details():
     print("\n📋 Table Details:")
     print("-" * 70)
     
-    inspector = inspect(engine)
+    inspector = inspect(engine.resolve())
     tables = inspector.get_table_names()
     
     for table_name in sorted(tables):
@@ -303,7 +307,7 @@ def create_sample_data():
         print("   Relay:    relay@example.com / relay123")
         
         return True
-        
+    
     except SQLAlchemyError as e:
         print(f"❌ Failed to create sample data: {str(e)}")
         db.rollback()
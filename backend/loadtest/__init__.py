@@ -0,0 +1,8 @@
+"""
+Load-test harness for the delivery workflow
+
+Drives register/login, shipment creation, assignment, relay point check-in
+and handoff, delivery and timeline polling concurrently against a running
+API, and reports per-step latency percentiles, throughput and error rates
+as JSON, checked against SLOs. See loadtest/README.md.
+"""
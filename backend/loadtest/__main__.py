@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Load test of the delivery workflow
+
+Creates travelers (with trips), a relay point operator and returning
+senders, then starts journeys as a Poisson process at --rate per second
+for --duration seconds, drawn from --mix:
+
+- new_sender: register, login, create a shipment, assign it to a traveler,
+  relay point check-in, handoff, delivery, polling the timeline throughout
+- returning_sender: the same after logging in to an existing account
+- tracking: login, list shipments, poll a delivered shipment's timeline
+
+Writes a JSON report (p50/p95/p99 per step, throughput, errors) to --output
+or stdout and exits with status 1 when an SLO is missed (loadtest.slo),
+so a CI job can gate on it.
+
+The stack must share this checkout's DATABASE_URL: trips are inserted
+directly, as the API has no endpoint for them.
+
+Usage:
+    python -m loadtest [--url http://localhost:8000] [--mix default] [--rate 5] [--duration 60]
+                       [--slo slo.json] [--baseline previous.json] [--output report.json]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from loadtest import slo
+from loadtest.runner import run
+from loadtest.workflow import MIXES, parse_mix
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--mix", default="default", help=f"{', '.join(MIXES)} or journey=weight,...")
+    parser.add_argument("--rate", type=float, default=5, help="journeys started per second")
+    parser.add_argument("--duration", type=float, default=60, help="seconds of arrivals")
+    parser.add_argument("--ramp", type=float, default=0, help="seconds over which the rate climbs to --rate")
+    parser.add_argument("--think", type=float, default=0.5, help="mean seconds a user waits between steps")
+    parser.add_argument("--max-active", type=int, default=500, help="journeys in flight before arrivals are dropped")
+    parser.add_argument("--travelers", type=int, default=20)
+    parser.add_argument("--senders", type=int, default=20, help="returning sender accounts")
+    parser.add_argument("--timeout", type=float, default=10, help="seconds before a request counts as timed out")
+    parser.add_argument("--slo", help="JSON file overriding the default SLOs")
+    parser.add_argument("--baseline", help="earlier report: p95/p99 regressions beyond --tolerance fail the run")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    parser.add_argument("--output", help="report file (default: stdout)")
+    args = parser.parse_args()
+    
+    report = asyncio.run(run(
+        args.url, parse_mix(args.mix), args.rate, args.duration, ramp=args.ramp, max_active=args.max_active,
+        travelers=args.travelers, senders=args.senders, think_seconds=args.think, timeout=args.timeout
+    ))
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+    violations = slo.check(report, slo.load_slos(args.slo), baseline, args.tolerance)
+    report["slo"] = {"passed": not violations, "violations": violations}
+    
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + "\n")
+    else:
+        print(output)
+    for violation in violations:
+        print(f"SLO missed: {violation}", file=sys.stderr)
+    sys.exit(1 if violations else 0)
+
+
+if __name__ == "__main__":
+    main()
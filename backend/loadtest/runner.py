@@ -0,0 +1,145 @@
+"""Open-loop arrivals of journeys, and the JSON report of what they measured"""
+import asyncio
+import math
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional
+
+import httpx
+
+from loadtest.workflow import JOURNEYS, StepError, populate
+
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of sorted values"""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered), max(1, math.ceil(q / 100 * len(ordered)))) - 1]
+
+
+class Recorder:
+    """Latency and outcome of every request, per step, and of every journey"""
+    
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, Counter] = defaultdict(Counter)
+        self.journeys: Dict[str, Counter] = defaultdict(Counter)
+        self.failures: Counter = Counter()
+    
+    def record(self, step: str, seconds: float, error: Optional[str] = None) -> None:
+        """error: None on success, else the status code or "timeout"/"connection" """
+        self.latencies[step].append(seconds)
+        if error:
+            self.errors[step][error] += 1
+    
+    def journey(self, name: str, outcome: str, failed_step: Optional[str] = None) -> None:
+        """outcome: completed, failed (at failed_step) or dropped (too many journeys active)"""
+        self.journeys[name][outcome] += 1
+        if failed_step:
+            self.failures[f"{name}.{failed_step}"] += 1
+    
+    def report(self, elapsed: float) -> dict:
+        steps = {}
+        for step, latencies in self.latencies.items():
+            ordered = sorted(latencies)
+            errors = sum(self.errors[step].values())
+            steps[step] = {
+                "requests": len(ordered),
+                "errors": errors,
+                "error_rate": round(errors / len(ordered), 4),
+                "errors_by_kind": dict(self.errors[step]),
+                "throughput_rps": round(len(ordered) / elapsed, 2),
+                **{f"p{q}_ms": round(percentile(ordered, q) * 1000, 1) for q in (50, 95, 99)},
+                "max_ms": round(ordered[-1] * 1000, 1),
+            }
+        requests = sum(step["requests"] for step in steps.values())
+        errors = sum(step["errors"] for step in steps.values())
+        completed = sum(outcomes["completed"] for outcomes in self.journeys.values())
+        return {
+            "elapsed_seconds": round(elapsed, 2),
+            "requests": requests,
+            "errors": errors,
+            "error_rate": round(errors / requests, 4) if requests else 0.0,
+            "throughput_rps": round(requests / elapsed, 2),
+            "journeys_per_second": round(completed / elapsed, 2),
+            "journeys": {name: dict(outcomes) for name, outcomes in self.journeys.items()},
+            "journey_failures": dict(self.failures),
+            "steps": steps,
+        }
+
+
+async def run(
+    base_url: str,
+    mix: Dict[str, float],
+    rate: float,
+    duration: float,
+    ramp: float = 0.0,
+    max_active: int = 500,
+    travelers: int = 20,
+    senders: int = 20,
+    think_seconds: float = 0.0,
+    timeout: float = 10.0,
+    session_factory: Optional[Callable] = None,
+    transport: Optional[httpx.AsyncBaseTransport] = None,
+) -> dict:
+    """
+    Start journeys as a Poisson process at `rate` per second for `duration` seconds
+    
+    The rate climbs linearly over the first `ramp` seconds. Arrivals are
+    open-loop: they do not wait for earlier journeys, so a slow server
+    builds a backlog the way real users would; an arrival finding
+    `max_active` journeys running is dropped and reported. Each journey
+    is drawn from `mix`, and waits about `think_seconds` between steps.
+    Accounts are created first (not measured).
+    """
+    if session_factory is None:
+        from app.database.database import SessionLocal
+        session_factory = SessionLocal
+    recorder = Recorder()
+    limits = httpx.Limits(max_connections=max_active, max_keepalive_connections=max_active)
+    async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as http:
+        population = await populate(http, Recorder().record, travelers, max(1, senders), session_factory)
+        population.measure(recorder.record)
+        names, weights = list(mix), list(mix.values())
+        active: set = set()
+        
+        async def think():
+            if think_seconds > 0:
+                await asyncio.sleep(random.expovariate(1 / think_seconds))
+        
+        async def journey(name: str):
+            try:
+                await JOURNEYS[name](population, http, recorder.record, think)
+            except StepError as e:
+                recorder.journey(name, "failed", e.step)
+            except Exception as e:  # An answer of the wrong shape: a failure, not a crash of the run
+                recorder.journey(name, "failed", type(e).__name__)
+            else:
+                recorder.journey(name, "completed")
+        
+        started = time.monotonic()
+        while True:
+            # Thinning: candidate arrivals at the full rate, kept in proportion to the ramp
+            await asyncio.sleep(random.expovariate(rate))
+            now = time.monotonic() - started
+            if now >= duration:
+                break
+            if ramp > 0 and random.random() > now / ramp:
+                continue
+            name = random.choices(names, weights)[0]
+            if len(active) >= max_active:
+                recorder.journey(name, "dropped")
+                continue
+            task = asyncio.create_task(journey(name))
+            active.add(task)
+            task.add_done_callback(active.discard)
+        if active:
+            await asyncio.wait(active)
+        elapsed = time.monotonic() - started
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "base_url": base_url, "mix": mix, "rate": rate, "duration": duration, "ramp": ramp,
+        "max_active": max_active, "travelers": travelers, "senders": senders, "think_seconds": think_seconds,
+    }
+    return report
@@ -0,0 +1,80 @@
+"""Service level objectives a load-test report is checked against"""
+import json
+from typing import List, Optional
+
+from app.utils.concurrency import route_class
+from loadtest.workflow import STEP_ROUTES
+
+
+# Share of failed requests allowed, overall and per step
+MAX_ERROR_RATE = 0.01
+# Share of journeys allowed to be dropped by the load generator itself
+MAX_DROPPED_RATE = 0.0
+# Smallest latency increase over a baseline counted as a regression (timer noise on fast steps)
+MIN_REGRESSION_MS = 10.0
+
+
+def default_slos() -> dict:
+    """
+    Baseline objectives: each step's p95 within its route class's objective
+    (the latency admission control defends, app.utils.concurrency) and at
+    most MAX_ERROR_RATE errors
+    """
+    return {
+        "error_rate": MAX_ERROR_RATE,
+        "dropped_rate": MAX_DROPPED_RATE,
+        "steps": {
+            step: {"p95_ms": route_class(method, path).slo_p95 * 1000, "error_rate": MAX_ERROR_RATE}
+            for step, (method, path) in STEP_ROUTES.items()
+        },
+    }
+
+
+def load_slos(path: Optional[str]) -> dict:
+    """Default SLOs, with those of a JSON file (same shape, partial) on top"""
+    slos = default_slos()
+    if path:
+        with open(path) as f:
+            overrides = json.load(f)
+        for step, objectives in overrides.pop("steps", {}).items():
+            slos["steps"].setdefault(step, {}).update(objectives)
+        slos.update(overrides)
+    return slos
+
+
+def check(report: dict, slos: dict, baseline: Optional[dict] = None, tolerance: float = 0.2) -> List[str]:
+    """
+    Violations of the SLOs by a report (empty when it passes)
+    
+    With a baseline report, a step's p95 or p99 more than `tolerance` (and
+    MIN_REGRESSION_MS) above the baseline's is a regression, even within
+    its objective.
+    """
+    violations = []
+    if report["error_rate"] > slos["error_rate"]:
+        violations.append(f"error rate {report['error_rate']:.2%} > {slos['error_rate']:.2%}")
+    dropped = sum(outcomes.get("dropped", 0) for outcomes in report["journeys"].values())
+    started = sum(sum(outcomes.values()) for outcomes in report["journeys"].values())
+    if started and dropped / started > slos["dropped_rate"]:
+        violations.append(f"{dropped} of {started} journeys dropped by the load generator (raise --max-active)")
+    for step, objectives in slos["steps"].items():
+        measured = report["steps"].get(step)
+        if measured is None:
+            continue
+        if "p95_ms" in objectives and measured["p95_ms"] > objectives["p95_ms"]:
+            violations.append(f"{step}: p95 {measured['p95_ms']:.0f} ms > {objectives['p95_ms']:.0f} ms")
+        if "p99_ms" in objectives and measured["p99_ms"] > objectives["p99_ms"]:
+            violations.append(f"{step}: p99 {measured['p99_ms']:.0f} ms > {objectives['p99_ms']:.0f} ms")
+        if "error_rate" in objectives and measured["error_rate"] > objectives["error_rate"]:
+            violations.append(f"{step}: error rate {measured['error_rate']:.2%} > {objectives['error_rate']:.2%}")
+    for step, previous in (baseline or {}).get("steps", {}).items():
+        measured = report["steps"].get(step)
+        if measured is None:
+            continue
+        for key in ("p95_ms", "p99_ms"):
+            if measured[key] > max(previous[key] * (1 + tolerance), previous[key] + MIN_REGRESSION_MS):
+                violations.append(
+                    f"{step}: {key[:3]} {measured[key]:.0f} ms regressed more than {tolerance:.0%}"
+                    f" from {previous[key]:.0f} ms"
+                )
+    return violations
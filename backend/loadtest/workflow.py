@@ -0,0 +1,278 @@
+"""Virtual users and the journeys they run through the delivery workflow"""
+import asyncio
+import itertools
+import random
+import time
+import uuid
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.models.trip import Trip
+
+
+API = "/api/v1"
+PASSWORD = "loadtest-password"
+
+# Step: (method, path) of its route, for route classes and default SLOs (see loadtest.slo)
+STEP_ROUTES: Dict[str, Tuple[str, str]] = {
+    "register": ("POST", "/api/v1/auth/register"),
+    "login": ("POST", "/api/v1/auth/login"),
+    "create_shipment": ("POST", "/api/v1/shipments"),
+    "assign": ("POST", "/api/v1/shipments/{id}/assign-traveler"),
+    "check_in": ("POST", "/api/v1/relay-points/check-in"),
+    "handoff": ("POST", "/api/v1/relay-points/handoff"),
+    "deliver": ("POST", "/api/v1/travelers/deliver"),
+    "timeline": ("GET", "/api/v1/shipments/{id}/timeline"),
+    "list_shipments": ("GET", "/api/v1/shipments"),
+}
+
+# Run-unique phone prefix: repeated runs against one database do not collide
+_RUN = random.Random().randrange(10**5)
+_numbers = itertools.count(1)
+
+
+class StepError(Exception):
+    """A step got an unexpected answer, so the journey cannot go on"""
+    
+    def __init__(self, step: str, detail: str):
+        super().__init__(f"{step}: {detail}")
+        self.step = step
+
+
+class VirtualUser:
+    """
+    One client of the API: an account, its token and its own address
+    
+    Requests carry a distinct X-Forwarded-For per user. The API only
+    honours it from TRUSTED_PROXIES, so per-IP rate limits apply per user
+    when the generator connects from a trusted address; through nginx the
+    whole run shares one address (see README).
+    """
+    
+    def __init__(self, http: httpx.AsyncClient, record: Callable, user_type: str, phone: Optional[str] = None):
+        number = next(_numbers)
+        self.http = http
+        self.record = record
+        self.user_type = user_type
+        self.phone = phone or f"+33{_RUN:05d}{number:07d}"
+        self.id: Optional[str] = None
+        self.headers = {"X-Forwarded-For": f"10.{number >> 16 & 255}.{number >> 8 & 255}.{number & 255}"}
+    
+    async def request(self, step: str, method: str, path: str, expect: int = 200, **kwargs) -> dict:
+        """Send one request, record its latency and outcome under step; StepError unless it got `expect`"""
+        started = time.perf_counter()
+        try:
+            response = await self.http.request(method, API + path, headers=self.headers, **kwargs)
+        except httpx.TimeoutException:
+            self.record(step, time.perf_counter() - started, "timeout")
+            raise StepError(step, "timed out")
+        except httpx.TransportError as e:
+            self.record(step, time.perf_counter() - started, "connection")
+            raise StepError(step, type(e).__name__)
+        self.record(step, time.perf_counter() - started, None if response.status_code == expect else str(response.status_code))
+        if response.status_code != expect:
+            raise StepError(step, f"{response.status_code} {response.text[:200]}")
+        return response.json()
+    
+    async def register(self) -> None:
+        user = await self.request("register", "POST", "/auth/register", expect=201, json={
+            "phone": self.phone,
+            "password": PASSWORD,
+            "first_name": "Load",
+            "last_name": f"Test {self.user_type}",
+            "user_type": self.user_type,
+        })
+        self.id = user["id"]
+    
+    async def login(self) -> None:
+        tokens = await self.request("login", "POST", "/auth/login", json={"identifier": self.phone, "password": PASSWORD})
+        self.headers["Authorization"] = f"Bearer {tokens['access_token']}"
+    
+    async def timeline(self, shipment_id: str) -> dict:
+        return await self.request("timeline", "GET", f"/shipments/{shipment_id}/timeline")
+
+
+@dataclass
+class Population:
+    """Accounts shared by journeys, created before the measured run"""
+    # Traveler and the trip shipments are assigned to
+    travelers: List[Tuple[VirtualUser, str]] = field(default_factory=list)
+    relay: Optional[VirtualUser] = None
+    # Phone and id of senders returning for another shipment
+    senders: List[Tuple[str, str]] = field(default_factory=list)
+    # Sender phone and id, shipment id: delivered shipments senders track
+    shipments: List[Tuple[str, str, str]] = field(default_factory=list)
+    
+    def measure(self, record: Callable) -> None:
+        """Record the requests of the shared accounts from now on (account creation is not measured)"""
+        for user in [self.relay, *(traveler for traveler, _ in self.travelers)]:
+            user.record = record
+
+
+def seed_trips(traveler_ids: List[str], session_factory: Callable) -> List[str]:
+    """One upcoming trip per traveler (the API has no trip endpoint); returns their ids"""
+    trips = [
+        Trip(
+            id=str(uuid.uuid4()),
+            traveler_id=traveler_id,
+            departure_city="Paris",
+            departure_date=date.today() + timedelta(days=7),
+            destination_city="Casablanca",
+            destination_country="Morocco",
+            spots_available=10**6,
+        )
+        for traveler_id in traveler_ids
+    ]
+    ids = [trip.id for trip in trips]
+    session = session_factory()
+    try:
+        session.add_all(trips)
+        session.commit()
+    finally:
+        session.close()
+    return ids
+
+
+async def populate(
+    http: httpx.AsyncClient,
+    record: Callable,
+    travelers: int,
+    senders: int,
+    session_factory: Callable,
+    concurrency: int = 8
+) -> Population:
+    """Register and log in the travelers (with trips), a relay point operator and returning senders"""
+    limit = asyncio.Semaphore(concurrency)
+    
+    async def account(user_type: str) -> VirtualUser:
+        async with limit:
+            user = VirtualUser(http, record, user_type)
+            await user.register()
+            await user.login()
+            return user
+    
+    users = await asyncio.gather(
+        *(account("traveler") for _ in range(travelers)),
+        account("relay_point"),
+        *(account("sender") for _ in range(senders)),
+    )
+    trips = await asyncio.to_thread(seed_trips, [user.id for user in users[:travelers]], session_factory)
+    return Population(
+        travelers=list(zip(users[:travelers], trips)),
+        relay=users[travelers],
+        senders=[(user.phone, user.id) for user in users[travelers + 1:]],
+    )
+
+
+def shipment_payload(sender: VirtualUser) -> dict:
+    return {
+        "sender_name": "Load Test",
+        "sender_phone": sender.phone,
+        "source_address": "123 Rue de Paris, 75001 Paris, France",
+        "recipient_name": "Load Recipient",
+        "recipient_phone": "+212612345678",
+        "destination_address": "456 Avenue Mohammed V, Casablanca, Morocco",
+        "document_type": "official_document",
+        "offered_price": "25",
+    }
+
+
+async def deliver_shipment(population: Population, sender: VirtualUser, think: Callable[[], Awaitable]) -> None:
+    """Create, assign, check in, hand off and deliver one shipment; the sender follows its timeline"""
+    shipment = await sender.request("create_shipment", "POST", "/shipments", expect=201, json=shipment_payload(sender))
+    shipment_id, codes = shipment["id"], shipment["codes"]
+    traveler, trip_id = random.choice(population.travelers)
+    relay_point_id = shipment["relay_point_id"] or "loadtest-relay-point"
+    await think()
+    await sender.request(
+        "assign", "POST", f"/shipments/{shipment_id}/assign-traveler",
+        params={"traveler_id": traveler.id, "trip_id": trip_id}
+    )
+    await sender.timeline(shipment_id)
+    await think()
+    await population.relay.request("check_in", "POST", "/relay-points/check-in", json={
+        "shipment_id": shipment_id, "unique_code": codes["unique_code"], "relay_point_id": relay_point_id
+    })
+    await sender.timeline(shipment_id)
+    await think()
+    await population.relay.request("handoff", "POST", "/relay-points/handoff", json={
+        "shipment_id": shipment_id, "traveler_code": codes["traveler_code"], "relay_point_id": relay_point_id
+    })
+    await sender.timeline(shipment_id)
+    await think()
+    await traveler.request("deliver", "POST", "/travelers/deliver", json={
+        "shipment_id": shipment_id, "delivery_code": codes["delivery_code"]
+    })
+    timeline = await sender.timeline(shipment_id)
+    if timeline["current_status"] != "delivered":
+        raise StepError("timeline", f"shipment {shipment_id} is {timeline['current_status']} after delivery")
+    population.shipments.append((sender.phone, sender.id, shipment_id))
+
+
+async def new_sender(population: Population, http: httpx.AsyncClient, record: Callable, think) -> None:
+    """A first-time sender signs up and sends a document"""
+    sender = VirtualUser(http, record, "sender")
+    await sender.register()
+    await sender.login()
+    await deliver_shipment(population, sender, think)
+
+
+async def returning_sender(population: Population, http: httpx.AsyncClient, record: Callable, think) -> None:
+    """A registered sender logs in and sends another document"""
+    phone, user_id = random.choice(population.senders)
+    sender = VirtualUser(http, record, "sender", phone)
+    sender.id = user_id
+    await sender.login()
+    await deliver_shipment(population, sender, think)
+
+
+async def tracking(population: Population, http: httpx.AsyncClient, record: Callable, think, polls: int = 3) -> None:
+    """A sender logs in, lists their shipments and polls one timeline"""
+    if population.shipments:
+        phone, user_id, shipment_id = random.choice(population.shipments)
+    else:
+        (phone, user_id), shipment_id = random.choice(population.senders), None
+    sender = VirtualUser(http, record, "sender", phone)
+    sender.id = user_id
+    await sender.login()
+    await sender.request("list_shipments", "GET", "/shipments", params={"page_size": 20})
+    for _ in range(polls if shipment_id else 0):
+        await think()
+        await sender.timeline(shipment_id)
+
+
+JOURNEYS = {
+    "new_sender": new_sender,
+    "returning_sender": returning_sender,
+    "tracking": tracking,
+}
+
+# Named user mixes: share of arrivals running each journey
+MIXES: Dict[str, Dict[str, float]] = {
+    # Steady state: most traffic follows existing shipments
+    "default": {"new_sender": 0.2, "returning_sender": 0.3, "tracking": 0.5},
+    # Signup campaign: registration (password hashing) dominates
+    "onboarding": {"new_sender": 0.7, "returning_sender": 0.1, "tracking": 0.2},
+    # Workflow writes only, the admission controller's highest class
+    "deliveries": {"new_sender": 0.2, "returning_sender": 0.8},
+}
+
+
+def parse_mix(value: str) -> Dict[str, float]:
+    """A named mix or "journey=weight,..." (weights are normalized)"""
+    if value in MIXES:
+        mix = MIXES[value]
+    else:
+        mix = {}
+        for entry in value.split(","):
+            name, _, weight = entry.strip().partition("=")
+            if name not in JOURNEYS:
+                raise ValueError(f"Unknown journey {name!r} (one of {', '.join(JOURNEYS)})")
+            mix[name] = float(weight or 1)
+    total = sum(mix.values())
+    if total <= 0:
+        raise ValueError(f"Mix {value!r} has no positive weight")
+    return {name: weight / total for name, weight in mix.items() if weight > 0}
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add indexes used by the maintenance jobs
+
+This script creates the indexes the Celery beat sweeps filter on, so they
+never scan otp_verifications, trips or document_requests. Indexes are built
+CONCURRENTLY: writes keep flowing while they build.
+Run this ONCE after deploying the new code.
+
+Usage:
+    python migrate_add_maintenance_indexes.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+from app.database.database import engine
+
+
+INDEXES = [
+    (
+        "ix_otp_verifications_expires_at",
+        "ON otp_verifications (expires_at)"
+    ),
+    (
+        "ix_trips_active_departure_date",
+        "ON trips (departure_date) WHERE is_active IS true"
+    ),
+    (
+        "ix_document_requests_status_updated_at",
+        "ON document_requests (status, updated_at)"
+    ),
+]
+
+
+def print_banner():
+    """Print banner"""
+    print("=" * 70)
+    print("  DocUrgent - Database Migration")
+    print("  Adding maintenance job indexes")
+    print("=" * 70)
+    print()
+
+
+def create_index(conn, name, definition):
+    """Create one index without blocking writes"""
+    print(f"🔧 Creating {name}...")
+    
+    try:
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {definition}"))
+        print("✅ Index ready")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error creating index: {str(e)}")
+        return False
+
+
+def main():
+    """Main migration function"""
+    print_banner()
+    
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for step, (name, definition) in enumerate(INDEXES, start=1):
+            if not create_index(conn, name, definition):
+                print(f"\n❌ Migration failed at step {step}")
+                print("   Drop the INVALID index (if any) before re-running")
+                sys.exit(1)
+    
+    # Success
+    print()
+    print("=" * 70)
+    print("✅ Migration completed successfully!")
+    print("=" * 70)
+    print()
+    print("Next steps:")
+    print("  1. Start celery beat (CELERY_WORKER_POOL=beat)")
+    print("  2. Check maintenance_rows / maintenance_run_seconds on the worker metrics")
+    print()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Migration cancelled by user")
+        sys.exit(0)
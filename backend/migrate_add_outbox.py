@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Add transactional outbox
+
+This script creates the outbox_events and processed_events tables and adds the actor_id and notes
+columns that shipment transitions write to delivery_steps.
+Run this ONCE after deploying the new code.
+
+Usage:
+    python migrate_add_outbox.py
+"""
+
+import sys
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+from app.database.database import SessionLocal, engine
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+
+
+def print_banner():
+    """Print banner"""
+    print("=" * 70)
+    print("  DocUrgent - Database Migration")
+    print("  Adding transactional outbox")
+    print("=" * 70)
+    print()
+
+
+def create_outbox_table():
+    """Create outbox_events and processed_events tables with their indexes"""
+    print("🔧 Creating outbox_events and processed_events tables...")
+    
+    try:
+        OutboxEvent.__table__.create(bind=engine.resolve(), checkfirst=True)
+        ProcessedEvent.__table__.create(bind=engine.resolve(), checkfirst=True)
+        print("✅ Tables ready")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error creating table: {str(e)}")
+        return False
+
+
+def add_delivery_step_columns(db):
+    """Add actor_id and notes columns to delivery_steps table"""
+    print("\n🔧 Adding delivery_steps columns...")
+    
+    try:
+        db.execute(text("""
+            ALTER TABLE delivery_steps 
+            ADD COLUMN IF NOT EXISTS actor_id VARCHAR(36)
+        """))
+        db.execute(text("""
+            ALTER TABLE delivery_steps 
+            ADD COLUMN IF NOT EXISTS notes TEXT
+        """))
+        db.execute(text("""
+            ALTER TABLE delivery_steps 
+            ALTER COLUMN step_id DROP NOT NULL
+        """))
+        db.execute(text("""
+            CREATE INDEX IF NOT EXISTS ix_delivery_steps_document_request_id 
+            ON delivery_steps (document_request_id)
+        """))
+        
+        print("✅ Columns added successfully")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error adding columns: {str(e)}")
+        return False
+
+
+def main():
+    """Main migration function"""
+    print_banner()
+    
+    db = SessionLocal()
+    
+    try:
+        # Step 1: Outbox table
+        if not create_outbox_table():
+            print("\n❌ Migration failed at step 1")
+            return
+        
+        # Step 2: Columns written by shipment transitions
+        if not add_delivery_step_columns(db):
+            db.rollback()
+            print("\n❌ Migration failed at step 2")
+            return
+        
+        db.commit()
+        
+        # Success
+        print()
+        print("=" * 70)
+        print("✅ Migration completed successfully!")
+        print("=" * 70)
+        print()
+        print("Next steps:")
+        print("  1. Start the outbox relay: python -m app.workers.outbox_relay")
+        print("  2. Restart the backend server and Celery workers")
+        print("  3. Create a shipment and check outbox_events.published_at is set")
+        print()
+    
+    except Exception as e:
+        print(f"\n\n❌ Unexpected error: {str(e)}")
+        db.rollback()
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Migration cancelled by user")
+        sys.exit(0)
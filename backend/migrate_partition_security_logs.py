@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Database Migration: Partition security_logs by month
+
+This script rebuilds security_logs as a table range-partitioned on timestamp,
+one partition per month, with a BRIN index on timestamp. Retention then drops
+whole partitions (maintenance.rotate_security_log_partitions) instead of
+deleting rows. The primary key becomes (id, timestamp), as Postgres requires
+the partition key in it, and the user/shipment foreign keys are dropped so
+audit rows outlive what they mention. Existing rows within the retention
+window are copied over.
+Run this ONCE after deploying the new code.
+
+Usage:
+    python migrate_partition_security_logs.py
+"""
+
+import sys
+from datetime import date
+from pathlib import Path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from sqlalchemy import text
+from app.core.config import settings
+from app.database.database import SessionLocal
+from app.services.audit_service import month_start, partition_ddl
+
+
+COLUMNS = "id, action, details, user_id, document_request_id, ip_address, user_agent, \"timestamp\""
+
+
+def print_banner():
+    """Print banner"""
+    print("=" * 70)
+    print("  DocUrgent - Database Migration")
+    print("  Partitioning security_logs by month")
+    print("=" * 70)
+    print()
+
+
+def is_partitioned(db):
+    """Check whether security_logs is already partitioned"""
+    return db.execute(text("""
+        SELECT 1 FROM pg_partitioned_table p
+        JOIN pg_class c ON c.oid = p.partrelid
+        WHERE c.relname = 'security_logs'
+    """)).first() is not None
+
+
+def create_partitioned_table(db):
+    """Swap security_logs for a partitioned copy with monthly partitions"""
+    print("🔧 Creating partitioned security_logs table...")
+    
+    try:
+        db.execute(text("ALTER TABLE security_logs RENAME TO security_logs_legacy"))
+        db.execute(text("""
+            CREATE TABLE security_logs (
+                id VARCHAR(36) NOT NULL,
+                action VARCHAR(100) NOT NULL,
+                details TEXT,
+                user_id VARCHAR(36),
+                document_request_id VARCHAR(36),
+                ip_address VARCHAR(50),
+                user_agent VARCHAR(500),
+                "timestamp" TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+                PRIMARY KEY (id, "timestamp")
+            ) PARTITION BY RANGE ("timestamp")
+        """))
+        
+        # From the oldest retained month to AUDIT_PARTITIONS_AHEAD months ahead
+        current = month_start(date.today())
+        months = range(-settings.AUDIT_RETENTION_MONTHS, settings.AUDIT_PARTITIONS_AHEAD + 1)
+        for offset in months:
+            db.execute(text(partition_ddl(month_start(current, offset))[1]))
+        
+        print(f"✅ Table ready with {len(months)} monthly partitions")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error creating table: {str(e)}")
+        return False
+
+
+def copy_legacy_rows(db):
+    """Copy retained rows from the old table, then drop it"""
+    print("\n🔧 Copying existing audit events...")
+    
+    try:
+        oldest = month_start(date.today(), -settings.AUDIT_RETENTION_MONTHS)
+        copied = db.execute(text(f"""
+            INSERT INTO security_logs ({COLUMNS})
+            SELECT {COLUMNS} FROM security_logs_legacy
+            WHERE "timestamp" >= :oldest
+        """), {"oldest": oldest}).rowcount
+        db.execute(text("DROP TABLE security_logs_legacy"))
+        
+        print(f"✅ {copied} events copied")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error copying events: {str(e)}")
+        return False
+
+
+def create_indexes(db):
+    """BRIN on timestamp, B-tree for per-user and per-action lookups"""
+    print("\n🔧 Creating indexes...")
+    
+    try:
+        db.execute(text("""
+            CREATE INDEX ix_security_logs_timestamp_brin
+            ON security_logs USING brin ("timestamp")
+        """))
+        db.execute(text("""
+            CREATE INDEX ix_security_logs_user_id_timestamp
+            ON security_logs (user_id, "timestamp")
+        """))
+        db.execute(text("""
+            CREATE INDEX ix_security_logs_action
+            ON security_logs (action)
+        """))
+        
+        print("✅ Indexes created successfully")
+        return True
+    
+    except Exception as e:
+        print(f"❌ Error creating indexes: {str(e)}")
+        return False
+
+
+def main():
+    """Main migration function"""
+    print_banner()
+    
+    db = SessionLocal()
+    
+    try:
+        if is_partitioned(db):
+            print("✅ security_logs is already partitioned, nothing to do")
+            return
+        
+        # All steps run in one transaction: any failure leaves the old table
+        steps = [create_partitioned_table, copy_legacy_rows, create_indexes]
+        for step, run in enumerate(steps, start=1):
+            if not run(db):
+                db.rollback()
+                print(f"\n❌ Migration failed at step {step}")
+                return
+        
+        db.commit()
+        
+        # Success
+        print()
+        print("=" * 70)
+        print("✅ Migration completed successfully!")
+        print("=" * 70)
+        print()
+        print("Next steps:")
+        print("  1. Start celery beat (CELERY_WORKER_POOL=beat) to rotate partitions daily")
+        print("  2. Restart the backend server")
+        print("  3. Log in and check GET /api/v1/admin/security-logs")
+        print()
+    
+    except Exception as e:
+        print(f"\n\n❌ Unexpected error: {str(e)}")
+        db.rollback()
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\n❌ Migration cancelled by user")
+        sys.exit(0)
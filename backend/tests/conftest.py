@@ -1,11 +1,16 @@
 """Test configuration and fixtures"""
+import socket
+
 import pytest
+from aiosmtpd.controller import Controller
+from aiosmtpd.smtp import AuthResult
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.main import app
 from app.database.database import Base
+from app.core.config import settings
 from app.core.dependencies import get_db
 
 
@@ -31,8 +36,12 @@ def db_session():
 
 
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, monkeypatch):
     """Create a test client"""
+    # No background health checks against the real Postgres/Redis/MinIO;
+    # tests that need a monitor override health_monitor
+    monkeypatch.setattr(settings.resolve(), "HEALTH_CHECK_INTERVAL_SECONDS", 0)
+    
     def override_get_db():
         try:
             yield db_session
@@ -43,3 +52,85 @@ def client(db_session):
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
+
+
+class RecordingHandler:
+    """Accepts mail, refuses unknown@ recipients, can fail one DATA with 421"""
+    
+    def __init__(self):
+        self.messages = []
+        self.logins = []
+        self.fail_next_data = False
+    
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if address.startswith("unknown@"):
+            return "550 No such user"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+    
+    async def handle_DATA(self, server, session, envelope):
+        if self.fail_next_data:
+            self.fail_next_data = False
+            return "421 Service not available, try again"
+        self.messages.append((session.peer, envelope.rcpt_tos[0]))
+        return "250 OK"
+    
+    def authenticate(self, server, session, envelope, mechanism, auth_data):
+        self.logins.append(session.peer)
+        return AuthResult(success=auth_data.password == b"secret")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class SMTPServer:
+    """aiosmtpd server that can be restarted on the same port"""
+    
+    def __init__(self):
+        self.handler = RecordingHandler()
+        self.port = free_port()
+        self.controller = None
+    
+    def start(self):
+        self.controller = Controller(
+            self.handler,
+            hostname="127.0.0.1",
+            port=self.port,
+            authenticator=self.handler.authenticate,
+            auth_require_tls=False
+        )
+        self.controller.start()
+    
+    def stop(self):
+        self.controller.stop()
+    
+    def restart(self):
+        self.stop()
+        self.start()
+
+
+@pytest.fixture
+def smtp_server():
+    """Local SMTP server (login mailer/secret) recording what it accepts"""
+    server = SMTPServer()
+    server.start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def app_smtp_server(smtp_server, monkeypatch):
+    """smtp_server configured as the application's SMTP host"""
+    config = settings.resolve()
+    for name, value in {
+        "SMTP_HOST": "127.0.0.1",
+        "SMTP_PORT": smtp_server.port,
+        "SMTP_USER": "mailer",
+        "SMTP_PASSWORD": "secret",
+        "SMTP_TLS": False,
+    }.items():
+        monkeypatch.setattr(config, name, value)
+    return smtp_server
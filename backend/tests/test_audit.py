@@ -0,0 +1,124 @@
+"""Tests for the batched security audit log"""
+import threading
+import time
+import uuid
+
+import pytest
+from sqlalchemy import event
+from starlette.requests import Request
+
+from app.core.security import create_access_token
+from app.models.security_log import SecurityLog
+from app.models.user import User, UserRole
+from app.utils.audit import AuditContext, AuditWriter, audit_writer
+from tests.conftest import TestingSessionLocal, engine
+
+
+@pytest.fixture
+def inserts():
+    """INSERT statements sent to security_logs"""
+    statements = []
+    
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.startswith("INSERT INTO security_logs"):
+            statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", capture)
+    yield statements
+    event.remove(engine, "before_cursor_execute", capture)
+
+
+@pytest.fixture
+def writer(db_session):
+    """Shared writer bound to the test database (flushed when the test closes it)"""
+    writer = AuditWriter(session_factory=TestingSessionLocal, batch_size=100, flush_ms=20)
+    audit_writer.override(writer)
+    yield writer
+    writer.close()
+    audit_writer.override(None)
+
+
+def test_events_are_written_in_multirow_batches(db_session, inserts):
+    """N events cost ceil(N / batch_size) INSERT statements"""
+    writer = AuditWriter(session_factory=TestingSessionLocal, batch_size=3, flush_ms=10_000)
+    for i in range(7):
+        assert writer.record("login_succeeded", user_id=f"user-{i}", ip_address="10.0.0.1")
+    writer.close()
+    
+    assert len(inserts) == 3
+    assert sorted(log.user_id for log in db_session.query(SecurityLog)) == [f"user-{i}" for i in range(7)]
+
+
+def test_partial_batch_is_flushed_after_interval(db_session, writer):
+    """A lone event does not wait for a full batch"""
+    writer.record("delivery_code_rejected", user_id="traveler-1", document_request_id="shipment-1")
+    
+    deadline = time.monotonic() + 2
+    while db_session.query(SecurityLog).count() == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    
+    log = db_session.query(SecurityLog).one()
+    assert (log.action, log.document_request_id) == ("delivery_code_rejected", "shipment-1")
+
+
+def test_failed_logins_are_searchable_by_admins(client, db_session, writer):
+    """Failed logins are audited with client metadata; only admins can page through them"""
+    for identifier in ("a@example.com", "b@example.com"):
+        response = client.post("/api/v1/auth/login", json={"identifier": identifier, "password": "wrong"},
+                               headers={"User-Agent": "pytest", "X-Forwarded-For": "198.51.100.1, 203.0.113.7"})
+        assert response.status_code == 401
+    writer.close()
+    
+    users = {}
+    for role in (UserRole.ADMIN, UserRole.SENDER):
+        users[role] = User(id=str(uuid.uuid4()), email=f"{role.value}@example.com", phone=f"+3360000000{len(users)}",
+                           hashed_password="x", first_name="T", last_name="T", user_type=role)
+        db_session.add(users[role])
+    db_session.commit()
+    
+    def search(role, **params):
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': users[role].id})}"}
+        return client.get("/api/v1/admin/security-logs", params=params, headers=headers)
+    
+    assert search(UserRole.SENDER).status_code == 403
+    
+    first = search(UserRole.ADMIN, action="login_failed", limit=1).json()
+    second = search(UserRole.ADMIN, action="login_failed", limit=1, cursor=first["next_cursor"]).json()
+    assert second["next_cursor"] is None
+    events = first["items"] + second["items"]
+    assert [event["details"] for event in events] == ["b@example.com (401)", "a@example.com (401)"]
+    assert {(event["ip_address"], event["user_agent"]) for event in events} == {("203.0.113.7", "pytest")}
+    
+    assert search(UserRole.ADMIN, action="login_failed", user_id="someone-else").json()["items"] == []
+
+
+def test_audited_address_ignores_forged_forwarded_for():
+    """Events carry the address seen by the trusted proxy, or the peer when it is not one"""
+    def context(peer: str, forwarded: bytes) -> AuditContext:
+        return AuditContext(Request({
+            "type": "http",
+            "client": (peer, 50000),
+            "headers": [(b"x-forwarded-for", forwarded), (b"user-agent", b"pytest")],
+        }))
+    
+    assert context("127.0.0.1", b"198.51.100.1, 203.0.113.7").ip_address == "203.0.113.7"
+    assert context("192.0.2.7", b"198.51.100.1").ip_address == "192.0.2.7"
+
+
+def test_close_gives_up_on_a_saturated_queue(db_session):
+    """A writer stuck on the database does not make close() raise"""
+    writing, release = threading.Event(), threading.Event()
+    
+    def stuck_session():
+        writing.set()
+        release.wait()
+        return TestingSessionLocal()
+    
+    writer = AuditWriter(session_factory=stuck_session, batch_size=1, flush_ms=0, queue_size=2)
+    writer.record("login_failed")
+    assert writing.wait(5)
+    try:
+        assert [writer.record("login_failed") for _ in range(3)] == [True, True, False]
+        writer.close(timeout=0.05)
+    finally:
+        release.set()
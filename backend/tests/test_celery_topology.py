@@ -0,0 +1,83 @@
+"""Tests for Celery queue routing and task metrics"""
+import re
+import time
+from pathlib import Path
+
+import pytest
+from celery.contrib.testing.worker import start_worker
+
+from app.core.metrics import REGISTRY
+from app.workers import tasks  # noqa: F401 (register the application's tasks)
+from app.workers.celery_app import QUEUE_BULK, QUEUE_DEFAULT, QUEUE_MAINTENANCE, QUEUE_TRANSACTIONAL, celery_app
+
+
+def sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def memory_worker():
+    """In-process worker on an in-memory broker, consuming the transactional queue"""
+    original = {key: celery_app.conf[key] for key in ("broker_url", "result_backend")}
+    celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://")
+    
+    @celery_app.task(name="tests.wait", ignore_result=False)
+    def wait(seconds: float):
+        time.sleep(seconds)
+        return seconds
+    
+    try:
+        with start_worker(celery_app, pool="solo", perform_ping_check=False, queues=[QUEUE_TRANSACTIONAL]):
+            yield wait
+    finally:
+        celery_app.tasks.pop("tests.wait", None)
+        celery_app.conf.update(original)
+
+
+def test_tasks_are_routed_by_workload():
+    """Transactional mail never shares a queue with fan-out; unread results are not stored"""
+    router = celery_app.amqp.router
+    
+    def queue(name):
+        return router.route({}, name)["queue"].name
+    
+    assert queue("send_email_task") == QUEUE_TRANSACTIONAL
+    assert queue("handle_outbox_event") == QUEUE_TRANSACTIONAL
+    assert queue("send_bulk_notifications") == QUEUE_BULK
+    assert queue("process_kyc_image") == "media"
+    assert queue("generate_report") == "reports"
+    assert queue("unknown_task") == QUEUE_DEFAULT
+    
+    assert celery_app.tasks["send_email_task"].ignore_result
+    assert celery_app.tasks["process_kyc_image"].ignore_result
+    assert not celery_app.tasks["send_bulk_notifications"].ignore_result
+    assert not celery_app.tasks["generate_report"].ignore_result
+    assert celery_app.tasks["send_email_task"].priority < celery_app.tasks["send_bulk_notifications"].priority
+
+
+def test_maintenance_sweeps_stay_off_the_transactional_pool():
+    """Every beat task lands on a queue that some pool consumes, but not the transactional one"""
+    entrypoint = (Path(__file__).parent.parent / "celery-entrypoint.sh").read_text()
+    pools = {pool: set(queues.split(",")) for pool, queues in re.findall(r'(\S+)\)\s+QUEUES="([^"]+)"', entrypoint)}
+    
+    for entry in celery_app.conf.beat_schedule.values():
+        queue = celery_app.amqp.router.route({}, entry["task"])["queue"].name
+        assert queue == QUEUE_MAINTENANCE
+        assert queue not in pools["transactional"]
+        assert queue in pools["bulk"] and queue in pools["*"]
+
+
+def test_worker_records_queue_time_and_runtime(memory_worker):
+    """Enqueue-to-start latency and runtime are observed per task"""
+    queued = {"task": "tests.wait", "queue": QUEUE_TRANSACTIONAL}
+    succeeded = {"task": "tests.wait", "state": "SUCCESS"}
+    queued_before = sample("celery_task_queue_seconds_count", queued)
+    runtime_before = sample("celery_task_runtime_seconds_sum", succeeded)
+    
+    results = [memory_worker.apply_async((0.05,), queue=QUEUE_TRANSACTIONAL) for _ in range(3)]
+    assert [result.get(timeout=10) for result in results] == [0.05] * 3
+    
+    assert sample("celery_task_queue_seconds_count", queued) == queued_before + 3
+    # The third task waited behind the first two on the single worker
+    assert sample("celery_task_queue_seconds_sum", queued) > 0.09
+    assert sample("celery_task_runtime_seconds_sum", succeeded) - runtime_before >= 0.15
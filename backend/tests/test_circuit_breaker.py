@@ -0,0 +1,144 @@
+"""Tests for circuit breakers around Redis, storage, SMTP and Twilio, with fault-injecting stand-ins"""
+import asyncio
+import socket
+import threading
+import time
+
+import fakeredis
+import pytest
+import redis
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+from app.core.metrics import CIRCUIT_STATE
+from app.main import circuit_open_handler
+from app.utils import email, sms
+from app.utils.circuit_breaker import CircuitOpenError
+from app.utils.redis_client import RedisClient
+from app.utils.storage import StorageClient
+from app.workers import tasks
+
+
+def unused_port() -> int:
+    """A port nothing listens on: connections are refused"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@pytest.fixture
+def hanging_server():
+    """Accepts connections and never answers (a stalled MinIO)"""
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen()
+    server.settimeout(0.05)
+    held, stop = [], threading.Event()
+    
+    def accept():
+        while not stop.is_set():
+            try:
+                held.append(server.accept()[0])
+            except socket.timeout:
+                pass
+    
+    thread = threading.Thread(target=accept, daemon=True)
+    thread.start()
+    yield server.getsockname()[1]
+    stop.set()
+    thread.join()
+    for connection in held:
+        connection.close()
+    server.close()
+
+
+def breaker_state(dependency: str) -> float:
+    return CIRCUIT_STATE.labels(dependency)._value.get()
+
+
+def test_redis_breaker_opens_probes_and_recovers(monkeypatch):
+    """Failures in a row open it; the half-open probe reopens it while Redis is down and closes it once back"""
+    monkeypatch.setattr(settings.resolve(), "CIRCUIT_BREAKERS", "redis=2/0.2")
+    down = redis.Redis(port=unused_port(), socket_connect_timeout=0.2)
+    client = RedisClient(client=down)
+    
+    for _ in range(2):
+        with pytest.raises(redis.ConnectionError):
+            client.get("key")
+    started = time.perf_counter()
+    with pytest.raises(redis.RedisError) as refused:  # Still a RedisError: callers that fail open keep working
+        client.get("key")
+    assert isinstance(refused.value, CircuitOpenError)
+    assert time.perf_counter() - started < 0.01
+    assert breaker_state("redis") == 2
+    
+    time.sleep(0.25)
+    with pytest.raises(redis.ConnectionError):
+        client.get("key")  # The probe fails: open again
+    assert client.breaker.state == "open"
+    
+    client.client = fakeredis.FakeRedis(decode_responses=True)
+    time.sleep(0.25)
+    assert client.set("key", "value") and client.get("key") == "value"
+    assert client.breaker.state == "closed" and breaker_state("redis") == 0
+
+
+def test_hanging_storage_times_out_then_fails_fast_with_503(monkeypatch, hanging_server):
+    """A stalled MinIO costs one bounded timeout, then requests get 503 without touching it"""
+    config = settings.resolve()
+    monkeypatch.setattr(config, "MINIO_ENDPOINT", f"127.0.0.1:{hanging_server}")
+    monkeypatch.setattr(config, "STORAGE_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKERS", "storage=1/30")
+    monkeypatch.setattr(StorageClient, "_ensure_bucket", lambda self: None)
+    storage = StorageClient()
+    
+    started = time.perf_counter()
+    with pytest.raises(Exception) as timed_out:
+        storage.stat_file("kyc/front.jpg")
+    assert not isinstance(timed_out.value, CircuitOpenError)
+    assert time.perf_counter() - started < 2
+    
+    app = FastAPI(exception_handlers={CircuitOpenError: circuit_open_handler})
+    app.add_api_route("/file", lambda: storage.stat_file("kyc/front.jpg"))
+    started = time.perf_counter()
+    response = TestClient(app).get("/file")
+    assert (response.status_code, response.headers["Retry-After"]) == (503, "30")
+    assert time.perf_counter() - started < 0.5
+    assert breaker_state("storage") == 2
+
+
+def test_email_is_queued_and_sms_skipped_while_circuits_are_open(monkeypatch):
+    """SMTP refusing connections opens its circuit and later emails go to the worker; a hanging Twilio is cut off"""
+    config = settings.resolve()
+    monkeypatch.setattr(config, "SMTP_HOST", "127.0.0.1")
+    monkeypatch.setattr(config, "SMTP_PORT", unused_port())
+    monkeypatch.setattr(config, "SMTP_MAX_ATTEMPTS", 1)
+    monkeypatch.setattr(config, "TWILIO_TIMEOUT_SECONDS", 0.1)
+    monkeypatch.setattr(config, "CIRCUIT_BREAKERS", "smtp=1/60,twilio=1/60")
+    queued, sms_attempts = [], []
+    monkeypatch.setattr(tasks.send_email_task, "apply_async", lambda args, countdown: queued.append((args, countdown)))
+    
+    class HangingMessages:
+        async def create_async(self, **kwargs):
+            sms_attempts.append(kwargs["to"])
+            await asyncio.sleep(60)
+    
+    class HangingTwilio:
+        messages = HangingMessages()
+    
+    monkeypatch.setattr(sms, "get_sms_client", lambda: HangingTwilio())
+    sms.sms_breaker.reset()
+    
+    async def scenario():
+        first = await email.send_or_queue_email("a@example.com", "Welcome", "Hello")
+        second = await email.send_or_queue_email("b@example.com", "Welcome", "Hello")
+        await email.close_mailer()
+        return first, second, await sms.send_sms("+33600000001", "Code"), await sms.send_sms("+33600000002", "Code")
+    
+    assert asyncio.run(scenario()) == (False, False, False, False)
+    assert [args[0] for args, _ in queued] == ["b@example.com"]
+    assert 59 < queued[0][1] <= 60
+    assert sms_attempts == ["+33600000001"]
+    assert breaker_state("smtp") == breaker_state("twilio") == 2
+    sms.sms_breaker.reset()
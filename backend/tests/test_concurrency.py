@@ -0,0 +1,158 @@
+"""Tests for capacity planning, admission control and pool instrumentation"""
+import asyncio
+
+import anyio.to_thread
+import httpx
+import pytest
+from fastapi import FastAPI
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from starlette.middleware import Middleware
+
+from app.core.capacity import capacity_plan
+from app.core.config import settings
+from app.core.metrics import ADMISSION_REJECTED, DB_POOL_TIMEOUTS
+from app.database.database import InstrumentedQueuePool
+from app.utils.concurrency import ConcurrencyLimitMiddleware, RouteClass
+
+
+def test_plan_keeps_threads_admission_and_pool_consistent(client, monkeypatch):
+    """Per-worker threads follow the connection budget; the app's thread limiter uses the plan"""
+    threads = client.portal.call(lambda: anyio.to_thread.current_default_thread_limiter().total_tokens)
+    assert threads == capacity_plan().threads
+    
+    config = settings.resolve()
+    monkeypatch.setattr(config, "DB_MAX_CONNECTIONS", 120)
+    monkeypatch.setattr(config, "DB_RESERVED_CONNECTIONS", 2)
+    monkeypatch.setattr(config, "API_WORKERS", 4)
+    plan = capacity_plan()
+    assert (plan.threads, plan.max_inflight, plan.db_pool_size, plan.db_max_overflow) == (28, 28, 28, 2)
+    assert plan.db_connections == 120
+    
+    monkeypatch.setattr(config, "API_WORKERS", 1)
+    assert capacity_plan().threads == settings.API_THREADS
+
+
+def test_excess_requests_are_queued_then_rejected_early():
+    """Two run, one waits its turn, the rest get 503 at once; health checks bypass the limit"""
+    release = None
+    app = FastAPI(middleware=[Middleware(ConcurrencyLimitMiddleware, max_inflight=2, max_queue=1, queue_timeout=5)])
+    
+    @app.get("/work")
+    async def work():
+        await release.wait()
+        return {"ok": True}
+    
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+    
+    rejected = ADMISSION_REJECTED.labels("read", "queue_full")._value.get()
+    
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as http:
+            requests = [asyncio.create_task(http.get("/work")) for _ in range(5)]
+            await asyncio.sleep(0.1)
+            health = await http.get("/health")
+            release.set()
+            return health, await asyncio.gather(*requests)
+    
+    health, responses = asyncio.run(scenario())
+    assert health.status_code == 200
+    assert sorted(response.status_code for response in responses) == [200, 200, 200, 503, 503]
+    assert all(r.headers["Retry-After"] == "1" for r in responses if r.status_code == 503)
+    assert ADMISSION_REJECTED.labels("read", "queue_full")._value.get() - rejected == 2
+    
+    timed_out = FastAPI(middleware=[Middleware(ConcurrencyLimitMiddleware, max_inflight=1, max_queue=5, queue_timeout=0.1)])
+    timed_out.add_api_route("/work", work)
+    
+    async def slow_scenario():
+        nonlocal release
+        release = asyncio.Event()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=timed_out), base_url="http://test") as http:
+            first = asyncio.create_task(http.get("/work"))
+            await asyncio.sleep(0.05)
+            second = await http.get("/work")
+            release.set()
+            return (await first).status_code, second.status_code
+    
+    assert asyncio.run(slow_scenario()) == (200, 503)
+
+
+def test_freed_slots_go_to_workflow_writes_before_low_priority_work():
+    """A handoff queued behind a list page is served first; a full queue evicts analytics for it"""
+    order = []
+    release = None
+    app = FastAPI()
+    
+    @app.api_route("/api/v1/{path:path}", methods=["GET", "POST"])
+    async def endpoint(path: str):
+        order.append(path)
+        await release.wait()
+        return {"path": path}
+    
+    limiter = ConcurrencyLimitMiddleware(app, max_inflight=1, max_queue=2, queue_timeout=5)
+    evicted = ADMISSION_REJECTED.labels("analytics", "evicted")._value.get()
+    
+    async def scenario():
+        nonlocal release
+        release = asyncio.Event()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limiter), base_url="http://test") as http:
+            requests = []
+            for method, path in [("GET", "shipments/1"), ("GET", "shipments"), ("GET", "analytics/daily"),
+                                 ("POST", "relay-points/handoff")]:
+                requests.append(asyncio.create_task(http.request(method, f"/api/v1/{path}")))
+                await asyncio.sleep(0.01)
+            release.set()
+            return [response.status_code for response in await asyncio.gather(*requests)]
+    
+    assert asyncio.run(scenario()) == [200, 200, 503, 200]
+    assert order == ["shipments/1", "relay-points/handoff", "shipments"]
+    assert ADMISSION_REJECTED.labels("analytics", "evicted")._value.get() - evicted == 1
+
+
+def test_missed_slo_sheds_lower_classes_under_contention():
+    """While writes miss their p95 objective, list pages are shed if they would have to queue"""
+    write, listing = RouteClass("write", 0, 5.0, 0.05), RouteClass("list", 3, 5.0, 10.0)
+    app = FastAPI()
+    
+    @app.api_route("/{path}", methods=["GET", "POST"])
+    async def endpoint(path: str):
+        await asyncio.sleep(0.1)
+        return {"path": path}
+    
+    limiter = ConcurrencyLimitMiddleware(
+        app, max_inflight=1, max_queue=10, queue_timeout=5,
+        classify=lambda method, path: write if method == "POST" else listing
+    )
+    
+    async def scenario():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=limiter), base_url="http://test") as http:
+            assert (await http.post("/handoff")).status_code == 200  # 0.1s > 0.05s objective
+            assert (await http.get("/shipments")).status_code == 200  # Free slot: admitted anyway
+            busy = asyncio.create_task(http.post("/handoff"))
+            await asyncio.sleep(0.01)
+            shed = await http.get("/shipments")
+            queued = await http.post("/handoff")
+            return shed, queued.status_code, (await busy).status_code
+    
+    shed, *writes = asyncio.run(scenario())
+    assert (shed.status_code, writes) == (503, [200, 200])
+    assert shed.headers["Retry-After"] == "5"
+
+
+def test_pool_checkout_timeouts_are_counted(tmp_path):
+    """A checkout waiting past pool_timeout is counted, not hidden"""
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool,
+        pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    timeouts = DB_POOL_TIMEOUTS._value.get()
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+    assert DB_POOL_TIMEOUTS._value.get() - timeouts == 1
+    engine.dispose()
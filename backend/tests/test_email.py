@@ -0,0 +1,127 @@
+"""Tests for the pooled SMTP sender against a local aiosmtpd server"""
+import asyncio
+from email.message import EmailMessage
+
+from prometheus_client import REGISTRY
+
+from app.utils.email import SMTPPool
+from tests.conftest import free_port
+
+
+def make_pool(port: int, **kwargs) -> SMTPPool:
+    options = {"size": 2, "batch_size": 10, "backoff_base": 0.01, "timeout": 5}
+    options.update(kwargs)
+    return SMTPPool("127.0.0.1", port, username="mailer", password="secret", **options)
+
+
+def make_message(to: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = "noreply@docurgent.test"
+    message["To"] = to
+    message["Subject"] = "Status update"
+    message.set_content("Your shipment moved.")
+    return message
+
+
+def metric(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_messages_share_authenticated_connections(smtp_server):
+    """Many concurrent messages go over at most `size` connections, each logged in once"""
+    handler, port = smtp_server.handler, smtp_server.port
+    sent_before = metric("smtp_messages_total", outcome="sent")
+    
+    async def scenario():
+        pool = make_pool(port)
+        results = await asyncio.gather(*(pool.send(make_message(f"user{i}@example.com")) for i in range(40)))
+        await pool.close()
+        return results
+    
+    assert all(asyncio.run(scenario()))
+    assert len(handler.messages) == 40
+    connections = {peer for peer, _ in handler.messages}
+    assert len(connections) <= 2
+    assert sorted(handler.logins) == sorted(connections)
+    assert metric("smtp_messages_total", outcome="sent") - sent_before == 40
+    assert metric("smtp_message_seconds_count", outcome="sent") >= 40
+
+
+def test_rejected_recipient_fails_alone(smtp_server):
+    """A 5xx rejection fails that message without retry; the batch continues"""
+    handler, port = smtp_server.handler, smtp_server.port
+    retries_before = metric("smtp_retries_total")
+    
+    async def scenario():
+        pool = make_pool(port, size=1)
+        results = await asyncio.gather(
+            pool.send(make_message("first@example.com")),
+            pool.send(make_message("unknown@example.com")),
+            pool.send(make_message("last@example.com"))
+        )
+        await pool.close()
+        return results
+    
+    assert asyncio.run(scenario()) == [True, False, True]
+    assert [to for _, to in handler.messages] == ["first@example.com", "last@example.com"]
+    assert metric("smtp_retries_total") == retries_before
+
+
+def test_reconnects_after_transient_failures(smtp_server):
+    """4xx replies are retried and connections dropped by the server are reopened"""
+    handler, port = smtp_server.handler, smtp_server.port
+    retries_before = metric("smtp_retries_total")
+    
+    async def scenario():
+        pool = make_pool(port, size=1)
+        handler.fail_next_data = True
+        first = await pool.send(make_message("first@example.com"))
+        # The pooled connection dies with the server
+        await asyncio.to_thread(smtp_server.restart)
+        second = await pool.send(make_message("second@example.com"))
+        await pool.close()
+        return first, second
+    
+    assert asyncio.run(scenario()) == (True, True)
+    assert [to for _, to in handler.messages] == ["first@example.com", "second@example.com"]
+    assert len(handler.logins) >= 3
+    assert metric("smtp_retries_total") - retries_before >= 1
+
+
+def test_gives_up_after_max_attempts():
+    """With the server down, messages fail after max_attempts connection errors"""
+    failed_before = metric("smtp_messages_total", outcome="failed")
+    errors_before = metric("smtp_connections_total", result="error")
+    
+    async def scenario():
+        pool = make_pool(free_port(), max_attempts=3)
+        result = await pool.send(make_message("user@example.com"))
+        await pool.close()
+        return result
+    
+    assert asyncio.run(scenario()) is False
+    assert metric("smtp_messages_total", outcome="failed") - failed_before == 1
+    assert metric("smtp_connections_total", result="error") - errors_before == 3
+
+
+def test_unexpected_errors_fail_the_message_and_keep_the_worker(smtp_server):
+    """A message that cannot be sent at all fails alone; its batch and later messages are still sent"""
+    handler, port = smtp_server.handler, smtp_server.port
+    
+    async def scenario():
+        pool = make_pool(port, size=1)
+        broken = make_message("user@example.com")
+        del broken["From"]  # aiosmtplib raises ValueError
+        # Queued together: the broken message and the valid one share a batch
+        results = list(await asyncio.wait_for(
+            asyncio.gather(pool.send(broken), pool.send(make_message("batch@example.com"))), 5
+        ))
+        results.append(await asyncio.wait_for(pool.send(make_message("next@example.com")), 5))
+        workers = list(pool._workers)
+        await pool.close()
+        return results, workers
+    
+    results, workers = asyncio.run(scenario())
+    assert results == [False, True, True]
+    assert len(workers) == 1 and workers[0].cancelled()
+    assert [to for _, to in handler.messages] == ["batch@example.com", "next@example.com"]
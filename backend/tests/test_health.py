@@ -0,0 +1,82 @@
+"""Tests for cached dependency checks and the Kubernetes probes"""
+import threading
+import time
+
+from app.utils.health import HealthMonitor, health_monitor
+
+
+def wait_for(condition, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+
+def test_background_checks_cache_results_with_latencies():
+    """Checks run on their own threads; a failing dependency makes the report not ready"""
+    calls = {"database": 0, "redis": 0}
+    
+    def database():
+        calls["database"] += 1
+        time.sleep(0.01)
+    
+    def redis():
+        calls["redis"] += 1
+        raise ConnectionError("Connection refused")
+    
+    monitor = HealthMonitor({"database": database, "redis": redis}, interval=0.05)
+    assert monitor.report()["status"] == "not_ready"  # Nothing probed yet
+    monitor.start()
+    wait_for(lambda: min(calls.values()) >= 3)
+    monitor.stop()
+    
+    report = monitor.report()
+    assert report["status"] == "not_ready"
+    assert report["checks"]["database"]["ok"] and report["checks"]["database"]["latency_ms"] >= 10
+    assert report["checks"]["redis"] == {
+        **report["checks"]["redis"], "ok": False, "error": "ConnectionError: Connection refused"
+    }
+    assert calls["database"] >= 3
+
+
+def test_hanging_check_goes_stale_without_blocking_reports():
+    """A check stuck in I/O turns not-ready after three intervals; reading the report never waits for it"""
+    release = threading.Event()
+    first = threading.Event()
+    
+    def storage():
+        if first.is_set():
+            release.wait()
+        first.set()
+    
+    monitor = HealthMonitor({"storage": storage}, interval=0.05)
+    monitor.start()
+    wait_for(first.is_set)
+    assert monitor.report()["status"] == "ready"
+    
+    time.sleep(0.2)
+    started = time.perf_counter()
+    report = monitor.report()
+    assert time.perf_counter() - started < 0.005
+    assert report["status"] == "not_ready"
+    assert report["checks"]["storage"]["error"].startswith("no result for over")
+    release.set()
+    monitor.stop()
+
+
+def test_probe_endpoints(client):
+    """Liveness always answers; readiness is 503 until every dependency passes its check"""
+    monitor = HealthMonitor({"database": lambda: None, "redis": lambda: None}, interval=60)
+    health_monitor.override(monitor)
+    try:
+        assert client.get("/health/live").json() == {"status": "alive"}
+        response = client.get("/health/ready")
+        assert response.status_code == 503
+        assert response.json()["checks"]["redis"] == {"ok": False, "error": "not probed yet"}
+        
+        for name, check in monitor.checks.items():
+            monitor.probe(name, check)
+        response = client.get("/health/ready")
+        assert response.status_code == 200
+        assert set(response.json()["checks"]) == {"database", "redis"}
+    finally:
+        health_monitor.override(None)
@@ -0,0 +1,86 @@
+"""Tests for the HTTP metrics middleware and /metrics endpoint"""
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.core.metrics import REGISTRY
+from app.utils.http_metrics import PrometheusMiddleware
+
+
+def sample(name: str, labels: dict) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+@pytest.fixture
+def metered_app():
+    app = FastAPI()
+    
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        return {"id": item_id}
+    
+    @app.post("/items")
+    def create_item(item: dict):
+        return item
+    
+    app.add_middleware(PrometheusMiddleware)
+    return app
+
+
+def test_requests_are_recorded_per_route_template(metered_app):
+    """Path parameters collapse into one series; 404s share an 'unmatched' series"""
+    route = {"method": "GET", "route": "/items/{item_id}"}
+    before = {
+        "count": sample("http_request_duration_seconds_count", route),
+        "ok": sample("http_requests_total", {**route, "status": "200"}),
+        "missing": sample("http_requests_total", {"method": "GET", "route": "unmatched", "status": "404"}),
+        "posted": sample("http_request_size_bytes_sum", {"method": "POST", "route": "/items"}),
+    }
+    
+    with TestClient(metered_app) as client:
+        for item_id in ("a", "b", "c"):
+            assert client.get(f"/items/{item_id}").status_code == 200
+        assert client.get("/nowhere/1").status_code == 404
+        assert client.post("/items", content=b'{"name": "x"}', headers={"Content-Type": "application/json"}).status_code == 200
+    
+    assert sample("http_request_duration_seconds_count", route) == before["count"] + 3
+    assert sample("http_requests_total", {**route, "status": "200"}) == before["ok"] + 3
+    assert sample("http_requests_total", {"method": "GET", "route": "unmatched", "status": "404"}) == before["missing"] + 1
+    assert sample("http_request_size_bytes_sum", {"method": "POST", "route": "/items"}) == before["posted"] + 13
+    assert sample("http_response_size_bytes_sum", route) > 0
+    assert sample("http_requests_in_progress", {"method": "GET"}) == 0
+
+
+def test_metrics_endpoint_exposes_http_metrics(client):
+    client.get("/health")
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health"}' in response.text
+
+
+def test_worker_processes_are_aggregated(tmp_path):
+    """With PROMETHEUS_MULTIPROC_DIR set, the registry sums every worker's samples"""
+    env = {**os.environ, "PROMETHEUS_MULTIPROC_DIR": str(tmp_path)}
+    backend = Path(__file__).resolve().parents[1]
+    record = (
+        "from app.core.metrics import HTTP_REQUESTS; "
+        "HTTP_REQUESTS.labels('GET', '/health', '200').inc(5)"
+    )
+    for _ in range(2):
+        subprocess.run([sys.executable, "-c", record], env=env, cwd=backend, check=True)
+    
+    collect = (
+        "from app.core.metrics import metrics_registry; "
+        "print(metrics_registry().get_sample_value("
+        "'http_requests_total', {'method': 'GET', 'route': '/health', 'status': '200'}))"
+    )
+    output = subprocess.run([sys.executable, "-c", collect], env=env, cwd=backend,
+                            check=True, capture_output=True, text=True).stdout
+    assert float(output) == 10.0
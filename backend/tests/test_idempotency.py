@@ -0,0 +1,113 @@
+"""Tests for Idempotency-Key handling on mutating endpoints"""
+import asyncio
+
+import fakeredis
+import httpx
+import pytest
+from fastapi import FastAPI, Request, status
+
+from app.core.security import create_access_token
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils.redis_client import RedisClient
+
+
+SHIPMENTS_PATH = "/api/v1/shipments"
+
+
+@pytest.fixture
+def calls():
+    """Bodies received by the fake endpoint"""
+    return []
+
+
+@pytest.fixture
+def idempotent_app(calls):
+    """Minimal app with a slow shipment endpoint behind the middleware"""
+    app = FastAPI()
+    
+    @app.post(SHIPMENTS_PATH, status_code=status.HTTP_201_CREATED)
+    async def create_shipment(request: Request):
+        calls.append(await request.json())
+        # Keep the request in flight long enough for duplicates to overlap
+        await asyncio.sleep(0.2)
+        return {"id": len(calls)}
+    
+    redis = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+    app.add_middleware(IdempotencyMiddleware, redis=redis)
+    return app
+
+
+def auth_headers(user_id: str, key: str = None) -> dict:
+    """Bearer token headers with an optional Idempotency-Key"""
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user_id})}"}
+    if key:
+        headers["Idempotency-Key"] = key
+    return headers
+
+
+async def post(app: FastAPI, headers: dict, payload: dict) -> httpx.Response:
+    """POST to the shipments endpoint through the ASGI app"""
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.post(SHIPMENTS_PATH, json=payload, headers=headers)
+
+
+def test_concurrent_duplicates_execute_once(idempotent_app, calls):
+    """Concurrent retries with the same key run the endpoint once"""
+    headers = auth_headers("user-1", "retry-1")
+    
+    async def submit_duplicates():
+        return await asyncio.gather(*[
+            post(idempotent_app, headers, {"recipient_name": "Ahmed"}) for _ in range(5)
+        ])
+    
+    responses = asyncio.run(submit_duplicates())
+    status_codes = sorted(r.status_code for r in responses)
+    
+    assert len(calls) == 1
+    assert status_codes == [status.HTTP_201_CREATED] + [status.HTTP_409_CONFLICT] * 4
+    conflict = next(r for r in responses if r.status_code == status.HTTP_409_CONFLICT)
+    assert conflict.headers["retry-after"] == "1"
+
+
+def test_replay_returns_stored_response(idempotent_app, calls):
+    """A retry after completion replays the stored response"""
+    headers = auth_headers("user-1", "retry-2")
+    
+    first = asyncio.run(post(idempotent_app, headers, {"recipient_name": "Ahmed"}))
+    second = asyncio.run(post(idempotent_app, headers, {"recipient_name": "Ahmed"}))
+    
+    assert len(calls) == 1
+    assert second.status_code == status.HTTP_201_CREATED
+    assert second.json() == first.json()
+    assert second.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+
+
+def test_key_reuse_with_different_payload(idempotent_app, calls):
+    """Reusing a key for a different request is rejected"""
+    headers = auth_headers("user-1", "retry-3")
+    
+    asyncio.run(post(idempotent_app, headers, {"recipient_name": "Ahmed"}))
+    response = asyncio.run(post(idempotent_app, headers, {"recipient_name": "Sara"}))
+    
+    assert len(calls) == 1
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_keys_are_scoped_per_user(idempotent_app, calls):
+    """The same key from two users creates two shipments"""
+    asyncio.run(post(idempotent_app, auth_headers("user-1", "shared"), {"recipient_name": "Ahmed"}))
+    asyncio.run(post(idempotent_app, auth_headers("user-2", "shared"), {"recipient_name": "Ahmed"}))
+    
+    assert len(calls) == 2
+
+
+def test_requests_without_key_are_not_deduplicated(idempotent_app, calls):
+    """Requests without the header behave as before"""
+    headers = auth_headers("user-1")
+    
+    asyncio.run(post(idempotent_app, headers, {"recipient_name": "Ahmed"}))
+    asyncio.run(post(idempotent_app, headers, {"recipient_name": "Ahmed"}))
+    
+    assert len(calls) == 2
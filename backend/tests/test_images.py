@@ -0,0 +1,163 @@
+"""Tests for KYC image processing: renditions, EXIF stripping and the worker task"""
+import io
+import uuid
+
+import pytest
+from PIL import Image, JpegImagePlugin, UnidentifiedImageError
+
+from app.models.kyc_document import DocumentTypeKYC, KYCDocument
+from app.models.user import User
+from app.utils.images import process_image
+from app.utils.local_storage import LocalStorageClient
+from app.utils.storage import StorageError, storage_client
+from app.workers import tasks
+from tests.conftest import TestingSessionLocal
+
+# EXIF tags: orientation (6 = rotate 90° clockwise to display), camera model, GPS block
+ORIENTATION, MODEL, GPS_INFO = 0x0112, 0x0110, 0x8825
+
+
+def encode(image: Image.Image, format: str = "JPEG", **options) -> io.BytesIO:
+    data = io.BytesIO()
+    image.save(data, format=format, **options)
+    data.seek(0)
+    return data
+
+
+def phone_photo(size=(400, 200)) -> io.BytesIO:
+    """JPEG taken sideways, with camera and GPS metadata"""
+    exif = Image.Exif()
+    exif[ORIENTATION] = 6
+    exif[MODEL] = "Phone 12"
+    exif.get_ifd(GPS_INFO).update({1: "N", 2: (48.0, 51.0, 24.0)})
+    return encode(Image.new("RGB", size, (200, 30, 30)), exif=exif)
+
+
+def decoded(data: bytes) -> Image.Image:
+    image = Image.open(io.BytesIO(data))
+    image.load()
+    return image
+
+
+def test_large_photos_are_decoded_reduced(monkeypatch):
+    """JPEGs are drafted at a DCT scale, other formats reduced; both keep their aspect ratio"""
+    drafts = []
+    original_draft = JpegImagePlugin.JpegImageFile.draft
+    
+    def draft(self, mode, size):
+        result = original_draft(self, mode, size)
+        drafts.append(self.size)
+        return result
+    
+    monkeypatch.setattr(JpegImagePlugin.JpegImageFile, "draft", draft)
+    photo = process_image(encode(Image.new("RGB", (4000, 3000), (10, 120, 200))))
+    
+    assert drafts == [(2000, 1500)]  # Decoded at 1/2, the smallest scale covering 1600 px
+    assert (photo.original_size, photo.review_size) == ((4000, 3000), (1600, 1200))
+    assert decoded(photo.thumbnail).size == (320, 240)
+    
+    scan = process_image(encode(Image.new("L", (3300, 1100), 128), "PNG"))
+    assert scan.review_size == (1600, 533)
+    assert decoded(scan.review).mode == "RGB"
+    
+    small = process_image(encode(Image.new("RGBA", (300, 200), (0, 0, 0, 0)), "PNG"))
+    assert small.review_size == (300, 200)
+
+
+def test_orientation_is_applied_and_metadata_dropped():
+    """The review shows the photo upright, and no rendition keeps EXIF (GPS, device)"""
+    source = phone_photo()
+    assert Image.open(source).getexif()[MODEL] == "Phone 12"
+    source.seek(0)
+    
+    processed = process_image(source)
+    
+    assert processed.original_size == (400, 200) and processed.review_size == (200, 400)
+    for rendition in (processed.review, processed.thumbnail):
+        image = decoded(rendition)
+        assert image.format == "JPEG" and "exif" not in image.info
+        assert len(image.getexif()) == 0
+
+
+def test_corrupt_and_oversized_images_are_refused(monkeypatch):
+    """Undecodable bytes, truncated files and decompression bombs raise instead of producing renditions"""
+    with pytest.raises(UnidentifiedImageError):
+        process_image(io.BytesIO(b"not an image at all"))
+    
+    truncated = encode(Image.effect_noise((600, 400), 64).convert("RGB")).getvalue()
+    with pytest.raises(OSError):
+        process_image(io.BytesIO(truncated[:len(truncated) // 2]))
+    
+    monkeypatch.setattr(Image, "MAX_IMAGE_PIXELS", 10_000)
+    with pytest.raises(Image.DecompressionBombError):
+        process_image(encode(Image.new("RGB", (200, 200))))
+
+
+def test_task_replaces_the_upload_with_deduplicated_renditions(db_session, tmp_path, monkeypatch):
+    """The worker stores renditions under the content hash, repoints the document and deletes the original"""
+    storage = LocalStorageClient(root=str(tmp_path))
+    storage_client.override(storage)
+    monkeypatch.setattr(tasks, "SessionLocal", TestingSessionLocal)
+    user = User(id=str(uuid.uuid4()), email="k@example.com", phone="+33600000001",
+                hashed_password="x", first_name="K", last_name="Y")
+    db_session.add(user)
+    photo = phone_photo().getvalue()
+    uploads = []
+    for side in ("front", "selfie"):
+        document = KYCDocument(id=str(uuid.uuid4()), user_id=user.id, document_type=DocumentTypeKYC.PASSPORT)
+        object_name = f"kyc/{user.id}/{document.id}/{side}-{uuid.uuid4().hex}.jpg"
+        storage.upload_file(photo, object_name, "image/jpeg")
+        setattr(document, "front_image_url" if side == "front" else "selfie_url", storage.object_url(object_name))
+        db_session.add(document)
+        uploads.append((document.id, side, object_name))
+    db_session.commit()
+    
+    try:
+        first, second = [tasks.process_kyc_image_task(*upload) for upload in uploads]
+        # The slot now points at the rendition: a redelivered job is skipped
+        assert tasks.process_kyc_image_task(*uploads[0])["status"] == "skipped"
+    finally:
+        storage_client.override(None)
+    
+    assert (first["status"], first["deduplicated"], second["deduplicated"]) == ("processed", False, True)
+    assert first["review"] == second["review"] == f"kyc/processed/{first['content_hash']}/review.jpg"
+    assert all(storage.stat_file(object_name) is None for _, _, object_name in uploads)
+    assert "exif" not in decoded(storage.download_file(first["review"])).info
+    db_session.expire_all()
+    assert db_session.get(KYCDocument, uploads[0][0]).front_image_url == storage.object_url(first["review"])
+    assert db_session.get(KYCDocument, uploads[1][0]).selfie_url == storage.object_url(first["review"])
+
+
+class FailingReviewStorage(LocalStorageClient):
+    """Local storage whose review rendition uploads fail (as StorageClient reports errors: None)"""
+    
+    def upload_stream(self, stream, object_name, *args, **kwargs):
+        if object_name.endswith("/review.jpg"):
+            return None
+        return super().upload_stream(stream, object_name, *args, **kwargs)
+
+
+def test_failed_rendition_upload_keeps_the_original(db_session, tmp_path, monkeypatch):
+    """The task raises for a retry; the document still points at the original, which is not deleted"""
+    storage = FailingReviewStorage(root=str(tmp_path))
+    storage_client.override(storage)
+    monkeypatch.setattr(tasks, "SessionLocal", TestingSessionLocal)
+    user = User(id=str(uuid.uuid4()), email="k@example.com", phone="+33600000001",
+                hashed_password="x", first_name="K", last_name="Y")
+    document = KYCDocument(id=str(uuid.uuid4()), user_id=user.id, document_type=DocumentTypeKYC.PASSPORT)
+    object_name = f"kyc/{user.id}/{document.id}/front-{uuid.uuid4().hex}.jpg"
+    storage.upload_file(phone_photo().getvalue(), object_name, "image/jpeg")
+    document.front_image_url = storage.object_url(object_name)
+    db_session.add_all([user, document])
+    db_session.commit()
+    
+    try:
+        with pytest.raises(StorageError):
+            tasks.process_kyc_image_task(document.id, "front", object_name)
+    finally:
+        storage_client.override(None)
+    
+    assert storage.stat_file(object_name) is not None
+    db_session.expire_all()
+    assert db_session.get(KYCDocument, document.id).front_image_url == storage.object_url(object_name)
+    assert StorageError in tasks.process_kyc_image_task.autoretry_for
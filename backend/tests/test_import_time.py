@@ -0,0 +1,66 @@
+"""Cold-start budget for importing the application"""
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+# Cumulative import time allowed for app.main (override for slow CI machines)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "3.0"))
+
+# Unroutable address: any connection attempted at import time would stall
+UNREACHABLE_HOST = "10.255.255.1"
+
+PROBE = """
+import json
+import app.main
+from app.database.database import engine
+from app.utils.redis_client import redis_client
+from app.utils.storage import storage_client
+print(json.dumps({
+    "postgres": engine.initialized,
+    "redis": redis_client.initialized,
+    "storage": storage_client.initialized,
+}))
+"""
+
+
+def import_app_main() -> tuple[float, dict]:
+    """Import app.main in a fresh interpreter with -X importtime"""
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"postgresql://docurgent:docurgent@{UNREACHABLE_HOST}:5432/docurgent",
+        "REDIS_HOST": UNREACHABLE_HOST,
+        "MINIO_ENDPOINT": f"{UNREACHABLE_HOST}:9000",
+        "SMTP_HOST": UNREACHABLE_HOST,
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        timeout=60
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    
+    # Lines look like: "import time:  self [us] | cumulative | imported package"
+    cumulative_us = next(
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.startswith("import time:") and line.split("|")[2].strip() == "app.main"
+    )
+    return cumulative_us / 1_000_000, json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_app_main_import_budget():
+    """Importing app.main stays within budget and opens no connections"""
+    seconds, initialized = import_app_main()
+    
+    assert initialized == {"postgres": False, "redis": False, "storage": False}
+    assert seconds < IMPORT_BUDGET_SECONDS, (
+        f"app.main took {seconds:.2f}s to import (budget {IMPORT_BUDGET_SECONDS:.2f}s)"
+    )
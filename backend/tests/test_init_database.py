@@ -0,0 +1,29 @@
+"""Tests for init_database.py and migrations running DDL through the lazily built engine"""
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+import init_database
+import migrate_add_outbox
+from app.database.database import engine
+
+
+def test_create_and_drop_tables_through_the_lazy_engine():
+    """The app's engine proxy (not a plain Engine) is a usable bind for create_all/drop_all and inspect"""
+    engine.override(create_engine("sqlite://", poolclass=StaticPool))
+    try:
+        assert init_database.create_all_tables()
+        assert {"users", "document_requests", "outbox_events"} <= set(init_database.get_existing_tables())
+        assert init_database.drop_all_tables()
+        assert init_database.get_existing_tables() == []
+    finally:
+        engine.reset()
+
+
+def test_outbox_migration_creates_its_table_through_the_lazy_engine():
+    """migrate_add_outbox creates its tables with the resolved engine"""
+    engine.override(create_engine("sqlite://", poolclass=StaticPool))
+    try:
+        assert migrate_add_outbox.create_outbox_table()
+        assert {"outbox_events", "processed_events"} <= set(init_database.get_existing_tables())
+    finally:
+        engine.reset()
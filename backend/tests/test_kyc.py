@@ -0,0 +1,194 @@
+"""Tests for presigned KYC uploads: issuing URLs and verifying completed uploads"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api.v1.endpoints import kyc
+from app.core.dependencies import get_db
+from app.core.security import create_access_token
+from app.models.kyc_document import KYCDocument
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+from app.models.user import User, VerificationStatus
+from app.services.outbox_service import OutboxService
+from app.utils.storage import storage_client
+from app.workers.tasks import process_kyc_image_task
+
+
+class StubStorage:
+    """Storage stand-in: objects are (size, content type) the browser "uploaded" """
+    
+    def __init__(self):
+        self.objects = {}
+        self.deleted = []
+        self.available = True
+    
+    def get_upload_url(self, object_name: str, expires: int = 300):
+        return f"https://storage.test/{object_name}?X-Amz-Expires={expires}" if self.available else None
+    
+    def stat_file(self, object_name: str):
+        if object_name not in self.objects:
+            return None
+        size, content_type = self.objects[object_name]
+        return SimpleNamespace(size=size, content_type=content_type)
+    
+    def delete_file(self, object_name: str) -> bool:
+        self.deleted.append(object_name)
+        return self.objects.pop(object_name, None) is not None
+    
+    def object_url(self, object_name: str) -> str:
+        return f"https://storage.test/{object_name}"
+
+
+@pytest.fixture
+def storage():
+    stub = StubStorage()
+    storage_client.override(stub)
+    yield stub
+    storage_client.override(None)
+
+
+@pytest.fixture
+def queued(monkeypatch):
+    """Image processing jobs queued by completed uploads"""
+    jobs = []
+    monkeypatch.setattr(process_kyc_image_task, "delay", lambda *args: jobs.append(args))
+    return jobs
+
+
+@pytest.fixture
+def api(db_session, storage, queued):
+    """Minimal app exposing the KYC routes on the test database"""
+    app = FastAPI()
+    app.include_router(kyc.router, prefix="/api/v1")
+    app.dependency_overrides[get_db] = lambda: db_session
+    return TestClient(app)
+
+
+def make_user(db, phone: str) -> User:
+    user = User(id=str(uuid.uuid4()), email=f"{phone[1:]}@example.com", phone=phone,
+                hashed_password="x", first_name="K", last_name="Y")
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth(user: User) -> dict:
+    return {"Authorization": f"Bearer {create_access_token({'sub': user.id})}"}
+
+
+def request_upload(api, user: User, side: str = "front", **fields):
+    body = {"document_type": "passport", "side": side, "filename": "id.jpg", "content_type": "image/jpeg", "size": 1000}
+    return api.post("/api/v1/kyc/uploads", json={**body, **fields}, headers=auth(user))
+
+
+def complete(api, user: User, document_id: str, object_name: str, side: str = "front"):
+    return api.post("/api/v1/kyc/uploads/complete", headers=auth(user),
+                    json={"document_id": document_id, "side": side, "object_name": object_name})
+
+
+def image_events(db) -> list:
+    """kyc.image_uploaded outbox events, as published messages"""
+    events = db.query(OutboxEvent).filter(OutboxEvent.event_type == "kyc.image_uploaded").order_by(OutboxEvent.created_at)
+    return [OutboxService.to_message(event) for event in events]
+
+
+def test_upload_and_complete_queue_the_images_for_review(api, db_session, storage, queued):
+    """Front and selfie attach to one document, put the user in review and queue image processing"""
+    user = make_user(db_session, "+33600000001")
+    
+    front = request_upload(api, user)
+    assert front.status_code == 201
+    upload = front.json()
+    document_id = upload["document_id"]
+    assert upload["object_name"].startswith(f"kyc/{user.id}/{document_id}/front-") and upload["object_name"].endswith(".jpg")
+    assert upload["upload_url"].startswith("https://storage.test/") and upload["headers"] == {"Content-Type": "image/jpeg"}
+    
+    selfie = request_upload(api, user, "selfie", document_id=document_id, filename="me.png", content_type="image/png").json()
+    assert selfie["document_id"] == document_id
+    
+    storage.objects[upload["object_name"]] = (1000, "image/jpeg")
+    storage.objects[selfie["object_name"]] = (2000, "image/png; charset=binary")
+    assert complete(api, user, document_id, upload["object_name"]).json()["front_image_url"] == storage.object_url(upload["object_name"])
+    response = complete(api, user, document_id, selfie["object_name"], "selfie")
+    
+    assert response.status_code == 200
+    assert response.json()["selfie_url"] == storage.object_url(selfie["object_name"])
+    db_session.refresh(user)
+    assert user.verification_status == VerificationStatus.PENDING
+    assert queued == []  # Not from the request: through the outbox
+    assert all(OutboxService.consume(db_session, message) for message in image_events(db_session))
+    assert queued == [(document_id, "front", upload["object_name"]), (document_id, "selfie", selfie["object_name"])]
+    assert [document["id"] for document in api.get("/api/v1/kyc/documents", headers=auth(user)).json()] == [document_id]
+
+
+def test_documents_and_objects_are_checked_against_their_owner(api, db_session, storage, queued):
+    """Another user's document is not found; objects outside the document's slot are refused"""
+    owner, other = make_user(db_session, "+33600000001"), make_user(db_session, "+33600000002")
+    upload = request_upload(api, owner).json()
+    document_id, object_name = upload["document_id"], upload["object_name"]
+    storage.objects[object_name] = (1000, "image/jpeg")
+    
+    assert request_upload(api, other, document_id=document_id).status_code == 404
+    assert complete(api, other, document_id, object_name).status_code == 404
+    
+    other_document = request_upload(api, other).json()["document_id"]
+    assert complete(api, other, other_document, object_name).status_code == 400
+    assert complete(api, owner, document_id, object_name, "back").status_code == 400
+    nested = f"kyc/{owner.id}/{document_id}/front-x/../../{other_document}/front-y.jpg"
+    assert complete(api, owner, document_id, nested).status_code == 400
+    
+    db_session.query(KYCDocument).filter(KYCDocument.id == document_id).update({"is_verified": True})
+    db_session.commit()
+    assert complete(api, owner, document_id, object_name).status_code == 400
+    assert image_events(db_session) == [] and storage.deleted == []
+
+
+def test_declared_and_uploaded_files_are_validated(api, db_session, storage, queued):
+    """Type and size are checked when the URL is issued and again on the stored object"""
+    user = make_user(db_session, "+33600000001")
+    assert request_upload(api, user, filename="id.exe", content_type="application/octet-stream").status_code == 400
+    assert request_upload(api, user, content_type="image/png").status_code == 400
+    assert request_upload(api, user, size=11 * 1024 * 1024).status_code == 413
+    storage.available = False
+    assert request_upload(api, user).status_code == 503
+    storage.available = True
+    
+    upload = request_upload(api, user).json()
+    document_id, object_name = upload["document_id"], upload["object_name"]
+    response = complete(api, user, document_id, object_name)
+    assert response.status_code == 400 and "not found" in response.json()["detail"]
+    
+    for size, content_type in [(0, "image/jpeg"), (11 * 1024 * 1024, "image/jpeg"), (1000, "text/html")]:
+        storage.objects[object_name] = (size, content_type)
+        assert complete(api, user, document_id, object_name).status_code == 400
+        assert object_name not in storage.objects
+    
+    assert storage.deleted == [object_name] * 3
+    db_session.refresh(user)
+    assert user.verification_status == VerificationStatus.UNVERIFIED and image_events(db_session) == []
+
+
+def test_broker_outage_delays_processing_without_failing_the_upload(api, db_session, storage, queued, monkeypatch):
+    """Completion commits the event with the document; a failed publish is retried by the outbox consumer"""
+    user = make_user(db_session, "+33600000001")
+    upload = request_upload(api, user).json()
+    storage.objects[upload["object_name"]] = (1000, "image/jpeg")
+    
+    def broker_down(*args):
+        raise ConnectionError("broker down")
+    
+    monkeypatch.setattr(process_kyc_image_task, "delay", broker_down)
+    assert complete(api, user, upload["document_id"], upload["object_name"]).status_code == 200
+    
+    [message] = image_events(db_session)
+    with pytest.raises(ConnectionError):
+        OutboxService.consume(db_session, message)
+    db_session.rollback()
+    assert db_session.query(ProcessedEvent).count() == 0
+    
+    monkeypatch.setattr(process_kyc_image_task, "delay", lambda *args: queued.append(args))
+    assert OutboxService.consume(db_session, message)
+    assert queued == [(upload["document_id"], "front", upload["object_name"])]
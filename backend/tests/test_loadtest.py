@@ -0,0 +1,86 @@
+"""Tests for the load-test harness: the workflow against the app in-process, reports and SLO checks"""
+import asyncio
+import random
+
+import fakeredis
+import httpx
+
+from app.core.dependencies import get_db
+from app.main import app
+from app.utils.redis_client import RedisClient, redis_client
+from loadtest import slo
+from loadtest.runner import Recorder, percentile, run
+from loadtest.workflow import parse_mix
+from tests.conftest import TestingSessionLocal
+
+
+def test_full_workflow_runs_against_the_app(db_session):
+    """Every journey completes on SQLite and each workflow step is measured"""
+    def per_request_session():
+        session = TestingSessionLocal()
+        try:
+            yield session
+        finally:
+            session.close()
+    
+    app.dependency_overrides[get_db] = per_request_session
+    # A reachable rate-limit store: an unreachable one puts the app's limiter in fail-open for later tests
+    redis_client.override(RedisClient(client=fakeredis.FakeRedis(decode_responses=True)))
+    random.seed(3)  # Arrival times and journeys
+    try:
+        report = asyncio.run(run(
+            "http://test", parse_mix("new_sender=1,returning_sender=1,tracking=1"), rate=10, duration=0.5,
+            travelers=1, senders=1, timeout=30, session_factory=TestingSessionLocal,
+            transport=httpx.ASGITransport(app=app)
+        ))
+    finally:
+        app.dependency_overrides.clear()
+        redis_client.override(None)
+    
+    assert report["errors"] == 0 and report["journey_failures"] == {}
+    assert sum(outcomes["completed"] for outcomes in report["journeys"].values()) >= 3
+    delivery_steps = {"create_shipment", "assign", "check_in", "handoff", "deliver", "timeline"}
+    assert delivery_steps <= set(report["steps"])
+    assert report["steps"]["timeline"]["requests"] >= 4 * report["steps"]["deliver"]["requests"]
+    assert report["config"]["mix"] == {"new_sender": 1 / 3, "returning_sender": 1 / 3, "tracking": 1 / 3}
+
+
+def test_report_percentiles_and_error_rates():
+    """Nearest-rank percentiles per step; errors counted by kind and failed journeys by step"""
+    recorder = Recorder()
+    for ms in range(1, 101):
+        recorder.record("timeline", ms / 1000)
+    recorder.record("deliver", 0.2)
+    recorder.record("deliver", 5.0, "timeout")
+    recorder.record("deliver", 0.1, "503")
+    recorder.journey("new_sender", "failed", "deliver")
+    recorder.journey("tracking", "completed")
+    
+    report = recorder.report(elapsed=2.0)
+    timeline = report["steps"]["timeline"]
+    assert (timeline["p50_ms"], timeline["p95_ms"], timeline["p99_ms"]) == (50.0, 95.0, 99.0)
+    assert report["steps"]["deliver"]["errors_by_kind"] == {"timeout": 1, "503": 1}
+    assert (report["requests"], report["errors"], report["throughput_rps"]) == (103, 2, 51.5)
+    assert report["journey_failures"] == {"new_sender.deliver": 1}
+    assert percentile([], 95) == 0.0 and percentile([1.0], 99) == 1.0
+
+
+def test_slo_check_flags_misses_and_regressions(tmp_path):
+    """Objectives default to the route classes' p95; overrides and a baseline tighten them"""
+    slos = slo.default_slos()
+    assert slos["steps"]["deliver"]["p95_ms"] == 1000 and slos["steps"]["timeline"]["p95_ms"] == 500
+    
+    step = {"requests": 100, "errors": 0, "error_rate": 0.0, "p50_ms": 40, "p95_ms": 120, "p99_ms": 300}
+    report = {"error_rate": 0.0, "journeys": {"tracking": {"completed": 10}}, "steps": {"timeline": step}}
+    assert slo.check(report, slos) == []
+    
+    (tmp_path / "slo.json").write_text('{"error_rate": 0.001, "steps": {"timeline": {"p99_ms": 250}}}')
+    report["error_rate"] = 0.002
+    report["journeys"]["tracking"]["dropped"] = 1
+    baseline = {"steps": {"timeline": {**step, "p95_ms": 80}}}
+    assert slo.check(report, slo.load_slos(str(tmp_path / "slo.json")), baseline) == [
+        "error rate 0.20% > 0.10%",
+        "1 of 11 journeys dropped by the load generator (raise --max-active)",
+        "timeline: p99 300 ms > 250 ms",
+        "timeline: p95 120 ms regressed more than 20% from 80 ms",
+    ]
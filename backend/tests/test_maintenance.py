@@ -0,0 +1,104 @@
+"""Tests for the batched maintenance jobs"""
+import uuid
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.core.config import settings
+from app.models.document_request import DocumentRequest, DocumentType, RequestStatus
+from app.models.otp_verification import OTPVerification
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+from app.models.trip import Trip
+from app.models.user import User
+from app.services.maintenance_service import MaintenanceService
+
+NOW = datetime(2026, 6, 15, 12, 0)
+
+
+@pytest.fixture(autouse=True)
+def small_batches(monkeypatch):
+    config = settings.resolve()
+    monkeypatch.setattr(config, "MAINTENANCE_BATCH_SIZE", 2)
+    monkeypatch.setattr(config, "MAINTENANCE_BATCH_PAUSE_SECONDS", 0)
+
+
+@pytest.fixture
+def user(db_session) -> User:
+    user = User(id=str(uuid.uuid4()), email="t@example.com", phone="+33600000001",
+                hashed_password="x", first_name="T", last_name="T")
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def test_expired_otps_are_purged_in_batches(db_session):
+    """Only OTPs past the grace period go, in keyset batches"""
+    expiries = [NOW - timedelta(days=days) for days in (5, 4, 3, 2, 2)] + [NOW - timedelta(hours=1), NOW + timedelta(minutes=5)]
+    db_session.add_all([
+        OTPVerification(id=str(uuid.uuid4()), phone_number="+33600000000", otp_code="123456", expires_at=expires_at)
+        for expires_at in expiries
+    ])
+    db_session.commit()
+    
+    stats = MaintenanceService.purge_expired_otps(db_session, now=NOW)
+    
+    assert (stats["rows"], stats["batches"], stats["complete"]) == (5, 3, True)
+    assert sorted(otp.expires_at for otp in db_session.query(OTPVerification)) == expiries[5:]
+    assert MaintenanceService.purge_expired_otps(db_session, now=NOW)["rows"] == 0
+
+
+def test_old_processed_events_are_forgotten(db_session, monkeypatch):
+    """Handled event ids are kept for OUTBOX_DEDUPE_SECONDS, then purged"""
+    monkeypatch.setattr(settings.resolve(), "OUTBOX_DEDUPE_SECONDS", 24 * 3600)
+    ages = [timedelta(days=3), timedelta(days=2), timedelta(days=2), timedelta(hours=1)]
+    db_session.add_all([
+        ProcessedEvent(consumer="sender_notifications", event_id=str(uuid.uuid4()), processed_at=NOW - age)
+        for age in ages
+    ])
+    db_session.commit()
+    
+    stats = MaintenanceService.purge_processed_events(db_session, now=NOW)
+    
+    assert (stats["rows"], stats["batches"]) == (3, 2)
+    assert [event.processed_at for event in db_session.query(ProcessedEvent)] == [NOW - timedelta(hours=1)]
+
+
+def test_past_trips_are_deactivated(db_session, user):
+    """Trips that departed before today are deactivated, later ones untouched"""
+    departures = [date(2026, 6, day) for day in (1, 10, 14, 15, 20)]
+    db_session.add_all([
+        Trip(id=str(uuid.uuid4()), traveler_id=user.id, departure_city="Paris", destination_city="Rabat",
+             destination_country="Morocco", departure_date=departure)
+        for departure in departures
+    ])
+    db_session.commit()
+    
+    stats = MaintenanceService.deactivate_past_trips(db_session, today=NOW.date())
+    
+    assert stats["rows"] == 3
+    db_session.expire_all()
+    active = sorted(trip.departure_date for trip in db_session.query(Trip).filter(Trip.is_active.is_(True)))
+    assert active == departures[3:]
+
+
+def test_stuck_shipments_are_flagged_once_per_stay(db_session, user):
+    """Idle waiting shipments get one shipment.stuck event until they move again"""
+    def shipment(status, idle_hours):
+        return DocumentRequest(
+            id=str(uuid.uuid4()), sender_id=user.id, sender_name="S", sender_phone="+33600000000",
+            source_address="a", recipient_name="R", recipient_phone="+21260000000", destination_address="b",
+            document_type=DocumentType.OTHER, unique_code=str(uuid.uuid4())[:20], delivery_code="RCV",
+            traveler_code="TRV", status=status, updated_at=NOW - timedelta(hours=idle_hours)
+        )
+    
+    stuck = [shipment(RequestStatus.AT_RELAY_POINT, 100), shipment(RequestStatus.WITH_TRAVELER, 80),
+             shipment(RequestStatus.AT_RELAY_POINT, 73)]
+    db_session.add_all(stuck + [shipment(RequestStatus.WITH_TRAVELER, 10), shipment(RequestStatus.CREATED, 500)])
+    db_session.commit()
+    
+    assert MaintenanceService.flag_stuck_shipments(db_session, now=NOW)["rows"] == 3
+    assert MaintenanceService.flag_stuck_shipments(db_session, now=NOW)["rows"] == 0
+    
+    events = db_session.query(OutboxEvent).filter(OutboxEvent.event_type == "shipment.stuck").all()
+    assert {event.aggregate_id for event in events} == {s.id for s in stuck}
+    assert {event.payload["status"] for event in events} == {"at_relay_point", "with_traveler"}
@@ -0,0 +1,107 @@
+"""Tests for tracemalloc attribution and memory reports"""
+import uuid
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.user import User, UserRole
+from app.utils.memory import MemoryTracer, MemoryTracingMiddleware, memory_reports
+from app.utils.redis_client import RedisClient, redis_client
+
+MB = 1024 * 1024
+_leaked = []
+
+
+@pytest.fixture
+def tracer():
+    """Tracer reporting to a fake Redis; tests open and close its windows"""
+    redis = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+    redis_client.override(redis)
+    tracer = MemoryTracer(redis=redis)
+    yield tracer
+    tracer.stop()
+    redis_client.override(None)
+    _leaked.clear()
+
+
+def leak_megabyte():
+    _leaked.append(bytearray(MB))
+
+
+def run_requests(tracer):
+    app = FastAPI(middleware=[Middleware(MemoryTracingMiddleware, tracer=tracer)])
+    
+    @app.get("/leak/{n}")
+    def leak(n: int):
+        leak_megabyte()
+        return {"n": n}
+    
+    @app.get("/spike")
+    def spike():
+        return {"size": len(bytearray(4 * MB))}
+    
+    with TestClient(app) as client:
+        for n in range(3):
+            assert client.get(f"/leak/{n}").status_code == 200
+            assert client.get("/spike").status_code == 200
+
+
+def test_allocations_are_attributed_to_route_templates(tracer):
+    """Retained memory points at the leaking route, peaks at the spiking one; nothing is measured between windows"""
+    run_requests(tracer)
+    assert tracer.units == {}
+    
+    tracer.open_window()
+    run_requests(tracer)
+    tracer.close_window()
+    
+    leak = tracer.units[("route", "GET /leak/{n}")]
+    spike = tracer.units[("route", "GET /spike")]
+    assert leak.samples == spike.samples == 3
+    assert leak.retained_bytes >= 3 * MB
+    assert spike.peak_bytes >= 4 * MB
+    assert spike.retained_bytes < MB
+
+
+def test_window_reports_pin_retained_memory_to_source_lines(tracer):
+    """A window reports the lines still holding what it allocated, and the change from the previous window"""
+    leak_line = f"{__file__}:{leak_megabyte.__code__.co_firstlineno + 1}"
+    
+    tracer.open_window()
+    run_requests(tracer)
+    first = tracer.close_window()
+    sites = {site["site"]: site for site in first["top_sites"]}
+    assert sites[leak_line]["size"] >= 3 * MB
+    assert first["growth_since_previous"] == []
+    
+    tracer.open_window()
+    second = tracer.close_window()
+    shrunk = next(site for site in second["growth_since_previous"] if site["site"] == leak_line)
+    assert shrunk["size"] == 0 and shrunk["size_diff"] == -sites[leak_line]["size"]
+    assert [report["windows"] for report in memory_reports(tracer.redis)] == [2]
+
+
+def test_admin_reads_reports(client, db_session, tracer, monkeypatch):
+    """Admins list reports trimmed to `top` entries; refused while tracing is disabled"""
+    tracer.open_window()
+    run_requests(tracer)
+    tracer.close_window()
+    admin = User(id=str(uuid.uuid4()), email="admin@example.com", phone="+33600000001",
+                 hashed_password="x", first_name="A", last_name="A", user_type=UserRole.ADMIN)
+    db_session.add(admin)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin.id})}"}
+    
+    assert client.get("/api/v1/admin/memory", headers=headers).status_code == 409
+    
+    monkeypatch.setattr(settings.resolve(), "MEMORY_TRACING_ENABLED", True)
+    reports = client.get("/api/v1/admin/memory", params={"top": 1}, headers=headers).json()
+    assert [(report["kind"], len(report["top_sites"]), len(report["units"])) for report in reports] == [("api", 1, 1)]
+    assert reports[0]["units"][0]["name"] == "GET /leak/{n}"
+    assert client.post("/api/v1/admin/memory/window", headers=headers).status_code == 202
+    assert client.get("/api/v1/admin/memory", params={"kind": "worker"}, headers=headers).json() == []
@@ -0,0 +1,91 @@
+"""Tests for the pure ASGI middleware stack"""
+import asyncio
+
+import fakeredis
+import httpx
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+
+from app.utils.middleware import RequestIdMiddleware, TimingMiddleware, client_ip, request_id_var
+from app.utils.rate_limiter import RateLimitMiddleware
+from app.utils.redis_client import RedisClient
+
+
+def test_responses_carry_request_id_and_timing(client):
+    """Generated ids are unique; a caller's well-formed id is kept, a malformed one replaced"""
+    first, second = client.get("/health"), client.get("/health")
+    assert first.headers["x-request-id"] != second.headers["x-request-id"]
+    assert float(first.headers["x-process-time"]) >= 0
+    
+    assert client.get("/health", headers={"X-Request-ID": "edge-42.abc"}).headers["x-request-id"] == "edge-42.abc"
+    assert client.get("/health", headers={"X-Request-ID": "bad id\x7f"}).headers["x-request-id"] != "bad id\x7f"
+
+
+def test_request_id_reaches_sync_endpoints():
+    """The id set by the middleware is visible inside threadpool endpoints"""
+    app = FastAPI(middleware=[Middleware(RequestIdMiddleware), Middleware(TimingMiddleware)])
+    
+    @app.get("/whoami")
+    def whoami():
+        return {"request_id": request_id_var.get()}
+    
+    with TestClient(app) as client:
+        response = client.get("/whoami", headers={"X-Request-ID": "req-1"})
+    
+    assert response.json() == {"request_id": "req-1"}
+    assert request_id_var.get() is None
+
+
+def limited_app(limit: int) -> FastAPI:
+    redis = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+    app = FastAPI(middleware=[Middleware(RateLimitMiddleware, redis=redis, limit=limit)])
+    
+    @app.get("/ping")
+    def ping():
+        return {"ok": True}
+    
+    @app.get("/health")
+    def health():
+        return {"ok": True}
+    
+    return app
+
+
+def send(app: FastAPI, requests: list, peer: str = "127.0.0.1") -> list:
+    """Send (path, X-Forwarded-For) requests from a peer address; responses in order"""
+    async def main():
+        transport = httpx.ASGITransport(app=app, client=(peer, 50000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            return [
+                await http.get(path, headers={"X-Forwarded-For": forwarded} if forwarded else {})
+                for path, forwarded in requests
+            ]
+    
+    return asyncio.run(main())
+
+
+def test_rate_limit_per_client_ip():
+    """Over the limit a client gets 429 with Retry-After; health checks and other clients are unaffected"""
+    app = limited_app(limit=3)
+    
+    responses = send(app, [("/ping", "203.0.113.1")] * 4 + [("/health", "203.0.113.1"), ("/ping", "203.0.113.2")])
+    
+    assert [response.status_code for response in responses] == [200, 200, 200, 429, 200, 200]
+    assert 0 < int(responses[3].headers["retry-after"]) <= 60
+
+
+def test_forged_forwarded_for_cannot_escape_the_limit():
+    """Only the hop appended by the trusted proxy counts; an untrusted peer's header is ignored"""
+    app = limited_app(limit=2)
+    
+    # nginx appends the real address to whatever the client sent
+    forged = [("/ping", f"198.51.100.{n}, 203.0.113.1") for n in range(3)]
+    assert [response.status_code for response in send(app, forged)] == [200, 200, 429]
+    
+    # Straight to the app (not through a trusted proxy): keyed by the peer
+    direct = [("/ping", f"198.51.100.{n}") for n in range(3)]
+    assert [response.status_code for response in send(app, direct, peer="192.0.2.7")] == [200, 200, 429]
+    
+    assert client_ip({"client": ("127.0.0.1", 1), "headers": [(b"x-forwarded-for", b"10.0.0.1, ::1, 203.0.113.9, 127.0.0.1")]}) == "203.0.113.9"
+    assert client_ip({"client": ("127.0.0.1", 1), "headers": []}) == "127.0.0.1"
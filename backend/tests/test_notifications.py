@@ -0,0 +1,124 @@
+"""Tests for bulk notification fan-out"""
+import asyncio
+import uuid
+from datetime import date
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.models.document_request import DocumentRequest, DocumentType, RequestStatus
+from app.models.notification import Notification
+from app.models.trip import Trip
+from app.models.user import User
+from app.services import notification_service
+from app.services.notification_service import NotificationService
+from app.workers.runtime import AsyncRuntime
+
+
+def make_user(db, index: int, active: bool = True, email: bool = True) -> User:
+    user = User(
+        id=str(uuid.uuid4()),
+        email=f"user{index}@example.com" if email else None,
+        phone=f"+3360000{index:04d}",
+        hashed_password="x",
+        first_name="User",
+        last_name=str(index),
+        is_active=active
+    )
+    db.add(user)
+    return user
+
+
+@pytest.fixture
+def channels(app_smtp_server, monkeypatch):
+    """SMTP stand-in, recording SMS sender and push gateway on a fresh runtime"""
+    config = settings.resolve()
+    for name, value in {
+        "NOTIFICATION_CHUNK_SIZE": 10,
+        "NOTIFICATION_SMS_CONCURRENCY": 3,
+        "PUSH_GATEWAY_URL": "http://push.test/send",
+        "PUSH_BATCH_SIZE": 4,
+    }.items():
+        monkeypatch.setattr(config, name, value)
+    
+    sms = {"sent": [], "in_flight": 0, "max_in_flight": 0}
+    
+    async def fake_send_sms(phone: str, body: str) -> bool:
+        sms["in_flight"] += 1
+        sms["max_in_flight"] = max(sms["max_in_flight"], sms["in_flight"])
+        await asyncio.sleep(0.001)
+        sms["in_flight"] -= 1
+        sms["sent"].append(phone)
+        return True
+    
+    push_batches = []
+    
+    def push_gateway(request: httpx.Request) -> httpx.Response:
+        push_batches.append(request)
+        return httpx.Response(200, json={"ok": True})
+    
+    runtime = AsyncRuntime()
+    gateway = httpx.AsyncClient(transport=httpx.MockTransport(push_gateway))
+    monkeypatch.setattr(runtime, "http_client", lambda: gateway)
+    monkeypatch.setattr(notification_service, "runtime", runtime)
+    monkeypatch.setattr(notification_service, "send_sms", fake_send_sms)
+    yield {"smtp": app_smtp_server.handler, "sms": sms, "push": push_batches}
+    runtime.stop()
+
+
+def test_fan_out_over_every_channel(db_session, channels):
+    """Chunks resolve contacts, insert notifications and send per channel with limits"""
+    users = [make_user(db_session, i, email=i % 5 != 0) for i in range(23)]
+    inactive = make_user(db_session, 99, active=False)
+    db_session.commit()
+    user_ids = [user.id for user in users] + [inactive.id, "missing-user", users[0].id]
+    
+    progress = []
+    stats = NotificationService.fan_out(
+        db_session,
+        user_ids,
+        "Flight delayed",
+        "AF123 leaves 3 hours late",
+        channels=["in_app", "email", "sms", "push"],
+        data={"flight": "AF123"},
+        progress=lambda totals: progress.append(totals["processed"])
+    )
+    
+    assert stats["total"] == 25 and stats["processed"] == 25 and stats["skipped"] == 2
+    assert stats["channels"]["in_app"] == {"sent": 23, "failed": 0}
+    assert stats["channels"]["email"] == {"sent": 18, "failed": 0}
+    assert stats["channels"]["sms"] == {"sent": 23, "failed": 0}
+    assert stats["channels"]["push"] == {"sent": 23, "failed": 0}
+    assert progress[:3] == [10, 20, 25] and progress[-1] == 25
+    
+    rows = db_session.query(Notification).all()
+    assert sorted(row.user_id for row in rows) == sorted(user.id for user in users)
+    assert rows[0].extra_data == {"flight": "AF123"} and rows[0].channels == ["in_app", "email", "sms", "push"]
+    
+    assert len(channels["smtp"].messages) == 18
+    assert channels["sms"]["max_in_flight"] <= 3
+    # Chunks of 10, 10, 3 users in push batches of at most 4
+    assert len(channels["push"]) == 3 + 3 + 1
+
+
+def test_route_recipients(db_session):
+    """Travelers on the route and date plus senders with open requests on their trips"""
+    traveler, sender, done_sender, other = (make_user(db_session, i) for i in range(4))
+    trip = Trip(id=str(uuid.uuid4()), traveler_id=traveler.id, departure_city="Paris",
+                destination_city="Casablanca", destination_country="Morocco", departure_date=date(2026, 11, 2))
+    other_trip = Trip(id=str(uuid.uuid4()), traveler_id=other.id, departure_city="Paris",
+                      destination_city="Casablanca", destination_country="Morocco", departure_date=date(2026, 11, 3))
+    db_session.add_all([trip, other_trip])
+    for user, status in ((sender, RequestStatus.WITH_TRAVELER), (done_sender, RequestStatus.COMPLETED)):
+        db_session.add(DocumentRequest(
+            id=str(uuid.uuid4()), sender_id=user.id, sender_name="S", sender_phone=user.phone,
+            source_address="a", recipient_name="R", recipient_phone="+212600000000",
+            destination_address="b", document_type=DocumentType.DIPLOMA,
+            unique_code=f"DOC{uuid.uuid4().hex[:5]}", delivery_code="RCV", traveler_code="TRV",
+            trip_id=trip.id, status=status
+        ))
+    db_session.commit()
+    
+    recipients = NotificationService.route_recipient_ids(db_session, "Paris", "Casablanca", date(2026, 11, 2))
+    assert sorted(recipients) == sorted([traveler.id, sender.id])
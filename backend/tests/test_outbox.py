@@ -0,0 +1,167 @@
+"""Tests for the transactional outbox and its relay"""
+import json
+import uuid
+
+import fakeredis
+import pytest
+
+from app.models.document_request import RequestStatus
+from app.models.notification import Notification
+from app.models.outbox_event import OutboxEvent, ProcessedEvent
+from app.models.user import User
+from app.schemas.shipment import ShipmentCreate
+from app.services.outbox_service import OutboxService
+from app.services.shipment_service import ShipmentService
+from app.utils.redis_client import RedisClient
+from app.workers.outbox_relay import OutboxRelay, RedisStreamPublisher
+from app.workers.tasks import handle_outbox_event_task
+from tests.conftest import TestingSessionLocal
+
+
+class RecordingPublisher:
+    """Publisher stand-in that records messages and can fail on demand"""
+    
+    def __init__(self, fail_with: BaseException = None):
+        self.messages = []
+        self.fail_with = fail_with
+    
+    def publish(self, message: dict):
+        self.messages.append(message)
+        if self.fail_with is not None:
+            raise self.fail_with
+
+
+class RelayCrash(BaseException):
+    """Process death between publishing and committing (not caught by the relay)"""
+
+
+@pytest.fixture
+def sender(db_session) -> User:
+    user = User(
+        id=str(uuid.uuid4()),
+        email="sender@example.com",
+        phone="+33600000000",
+        hashed_password="x",
+        first_name="Sam",
+        last_name="Sender"
+    )
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+def create_shipment(db, sender: User):
+    return ShipmentService.create_shipment(db, sender.id, ShipmentCreate(
+        sender_name="Sam Sender",
+        sender_phone="+33600000000",
+        source_address="1 Rue de Paris",
+        recipient_name="Rita Recipient",
+        recipient_phone="+21260000000",
+        destination_address="1 Avenue Hassan II, Casablanca",
+        document_type="passport_copy"
+    ))
+
+
+def unpublished(db) -> list:
+    db.expire_all()
+    return db.query(OutboxEvent).filter(OutboxEvent.published_at.is_(None)).all()
+
+
+def test_events_commit_and_roll_back_with_the_shipment(db_session, sender, monkeypatch):
+    """Each transition writes its event in the same transaction"""
+    shipment = create_shipment(db_session, sender)
+    ShipmentService.update_status(db_session, shipment.id, RequestStatus.AT_RELAY_POINT, sender.id)
+    assert [event.event_type for event in unpublished(db_session)] == ["shipment.created", "shipment.status_changed"]
+    
+    def failing_commit():
+        raise RuntimeError("connection lost")
+    
+    monkeypatch.setattr(db_session, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        ShipmentService.cancel_shipment(db_session, shipment.id, sender.id, "changed my mind")
+    db_session.rollback()
+    monkeypatch.undo()
+    
+    assert len(unpublished(db_session)) == 2
+    assert ShipmentService.get_shipment(db_session, shipment.id).status == RequestStatus.AT_RELAY_POINT
+
+
+def test_relay_crash_republishes_the_batch(db_session, sender):
+    """Events published before a crash stay unpublished and are sent again"""
+    shipment = create_shipment(db_session, sender)
+    ShipmentService.update_status(db_session, shipment.id, RequestStatus.AT_RELAY_POINT, sender.id)
+    
+    crashing = RecordingPublisher(fail_with=RelayCrash())
+    with pytest.raises(RelayCrash):
+        OutboxRelay(TestingSessionLocal, crashing).relay_once()
+    assert len(crashing.messages) == 1
+    assert len(unpublished(db_session)) == 2
+    
+    publisher = RecordingPublisher()
+    assert OutboxRelay(TestingSessionLocal, publisher).relay_once() == {"published": 2, "failed": 0}
+    assert publisher.messages[0]["id"] == crashing.messages[0]["id"]
+    assert unpublished(db_session) == []
+    assert OutboxRelay(TestingSessionLocal, publisher).relay_once() == {"published": 0, "failed": 0}
+
+
+def test_failed_publishes_back_off(db_session, sender):
+    """A broker error reschedules the event instead of blocking the relay"""
+    create_shipment(db_session, sender)
+    
+    relay = OutboxRelay(TestingSessionLocal, RecordingPublisher(fail_with=ConnectionError("broker down")))
+    assert relay.relay_once() == {"published": 0, "failed": 1}
+    # Not due again until its backoff has elapsed
+    assert relay.relay_once() == {"published": 0, "failed": 0}
+    
+    event = unpublished(db_session)[0]
+    assert event.attempts == 1
+    assert event.last_error == "broker down"
+    assert event.available_at > event.created_at
+
+
+def test_redeliveries_are_handled_once(db_session, sender):
+    """At-least-once delivery through a Redis Stream, deduplicated by the consumer in the database"""
+    shipment = create_shipment(db_session, sender)
+    ShipmentService.cancel_shipment(db_session, shipment.id, sender.id, "changed my mind")
+    redis = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+    publisher = RedisStreamPublisher(redis, "test:events")
+    
+    class CrashAfterStream(RedisStreamPublisher):
+        def publish(self, message: dict):
+            super().publish(message)
+            raise RelayCrash()
+    
+    with pytest.raises(RelayCrash):
+        OutboxRelay(TestingSessionLocal, CrashAfterStream(redis, "test:events")).relay_once()
+    OutboxRelay(TestingSessionLocal, publisher).relay_once()
+    
+    entries = redis.client.xrange("test:events")
+    assert len(entries) == 3  # created (twice) and cancelled
+    handled = [OutboxService.consume(db_session, json.loads(fields["event"])) for _, fields in entries]
+    assert handled == [True, False, True]
+    
+    notifications = db_session.query(Notification).filter(Notification.user_id == sender.id).all()
+    assert [notification.title for notification in notifications] == ["Shipment cancelled"]
+
+
+def test_failed_handling_is_not_recorded(db_session, sender, monkeypatch):
+    """The processed-event row rolls back with a failed side effect, so the retry handles the event"""
+    shipment = create_shipment(db_session, sender)
+    message = OutboxService.to_message(unpublished(db_session)[0])
+    message.update(type="shipment.cancelled", payload={"sender_id": sender.id, "reason": "changed my mind"})
+    
+    def failing_commit():
+        raise RuntimeError("connection lost")
+    
+    monkeypatch.setattr(db_session, "commit", failing_commit)
+    with pytest.raises(RuntimeError):
+        OutboxService.consume(db_session, message)
+    db_session.rollback()
+    monkeypatch.undo()
+    assert db_session.query(ProcessedEvent).count() == 0
+    
+    assert OutboxService.consume(db_session, message)
+    assert not OutboxService.consume(db_session, message)
+    assert db_session.query(Notification).filter(Notification.user_id == sender.id).count() == 1
+    # The broker redelivers the task if the worker dies before it finished
+    assert handle_outbox_event_task.acks_late
@@ -0,0 +1,105 @@
+"""Tests for the admin-armed request profiler"""
+import threading
+import time
+import uuid
+
+import fakeredis
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from starlette.middleware import Middleware
+
+from app.core.config import settings
+from app.core.security import create_access_token
+from app.models.user import User, UserRole
+from app.utils.local_storage import LocalStorageClient
+from app.utils.profiling import ProfilingMiddleware, StackSampler, arm_profiling, sign_profile_token, verify_profile_token
+from app.utils.redis_client import RedisClient, redis_client
+
+
+@pytest.fixture
+def redis():
+    client = RedisClient(client=fakeredis.FakeRedis(decode_responses=True))
+    redis_client.override(client)
+    yield client
+    redis_client.override(None)
+
+
+def profiled_app(redis, storage) -> FastAPI:
+    app = FastAPI(middleware=[Middleware(ProfilingMiddleware, redis=redis, storage=storage, enabled=True)])
+    
+    def slow_lookup():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            pass
+    
+    @app.get("/items/{item_id}")
+    def get_item(item_id: str):
+        slow_lookup()
+        return {"id": item_id}
+    
+    return app
+
+
+def test_armed_session_profiles_next_matching_requests(redis, tmp_path, monkeypatch):
+    """Only N requests matching the route template are profiled; stacks land in storage"""
+    storage = LocalStorageClient(root=str(tmp_path))
+    stopped_on_loop = []
+    stop = StackSampler.stop
+    
+    def record_stop(sampler):
+        stopped_on_loop.append(threading.get_ident() == sampler.loop_thread_id)
+        stop(sampler)
+    
+    monkeypatch.setattr(StackSampler, "stop", record_stop)
+    session = arm_profiling("GET", "/items/{item_id}", requests=2, interval_ms=2, ttl_seconds=60, redis=redis)
+    
+    with TestClient(profiled_app(redis, storage)) as client:
+        responses = [client.get(f"/items/{i}") for i in range(3)]
+    
+    profiles = [response.headers.get("x-profile") for response in responses]
+    assert profiles[2] is None
+    assert stopped_on_loop == [False, False]  # Joined in the threadpool, not on the event loop
+    for name in profiles[:2]:
+        assert name.startswith(f"profiles/{session.id}/GET_items_item_id/")
+        stacks = storage.download_file(name).decode()
+        assert any(line.startswith("threadpool;") and "slow_lookup (" in line for line in stacks.splitlines())
+        assert all(line.rsplit(" ", 1)[1].isdigit() for line in stacks.splitlines())
+
+
+def test_profile_token_is_bound_to_method_path_and_expiry(redis, tmp_path):
+    """A signed header profiles exactly its request; anything else is ignored"""
+    token = sign_profile_token("GET", "/items/42", ttl_seconds=60)
+    assert verify_profile_token(token, "GET", "/items/42")
+    assert not verify_profile_token(token, "GET", "/items/43")
+    assert not verify_profile_token(token, "DELETE", "/items/42")
+    assert not verify_profile_token(token[:-1] + "0", "GET", "/items/42")
+    assert not verify_profile_token(sign_profile_token("GET", "/items/42", ttl_seconds=-1), "GET", "/items/42")
+    
+    with TestClient(profiled_app(redis, LocalStorageClient(root=str(tmp_path)))) as client:
+        assert "x-profile" in client.get("/items/42", headers={"X-Profile-Token": token}).headers
+        assert "x-profile" not in client.get("/items/43", headers={"X-Profile-Token": token}).headers
+
+
+def test_admin_arms_profiling_for_known_routes(client, db_session, redis, monkeypatch):
+    """Admins arm, inspect and disarm sessions; disabled deployments refuse"""
+    admin = User(id=str(uuid.uuid4()), email="admin@example.com", phone="+33600000001",
+                 hashed_password="x", first_name="A", last_name="A", user_type=UserRole.ADMIN)
+    db_session.add(admin)
+    db_session.commit()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': admin.id})}"}
+    body = {"method": "GET", "route": "/api/v1/shipments/{shipment_id}", "requests": 5}
+    
+    assert client.post("/api/v1/admin/profiling", json=body, headers=headers).status_code == 409
+    
+    monkeypatch.setattr(settings.resolve(), "PROFILING_ENABLED", True)
+    unknown = {**body, "route": "/api/v1/nothing/{here}"}
+    assert client.post("/api/v1/admin/profiling", json=unknown, headers=headers).status_code == 400
+    
+    armed = client.post("/api/v1/admin/profiling", json=body, headers=headers)
+    assert armed.status_code == 201
+    status = client.get("/api/v1/admin/profiling", headers=headers).json()
+    assert (status["id"], status["remaining"]) == (armed.json()["id"], 5)
+    
+    assert client.delete("/api/v1/admin/profiling", headers=headers).status_code == 200
+    assert client.get("/api/v1/admin/profiling", headers=headers).status_code == 404
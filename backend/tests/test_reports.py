@@ -0,0 +1,96 @@
+"""Tests for streaming shipment reports"""
+import csv
+import io
+import json
+import uuid
+from datetime import date, datetime
+
+import pytest
+
+from app.models.document_request import DocumentRequest, DocumentType, RequestStatus
+from app.models.relay_point import RelayPoint
+from app.models.trip import Trip
+from app.models.user import User
+from app.services import report_service
+from app.services.report_service import ReportService
+from app.utils.local_storage import LocalStorageClient
+
+
+@pytest.fixture
+def storage(tmp_path) -> LocalStorageClient:
+    return LocalStorageClient(root=str(tmp_path))
+
+
+@pytest.fixture
+def shipments(db_session):
+    """Six March shipments over two routes, plus one in April"""
+    users = [
+        User(id=str(uuid.uuid4()), email=f"u{i}@example.com", phone=f"+3360000000{i}",
+             hashed_password="x", first_name="U", last_name=str(i))
+        for i in range(3)
+    ]
+    sender, traveler, relay_owner = users
+    relay = RelayPoint(id=str(uuid.uuid4()), user_id=relay_owner.id, location_name="Tabac Central",
+                       address="1 Rue", city="Paris", country="France")
+    trips = [
+        Trip(id=str(uuid.uuid4()), traveler_id=traveler.id, departure_city="Paris",
+             destination_city=city, destination_country="Morocco", departure_date=date(2026, 3, 20))
+        for city in ("Casablanca", "Rabat")
+    ]
+    db_session.add_all(users + [relay] + trips)
+    
+    def shipment(created_at, status, trip=None, price="10"):
+        return DocumentRequest(
+            id=str(uuid.uuid4()), sender_id=sender.id, sender_name="S", sender_phone="+33600000000",
+            source_address="a", recipient_name="R", recipient_phone="+21260000000", destination_address="b",
+            document_type=DocumentType.DIPLOMA, unique_code=str(uuid.uuid4())[:20], delivery_code="RCV",
+            traveler_code="TRV", status=status, offered_price=price, created_at=created_at,
+            traveler_id=traveler.id if trip else None, trip_id=trip.id if trip else None,
+            relay_point_id=relay.id
+        )
+    
+    db_session.add_all([
+        shipment(datetime(2026, 3, 1), RequestStatus.COMPLETED, trips[0], "25"),
+        shipment(datetime(2026, 3, 2), RequestStatus.DELIVERED, trips[0], "15"),
+        shipment(datetime(2026, 3, 3), RequestStatus.WITH_TRAVELER, trips[0]),
+        shipment(datetime(2026, 3, 4), RequestStatus.COMPLETED, trips[1], "oops"),
+        shipment(datetime(2026, 3, 5), RequestStatus.CREATED),
+        shipment(datetime(2026, 3, 31, 23, 59), RequestStatus.CANCELLED),
+        shipment(datetime(2026, 4, 1), RequestStatus.CREATED),
+    ])
+    db_session.commit()
+    return trips
+
+
+def read(storage: LocalStorageClient, result: dict) -> str:
+    return storage.download_file(result["object_name"]).decode()
+
+
+def test_aggregate_report_streams_into_storage(db_session, shipments, storage, monkeypatch):
+    """Rows are folded per route while streaming; the CSV lands in storage behind a signed URL"""
+    monkeypatch.setattr(report_service, "OUTPUT_CHUNK_SIZE", 64)
+    
+    result = ReportService.generate(db_session, "by_route", "2026-03", "csv", storage=storage)
+    
+    assert result["rows"] == 6
+    assert result["url"].startswith("/api/v1/storage/reports/by_route/2026-03/")
+    rows = {row["key"]: row for row in csv.DictReader(io.StringIO(read(storage, result)))}
+    assert rows["Paris -> Casablanca"]["shipments"] == "3"
+    assert rows["Paris -> Casablanca"]["revenue"] == "40"
+    assert rows["Paris -> Rabat"]["completed"] == "1"
+    assert rows["Paris -> Rabat"]["revenue"] == "0"
+    assert rows["unassigned"]["shipments"] == "2"
+    assert storage.stat_file(result["object_name"]).content_type == "text/csv"
+
+
+def test_row_report_as_ndjson(db_session, shipments, storage):
+    """The row-level export keeps every shipment of the month, in NDJSON"""
+    result = ReportService.generate(db_session, "shipments", "2026-03", "ndjson", storage=storage)
+    
+    lines = [json.loads(line) for line in read(storage, result).splitlines()]
+    assert len(lines) == 6
+    assert {line["status"] for line in lines} == {"completed", "delivered", "with_traveler", "created", "cancelled"}
+    assert lines[0]["relay_point"] == "Tabac Central (Paris)"
+    
+    with pytest.raises(ValueError):
+        ReportService.generate(db_session, "by_weather", "2026-03", storage=storage)
@@ -0,0 +1,58 @@
+"""Tests for the Gunicorn entry point and its CPU-quota-aware worker count"""
+import gc
+import os
+
+from app import server
+from app.core import capacity
+from app.core.capacity import available_cpus, capacity_plan
+from app.core.config import settings
+
+
+def test_cpus_follow_the_cgroup_quota(tmp_path):
+    """cgroup v2 cpu.max, then v1 cfs files; no quota leaves the schedulable CPUs"""
+    cpus = len(os.sched_getaffinity(0))
+    assert available_cpus(str(tmp_path)) == cpus
+    
+    (tmp_path / "cpu").mkdir()
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("-1\n")
+    (tmp_path / "cpu" / "cpu.cfs_period_us").write_text("100000\n")
+    assert available_cpus(str(tmp_path)) == cpus
+    (tmp_path / "cpu" / "cpu.cfs_quota_us").write_text("25000\n")
+    assert available_cpus(str(tmp_path)) == 0.25
+    
+    (tmp_path / "cpu.max").write_text("max 100000\n")
+    assert available_cpus(str(tmp_path)) == cpus
+    (tmp_path / "cpu.max").write_text("50000 100000\n")
+    assert available_cpus(str(tmp_path)) == 0.5
+
+
+def test_auto_workers_round_the_quota_up(monkeypatch):
+    """API_WORKERS=0 runs one worker per CPU of quota, at least one; a set value wins"""
+    monkeypatch.setattr(settings.resolve(), "API_WORKERS", 0)
+    for cpus, workers in ((0.5, 1), (2.0, 2), (2.5, 3)):
+        monkeypatch.setattr(capacity, "available_cpus", lambda: cpus)
+        assert capacity_plan().workers == workers
+    monkeypatch.setattr(settings.resolve(), "API_WORKERS", 4)
+    assert capacity_plan().workers == 4
+
+
+def test_server_config_preloads_and_freezes_before_fork(monkeypatch):
+    """Gunicorn accepts the options; the fork hooks freeze the master's objects and re-enable gc in workers"""
+    config = settings.resolve()
+    monkeypatch.setattr(config, "API_WORKERS", 3)
+    monkeypatch.setattr(config, "API_MAX_REQUESTS_JITTER", 500)
+    cfg = server.Server(server.server_options()).cfg
+    assert (cfg.workers, cfg.preload_app, cfg.max_requests_jitter) == (3, True, 500)
+    assert cfg.graceful_timeout == int(settings.API_GRACEFUL_TIMEOUT_SECONDS)
+    assert cfg.worker_class is server.Worker
+    assert server.Worker.CONFIG_KWARGS == {"loop": "uvloop", "http": "httptools"}
+    
+    gc.disable()
+    try:
+        cfg.pre_fork(None, None)
+        assert gc.get_freeze_count() > 0
+        cfg.post_fork(None, None)
+        assert gc.isenabled()
+    finally:
+        gc.unfreeze()
+        gc.enable()
@@ -0,0 +1,76 @@
+"""Tests for the MinIO storage client's streamed downloads"""
+import gc
+
+import pytest
+
+from app.utils.storage import StorageClient
+
+
+class FakeResponse:
+    """get_object response: streams its data and records when it is given back"""
+    
+    def __init__(self, data: bytes):
+        self.data = data
+        self.closed = self.released = False
+    
+    def stream(self, chunk_size: int):
+        for start in range(0, len(self.data), chunk_size):
+            yield self.data[start:start + chunk_size]
+    
+    def close(self):
+        self.closed = True
+    
+    def release_conn(self):
+        self.released = True
+
+
+class FakeMinio:
+    def __init__(self):
+        self.responses = []
+    
+    def get_object(self, bucket, object_name, offset=0, length=0):
+        response = FakeResponse(b"x" * 10)
+        self.responses.append(response)
+        return response
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setattr(StorageClient, "_ensure_bucket", lambda self: None)
+    client = StorageClient()
+    client.client = FakeMinio()
+    return client
+
+
+def test_exhausted_stream_releases_the_connection(storage):
+    """Reading every chunk gives the connection back"""
+    chunks = storage.stream_file("kyc/front.jpg", chunk_size=4)
+    assert list(chunks) == [b"xxxx", b"xxxx", b"xx"]
+    [response] = storage.client.responses
+    assert response.closed and response.released
+    assert list(chunks) == []
+
+
+def test_partially_read_stream_releases_the_connection(storage):
+    """A client disconnecting mid-download: close() or discarding the iterator gives it back"""
+    closed = storage.stream_file("kyc/front.jpg", chunk_size=4)
+    assert next(closed) == b"xxxx"
+    closed.close()
+    
+    dropped = storage.stream_file("kyc/front.jpg", chunk_size=4)
+    assert next(dropped) == b"xxxx"
+    del dropped
+    gc.collect()
+    
+    assert all(response.closed and response.released for response in storage.client.responses)
+
+
+def test_unread_stream_releases_the_connection(storage):
+    """A response opened but never iterated (e.g. an error before streaming) is not leaked"""
+    closed = storage.stream_file("kyc/front.jpg")
+    closed.close()
+    storage.stream_file("kyc/back.jpg")
+    gc.collect()
+    
+    assert len(storage.client.responses) == 2
+    assert all(response.closed and response.released for response in storage.client.responses)
@@ -0,0 +1,186 @@
+"""Tests for spans across requests, the database, Redis and Celery"""
+import json
+import threading
+import time
+import uuid
+
+import fakeredis
+import pytest
+from celery.contrib.testing.worker import start_worker
+from kombu import Producer
+
+from app.core.security import create_access_token
+from app.models.document_request import DocumentRequest, DocumentType
+from app.models.user import User
+from app.utils.redis_client import RedisClient, redis_client
+from app.utils.tracing import FileSpanExporter, InMemorySpanExporter, SpanExporter, Tracer, tracer
+from app.workers import celery_app as celery_module
+from app.workers.celery_app import QUEUE_TRANSACTIONAL, celery_app
+
+
+@pytest.fixture
+def spans():
+    """Finished spans of the process tracer, sampling every trace"""
+    exporter = InMemorySpanExporter()
+    tracer.override(Tracer(exporter=exporter, sample_ratio=1.0))
+    yield exporter.spans
+    tracer.override(None)
+
+
+def test_request_spans_cover_database_and_redis(client, db_session, spans):
+    """The server span continues the caller's trace; statements and Redis calls are its children"""
+    redis_client.override(RedisClient(client=fakeredis.FakeRedis(decode_responses=True)))
+    user = User(id=str(uuid.uuid4()), email="sender@example.com", phone="+33600000000",
+                hashed_password="x", first_name="S", last_name="S")
+    shipment = DocumentRequest(
+        id=str(uuid.uuid4()), sender_id=user.id, sender_name="Sender", sender_phone="+33600000000",
+        source_address="1 Rue de Paris", recipient_name="Recipient", recipient_phone="+21260000000",
+        destination_address="1 Avenue", document_type=DocumentType.DIPLOMA, unique_code="DOC00000001",
+        delivery_code="RCV00001", traveler_code="TRV00001"
+    )
+    db_session.add_all([user, shipment])
+    db_session.commit()
+    trace_id, caller_span_id = uuid.uuid4().hex, uuid.uuid4().hex[:16]
+    
+    try:
+        response = client.get(f"/api/v1/shipments/{shipment.id}", headers={
+            "Authorization": f"Bearer {create_access_token({'sub': user.id})}",
+            "traceparent": f"00-{trace_id}-{caller_span_id}-01",
+        })
+    finally:
+        redis_client.override(None)
+    
+    assert response.status_code == 200
+    assert response.headers["x-trace-id"] == trace_id
+    server = next(span for span in spans if span.kind == "server")
+    assert server.name == "GET /api/v1/shipments/{shipment_id}"
+    assert (server.trace_id, server.parent_span_id) == (trace_id, caller_span_id)
+    assert server.attributes["http.response.status_code"] == 200
+    
+    statements = [span for span in spans if span.attributes.get("db.system") == "sqlite"]
+    assert {span.name for span in statements} == {"SELECT"}
+    assert len(statements) >= 2  # User lookup, then the shipment
+    assert {(span.trace_id, span.parent_span_id) for span in statements} == {(trace_id, server.span_id)}
+    redis_span = next(span for span in spans if span.name == "redis increment_window")
+    assert (redis_span.kind, redis_span.parent_span_id) == ("client", server.span_id)
+
+
+def test_trace_context_travels_in_task_headers(spans):
+    """publish is a child of the caller's span, process a child of publish"""
+    original = {key: celery_app.conf[key] for key in ("broker_url", "result_backend")}
+    celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://")
+    
+    @celery_app.task(name="tests.echo", ignore_result=False)
+    def echo(value):
+        return value
+    
+    try:
+        with start_worker(celery_app, pool="solo", perform_ping_check=False, queues=[QUEUE_TRANSACTIONAL]):
+            with tracer.span("checkout") as root:
+                assert echo.apply_async((1,), queue=QUEUE_TRANSACTIONAL).get(timeout=10) == 1
+            deadline = time.monotonic() + 5
+            while not any(span.kind == "consumer" for span in spans) and time.monotonic() < deadline:
+                time.sleep(0.01)
+    finally:
+        celery_app.tasks.pop("tests.echo", None)
+        celery_app.conf.update(original)
+    
+    publish = next(span for span in spans if span.kind == "producer")
+    process = next(span for span in spans if span.kind == "consumer")
+    assert (publish.name, publish.parent_span_id) == ("tests.echo publish", root.span_id)
+    assert (process.name, process.parent_span_id) == ("tests.echo process", publish.span_id)
+    assert process.trace_id == publish.trace_id == root.trace_id
+    assert process.attributes["celery.state"] == "SUCCESS"
+
+
+
+def test_failed_publishes_leave_no_open_spans(spans, monkeypatch):
+    """A publish that raises never gets after_task_publish: its span is dropped, not kept per task id"""
+    original = {key: celery_app.conf[key] for key in ("broker_url", "result_backend")}
+    celery_app.conf.update(broker_url="memory://", result_backend="cache+memory://")
+    
+    @celery_app.task(name="tests.echo")
+    def echo(value):
+        return value
+    
+    def broker_down(*args, **kwargs):
+        raise ConnectionError("broker down")
+    
+    try:
+        with monkeypatch.context() as patch:
+            patch.setattr(Producer, "publish", broker_down)
+            for value in range(3):
+                with pytest.raises(ConnectionError):
+                    echo.apply_async((value,), queue=QUEUE_TRANSACTIONAL, retry=False)
+        echo.apply_async((3,), queue=QUEUE_TRANSACTIONAL, retry=False)
+    finally:
+        celery_app.tasks.pop("tests.echo", None)
+        celery_app.conf.update(original)
+    
+    assert [span.name for span in spans if span.kind == "producer"] == ["tests.echo publish"]
+    assert celery_module._publishing.span is None
+
+def test_sampling_and_otlp_file_export(tmp_path):
+    """Unsampled traces export nothing unless the caller sampled them; batches are OTLP/JSON lines"""
+    unsampled = InMemorySpanExporter()
+    local = Tracer(exporter=unsampled, sample_ratio=0.0)
+    with local.span("root") as root, local.span("child"):
+        pass
+    assert unsampled.spans == [] and root.traceparent.endswith("-00")
+    with local.span("remote", traceparent=f"00-{'a' * 32}-{'b' * 16}-01"):
+        pass
+    assert [(span.trace_id, span.parent_span_id) for span in unsampled.spans] == [("a" * 32, "b" * 16)]
+    with local.span("malformed", traceparent="00-xyz-01"):
+        pass
+    assert len(unsampled.spans) == 1
+    
+    path = tmp_path / "spans.jsonl"
+    local = Tracer(exporter=FileSpanExporter(str(path)), sample_ratio=1.0)
+    with pytest.raises(ValueError), local.span("outer") as outer, local.span("inner", attributes={"n": 3}):
+        raise ValueError("boom")
+    local.close()
+    
+    [line] = path.read_text().splitlines()
+    [resource_spans] = json.loads(line)["resourceSpans"]
+    assert {"key": "service.name", "value": {"stringValue": "docurgent-backend"}} in resource_spans["resource"]["attributes"]
+    inner, exported_outer = resource_spans["scopeSpans"][0]["spans"]
+    assert (inner["parentSpanId"], exported_outer["spanId"]) == (outer.span_id, outer.span_id)
+    assert inner["attributes"] == [{"key": "n", "value": {"intValue": "3"}}]
+    assert inner["status"]["code"] == exported_outer["status"]["code"] == 2
+    assert inner["events"][0]["name"] == "exception"
+
+
+class StuckSpanExporter(SpanExporter):
+    """Batched exporter whose first export hangs until released"""
+    
+    def __init__(self):
+        self.exporting = threading.Event()
+        self.release = threading.Event()
+        self.shut_down = False
+    
+    def export(self, spans):
+        self.exporting.set()
+        self.release.wait(5)
+    
+    def shutdown(self):
+        self.shut_down = True
+
+
+def test_close_gives_up_on_a_stuck_exporter():
+    """A full queue does not make close() raise; the backlog is dropped and the exporter still shut down"""
+    exporter = StuckSpanExporter()
+    local = Tracer(exporter=exporter, sample_ratio=1.0, batch_size=1, queue_size=2)
+    with local.span("exporting"):
+        pass
+    assert exporter.exporting.wait(5)
+    for name in ("queued", "queued", "dropped"):
+        with local.span(name):
+            pass
+    
+    try:
+        started = time.monotonic()
+        local.close(timeout=0.05)
+        assert time.monotonic() - started < 1
+        assert exporter.shut_down
+    finally:
+        exporter.release.set()
@@ -0,0 +1,53 @@
+"""Tests for the persistent event loop of Celery worker processes"""
+import pytest
+
+from app.core.config import settings
+from app.workers.runtime import AsyncRuntime
+from app.workers import tasks
+
+
+@pytest.fixture
+def mail_server(app_smtp_server, monkeypatch):
+    """The application's SMTP server, with a pool of two connections per loop"""
+    monkeypatch.setattr(settings.resolve(), "SMTP_POOL_SIZE", 2)
+    return app_smtp_server
+
+
+@pytest.fixture
+def worker_runtime(monkeypatch):
+    """Fresh runtime installed for the tasks module"""
+    runtime = AsyncRuntime()
+    monkeypatch.setattr(tasks, "runtime", runtime)
+    yield runtime
+    runtime.stop()
+
+
+def test_email_tasks_reuse_the_process_loop(mail_server, worker_runtime):
+    """Consecutive tasks share one loop and its pooled, authenticated connections"""
+    for i in range(20):
+        assert tasks.send_email_task.run(f"user{i}@example.com", "Status", "Moved") == {
+            "status": "sent", "to": f"user{i}@example.com"
+        }
+    
+    connections = {peer for peer, _ in mail_server.handler.messages}
+    assert len(mail_server.handler.messages) == 20
+    assert len(connections) <= 2
+    assert sorted(mail_server.handler.logins) == sorted(connections)
+
+
+def test_stop_closes_shared_resources(mail_server, worker_runtime):
+    """stop() quits pooled connections and a later run() starts a fresh loop"""
+    worker_runtime.run(tasks.send_email("a@example.com", "Status", "Moved"))
+    first_loop = worker_runtime._loop
+    
+    async def shared_clients():
+        return worker_runtime.http_client(), worker_runtime.http_client()
+    
+    http, same_http = worker_runtime.run(shared_clients())
+    assert http is same_http
+    
+    worker_runtime.stop()
+    assert not worker_runtime.running and http.is_closed and first_loop.is_closed()
+    
+    assert worker_runtime.run(tasks.send_email("b@example.com", "Status", "Moved"))
+    assert worker_runtime.running and worker_runtime._loop is not first_loop